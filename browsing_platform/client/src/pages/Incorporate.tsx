@@ -4,6 +4,7 @@ import {
     Button,
     Chip,
     CircularProgress,
+    LinearProgress,
     Paper,
     Stack,
     Table,
@@ -39,6 +40,18 @@ interface LogLine {
     error?: string;
 }
 
+interface StageProgress {
+    type: 'progress';
+    stage: string;
+    label: string;
+    done: number;
+    total: number | null;
+    errors: number;
+    rate: number;
+    eta_seconds: number | null;
+    finished: boolean;
+}
+
 const STATUS_COLOR: Record<string, 'default' | 'success' | 'error' | 'warning' | 'info'> = {
     running: 'info',
     completed: 'success',
@@ -52,6 +65,13 @@ const LOG_LEVEL_COLOR: Record<string, string> = {
     DEBUG: '#868e96',
 };
 
+const formatDuration = (seconds: number): string => {
+    const s = Math.round(seconds);
+    if (s < 60) return `${s}s`;
+    if (s < 3600) return `${Math.floor(s / 60)}m ${s % 60}s`;
+    return `${Math.floor(s / 3600)}h ${Math.floor((s % 3600) / 60)}m`;
+};
+
 const WS_URL = (() => {
     const base = config.serverPath.replace(/\/$/, '').replace(/^http/, 'ws');
     return `${base}/api/incorporate/ws`;
@@ -63,6 +83,8 @@ export default function IncorporatePage() {
     const [stopping, setStopping] = useState(false);
     const [history, setHistory] = useState<Job[]>([]);
     const [logs, setLogs] = useState<LogLine[]>([]);
+    // Latest coalesced progress message per stage, in the order stages started
+    const [progress, setProgress] = useState<Record<string, StageProgress>>({});
     const [wsConnected, setWsConnected] = useState(false);
     const logBoxRef = useRef<HTMLDivElement>(null);
     const wsRef = useRef<WebSocket | null>(null);
@@ -110,8 +132,13 @@ export default function IncorporatePage() {
 
         ws.onmessage = (event) => {
             try {
-                const msg: LogLine = JSON.parse(event.data);
+                const msg = JSON.parse(event.data);
                 if (msg.type === 'ping') return;
+                if (msg.type === 'progress') {
+                    const stage = msg as StageProgress;
+                    setProgress(prev => ({...prev, [stage.stage]: stage}));
+                    return;
+                }
                 if (msg.type === 'done') {
                     setRunning(false);
                     setStarting(false);
@@ -147,6 +174,7 @@ export default function IncorporatePage() {
     const handleStart = async () => {
         setStarting(true);
         setLogs([]);
+        setProgress({});
         const data = await server.post('incorporate/start', {});
         if (data?.status === 'started') {
             setRunning(true);
@@ -221,6 +249,27 @@ export default function IncorporatePage() {
                     />
                 </Stack>
 
+                {/* Per-stage progress */}
+                {Object.values(progress).map(stage => (
+                    <Box key={stage.stage} mb={1.5}>
+                        <Stack direction="row" justifyContent="space-between">
+                            <Typography variant="body2">{stage.label}</Typography>
+                            <Typography variant="body2" color="text.secondary">
+                                {stage.done.toLocaleString()}
+                                {stage.total !== null && ` / ${stage.total.toLocaleString()}`}
+                                {stage.errors > 0 && ` · ${stage.errors.toLocaleString()} errors`}
+                                {!stage.finished && stage.rate > 0 && ` · ${stage.rate.toFixed(1)}/s`}
+                                {!stage.finished && stage.eta_seconds !== null && ` · ETA ${formatDuration(stage.eta_seconds)}`}
+                            </Typography>
+                        </Stack>
+                        <LinearProgress
+                            variant={stage.finished || stage.total ? 'determinate' : 'indeterminate'}
+                            value={stage.finished ? 100 : stage.total ? Math.min(100, 100 * stage.done / stage.total) : undefined}
+                            color={stage.errors > 0 ? 'warning' : 'primary'}
+                        />
+                    </Box>
+                ))}
+
                 {/* Live log panel */}
                 {logs.length > 0 && (
                     <Paper
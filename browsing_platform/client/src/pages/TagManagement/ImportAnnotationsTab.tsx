@@ -37,8 +37,10 @@ import {
     IAnnotationImportRowInput,
     IResolvedAnnotationRow,
     ITagWithType,
+    IImportProgress,
 } from '../../types/tags';
 import {executeAnnotationImport, previewAnnotationImport} from '../../services/TagManagementService';
+import ImportProgress from './ImportProgress';
 import {downloadTextFile} from '../../services/utils';
 import TagSelector from '../../UIComponents/Tags/TagSelector';
 
@@ -569,6 +571,7 @@ export default function ImportAnnotationsTab() {
     const [importResult, setImportResult] = useState<IAnnotationImportExecuteResponse | null>(null);
     const [repreviewing, setRepreviewing] = useState(false);
     const [importing, setImporting] = useState(false);
+    const [importProgress, setImportProgress] = useState<IImportProgress | null>(null);
 
     const handleResolved = (rows: IResolvedAnnotationRow[]) => {
         setResolvedRows(rows);
@@ -601,8 +604,9 @@ export default function ImportAnnotationsTab() {
 
     const handleImport = async () => {
         setImporting(true);
+        setImportProgress(null);
         try {
-            const result = await executeAnnotationImport(editableRows);
+            const result = await executeAnnotationImport(editableRows, setImportProgress);
             setImportResult(result);
             setStep(2);
         } catch (e: any) {
@@ -655,6 +659,8 @@ export default function ImportAnnotationsTab() {
                 />
             )}
 
+            {importing && importProgress && <ImportProgress progress={importProgress}/>}
+
             {step === 2 && importResult && (
                 <ResultsStep
                     response={importResult}
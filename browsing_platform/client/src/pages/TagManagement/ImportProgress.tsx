@@ -0,0 +1,26 @@
+import React from 'react';
+import {Box, LinearProgress, Typography} from '@mui/material';
+import {IImportProgress} from '../../types/tags';
+
+const formatDuration = (seconds: number): string => {
+    const s = Math.round(seconds);
+    if (s < 60) return `${s}s`;
+    if (s < 3600) return `${Math.floor(s / 60)}m ${s % 60}s`;
+    return `${Math.floor(s / 3600)}h ${Math.floor((s % 3600) / 60)}m`;
+};
+
+/* Progress of an import the server runs as a background job */
+export default function ImportProgress({progress}: { progress: IImportProgress }) {
+    return (
+        <Box sx={{maxWidth: 600}}>
+            <Typography variant="body2" color="text.secondary" sx={{mb: 0.5}}>
+                Imported {progress.done}{progress.total ? ` / ${progress.total}` : ''} rows
+                {progress.eta_seconds !== null && ` · ETA ${formatDuration(progress.eta_seconds)}`}
+            </Typography>
+            <LinearProgress
+                variant={progress.total ? 'determinate' : 'indeterminate'}
+                value={progress.total ? Math.min(100, 100 * progress.done / progress.total) : undefined}
+            />
+        </Box>
+    );
+}
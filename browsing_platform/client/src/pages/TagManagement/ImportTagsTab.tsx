@@ -23,8 +23,9 @@ import {
 import DownloadIcon from '@mui/icons-material/Download';
 import UploadFileIcon from '@mui/icons-material/UploadFile';
 import {toast} from 'material-react-toastify';
-import {ITagImportExecuteResponse, ITagImportRowInput, ITagImportRowParsed,} from '../../types/tags';
+import {IImportProgress, ITagImportExecuteResponse, ITagImportRowInput, ITagImportRowParsed,} from '../../types/tags';
 import {executeTagImport, previewTagImport} from '../../services/TagManagementService';
+import ImportProgress from './ImportProgress';
 import {downloadTextFile} from '../../services/utils';
 
 const STEPS = ['Upload File', 'Preview & Edit', 'Results'];
@@ -332,6 +333,7 @@ export default function ImportTagsTab() {
     const [createMissingTypes, setCreateMissingTypes] = useState(false);
     const [importResult, setImportResult] = useState<ITagImportExecuteResponse | null>(null);
     const [importing, setImporting] = useState(false);
+    const [importProgress, setImportProgress] = useState<IImportProgress | null>(null);
 
     const handleParsed = (parsed: ITagImportRowParsed[]) => {
         setEditableRows(parsed.map(p => ({
@@ -350,8 +352,9 @@ export default function ImportTagsTab() {
 
     const handleImport = async () => {
         setImporting(true);
+        setImportProgress(null);
         try {
-            const result = await executeTagImport(editableRows, createMissingTypes);
+            const result = await executeTagImport(editableRows, createMissingTypes, setImportProgress);
             setImportResult(result);
             setStep(2);
         } catch (e: any) {
@@ -388,6 +391,8 @@ export default function ImportTagsTab() {
                 />
             )}
 
+            {importing && importProgress && <ImportProgress progress={importProgress}/>}
+
             {step === 2 && importResult && (
                 <ResultsStep
                     response={importResult}
@@ -52,7 +52,8 @@ interface FileState {
 }
 
 interface VerifyResult {
-    status: 'pass' | 'fail' | 'no_checksum_file';
+    // 'assembling': the server is still joining the parallel parts of a large upload
+    status: 'pass' | 'fail' | 'no_checksum_file' | 'assembling';
     results: { path: string; status: string }[];
 }
 
@@ -298,6 +299,9 @@ function buildTarBlob(
 
 const ITEMS_PER_PAGE = 10;
 const MAX_CONCURRENT_UPLOADS = 10;
+const PARALLEL_UPLOAD_MIN_BYTES = 1024 * 1024 * 1024;
+const PARALLEL_UPLOAD_STREAMS = 4;
+const VERIFY_POLL_MS = 2000;
 const HASH_CONCURRENCY = Math.min(navigator.hardwareConcurrency || 4, 8);
 
 async function runConcurrently<T>(
@@ -500,6 +504,10 @@ export default function UploadPage() {
             const upload = new TusUpload(tarBlob, {
                 endpoint: `${config.serverPath}api/upload/tus/`,
                 chunkSize: 5 * 1024 * 1024,
+                // Large tars go up as several partial uploads over parallel connections and are
+                // joined server-side (TUS concatenation). Per-file progress below assumes a
+                // contiguous prefix, so it is approximate while the parts are in flight.
+                parallelUploads: tarBlob.size >= PARALLEL_UPLOAD_MIN_BYTES ? PARALLEL_UPLOAD_STREAMS : 1,
                 retryDelays: [0, 1000, 3000, 5000, 10000],
                 removeFingerprintOnSuccess: true,
                 metadata: { archiveName: archive.name, uploadMode: 'tar' },
@@ -587,7 +595,12 @@ export default function UploadPage() {
 
             setArchiveStatus(archive.name, { status: 'verifying' });
             try {
-                const verifyResult: VerifyResult = await apiPost(`upload/verify/${archive.name}`);
+                let verifyResult: VerifyResult = await apiPost(`upload/verify/${archive.name}`);
+                while (verifyResult.status === 'assembling' && !cancelledRef.current) {
+                    await new Promise(resolve => setTimeout(resolve, VERIFY_POLL_MS));
+                    verifyResult = await apiPost(`upload/verify/${archive.name}`);
+                }
+                if (cancelledRef.current) return;
                 if (verifyResult.status === 'pass' || verifyResult.status === 'no_checksum_file') {
                     await apiPost(`upload/commit/${archive.name}`);
                     setArchiveStatus(archive.name, { status: 'done', verifyResult });
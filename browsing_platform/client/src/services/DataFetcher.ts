@@ -2,6 +2,7 @@ import {
     E_ENTITY_TYPES,
     IAccountAuxiliaryCounts,
     IAccountInteractions,
+    IAccountPostsResponse,
     IAccountRelationsResponse,
     IArchiveSession,
     IArchiveSessionWithEntities,
@@ -9,6 +10,7 @@ import {
     IExtractedEntitiesNested,
     ILikesResponse,
     IMediaPart,
+    IMediaPreview,
     IPostAuxiliaryCounts,
 } from "../types/entities";
 import server, {HTTP_METHODS} from "./server";
@@ -57,13 +59,53 @@ const transformConfigToQueryParams = (config: EntitiesTransformConfig): string =
 const parseAccountTagsMap = (raw: Record<string, ITagWithType[]> | undefined): Record<number, ITagWithType[]> =>
     raw ? Object.fromEntries(Object.entries(raw).map(([k, v]) => [Number(k), v])) : {};
 
+// Page size for cursor-paginated sub-resources (server caps it at 1000)
+const SUB_RESOURCE_PAGE_SIZE = 1000;
+
+// Follow next_cursor until the list is exhausted; `path` is a sub-resource URL that accepts cursor/limit
+const fetchAllPages = async <T extends { page?: { next_cursor?: string | null } | null }>(
+    path: string, extraParams: string = ""
+): Promise<T[]> => {
+    const pages: T[] = [];
+    let cursor: string | null | undefined = null;
+    do {
+        const params = new URLSearchParams(extraParams);
+        params.set("limit", String(SUB_RESOURCE_PAGE_SIZE));
+        if (cursor) params.set("cursor", cursor);
+        const page: T = await server.get(`${path}?${params.toString()}`);
+        pages.push(page);
+        cursor = page.page?.next_cursor;
+    } while (cursor);
+    return pages;
+}
+
 export const fetchAccount = async (accountId: number | string, config: EntitiesTransformConfig): Promise<IExtractedEntitiesNested> => {
     const result = await server.get("account/" + accountId + "?" + transformConfigToQueryParams(config));
-    return {...result, account_tags: parseAccountTagsMap(result.account_tags)};
+    const accountTags = parseAccountTagsMap(result.account_tags);
+    const nextCursor = result.pages?.account_posts?.next_cursor;
+    const account = result.accounts?.[0];
+    if (nextCursor && account?.id != null) {
+        // The entity response only embeds the newest posts; fetch the rest a page at a time
+        const params = new URLSearchParams(transformConfigToQueryParams(config));
+        params.set("cursor", nextCursor);
+        const rest = await fetchAllPages<IAccountPostsResponse>(`account/${account.id}/posts/`, params.toString());
+        for (const page of rest) {
+            account.account_posts.push(...page.posts);
+            Object.assign(accountTags, parseAccountTagsMap(page.account_tags));
+        }
+    }
+    return {...result, account_tags: accountTags};
 }
 
 export const fetchPost = async (postId: number | string, config: EntitiesTransformConfig): Promise<IExtractedEntitiesNested> => {
     const result = await server.get("post/" + postId + "?" + transformConfigToQueryParams(config));
+    if (result.pages?.post_comments?.next_cursor) {
+        // Only the first page of comments was embedded; let the post view load them all on demand
+        for (const post of result.posts ?? []) post.post_comments = [];
+        for (const account of result.accounts ?? []) {
+            for (const post of account.account_posts ?? []) post.post_comments = [];
+        }
+    }
     return {...result, account_tags: parseAccountTagsMap(result.account_tags)};
 }
 
@@ -91,20 +133,33 @@ export const fetchMediaParts = async (mediaId: number): Promise<IMediaPart[]> =>
     return await server.get(`media/parts/${mediaId}/`);
 }
 
+export const fetchMediaPreview = async (mediaId: number, config: EntitiesTransformConfig): Promise<IMediaPreview> => {
+    return await server.get(`media/preview/${mediaId}/?` + transformConfigToQueryParams(config));
+}
+
 export const fetchPostComments = async (postId: number): Promise<ICommentsResponse> => {
-    const result = await server.get(`post/${postId}/comments/`);
-    return {...result, account_tags: parseAccountTagsMap(result.account_tags)};
+    const pages = await fetchAllPages<ICommentsResponse>(`post/${postId}/comments/`);
+    return {
+        comments: pages.flatMap(p => p.comments),
+        account_tags: Object.assign({}, ...pages.map(p => parseAccountTagsMap(p.account_tags))),
+    };
 }
 
 export const fetchPostLikes = async (postId: number): Promise<ILikesResponse> => {
-    const result = await server.get(`post/${postId}/likes/`);
-    return {...result, account_tags: parseAccountTagsMap(result.account_tags)};
+    const pages = await fetchAllPages<ILikesResponse>(`post/${postId}/likes/`);
+    return {
+        likes: pages.flatMap(p => p.likes),
+        account_tags: Object.assign({}, ...pages.map(p => parseAccountTagsMap(p.account_tags))),
+    };
 }
 
 export const fetchAccountRelations = async (accountId: number): Promise<IAccountRelationsResponse | null> => {
     try {
-        const result = await server.get(`account/${accountId}/relations/`);
-        return {...result, account_tags: parseAccountTagsMap(result.account_tags)};
+        const pages = await fetchAllPages<IAccountRelationsResponse>(`account/${accountId}/relations/`);
+        return {
+            relations: pages.flatMap(p => p.relations),
+            account_tags: Object.assign({}, ...pages.map(p => parseAccountTagsMap(p.account_tags))),
+        };
     } catch {
         return null;
     }
@@ -259,6 +314,22 @@ export const ADVANCED_FILTERS_CONFIG: { [key: T_Search_Mode]: Fields } = {
             label: 'Posts Archived',
             type: 'number',
         },
+        data_is_verified: {
+            label: 'Verified',
+            type: 'boolean',
+        },
+        data_is_private: {
+            label: 'Private',
+            type: 'boolean',
+        },
+        data_follower_count: {
+            label: 'Followers',
+            type: 'number',
+        },
+        data_following_count: {
+            label: 'Following',
+            type: 'number',
+        },
     },
     'posts': {
         publication_date: {
@@ -275,6 +346,22 @@ export const ADVANCED_FILTERS_CONFIG: { [key: T_Search_Mode]: Fields } = {
             type: 'text',
             excludeOperators: disabled_operators_by_type['text'],
         },
+        data_like_count: {
+            label: 'Likes',
+            type: 'number',
+        },
+        data_comment_count: {
+            label: 'Comments',
+            type: 'number',
+        },
+        data_play_count: {
+            label: 'Plays',
+            type: 'number',
+        },
+        data_video_duration: {
+            label: 'Video Duration (s)',
+            type: 'number',
+        },
         url: {
             label: 'Post URL',
             type: 'text',
@@ -306,6 +393,18 @@ export const ADVANCED_FILTERS_CONFIG: { [key: T_Search_Mode]: Fields } = {
             type: 'text',
             excludeOperators: disabled_operators_by_type['text'],
         },
+        data_video_duration: {
+            label: 'Video Duration (s)',
+            type: 'number',
+        },
+        data_original_width: {
+            label: 'Width (px)',
+            type: 'number',
+        },
+        data_original_height: {
+            label: 'Height (px)',
+            type: 'number',
+        },
     },
     'archive_sessions': {
         archiving_timestamp: {
@@ -341,6 +440,8 @@ export interface ISearchQuery {
     tag_scopes?: E_ENTITY_TYPES[];
     sort_by?: string | null;
     sort_order?: 'asc' | 'desc' | null;
+    // keyset pagination: the `cursor` of the last result of the previous page (page_number is then ignored)
+    cursor?: string | null;
 }
 
 export interface Thumbnail {
@@ -356,6 +457,7 @@ export interface SearchResult {
     details?: string;
     thumbnails?: Thumbnail[];
     metadata?: Record<string, any>;
+    cursor?: string | null;
 }
 
 export const searchData = async (
@@ -365,6 +467,11 @@ export const searchData = async (
     return await server.post("search/", query, HTTP_METHODS.post, {abortSignal: options.signal});
 }
 
+export const fetchSimilarMedia = async (mediaId: number, maxDistance?: number): Promise<SearchResult[]> => {
+    const params = maxDistance !== undefined ? `?max_distance=${maxDistance}` : "";
+    return await server.get(`media/similar/${mediaId}/${params}`);
+}
+
 export const fetchRelatedTagStats = async (accountId: number): Promise<ITagStat[]> => {
     return await server.get(`account/${accountId}/related_tag_stats/`);
 }
@@ -398,12 +505,20 @@ export interface CandidateAccount {
     follower_count: number;
     following_count: number;
     post_count: number;
+    // Multi-hop expansion only: shortest tie distance from the kernel
+    hops?: number | null;
 }
 
 export interface CommunityCandidatesResponse {
     candidates: CandidateAccount[];
 }
 
+export interface CommunityExpansionResponse extends CommunityCandidatesResponse {
+    iterations: number;
+    converged: boolean;
+    subgraph_size: number;
+}
+
 export const fetchCommunityCandidates = async (
     kernelIds: number[],
     excludedIds: number[],
@@ -429,6 +544,23 @@ export const fetchKernelDetails = async (
     });
 };
 
+// Candidates up to `maxHops` ties away, ranked by personalized PageRank from the
+// kernel. In tag-bound mode pass tagId so the tag's saved dismissals are skipped.
+export const fetchCommunityExpansion = async (
+    kernelIds: number[],
+    excludedIds: number[],
+    weights: TieWeights,
+    options: {tagId?: number | null, maxHops?: number} = {},
+): Promise<CommunityExpansionResponse> => {
+    return await server.post('community/expansion/', {
+        kernel_ids: kernelIds,
+        excluded_ids: excludedIds,
+        weights,
+        tag_id: options.tagId ?? null,
+        max_hops: options.maxHops ?? 3,
+    });
+};
+
 export interface TagKernelAccount {
     id: number;
     url_suffix: string | null;
@@ -1,8 +1,11 @@
 import server, {HTTP_METHODS} from "./server";
+import config from "./config";
+import cookie from "js-cookie";
 import {E_ENTITY_TYPES} from "../types/entities";
 import {
     IAnnotationImportExecuteResponse,
     IAnnotationImportRowInput,
+    IImportProgress,
     IQuickAccessData,
     IResolvedAnnotationRow,
     ITagDetail,
@@ -16,6 +19,12 @@ import {
 
 const BASE = "tag-management";
 
+const IMPORT_JOBS_WS_URL = (() => {
+    const base = config.serverPath.replace(/\/$/, '').replace(/^http/, 'ws');
+    return `${base}/api/import-jobs/ws`;
+})();
+const IMPORT_JOB_POLL_MS = 2000;
+
 export const fetchQuickAccessData = async (entity?: E_ENTITY_TYPES): Promise<IQuickAccessData> =>
     server.get(`${BASE}/quick-access/${entity ? `?entity=${encodeURIComponent(entity)}` : ''}`);
 
@@ -93,11 +102,67 @@ export const previewTagImport = async (file: File): Promise<ITagImportRowParsed[
     return server.postFormData(`${BASE}/import/tags/preview/`, fd);
 };
 
+/* Large imports run as a background job on the server (the import endpoint
+   answers with a job_id): follow the job's progress over the import-jobs
+   WebSocket and fetch its results once it is done. If the socket drops, poll. */
+const waitForImportJob = <T extends { results: unknown[]; summary: unknown }>(
+    jobId: number,
+    onProgress?: (progress: IImportProgress) => void
+): Promise<T> => new Promise((resolve, reject) => {
+    let settled = false;
+    let pollTimer: ReturnType<typeof setInterval> | null = null;
+    const ws = new WebSocket(IMPORT_JOBS_WS_URL);
+
+    const finish = async () => {
+        if (settled) return;
+        settled = true;
+        if (pollTimer) clearInterval(pollTimer);
+        ws.close();
+        try {
+            const job = await server.get(`import-jobs/${jobId}`);
+            if (job?.status === 'completed') {
+                resolve({results: job.results, summary: job.summary} as T);
+            } else {
+                reject(new Error(job?.error || 'Import failed'));
+            }
+        } catch (e) {
+            reject(e);
+        }
+    };
+    const poll = () => {
+        if (settled || pollTimer) return;
+        pollTimer = setInterval(async () => {
+            const job = await server.get(`import-jobs/${jobId}`, {ignoreErrors: true});
+            if (job && job.status !== 'running') finish();
+        }, IMPORT_JOB_POLL_MS);
+    };
+
+    // Send the auth token as the first message rather than in the URL
+    ws.onopen = () => ws.send(JSON.stringify({token: cookie.get('token') ?? ''}));
+    ws.onclose = poll;
+    ws.onerror = poll;
+    ws.onmessage = (event) => {
+        try {
+            const msg = JSON.parse(event.data);
+            if (msg.type === 'progress' && msg.stage === `import-${jobId}`) {
+                onProgress?.({done: msg.done, total: msg.total, eta_seconds: msg.eta_seconds});
+            } else if (msg.type === 'done' && msg.job_id === jobId) {
+                finish();
+            }
+        } catch {
+            // ignore malformed messages
+        }
+    };
+});
+
 export const executeTagImport = async (
     rows: ITagImportRowInput[],
-    create_missing_types: boolean
-): Promise<ITagImportExecuteResponse> =>
-    server.post(`${BASE}/import/tags/`, {rows, create_missing_types});
+    create_missing_types: boolean,
+    onProgress?: (progress: IImportProgress) => void
+): Promise<ITagImportExecuteResponse> => {
+    const response: ITagImportExecuteResponse = await server.post(`${BASE}/import/tags/`, {rows, create_missing_types});
+    return response?.job_id != null ? waitForImportJob(response.job_id, onProgress) : response;
+};
 
 /* Annotation import */
 export const previewAnnotationImport = async (file: File): Promise<IResolvedAnnotationRow[]> => {
@@ -107,6 +172,9 @@ export const previewAnnotationImport = async (file: File): Promise<IResolvedAnno
 };
 
 export const executeAnnotationImport = async (
-    rows: IAnnotationImportRowInput[]
-): Promise<IAnnotationImportExecuteResponse> =>
-    server.post(`annotate/import/`, {rows});
+    rows: IAnnotationImportRowInput[],
+    onProgress?: (progress: IImportProgress) => void
+): Promise<IAnnotationImportExecuteResponse> => {
+    const response: IAnnotationImportExecuteResponse = await server.post(`annotate/import/`, {rows});
+    return response?.job_id != null ? waitForImportJob(response.job_id, onProgress) : response;
+};
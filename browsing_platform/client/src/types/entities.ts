@@ -45,10 +45,23 @@ export interface IMedia extends IEntityBase {
     local_url?: string;
     thumbnail_path?: string;
     aspect_ratio?: number;
+    sprite_path?: string;
+    poster_path?: string;
+    sprite_frame_count?: number;
     media_type: EMediaType;
     data?: any;
 }
 
+export interface IMediaPreview {
+    media_id: number;
+    media_type: EMediaType;
+    aspect_ratio?: number;
+    thumbnail_path?: string;
+    poster_path?: string;
+    sprite_path?: string;
+    sprite_frame_count?: number;
+}
+
 export interface IMediaPart extends IEntityBase {
     media_id?: number;
     timestamp_range_start?: number;
@@ -154,11 +167,18 @@ export interface IAccountAndAssociatedEntities extends IAccount {
     account_relations: IAccountRelation[];
 }
 
+export interface ISubResourcePage {
+    total: number;
+    next_cursor?: string | null;
+}
+
 export interface IExtractedEntitiesNested {
     accounts: IAccountAndAssociatedEntities[];
     posts: IPostAndAssociatedEntities[];
     media: IMediaAndAssociatedEntities[];
     account_tags?: Record<number, ITagWithType[]>;
+    // Sub-resources cut to their first page by the server ("account_posts", "post_comments")
+    pages?: Record<string, ISubResourcePage>;
 }
 
 interface ISessionAttachments {
@@ -201,6 +221,12 @@ export interface IArchiveSessionWithEntities {
     entities: IExtractedEntitiesNested;
 }
 
+export interface IAccountPostsResponse {
+    posts: IPostAndAssociatedEntities[];
+    account_tags: Record<number, ITagWithType[]>;
+    page: ISubResourcePage;
+}
+
 export interface IAccountInteractions {
     comments: IComment[];
     likes: IPostLike[];
@@ -211,16 +237,19 @@ export interface IAccountInteractions {
 export interface IAccountRelationsResponse {
     relations: IAccountRelation[];
     account_tags: Record<number, ITagWithType[]>;
+    page?: ISubResourcePage | null;
 }
 
 export interface ICommentsResponse {
     comments: IComment[];
     account_tags: Record<number, ITagWithType[]>;
+    page?: ISubResourcePage | null;
 }
 
 export interface ILikesResponse {
     likes: IPostLike[];
     account_tags: Record<number, ITagWithType[]>;
+    page?: ISubResourcePage | null;
 }
 
 interface IAccountInteractionCounts {
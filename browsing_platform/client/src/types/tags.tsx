@@ -126,6 +126,7 @@ export interface ITagImportSummary {
 export interface ITagImportExecuteResponse {
     results: ITagImportRowResult[];
     summary: ITagImportSummary;
+    job_id?: number | null; // set when the server runs the import as a background job
 }
 
 // ── Annotation Import ─────────────────────────────────────────────────────────
@@ -166,4 +167,11 @@ export interface IAnnotationImportSummary {
 export interface IAnnotationImportExecuteResponse {
     results: IAnnotationImportRowResult[];
     summary: IAnnotationImportSummary;
+    job_id?: number | null; // set when the server runs the import as a background job
+}
+
+export interface IImportProgress {
+    done: number;
+    total: number | null;
+    eta_seconds: number | null;
 }
@@ -0,0 +1,151 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+Entity payloads (nested accounts/posts with raw `data`, session structures) are
+large, repetitive JSON and compress 5-15x. Preference order is zstd, then gzip
+for clients without zstd support.
+Bodies under the size threshold, already-encoded responses, partial content and
+non-text media types (videos, images served from /archives and /thumbnails) are
+passed through untouched. Streaming responses (NDJSON exports) are compressed
+chunk by chunk with a flush per chunk, so the client still sees rows as they are
+produced.
+
+This is a plain ASGI middleware rather than a BaseHTTPMiddleware so streaming
+bodies are not buffered.
+"""
+import zlib
+from typing import Optional
+
+import zstandard
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+COMPRESSIBLE_CONTENT_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "application/javascript",
+    "image/svg+xml",
+    "text/",
+)
+
+
+SUPPORTED_ENCODINGS = ("zstd", "gzip")
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Best encoding we support that the client accepts (q > 0), in server preference order."""
+    accepted: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    for encoding in SUPPORTED_ENCODINGS:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+
+class _Compressor:
+    """Incremental compressor with a uniform compress / flush (block boundary) / finish interface."""
+
+    def __init__(self, encoding: str):
+        if encoding == "zstd":
+            obj = zstandard.ZstdCompressor(level=3).compressobj()
+            self.compress = obj.compress
+            self.flush = lambda: obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+            self.finish = obj.flush
+        else:
+            obj = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.compress = obj.compress
+            self.flush = lambda: obj.flush(zlib.Z_SYNC_FLUSH)
+            self.finish = obj.flush
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await _CompressedResponder(self.app, encoding, self.minimum_size)(scope, receive, send)
+
+
+class _CompressedResponder:
+    def __init__(self, app: ASGIApp, encoding: str, minimum_size: int):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.send: Send = None
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        # None until the first body message decides whether this response is compressed
+        self.compressing: Optional[bool] = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_wrapper)
+
+    def _eligible(self, headers: Headers) -> bool:
+        if self.start_message["status"] in (204, 206, 304) or "content-encoding" in headers:
+            return False
+        if "x-accel-redirect" in headers:
+            return False
+        content_type = headers.get("content-type", "").lower()
+        return content_type.startswith(COMPRESSIBLE_CONTENT_TYPES)
+
+    async def send_wrapper(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether compression is worth it
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if self.compressing is None:
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            self.compressing = self._eligible(headers) and (more_body or len(body) >= self.minimum_size)
+            if self.compressing:
+                headers.add_vary_header("Accept-Encoding")
+                headers["Content-Encoding"] = self.encoding
+                self.compressor = _Compressor(self.encoding)
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = self.compressor.compress(body) + self.compressor.finish()
+                    headers["Content-Length"] = str(len(body))
+                    await self.send(self.start_message)
+                    await self.send({"type": "http.response.body", "body": body})
+                    return
+            elif self._eligible(headers):
+                headers.add_vary_header("Accept-Encoding")
+            await self.send(self.start_message)
+            if not self.compressing:
+                await self.send(message)
+                return
+        elif not self.compressing:
+            await self.send(message)
+            return
+
+        chunk = self.compressor.compress(body)
+        chunk += self.compressor.flush() if more_body else self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -0,0 +1,13 @@
+"""
+Deployment settings of the API server read by several modules.
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Number of uvicorn worker processes serving the API (see server.py). With more
+# than one, state shared between requests has to live outside the process
+# (broadcast_event relays, MySQL named locks, the rate limit storage).
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
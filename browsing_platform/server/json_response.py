@@ -0,0 +1,56 @@
+"""
+Fast JSON responses for the large entity endpoints.
+
+Returning a pydantic model from a route makes FastAPI dump it to python
+objects, re-validate it against the response model, run jsonable_encoder and
+finally stdlib json.dumps — for a big account that pipeline costs more than the
+queries. ModelJSONResponse serializes the model once with pydantic-core
+(model_dump_json) and splices `data` columns kept as RawJsonText (see
+extractors.entity_types.keep_raw_json_data) into the output verbatim, so those
+blobs are never parsed or re-encoded.
+
+Routes keep their return annotation for the OpenAPI schema and return
+ModelJSONResponse(model) instead of the model.
+"""
+import re
+import secrets
+from typing import Any, Mapping, Optional
+
+from pydantic import BaseModel
+from starlette.responses import Response
+
+from extractors.entity_types import RAW_JSON_PLACEHOLDERS
+
+
+class _RawJsonPlaceholders:
+    """Collects RawJsonText values during serialization, leaving a unique string placeholder for each."""
+
+    def __init__(self):
+        self.prefix = f"raw-json-{secrets.token_hex(8)}-"
+        self.values: list[str] = []
+
+    def add(self, text: str) -> str:
+        self.values.append(text)
+        return f"{self.prefix}{len(self.values) - 1}"
+
+    def splice(self, dumped: str) -> str:
+        if not self.values:
+            return dumped
+        pattern = re.compile('"' + re.escape(self.prefix) + r'(\d+)"')
+        return pattern.sub(lambda m: self.values[int(m.group(1))], dumped)
+
+
+def dump_model_json(model: BaseModel) -> bytes:
+    placeholders = _RawJsonPlaceholders()
+    dumped = model.model_dump_json(context={RAW_JSON_PLACEHOLDERS: placeholders})
+    return placeholders.splice(dumped).encode("utf-8")
+
+
+class ModelJSONResponse(Response):
+    media_type = "application/json"
+
+    def __init__(self, content: BaseModel, status_code: int = 200, headers: Optional[Mapping[str, str]] = None):
+        super().__init__(content, status_code=status_code, headers=headers)
+
+    def render(self, content: Any) -> bytes:
+        return dump_model_json(content)
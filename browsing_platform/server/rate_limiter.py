@@ -1,6 +1,16 @@
+import os
+
 from slowapi import Limiter
 from starlette.requests import Request
 
+from browsing_platform.server.config import SERVER_WORKERS
+
+# Counters live in this storage (a `limits` storage URI, e.g. redis://host:6379/0 or
+# memcached://host:11211; install the project's `redis` or `memcached` extra for the
+# client library). The in-memory default is per process, so it is refused with
+# several workers: every client would get SERVER_WORKERS times the configured limit.
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")
+
 
 def _get_real_ip(request: Request) -> str:
     # Respect reverse-proxy headers so all users behind nginx don't share one bucket
@@ -13,4 +23,11 @@ def _get_real_ip(request: Request) -> str:
     return request.client.host if request.client else "unknown"
 
 
-limiter = Limiter(key_func=_get_real_ip)
+if SERVER_WORKERS > 1 and RATE_LIMIT_STORAGE_URI.startswith("memory://"):
+    raise RuntimeError(
+        f"FATAL: SERVER_WORKERS={SERVER_WORKERS} with in-memory rate limit storage would enforce the "
+        "login and 2FA limits per worker. Set RATE_LIMIT_STORAGE_URI to a shared store "
+        "(redis://, memcached://). Refusing to start."
+    )
+
+limiter = Limiter(key_func=_get_real_ip, storage_uri=RATE_LIMIT_STORAGE_URI)
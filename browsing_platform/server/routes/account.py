@@ -1,18 +1,23 @@
-from typing import Any
+from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, Response
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
+from browsing_platform.server.json_response import ModelJSONResponse
 from browsing_platform.server.routes.fast_api_request_processor import extract_entities_transform_config
 from browsing_platform.server.services.account import account_exists, get_account_data_by_id, \
     get_account_by_platform_id, get_account_by_url
 from browsing_platform.server.services.enriched_entities import get_enriched_account_by_id, \
     get_account_relations_by_account_id, get_interactions_by_account_id, AccountInteractions, \
     get_account_auxiliary_counts, AccountAuxiliaryCounts, AccountRelationsResponse, \
-    get_account_tags_for_account_relations
+    get_account_tags_for_account_relations, EnrichedEntitiesNested, AccountPostsResponse, \
+    get_enriched_account_posts_page, get_account_relations_page, count_account_relations, account_tags_for, \
+    iter_ndjson_pages, clamp_page_size, SubResourcePage, ACCOUNT_POSTS_FIRST_PAGE, MAX_SUB_RESOURCE_PAGE
+from browsing_platform.server.services.entity_etags import compute_entity_etag, etag_matches, ETAG_CACHE_CONTROL
 from browsing_platform.server.services.permissions import auth_entity_view_access, require_any_auth
 from browsing_platform.server.services.tag_management import get_related_account_tag_stats, ITagStat
-from extractors.entity_types import ExtractedEntitiesNested
 
 router = APIRouter(
     prefix="/account",
@@ -27,28 +32,36 @@ async def _auth_account_view(req: Request, item_id: int):
 
 @router.get("/pk/{platform_id}/")
 @router.get("/pk/{platform_id}")
-async def get_account_by_pk(platform_id: str, req: Request) -> ExtractedEntitiesNested:
+async def get_account_by_pk(platform_id: str, req: Request) -> EnrichedEntitiesNested:
     await require_any_auth(req)
-    account = get_account_by_platform_id(platform_id, include_data=False)
+    account = await run_in_threadpool(get_account_by_platform_id, platform_id, include_data=False)
     if not account:
         raise HTTPException(status_code=404, detail="Account Not Found")
     await auth_entity_view_access(request=req, entity="account", entity_id=account.id)
-    return get_enriched_account_by_id(account.id, extract_entities_transform_config(req))
+    result = await run_in_threadpool(get_enriched_account_by_id, account.id, extract_entities_transform_config(req))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Account Not Found")
+    # Rendered in the threadpool: serializing a large payload would otherwise block the event loop
+    return await run_in_threadpool(ModelJSONResponse, result)
 
 
 @router.get("/url/{account_url:path}")
-async def get_account_by_url_path(account_url: str, req: Request) -> ExtractedEntitiesNested:
+async def get_account_by_url_path(account_url: str, req: Request) -> EnrichedEntitiesNested:
     await require_any_auth(req)
-    account = get_account_by_url(account_url, include_data=False)
+    account = await run_in_threadpool(get_account_by_url, account_url, include_data=False)
     if not account:
         raise HTTPException(status_code=404, detail="Account Not Found")
     await auth_entity_view_access(request=req, entity="account", entity_id=account.id)
-    return get_enriched_account_by_id(account.id, extract_entities_transform_config(req))
+    result = await run_in_threadpool(get_enriched_account_by_id, account.id, extract_entities_transform_config(req))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Account Not Found")
+    # Rendered in the threadpool: serializing a large payload would otherwise block the event loop
+    return await run_in_threadpool(ModelJSONResponse, result)
 
 
 @router.get("/data/{item_id:int}", dependencies=[Depends(_auth_account_view)])
 @router.get("/data/{item_id:int}/", dependencies=[Depends(_auth_account_view)])
-async def get_account_data(item_id:int) -> Any:
+def get_account_data(item_id:int) -> Any:
     found, data = get_account_data_by_id(item_id)
     if not found:
         raise HTTPException(status_code=404, detail="Account Not Found")
@@ -57,18 +70,51 @@ async def get_account_data(item_id:int) -> Any:
 
 @router.get("/{item_id}/relations/", dependencies=[Depends(_auth_account_view)])
 @router.get("/{item_id}/relations", dependencies=[Depends(_auth_account_view)])
-async def get_relations(item_id: int) -> AccountRelationsResponse:
+def get_relations(item_id: int, cursor: Optional[str] = None, limit: Optional[int] = None,
+                  ndjson: bool = False) -> Any:
     if not account_exists(item_id):
         raise HTTPException(status_code=404, detail="Account Not Found")
+    if ndjson:
+        return StreamingResponse(
+            iter_ndjson_pages(lambda c: get_account_relations_page(item_id, c, MAX_SUB_RESOURCE_PAGE), cursor),
+            media_type="application/x-ndjson",
+        )
+    if cursor is None and limit is None:
+        return AccountRelationsResponse(
+            relations=get_account_relations_by_account_id(item_id),
+            account_tags=get_account_tags_for_account_relations(item_id),
+        )
+    try:
+        relations, next_cursor = get_account_relations_page(item_id, cursor, clamp_page_size(limit, MAX_SUB_RESOURCE_PAGE))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return AccountRelationsResponse(
-        relations=get_account_relations_by_account_id(item_id),
-        account_tags=get_account_tags_for_account_relations(item_id),
+        relations=relations,
+        account_tags=account_tags_for(
+            [r.follower_account_id for r in relations] + [r.followed_account_id for r in relations]
+        ),
+        page=SubResourcePage(total=count_account_relations(item_id), next_cursor=next_cursor),
     )
 
 
+@router.get("/{item_id}/posts/", dependencies=[Depends(_auth_account_view)])
+@router.get("/{item_id}/posts", dependencies=[Depends(_auth_account_view)])
+def get_account_posts(item_id: int, req: Request, cursor: Optional[str] = None,
+                      limit: Optional[int] = None) -> AccountPostsResponse:
+    try:
+        page = get_enriched_account_posts_page(
+            item_id, cursor, clamp_page_size(limit, ACCOUNT_POSTS_FIRST_PAGE), extract_entities_transform_config(req)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if page is None:
+        raise HTTPException(status_code=404, detail="Account Not Found")
+    return ModelJSONResponse(page)
+
+
 @router.get("/{item_id}/interactions/", dependencies=[Depends(_auth_account_view)])
 @router.get("/{item_id}/interactions", dependencies=[Depends(_auth_account_view)])
-async def get_interactions(item_id: int) -> AccountInteractions:
+def get_interactions(item_id: int) -> AccountInteractions:
     if not account_exists(item_id):
         raise HTTPException(status_code=404, detail="Account Not Found")
     return get_interactions_by_account_id(item_id)
@@ -76,7 +122,7 @@ async def get_interactions(item_id: int) -> AccountInteractions:
 
 @router.get("/{item_id}/related_tag_stats/", dependencies=[Depends(_auth_account_view)])
 @router.get("/{item_id}/related_tag_stats", dependencies=[Depends(_auth_account_view)])
-async def get_related_tag_stats(item_id: int) -> list[ITagStat]:
+def get_related_tag_stats(item_id: int) -> list[ITagStat]:
     if not account_exists(item_id):
         raise HTTPException(status_code=404, detail="Account Not Found")
     return get_related_account_tag_stats(item_id)
@@ -84,7 +130,7 @@ async def get_related_tag_stats(item_id: int) -> list[ITagStat]:
 
 @router.get("/{item_id}/auxiliary-counts/", dependencies=[Depends(_auth_account_view)])
 @router.get("/{item_id}/auxiliary-counts", dependencies=[Depends(_auth_account_view)])
-async def get_account_auxiliary_counts_route(item_id: int) -> AccountAuxiliaryCounts:
+def get_account_auxiliary_counts_route(item_id: int) -> AccountAuxiliaryCounts:
     if not account_exists(item_id):
         raise HTTPException(status_code=404, detail="Account Not Found")
     return get_account_auxiliary_counts(item_id)
@@ -92,8 +138,15 @@ async def get_account_auxiliary_counts_route(item_id: int) -> AccountAuxiliaryCo
 
 @router.get("/{item_id}/", dependencies=[Depends(_auth_account_view)])
 @router.get("/{item_id}", dependencies=[Depends(_auth_account_view)])
-async def get_account(item_id:int, req: Request) -> ExtractedEntitiesNested:
-    account = get_enriched_account_by_id(item_id, extract_entities_transform_config(req))
+def get_account(item_id:int, req: Request) -> EnrichedEntitiesNested:
+    config = extract_entities_transform_config(req)
+    etag = compute_entity_etag("account", item_id, config)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Account Not Found")
+    cache_headers = {"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL}
+    if etag_matches(req.headers.get("If-None-Match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+    account = get_enriched_account_by_id(item_id, config)
     if not account:
         raise HTTPException(status_code=404, detail="Account Not Found")
-    return account
+    return ModelJSONResponse(account, headers=cache_headers)
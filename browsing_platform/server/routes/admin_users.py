@@ -7,7 +7,8 @@ from pydantic import BaseModel
 
 from browsing_platform.server.services.password_authenticator import set_user_password
 from browsing_platform.server.services.permissions import auth_admin_access
-from browsing_platform.server.services.token_manager import remove_all_tokens_for_user
+from browsing_platform.server.services.token_manager import remove_all_tokens_for_user, \
+    invalidate_cached_tokens_for_user
 from browsing_platform.server.services.user_manager import delete_user as _delete_user
 from utils import db
 
@@ -53,7 +54,7 @@ class CreatedUserResponse(BaseModel):
 
 
 @router.get("/")
-async def list_users() -> list[AdminUserRow]:
+def list_users() -> list[AdminUserRow]:
     rows = db.execute_query(
         """SELECT id, email, admin, locked, last_login, login_attempts,
                   totp_configured, force_pwd_reset, create_date
@@ -64,7 +65,7 @@ async def list_users() -> list[AdminUserRow]:
 
 
 @router.post("/")
-async def create_user(data: CreateUserRequest) -> CreatedUserResponse:
+def create_user(data: CreateUserRequest) -> CreatedUserResponse:
     existing = db.execute_query(
         "SELECT id FROM user WHERE email = %(e)s", {"e": data.email}, "single_row"
     )
@@ -85,7 +86,7 @@ async def create_user(data: CreateUserRequest) -> CreatedUserResponse:
 
 
 @router.patch("/{user_id}")
-async def update_user(user_id: int, data: UpdateUserRequest) -> Any:
+def update_user(user_id: int, data: UpdateUserRequest) -> Any:
     user_row = db.execute_query(
         "SELECT id, locked FROM user WHERE id = %(uid)s", {"uid": user_id}, "single_row"
     )
@@ -109,6 +110,8 @@ async def update_user(user_id: int, data: UpdateUserRequest) -> Any:
 
     if data.locked:
         remove_all_tokens_for_user(user_id)
+    elif data.admin is not None:
+        invalidate_cached_tokens_for_user(user_id)
 
     if data.temp_password:
         try:
@@ -124,7 +127,7 @@ async def update_user(user_id: int, data: UpdateUserRequest) -> Any:
 
 
 @router.delete("/{user_id}")
-async def delete_user(user_id: int) -> Any:
+def delete_user(user_id: int) -> Any:
     user_row = db.execute_query(
         "SELECT id FROM user WHERE id = %(uid)s", {"uid": user_id}, "single_row"
     )
@@ -136,7 +139,7 @@ async def delete_user(user_id: int) -> Any:
 
 
 @router.post("/{user_id}/reset-2fa")
-async def reset_2fa(user_id: int) -> Any:
+def reset_2fa(user_id: int) -> Any:
     user_row = db.execute_query(
         "SELECT id FROM user WHERE id = %(uid)s", {"uid": user_id}, "single_row"
     )
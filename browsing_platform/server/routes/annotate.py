@@ -3,6 +3,7 @@ from typing import Any, List, Literal, TypeAlias
 from fastapi import APIRouter, Depends, HTTPException, Request
 from pydantic import BaseModel
 
+from browsing_platform.server.json_response import ModelJSONResponse
 from browsing_platform.server.routes.fast_api_request_processor import extract_entities_transform_config
 from browsing_platform.server.services.account import get_account_by_id, annotate_account
 from browsing_platform.server.services.annotation import Annotation, TagWithNotes, add_tags_batch, \
@@ -32,7 +33,7 @@ class BatchAnnotationBody(BaseModel):
 
 
 @router.post("/batch", dependencies=[Depends(auth_user_access)])
-async def annotate_batch(body: BatchAnnotationBody) -> bool:
+def annotate_batch(body: BatchAnnotationBody) -> bool:
     if body.tags:
         incompatible = validate_tags_entity_affinity([t.id for t in body.tags], body.entity_type)
         if incompatible:
@@ -42,7 +43,7 @@ async def annotate_batch(body: BatchAnnotationBody) -> bool:
 
 
 @router.post("/{entity:str}/{item_id:int}", dependencies=[Depends(auth_user_access)])
-async def annotate_entity(entity: EntityType, item_id:int, annotation: Annotation) -> Any:
+def annotate_entity(entity: EntityType, item_id:int, annotation: Annotation) -> Any:
     if annotation.tags:
         incompatible = validate_tags_entity_affinity([t.id for t in annotation.tags], entity)
         if incompatible:
@@ -73,13 +74,13 @@ async def annotate_entity(entity: EntityType, item_id:int, annotation: Annotatio
 
 
 @router.delete("/{entity:str}/{item_id:int}/tag/{tag_id:int}", dependencies=[Depends(auth_user_access)])
-async def remove_entity_tag(entity: EntityType, item_id: int, tag_id: int) -> bool:
+def remove_entity_tag(entity: EntityType, item_id: int, tag_id: int) -> bool:
     remove_tag_from_entity(entity, item_id, tag_id)
     return True
 
 
 @router.get("/{entity:str}/{item_id:int}", dependencies=[Depends(auth_user_access)])
-async def get_annotatable_entity(entity: EntityType, item_id: int, req: Request) -> ExtractedEntitiesNested:
+def get_annotatable_entity(entity: EntityType, item_id: int, req: Request) -> ExtractedEntitiesNested:
     transform = extract_entities_transform_config(req)
     if entity == "account":
         result = get_enriched_account_by_id(item_id, transform)
@@ -94,4 +95,4 @@ async def get_annotatable_entity(entity: EntityType, item_id: int, req: Request)
         raise HTTPException(status_code=400, detail="Invalid Entity Type")
     if not result:
         raise HTTPException(status_code=404, detail=f"{label} Not Found")
-    return result
+    return ModelJSONResponse(result)
@@ -1,14 +1,15 @@
-from typing import Optional, Literal
+from typing import Callable, Optional, Literal
 
-from fastapi import APIRouter, Depends, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File
 from pydantic import BaseModel
 
-from browsing_platform.server.services.account import get_account_by_id, get_account_by_url
-from browsing_platform.server.services.import_utils import parse_import_file
-from browsing_platform.server.services.media import get_media_by_id
-from browsing_platform.server.services.media_part import get_media_part_by_id
-from browsing_platform.server.services.permissions import auth_user_access
-from browsing_platform.server.services.post import get_post_by_id
+from browsing_platform.server.services.account import get_account_by_url
+from browsing_platform.server.services.import_jobs import IMPORT_BACKGROUND_MIN_ROWS, start_import_job
+from browsing_platform.server.services.import_utils import (
+    IMPORT_QUERY_CHUNK, chunked, insert_ignore, parse_import_file, select_in, )
+from browsing_platform.server.services.permissions import auth_user_access, get_user_id
+from browsing_platform.server.services.search_cache import invalidate_search_cache
+from browsing_platform.server.services.tag import ENTITY_TAG_TABLES
 from utils import db
 
 router = APIRouter(
@@ -63,48 +64,87 @@ class IAnnotationImportSummary(BaseModel):
 class IAnnotationImportExecuteResponse(BaseModel):
     results: list[IAnnotationImportRowResult]
     summary: IAnnotationImportSummary
+    job_id: Optional[int] = None  # set when the import was started as a background job
 
 
 # ── Resolution helpers ────────────────────────────────────────────────────────
-
-def _resolve_entity(entity_type: str, entity_raw: str) -> tuple[Optional[int], Optional[str], Optional[str]]:
-    """Returns (entity_id, display_name, error_message)."""
-    entity_type = entity_type.strip().lower()
-
-    if entity_type not in _VALID_ENTITY_TYPES:
-        return None, None, f"Invalid entity_type '{entity_type}'"
-
-    # For non-account types, entity must be a numeric ID
-    if entity_type != "account":
-        if not entity_raw.strip().lstrip('-').isdigit():
-            return None, None, f"Integer ID required for entity_type='{entity_type}'"
-        eid = int(entity_raw.strip())
-        if entity_type == "post":
-            obj = get_post_by_id(eid, include_data=False)
-        elif entity_type == "media":
-            obj = get_media_by_id(eid, include_data=False)
-        elif entity_type == "media_part":
-            obj = get_media_part_by_id(eid)
+#
+# Rows are resolved a chunk at a time: every entity id / account URL and tag
+# name in the chunk is looked up with a handful of IN (...) queries instead of
+# several point queries per row. The error messages are those of the per-row
+# lookups they replaced.
+
+def _resolve_entities(
+        keys: list[tuple[str, str]],
+) -> dict[tuple[str, str], tuple[Optional[int], Optional[str], Optional[str]]]:
+    """(entity_type, entity_raw) -> (entity_id, display_name, error_message).
+    Result keys carry the stripped, lowercased entity_type."""
+    resolved: dict[tuple[str, str], tuple[Optional[int], Optional[str], Optional[str]]] = {}
+    ids_by_type: dict[str, set[int]] = {}
+    account_ids: set[int] = set()
+    account_urls: set[str] = set()
+    pending: list[tuple[str, str]] = []
+
+    for entity_type, entity_raw in keys:
+        entity_type = entity_type.strip().lower()
+        key = (entity_type, entity_raw)
+        if entity_type not in _VALID_ENTITY_TYPES:
+            resolved[key] = (None, None, f"Invalid entity_type '{entity_type}'")
+        elif entity_type != "account":
+            # For non-account types, entity must be a numeric ID
+            if not entity_raw.strip().lstrip('-').isdigit():
+                resolved[key] = (None, None, f"Integer ID required for entity_type='{entity_type}'")
+                continue
+            ids_by_type.setdefault(entity_type, set()).add(int(entity_raw.strip()))
+            pending.append(key)
         else:
-            obj = None
-        if obj is None:
-            return None, None, f"{entity_type} with id={eid} not found"
-        return eid, str(eid), None
-
-    # Account: try numeric first, then url_suffix
-    stripped = entity_raw.strip().lstrip('@')
-    if stripped.isdigit():
-        eid = int(stripped)
-        obj = get_account_by_id(eid, include_data=False)
-        if obj is None:
-            return None, None, f"Account with id={eid} not found"
-        display = obj.url_suffix or obj.display_name or str(eid)
-        return eid, display, None
-    else:
-        obj = get_account_by_url(stripped, include_data=False)
-        if obj is None:
-            return None, None, f"Account with url_suffix='{stripped}' not found"
-        return obj.id, obj.url_suffix or stripped, None
+            # Account: numeric id, otherwise url_suffix
+            stripped = entity_raw.strip().lstrip('@')
+            if stripped.isdigit():
+                account_ids.add(int(stripped))
+            else:
+                account_urls.add(stripped)
+            pending.append(key)
+
+    found_ids = {
+        entity_type: {r["id"] for r in select_in(f"SELECT id FROM {entity_type} WHERE id IN ({{}})", ids)}  # nosec B608
+        for entity_type, ids in ids_by_type.items()
+    }
+    accounts_by_id = {
+        r["id"]: r for r in select_in("SELECT id, url_suffix, display_name FROM account WHERE id IN ({})", account_ids)
+    }
+    accounts_by_url: dict[str, dict] = {}
+    for r in select_in("SELECT id, url_suffix FROM account WHERE url_suffix IN ({})", account_urls):
+        accounts_by_url.setdefault(r["url_suffix"].lower(), r)
+
+    for key in pending:
+        entity_type, entity_raw = key
+        if entity_type != "account":
+            eid = int(entity_raw.strip())
+            if eid in found_ids[entity_type]:
+                resolved[key] = (eid, str(eid), None)
+            else:
+                resolved[key] = (None, None, f"{entity_type} with id={eid} not found")
+            continue
+        stripped = entity_raw.strip().lstrip('@')
+        if stripped.isdigit():
+            eid = int(stripped)
+            account = accounts_by_id.get(eid)
+            if account is None:
+                resolved[key] = (None, None, f"Account with id={eid} not found")
+            else:
+                resolved[key] = (eid, account["url_suffix"] or account["display_name"] or str(eid), None)
+            continue
+        account = accounts_by_url.get(stripped.lower())
+        if account is None:
+            # The column collation may match what lower() does not (accents); ask the DB directly
+            obj = get_account_by_url(stripped, include_data=False)
+            account = {"id": obj.id, "url_suffix": obj.url_suffix} if obj else None
+        if account is None:
+            resolved[key] = (None, None, f"Account with url_suffix='{stripped}' not found")
+        else:
+            resolved[key] = (account["id"], account["url_suffix"] or stripped, None)
+    return resolved
 
 
 def _resolve_tag(tag_name: str, tag_type_name: Optional[str]) -> tuple[Optional[int], Optional[str]]:
@@ -138,110 +178,210 @@ def _resolve_tag(tag_name: str, tag_type_name: Optional[str]) -> tuple[Optional[
             {"name": tag_name},
             return_type="rows"
         )
-        type_names = ", ".join(r["tname"] for r in type_rows)
-        return None, f"Tag '{tag_name}' is ambiguous — found in types: {type_names}. Specify tag_type."
+        return None, _ambiguous_tag_error(tag_name, [r["tname"] for r in type_rows])
     return rows[0]["id"], None
 
 
-def _resolve_row(row_index: int, row: IAnnotationImportRowInput) -> IResolvedAnnotationRow:
-    errors: list[str] = []
+def _ambiguous_tag_error(tag_name: str, type_names: list[str]) -> str:
+    return f"Tag '{tag_name}' is ambiguous — found in types: {', '.join(type_names)}. Specify tag_type."
+
+
+def _resolve_tags(
+        keys: list[tuple[str, Optional[str]]],
+) -> dict[tuple[str, Optional[str]], tuple[Optional[int], Optional[str]]]:
+    """Bulk _resolve_tag: (tag_name, tag_type_name) -> (tag_id, error_message)."""
+    names = {name.strip().lower() for name, _ in keys if name.strip()}
+    candidates: dict[str, list[dict]] = {}
+    for r in select_in(
+            "SELECT t.id, t.name, tt.name AS type_name FROM tag t LEFT JOIN tag_type tt ON t.tag_type_id = tt.id "
+            "WHERE LOWER(TRIM(t.name)) IN ({})", names):
+        candidates.setdefault(r["name"].strip().lower(), []).append(r)
+
+    resolved: dict[tuple[str, Optional[str]], tuple[Optional[int], Optional[str]]] = {}
+    for key in keys:
+        tag_name, tag_type_name = key
+        matches = candidates.get(tag_name.strip().lower())
+        if not tag_name.strip() or not matches:
+            # Empty name, or none found; the single-row lookup words the error (and covers
+            # collation matches lower() does not make)
+            resolved[key] = _resolve_tag(tag_name, tag_type_name)
+            continue
+        if tag_type_name:
+            type_key = tag_type_name.strip().lower()
+            matches = [m for m in matches if m["type_name"] is not None and m["type_name"].strip().lower() == type_key]
+            if not matches:
+                resolved[key] = _resolve_tag(tag_name, tag_type_name)
+                continue
+        if len(matches) > 1:
+            resolved[key] = (None, _ambiguous_tag_error(
+                tag_name.strip(), [m["type_name"] or "(untyped)" for m in candidates[tag_name.strip().lower()]]
+            ))
+        else:
+            resolved[key] = (matches[0]["id"], None)
+    return resolved
+
+
+def _resolve_rows(start_index: int, rows: list[IAnnotationImportRowInput]) -> list[IResolvedAnnotationRow]:
+    """Resolves rows[i] as import row start_index + i."""
+    entities = _resolve_entities(list({(row.entity_type, row.entity) for row in rows}))
+    tags = _resolve_tags(list({(row.tag, row.tag_type) for row in rows}))
+
+    resolved_rows = []
+    for offset, row in enumerate(rows):
+        errors: list[str] = []
+        entity_id, entity_display, entity_err = entities[(row.entity_type.strip().lower(), row.entity)]
+        if entity_err:
+            errors.append(entity_err)
+        tag_id, tag_err = tags[(row.tag, row.tag_type)]
+        if tag_err:
+            errors.append(tag_err)
+
+        resolved_rows.append(IResolvedAnnotationRow(
+            row_index=start_index + offset,
+            entity_type=row.entity_type.strip().lower(),
+            entity_raw=row.entity,
+            entity_id=entity_id,
+            entity_display=entity_display,
+            tag_name=row.tag,
+            tag_type=row.tag_type,
+            tag_id=tag_id,
+            notes=row.notes or None,
+            parse_errors=errors,
+        ))
+    return resolved_rows
 
-    entity_id, entity_display, entity_err = _resolve_entity(row.entity_type, row.entity)
-    if entity_err:
-        errors.append(entity_err)
 
-    tag_id, tag_err = _resolve_tag(row.tag, row.tag_type)
-    if tag_err:
-        errors.append(tag_err)
+def _existing_assignments(table_name: str, id_col: str, pairs: set[tuple[int, int]]) -> set[tuple[int, int]]:
+    existing: set[tuple[int, int]] = set()
+    for chunk in chunked(list(pairs)):
+        rows = db.execute_query(
+            f"SELECT {id_col} AS eid, tag_id FROM {table_name} "  # nosec B608
+            f"WHERE ({id_col}, tag_id) IN ({', '.join(['(%s, %s)'] * len(chunk))})",
+            [v for pair in chunk for v in pair],
+            return_type="rows"
+        )
+        existing.update((r["eid"], r["tag_id"]) for r in rows)
+    return existing
+
 
-    return IResolvedAnnotationRow(
-        row_index=row_index,
-        entity_type=row.entity_type.strip().lower(),
-        entity_raw=row.entity,
-        entity_id=entity_id,
-        entity_display=entity_display,
-        tag_name=row.tag,
-        tag_type=row.tag_type,
-        tag_id=tag_id,
-        notes=row.notes or None,
-        parse_errors=errors,
-    )
+def run_annotation_import(
+        rows: list[IAnnotationImportRowInput],
+        progress: Optional[Callable[..., None]] = None,
+) -> IAnnotationImportExecuteResponse:
+    """
+    Resolves and writes the rows a chunk at a time, all in one transaction: one
+    lookup of the chunk's existing assignments, then one multi-row INSERT IGNORE
+    per entity tag table. `progress(done=n)` is called after every chunk.
+    """
+    results: list[IAnnotationImportRowResult] = []
+    summary = IAnnotationImportSummary()
+    # (entity_type, entity_id, tag_id) written or found earlier in this import
+    seen: set[tuple[str, int, int]] = set()
+    if progress:
+        progress(total=len(rows))
+
+    with db.transaction_batch():
+        for start in range(0, len(rows), IMPORT_QUERY_CHUNK):
+            chunk = _resolve_rows(start, rows[start:start + IMPORT_QUERY_CHUNK])
+
+            pairs_by_type: dict[str, set[tuple[int, int]]] = {}
+            for resolved in chunk:
+                if not resolved.parse_errors and resolved.entity_type in ENTITY_TAG_TABLES:
+                    pairs_by_type.setdefault(resolved.entity_type, set()).add((resolved.entity_id, resolved.tag_id))
+            existing = {
+                (entity_type, eid, tid)
+                for entity_type, pairs in pairs_by_type.items()
+                for eid, tid in _existing_assignments(*ENTITY_TAG_TABLES[entity_type], pairs)
+            }
+
+            inserts: dict[str, list[tuple]] = {}
+            for resolved in chunk:
+                i = resolved.row_index
+                if resolved.parse_errors:
+                    results.append(IAnnotationImportRowResult(
+                        row_index=i, status='error', errors=resolved.parse_errors
+                    ))
+                    summary.errors += 1
+                    continue
+                if resolved.entity_type not in ENTITY_TAG_TABLES:
+                    results.append(IAnnotationImportRowResult(
+                        row_index=i, status='error', errors=[f"Unsupported entity_type '{resolved.entity_type}'"]
+                    ))
+                    summary.errors += 1
+                    continue
+
+                assignment = (resolved.entity_type, resolved.entity_id, resolved.tag_id)
+                if assignment in existing or assignment in seen:
+                    results.append(IAnnotationImportRowResult(row_index=i, status='exists'))
+                    summary.exists += 1
+                else:
+                    seen.add(assignment)
+                    inserts.setdefault(resolved.entity_type, []).append(
+                        (resolved.entity_id, resolved.tag_id, resolved.notes)
+                    )
+                    results.append(IAnnotationImportRowResult(row_index=i, status='added'))
+                    summary.added += 1
+
+            for entity_type, values in inserts.items():
+                table_name, id_col = ENTITY_TAG_TABLES[entity_type]
+                insert_ignore(table_name, [id_col, "tag_id", "notes"], values)
+            if progress:
+                progress(done=len(chunk))
+
+    if summary.added:
+        invalidate_search_cache()
+    return IAnnotationImportExecuteResponse(results=results, summary=summary)
 
 
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
 @router.post("/import/preview/")
 @router.post("/import/preview")
-async def preview_annotation_import(file: UploadFile = File(...)) -> list[IResolvedAnnotationRow]:
+def preview_annotation_import(file: UploadFile = File(...)) -> list[IResolvedAnnotationRow]:
     """Parse a CSV or XLSX file, resolve entities and tags, return resolved rows. No DB changes."""
-    file_bytes = await file.read()
+    file_bytes = file.file.read()
     raw_rows = parse_import_file(file_bytes, file.filename or "", _IMPORT_COLUMNS,
                                  required_columns=["entity_type", "entity", "tag"])
 
-    return [
-        _resolve_row(i, IAnnotationImportRowInput(
+    rows = [
+        IAnnotationImportRowInput(
             entity_type=row.get("entity_type", ""),
             entity=row.get("entity", ""),
             tag=row.get("tag", ""),
             tag_type=row.get("tag_type") or None,
             notes=row.get("notes") or None,
-        ))
-        for i, row in enumerate(raw_rows)
+        )
+        for row in raw_rows
+    ]
+    return [
+        resolved
+        for start in range(0, len(rows), IMPORT_QUERY_CHUNK)
+        for resolved in _resolve_rows(start, rows[start:start + IMPORT_QUERY_CHUNK])
     ]
 
 
 @router.post("/import/")
 @router.post("/import")
-async def execute_annotation_import(
+def execute_annotation_import(
     body: IAnnotationImportExecuteRequest,
+    request: Request,
+    response: Response,
 ) -> IAnnotationImportExecuteResponse:
     """
     Execute annotation import. Re-resolves each row server-side for security.
     Uses INSERT IGNORE semantics (adds tags without replacing existing ones).
+    Imports of IMPORT_BACKGROUND_MIN_ROWS rows or more run as a background job:
+    the response is 202 with only `job_id` set (see routes/import_jobs.py), or 429
+    while IMPORT_MAX_CONCURRENT_JOBS run.
     """
-    results: list[IAnnotationImportRowResult] = []
-    summary = IAnnotationImportSummary()
-
-    for i, row in enumerate(body.rows):
-        resolved = _resolve_row(i, row)
-
-        if resolved.parse_errors:
-            results.append(IAnnotationImportRowResult(
-                row_index=i, status='error', errors=resolved.parse_errors
-            ))
-            summary.errors += 1
-            continue
-
-        entity_id = resolved.entity_id
-        tag_id = resolved.tag_id
-        entity_type = resolved.entity_type
-
-        # Check if this assignment already exists
-        from browsing_platform.server.services.tag import ENTITY_TAG_TABLES
-        if entity_type not in ENTITY_TAG_TABLES:
-            results.append(IAnnotationImportRowResult(
-                row_index=i, status='error', errors=[f"Unsupported entity_type '{entity_type}'"]
-            ))
-            summary.errors += 1
-            continue
-
-        table_name, id_col = ENTITY_TAG_TABLES[entity_type]
-        existing = db.execute_query(
-            f"SELECT 1 FROM {table_name} WHERE {id_col} = %(eid)s AND tag_id = %(tid)s",
-            {"eid": entity_id, "tid": tag_id},
-            return_type="single_row"
-        )
-
-        if existing:
-            results.append(IAnnotationImportRowResult(row_index=i, status='exists'))
-            summary.exists += 1
-        else:
-            db.execute_query(
-                f"INSERT INTO {table_name} ({id_col}, tag_id, notes) VALUES (%(eid)s, %(tid)s, %(notes)s)",
-                {"eid": entity_id, "tid": tag_id, "notes": resolved.notes},
-                return_type="none"
+    if len(body.rows) >= IMPORT_BACKGROUND_MIN_ROWS:
+        try:
+            job_id = start_import_job(
+                "annotations", get_user_id(request), len(body.rows),
+                lambda progress: run_annotation_import(body.rows, progress),
             )
-            results.append(IAnnotationImportRowResult(row_index=i, status='added'))
-            summary.added += 1
-
-    return IAnnotationImportExecuteResponse(results=results, summary=summary)
+        except RuntimeError as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        response.status_code = 202
+        return IAnnotationImportExecuteResponse(results=[], summary=IAnnotationImportSummary(), job_id=job_id)
+    return run_annotation_import(body.rows)
@@ -3,6 +3,7 @@ from typing import Any
 from fastapi import APIRouter, Depends, Request
 from fastapi import HTTPException
 
+from browsing_platform.server.json_response import ModelJSONResponse
 from browsing_platform.server.routes.account import _auth_account_view
 from browsing_platform.server.routes.fast_api_request_processor import extract_entities_transform_config, \
     extract_session_transform_config
@@ -28,7 +29,7 @@ async def _auth_archiving_session_view(req: Request, item_id: int):
 
 @router.get("/data/{item_id}/", dependencies=[Depends(_auth_archiving_session_view)])
 @router.get("/data/{item_id}", dependencies=[Depends(_auth_archiving_session_view)])
-async def get_archiving_session_data(item_id:int) -> Any:
+def get_archiving_session_data(item_id:int) -> Any:
     found, structures = get_archiving_session_structures(item_id)
     if not found:
         raise HTTPException(status_code=404, detail="Session Not Found")
@@ -37,29 +38,29 @@ async def get_archiving_session_data(item_id:int) -> Any:
 
 @router.get("/{item_id}/", dependencies=[Depends(_auth_archiving_session_view)])
 @router.get("/{item_id}", dependencies=[Depends(_auth_archiving_session_view)])
-async def get_archiving_session(item_id:int, req: Request) -> ArchiveSessionWithEntities:
+def get_archiving_session(item_id:int, req: Request) -> ArchiveSessionWithEntities:
     session = get_enriched_archiving_session_by_id(item_id, extract_entities_transform_config(req), extract_session_transform_config(req))
     if not session:
         raise HTTPException(status_code=404, detail="Session Not Found")
-    return session
+    return ModelJSONResponse(session)
 
 
 @router.get("/account/{item_id}/", dependencies=[Depends(_auth_account_view)])
 @router.get("/account/{item_id}", dependencies=[Depends(_auth_account_view)])
-async def get_archiving_sessions_for_account(item_id:int, req: Request) -> list[ArchiveSession]:
+def get_archiving_sessions_for_account(item_id:int, req: Request) -> list[ArchiveSession]:
     sessions = get_archiving_sessions_by_account_id(item_id, extract_session_transform_config(req))
     return sessions
 
 
 @router.get("/post/{item_id}/", dependencies=[Depends(_auth_post_view)])
 @router.get("/post/{item_id}", dependencies=[Depends(_auth_post_view)])
-async def get_archiving_sessions_for_post(item_id:int, req: Request) -> list[ArchiveSession]:
+def get_archiving_sessions_for_post(item_id:int, req: Request) -> list[ArchiveSession]:
     sessions = get_archiving_sessions_by_post_id(item_id, extract_session_transform_config(req))
     return sessions
 
 
 @router.get("/media/{item_id}/", dependencies=[Depends(_auth_media_view)])
 @router.get("/media/{item_id}", dependencies=[Depends(_auth_media_view)])
-async def get_archiving_sessions_for_media(item_id:int, req: Request) -> list[ArchiveSession]:
+def get_archiving_sessions_for_media(item_id:int, req: Request) -> list[ArchiveSession]:
     sessions = get_archiving_sessions_by_media_id(item_id, extract_session_transform_config(req))
     return sessions
\ No newline at end of file
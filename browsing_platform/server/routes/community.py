@@ -4,9 +4,12 @@ from browsing_platform.server.routes.fast_api_request_processor import extract_s
 from browsing_platform.server.services.community import (
     CommunityCandidatesRequest,
     CommunityCandidatesResponse,
+    CommunityExpansionRequest,
+    CommunityExpansionResponse,
     TagDismissalsRequest,
     TagKernelResponse,
     compute_candidates,
+    compute_expansion,
     compute_kernel_scores,
     get_tag_kernel_accounts,
     set_tag_dismissals,
@@ -22,7 +25,7 @@ router = APIRouter(
 
 
 @router.post("/candidates/")
-async def get_community_candidates(
+def get_community_candidates(
         req: CommunityCandidatesRequest,
         request: Request,
 ) -> CommunityCandidatesResponse:
@@ -33,7 +36,7 @@ async def get_community_candidates(
 
 
 @router.post("/kernel-details/")
-async def get_kernel_details(
+def get_kernel_details(
         req: CommunityCandidatesRequest,
         request: Request,
 ) -> CommunityCandidatesResponse:
@@ -43,14 +46,26 @@ async def get_kernel_details(
     return compute_kernel_scores(req, transform)
 
 
+@router.post("/expansion/")
+def get_community_expansion(
+        req: CommunityExpansionRequest,
+        request: Request,
+) -> CommunityExpansionResponse:
+    """Multi-hop candidates ranked by personalized PageRank from the kernel."""
+    if not req.kernel_ids:
+        raise HTTPException(status_code=422, detail="kernel_ids must not be empty")
+    transform = extract_search_results_config(request)
+    return compute_expansion(req, transform)
+
+
 @router.get("/tag-kernel/{tag_id}")
-async def get_tag_kernel(tag_id: int, request: Request) -> TagKernelResponse:
+def get_tag_kernel(tag_id: int, request: Request) -> TagKernelResponse:
     transform = extract_search_results_config(request)
     return get_tag_kernel_accounts(tag_id, transform)
 
 
 @router.put("/tag/{tag_id}/dismissals")
-async def put_tag_dismissals(tag_id: int, req: TagDismissalsRequest) -> dict:
+def put_tag_dismissals(tag_id: int, req: TagDismissalsRequest) -> dict:
     """Overwrite the saved candidate dismissals for a tag (tag-bound mode)."""
     set_tag_dismissals(tag_id, req.dismissals)
     return {"status": "ok"}
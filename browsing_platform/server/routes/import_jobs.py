@@ -0,0 +1,83 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
+
+from browsing_platform.server.services.import_jobs import get_import_job, import_job_owner, import_ws, \
+    message_job_id
+from browsing_platform.server.services.permissions import auth_user_access, get_auth_permissions
+from browsing_platform.server.services.token_manager import TokenPermissions, check_token
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/import-jobs", tags=["import-jobs"])
+
+
+def _may_follow(owner_id: Optional[int], perms: Optional[TokenPermissions]) -> bool:
+    """Only the user who started an import, or an admin, sees it. perms is None in dev mode."""
+    return perms is None or perms.admin or (owner_id is not None and owner_id == perms.user_id)
+
+
+@router.get("/{job_id}")
+def get_job(job_id: int, _=Depends(auth_user_access), perms=Depends(get_auth_permissions)):
+    """Status of a background import; `summary` and `results` are set once it completed."""
+    job = get_import_job(job_id)
+    # Other users' jobs are not distinguishable from missing ones
+    if job is None or not _may_follow(job["triggered_by_user_id"], perms):
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job
+
+
+# ---------------------------------------------------------------------------
+# WebSocket — progress of background imports
+# ---------------------------------------------------------------------------
+
+@router.websocket("/ws")
+async def ws_endpoint(websocket: WebSocket):
+    # Same handshake as /incorporate/ws: the token is the first message, never in the URL
+    await websocket.accept()
+    is_dev = os.getenv("BROWSING_PLATFORM_DEV") == "1"
+    perms: Optional[TokenPermissions] = None
+    if not is_dev:
+        try:
+            raw = await asyncio.wait_for(websocket.receive_text(), timeout=10)
+            msg = json.loads(raw)
+            token = msg.get("token") if isinstance(msg, dict) else None
+        except (asyncio.TimeoutError, json.JSONDecodeError, Exception):
+            await websocket.close(code=4003)
+            return
+        perms = await run_in_threadpool(check_token, token)
+        if not perms.valid:
+            await websocket.close(code=4003)
+            return
+    # Owner of each job seen on this connection; the channel carries every user's imports
+    owners: dict[int, Optional[int]] = {}
+    q = import_ws.subscribe()
+    try:
+        while True:
+            try:
+                msg = await asyncio.wait_for(q.get(), timeout=30)
+                if perms is not None and not perms.admin:
+                    job_id = message_job_id(msg)
+                    if job_id is None:
+                        continue
+                    if job_id not in owners:
+                        owners[job_id] = await run_in_threadpool(import_job_owner, job_id)
+                    if not _may_follow(owners[job_id], perms):
+                        continue
+                await websocket.send_text(json.dumps(msg))
+            except asyncio.TimeoutError:
+                try:
+                    await websocket.send_text(json.dumps({"type": "ping"}))
+                except Exception:
+                    break
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.debug(f"WebSocket error: {e}")
+    finally:
+        import_ws.unsubscribe(q)
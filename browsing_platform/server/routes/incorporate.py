@@ -5,6 +5,7 @@ import os
 import threading
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, WebSocket, WebSocketDisconnect
+from starlette.concurrency import run_in_threadpool
 
 from browsing_platform.server.services.incorporation_service import manager, _run_incorporation, incorporation_ws
 from browsing_platform.server.services.permissions import auth_admin_access
@@ -66,7 +67,7 @@ def stop(_=Depends(auth_admin_access)):
 @router.get("/status")
 def status(_=Depends(auth_admin_access)):
     job_id = manager.current_job_id()
-    if manager.is_running() and job_id is not None:
+    if job_id is not None:
         row = db.execute_query(
             "SELECT * FROM incorporation_job WHERE id = %(id)s",
             {"id": job_id},
@@ -109,7 +110,7 @@ async def ws_endpoint(websocket: WebSocket):
         except (asyncio.TimeoutError, json.JSONDecodeError, Exception):
             await websocket.close(code=4003)
             return
-        perms = check_token(token)
+        perms = await run_in_threadpool(check_token, token)
         if not perms.valid or not perms.admin:
             await websocket.close(code=4003)
             return
@@ -43,7 +43,7 @@ class Verify2FARequest(BaseModel):
 
 @router.post("/")
 @limiter.limit("10/15minutes")
-async def login_with_pass(data: LoginCredentialsPass, request: Request) -> LoginStepResponse:
+def login_with_pass(data: LoginCredentialsPass, request: Request) -> LoginStepResponse:
     try:
         return login_with_password(data.email, data.password)
     except AccountLockedException as e:
@@ -55,7 +55,7 @@ async def login_with_pass(data: LoginCredentialsPass, request: Request) -> Login
 
 @router.post("/verify-2fa")
 @limiter.limit("10/15minutes")
-async def verify_2fa(data: Verify2FARequest, request: Request) -> AuthTokenResponse:
+def verify_2fa(data: Verify2FARequest, request: Request) -> AuthTokenResponse:
     user_id = consume_pre_auth_token(data.pre_auth_token, "verify_totp")
     if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid or expired 2FA token")
@@ -82,7 +82,7 @@ async def verify_2fa(data: Verify2FARequest, request: Request) -> AuthTokenRespo
 
 
 @router.post("/logout")
-async def logout(request: Request):
+def logout(request: Request):
     """Logout user and invalidate token"""
     auth_header = request.headers.get("Authorization")
     token = parse_token_from_header(auth_header)
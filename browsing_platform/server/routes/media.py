@@ -1,14 +1,21 @@
 from typing import Any
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, Response
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
 
-from browsing_platform.server.routes.fast_api_request_processor import extract_entities_transform_config
-from browsing_platform.server.services.enriched_entities import get_enriched_media_by_id
+from browsing_platform.server.json_response import ModelJSONResponse
+from browsing_platform.server.routes.fast_api_request_processor import extract_entities_transform_config, \
+    extract_search_results_config
+from browsing_platform.server.services.enriched_entities import get_enriched_media_by_id, get_media_preview_by_id, \
+    MediaPreview
+from browsing_platform.server.services.entity_etags import compute_entity_etag, etag_matches, ETAG_CACHE_CONTROL
 from browsing_platform.server.services.media import get_media_by_id, get_media_data_by_id, media_exists, \
     get_media_by_platform_id
 from browsing_platform.server.services.media_part import get_media_part_by_media
-from browsing_platform.server.services.permissions import auth_entity_view_access, require_any_auth
+from browsing_platform.server.services.media_similarity import DEFAULT_MAX_DISTANCE
+from browsing_platform.server.services.permissions import auth_entity_view_access, require_any_auth, auth_user_access
+from browsing_platform.server.services.search import ISearchQuery, SearchResult, search_similar_media
 from extractors.entity_types import ExtractedEntitiesNested
 
 router = APIRouter(
@@ -26,25 +33,60 @@ async def _auth_media_view(req: Request, item_id: int):
 @router.get("/pk/{platform_id}")
 async def get_media_by_pk(platform_id: str, req: Request) -> ExtractedEntitiesNested:
     await require_any_auth(req)
-    media = get_media_by_platform_id(platform_id, include_data=False)
+    media = await run_in_threadpool(get_media_by_platform_id, platform_id, include_data=False)
     if not media:
         raise HTTPException(status_code=404, detail="Media Not Found")
     await auth_entity_view_access(request=req, entity="media", entity_id=media.id)
-    return get_enriched_media_by_id(media.id, extract_entities_transform_config(req))
+    result = await run_in_threadpool(get_enriched_media_by_id, media.id, extract_entities_transform_config(req))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Media Not Found")
+    # Rendered in the threadpool: serializing a large payload would otherwise block the event loop
+    return await run_in_threadpool(ModelJSONResponse, result)
 
 
 @router.get("/data/{item_id}/", dependencies=[Depends(_auth_media_view)])
 @router.get("/data/{item_id}", dependencies=[Depends(_auth_media_view)])
-async def get_media_data(item_id:int) -> Any:
+def get_media_data(item_id:int) -> Any:
     found, data = get_media_data_by_id(item_id)
     if not found:
         raise HTTPException(status_code=404, detail="Media Not Found")
     return data
 
 
+@router.get("/preview/{item_id}/", dependencies=[Depends(_auth_media_view)])
+@router.get("/preview/{item_id}", dependencies=[Depends(_auth_media_view)])
+def get_media_preview(item_id: int, req: Request) -> MediaPreview:
+    preview = get_media_preview_by_id(item_id, extract_entities_transform_config(req))
+    if not preview:
+        raise HTTPException(status_code=404, detail="Media Not Found")
+    return preview
+
+
+@router.get("/similar/{item_id}/", dependencies=[Depends(auth_user_access)])
+@router.get("/similar/{item_id}", dependencies=[Depends(auth_user_access)])
+def get_similar_media(
+        item_id: int,
+        req: Request,
+        max_distance: int = DEFAULT_MAX_DISTANCE,
+        page_number: int = 1,
+        page_size: int = 100,
+) -> list[SearchResult]:
+    """Near-duplicates of a media item by perceptual-hash Hamming distance, closest first."""
+    if not media_exists(item_id):
+        raise HTTPException(status_code=404, detail="Media Not Found")
+    query = ISearchQuery(
+        search_mode="similar_media",
+        similar_to_media_id=item_id,
+        max_hamming_distance=max_distance,
+        page_number=page_number,
+        page_size=page_size,
+    )
+    return search_similar_media(query, extract_search_results_config(req))
+
+
 @router.get("/parts/{item_id}/", dependencies=[Depends(_auth_media_view)])
 @router.get("/parts/{item_id}", dependencies=[Depends(_auth_media_view)])
-async def get_media_parts(item_id:int) -> Any:
+def get_media_parts(item_id:int) -> Any:
     if not media_exists(item_id):
         raise HTTPException(status_code=404, detail="Media Not Found")
     media = get_media_by_id(item_id)
@@ -53,8 +95,15 @@ async def get_media_parts(item_id:int) -> Any:
 
 @router.get("/{item_id}/", dependencies=[Depends(_auth_media_view)])
 @router.get("/{item_id}", dependencies=[Depends(_auth_media_view)])
-async def get_media(item_id:int, req: Request) -> ExtractedEntitiesNested:
-    media = get_enriched_media_by_id(item_id, extract_entities_transform_config(req))
+def get_media(item_id:int, req: Request) -> ExtractedEntitiesNested:
+    config = extract_entities_transform_config(req)
+    etag = compute_entity_etag("media", item_id, config)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Media Not Found")
+    cache_headers = {"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL}
+    if etag_matches(req.headers.get("If-None-Match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+    media = get_enriched_media_by_id(item_id, config)
     if not media:
         raise HTTPException(status_code=404, detail="Media Not Found")
-    return media
+    return ModelJSONResponse(media, headers=cache_headers)
@@ -20,7 +20,7 @@ async def _auth_media_part_view(req: Request, item_id: int):
 
 @router.get("/{item_id}/", dependencies=[Depends(_auth_media_part_view)])
 @router.get("/{item_id}", dependencies=[Depends(_auth_media_part_view)])
-async def get_media_part(item_id:int) -> MediaPart:
+def get_media_part(item_id:int) -> MediaPart:
     media_part = get_media_part_by_id(item_id)
     if not media_part:
         raise HTTPException(status_code=404, detail="Media Part Not Found")
@@ -28,7 +28,7 @@ async def get_media_part(item_id:int) -> MediaPart:
 
 
 @router.post("/", dependencies=[Depends(auth_user_access)])
-async def post_media_part(item: MediaPart) -> Optional[int]:
+def post_media_part(item: MediaPart) -> Optional[int]:
     try:
         if item.id:
             return update_media_part(item)
@@ -39,7 +39,7 @@ async def post_media_part(item: MediaPart) -> Optional[int]:
 
 
 @router.delete("/{item_id}/", dependencies=[Depends(auth_user_access)])
-async def drop_media_part(item_id:int) -> None:
+def drop_media_part(item_id:int) -> None:
     media_part = get_media_part_by_id(item_id)
     if not media_part:
         raise HTTPException(status_code=404, detail="Media Part Not Found")
@@ -11,7 +11,7 @@ router = APIRouter(
 
 
 @router.get("/")
-async def get_permissions(request: Request):
+def get_permissions(request: Request):
     token = parse_token_from_header(request.headers.get("Authorization"))
     if not token:
         return TokenPermissions(valid=False, admin=False, user_id=None)
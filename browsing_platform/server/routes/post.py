@@ -1,16 +1,21 @@
-from typing import Any
+from typing import Any, Optional
 
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, Request, Response
 from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 
+from browsing_platform.server.json_response import ModelJSONResponse
 from browsing_platform.server.routes.fast_api_request_processor import extract_entities_transform_config
 from browsing_platform.server.services.enriched_entities import get_enriched_post_by_id, get_comments_by_post_ids, \
     get_likes_by_post_id, get_post_auxiliary_counts, PostAuxiliaryCounts, CommentsResponse, LikesResponse, \
-    get_account_tags_for_post_comments, get_account_tags_for_post_likes
+    get_account_tags_for_post_comments, get_account_tags_for_post_likes, EnrichedEntitiesNested, \
+    get_comments_page, get_likes_page, count_post_comments, count_post_likes, account_tags_for, iter_ndjson_pages, \
+    clamp_page_size, SubResourcePage, POST_COMMENTS_FIRST_PAGE, MAX_SUB_RESOURCE_PAGE
+from browsing_platform.server.services.entity_etags import compute_entity_etag, etag_matches, ETAG_CACHE_CONTROL
 from browsing_platform.server.services.permissions import auth_entity_view_access, require_any_auth
 from browsing_platform.server.services.post import get_post_data_by_id, post_exists, \
     get_post_by_platform_id, get_post_by_url
-from extractors.entity_types import ExtractedEntitiesNested
 
 router = APIRouter(
     prefix="/post",
@@ -26,28 +31,36 @@ async def _auth_post_view(req: Request, item_id: int):
 
 @router.get("/pk/{platform_id}/")
 @router.get("/pk/{platform_id}")
-async def get_post_by_pk(platform_id: str, req: Request) -> ExtractedEntitiesNested:
+async def get_post_by_pk(platform_id: str, req: Request) -> EnrichedEntitiesNested:
     await require_any_auth(req)
-    post = get_post_by_platform_id(platform_id, include_data=False)
+    post = await run_in_threadpool(get_post_by_platform_id, platform_id, include_data=False)
     if not post:
         raise HTTPException(status_code=404, detail="Post Not Found")
     await auth_entity_view_access(request=req, entity="post", entity_id=post.id)
-    return get_enriched_post_by_id(post.id, extract_entities_transform_config(req))
+    result = await run_in_threadpool(get_enriched_post_by_id, post.id, extract_entities_transform_config(req))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Post Not Found")
+    # Rendered in the threadpool: serializing a large payload would otherwise block the event loop
+    return await run_in_threadpool(ModelJSONResponse, result)
 
 
 @router.get("/url/{post_url:path}")
-async def get_post_by_url_path(post_url: str, req: Request) -> ExtractedEntitiesNested:
+async def get_post_by_url_path(post_url: str, req: Request) -> EnrichedEntitiesNested:
     await require_any_auth(req)
-    post = get_post_by_url(post_url, include_data=False)
+    post = await run_in_threadpool(get_post_by_url, post_url, include_data=False)
     if not post:
         raise HTTPException(status_code=404, detail="Post Not Found")
     await auth_entity_view_access(request=req, entity="post", entity_id=post.id)
-    return get_enriched_post_by_id(post.id, extract_entities_transform_config(req))
+    result = await run_in_threadpool(get_enriched_post_by_id, post.id, extract_entities_transform_config(req))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Post Not Found")
+    # Rendered in the threadpool: serializing a large payload would otherwise block the event loop
+    return await run_in_threadpool(ModelJSONResponse, result)
 
 
 @router.get("/data/{item_id}/", dependencies=[Depends(_auth_post_view)])
 @router.get("/data/{item_id}", dependencies=[Depends(_auth_post_view)])
-async def get_post_data(item_id:int) -> Any:
+def get_post_data(item_id:int) -> Any:
     found, data = get_post_data_by_id(item_id)
     if not found:
         raise HTTPException(status_code=404, detail="Post Not Found")
@@ -56,29 +69,61 @@ async def get_post_data(item_id:int) -> Any:
 
 @router.get("/{item_id}/comments/", dependencies=[Depends(_auth_post_view)])
 @router.get("/{item_id}/comments", dependencies=[Depends(_auth_post_view)])
-async def get_post_comments(item_id: int) -> CommentsResponse:
+def get_post_comments(item_id: int, cursor: Optional[str] = None, limit: Optional[int] = None,
+                      ndjson: bool = False) -> Any:
     if not post_exists(item_id):
         raise HTTPException(status_code=404, detail="Post Not Found")
+    if ndjson:
+        return StreamingResponse(
+            iter_ndjson_pages(lambda c: get_comments_page(item_id, c, MAX_SUB_RESOURCE_PAGE), cursor),
+            media_type="application/x-ndjson",
+        )
+    if cursor is None and limit is None:
+        return CommentsResponse(
+            comments=get_comments_by_post_ids([item_id]),
+            account_tags=get_account_tags_for_post_comments([item_id]),
+        )
+    try:
+        comments, next_cursor = get_comments_page(item_id, cursor, clamp_page_size(limit, POST_COMMENTS_FIRST_PAGE))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return CommentsResponse(
-        comments=get_comments_by_post_ids([item_id]),
-        account_tags=get_account_tags_for_post_comments([item_id]),
+        comments=comments,
+        account_tags=account_tags_for(c.account_id for c in comments),
+        page=SubResourcePage(total=count_post_comments(item_id), next_cursor=next_cursor),
     )
 
 
 @router.get("/{item_id}/likes/", dependencies=[Depends(_auth_post_view)])
 @router.get("/{item_id}/likes", dependencies=[Depends(_auth_post_view)])
-async def get_post_likes(item_id: int) -> LikesResponse:
+def get_post_likes(item_id: int, cursor: Optional[str] = None, limit: Optional[int] = None,
+                   ndjson: bool = False) -> Any:
     if not post_exists(item_id):
         raise HTTPException(status_code=404, detail="Post Not Found")
+    if ndjson:
+        return StreamingResponse(
+            iter_ndjson_pages(lambda c: get_likes_page(item_id, c, MAX_SUB_RESOURCE_PAGE), cursor),
+            media_type="application/x-ndjson",
+        )
+    if cursor is None and limit is None:
+        return LikesResponse(
+            likes=get_likes_by_post_id(item_id),
+            account_tags=get_account_tags_for_post_likes(item_id),
+        )
+    try:
+        likes, next_cursor = get_likes_page(item_id, cursor, clamp_page_size(limit, MAX_SUB_RESOURCE_PAGE))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return LikesResponse(
-        likes=get_likes_by_post_id(item_id),
-        account_tags=get_account_tags_for_post_likes(item_id),
+        likes=likes,
+        account_tags=account_tags_for(l.account_id for l in likes),
+        page=SubResourcePage(total=count_post_likes(item_id), next_cursor=next_cursor),
     )
 
 
 @router.get("/{item_id}/auxiliary-counts/", dependencies=[Depends(_auth_post_view)])
 @router.get("/{item_id}/auxiliary-counts", dependencies=[Depends(_auth_post_view)])
-async def get_post_auxiliary_counts_route(item_id: int) -> PostAuxiliaryCounts:
+def get_post_auxiliary_counts_route(item_id: int) -> PostAuxiliaryCounts:
     if not post_exists(item_id):
         raise HTTPException(status_code=404, detail="Post Not Found")
     return get_post_auxiliary_counts(item_id)
@@ -86,8 +131,15 @@ async def get_post_auxiliary_counts_route(item_id: int) -> PostAuxiliaryCounts:
 
 @router.get("/{item_id}/", dependencies=[Depends(_auth_post_view)])
 @router.get("/{item_id}", dependencies=[Depends(_auth_post_view)])
-async def get_post(item_id:int, req: Request) -> ExtractedEntitiesNested:
-    post = get_enriched_post_by_id(item_id, extract_entities_transform_config(req))
+def get_post(item_id:int, req: Request) -> EnrichedEntitiesNested:
+    config = extract_entities_transform_config(req)
+    etag = compute_entity_etag("post", item_id, config)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Post Not Found")
+    cache_headers = {"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL}
+    if etag_matches(req.headers.get("If-None-Match"), etag):
+        return Response(status_code=304, headers=cache_headers)
+    post = get_enriched_post_by_id(item_id, config)
     if not post:
         raise HTTPException(status_code=404, detail="Post Not Found")
-    return post
+    return ModelJSONResponse(post, headers=cache_headers)
@@ -1,8 +1,9 @@
-from fastapi import APIRouter, Depends, Request
+from fastapi import APIRouter, Depends, HTTPException, Request
 
 from browsing_platform.server.routes.fast_api_request_processor import extract_search_results_config
-from browsing_platform.server.services.permissions import auth_user_access
+from browsing_platform.server.services.permissions import auth_user_access, auth_admin_access
 from browsing_platform.server.services.search import ISearchQuery, SearchResult, search_base
+from browsing_platform.server.services.search_cache import search_cache_stats
 
 router = APIRouter(
     prefix="/search",
@@ -13,6 +14,13 @@ router = APIRouter(
 
 
 @router.post("/", dependencies=[Depends(auth_user_access)])
-async def search_data(query: ISearchQuery, req: Request) -> list[SearchResult]:
-    return search_base(query, extract_search_results_config(req))
+def search_data(query: ISearchQuery, req: Request) -> list[SearchResult]:
+    try:
+        return search_base(query, extract_search_results_config(req))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+
+@router.get("/cache-stats", dependencies=[Depends(auth_admin_access)])
+def get_search_cache_stats() -> dict:
+    return search_cache_stats()
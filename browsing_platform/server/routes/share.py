@@ -35,7 +35,7 @@ public_router = APIRouter(
 
 
 @router.post("/", dependencies=[Depends(auth_user_access)])
-async def new_share_link(scope: EntitySharePermissions, req: Request) -> Any:
+def new_share_link(scope: EntitySharePermissions, req: Request) -> Any:
     if scope.shared_entity is None:
         raise HTTPException(status_code=400, detail="shared_entity is required")
     if not entity_exists(scope.shared_entity.entity, scope.shared_entity.entity_id):
@@ -45,7 +45,7 @@ async def new_share_link(scope: EntitySharePermissions, req: Request) -> Any:
 
 
 @router.get("/{entity}/{entity_id}/", dependencies=[Depends(auth_user_access)])
-async def get_share_link(entity: T_Entities, entity_id: int) -> Any:
+def get_share_link(entity: T_Entities, entity_id: int) -> Any:
     existing = get_existing_share_link(entity, entity_id)
     if not existing:
         return None
@@ -63,7 +63,7 @@ class SetValidityRequest(BaseModel):
 
 
 @router.post("/{entity}/{entity_id}/valid", dependencies=[Depends(auth_user_access)])
-async def patch_share_link_validity(entity: T_Entities, entity_id: int, body: SetValidityRequest) -> Any:
+def patch_share_link_validity(entity: T_Entities, entity_id: int, body: SetValidityRequest) -> Any:
     existing = get_existing_share_link(entity, entity_id)
     if not existing:
         raise HTTPException(status_code=404, detail="No share link found for this entity")
@@ -77,7 +77,7 @@ class SetAttachmentAccessRequest(BaseModel):
 
 
 @router.post("/{entity}/{entity_id}/attachment_access", dependencies=[Depends(auth_user_access)])
-async def patch_share_link_attachment_access(
+def patch_share_link_attachment_access(
     entity: T_Entities, entity_id: int, body: SetAttachmentAccessRequest
 ) -> Any:
     existing = get_existing_share_link(entity, entity_id)
@@ -88,7 +88,7 @@ async def patch_share_link_attachment_access(
 
 
 @router.post("/{entity}/{entity_id}/password", dependencies=[Depends(auth_user_access)])
-async def patch_share_link_password(entity: T_Entities, entity_id: int, body: SetPasswordRequest) -> Any:
+def patch_share_link_password(entity: T_Entities, entity_id: int, body: SetPasswordRequest) -> Any:
     existing = get_existing_share_link(entity, entity_id)
     if not existing:
         raise HTTPException(status_code=404, detail="No share link found for this entity")
@@ -106,7 +106,7 @@ class VerifyPasswordRequest(BaseModel):
 
 @public_router.post("/verify_password/")
 @limiter.limit("5/minute")
-async def verify_password_endpoint(request: Request, body: VerifyPasswordRequest) -> Any:
+def verify_password_endpoint(request: Request, body: VerifyPasswordRequest) -> Any:
     token = verify_share_link_password(body.link_suffix, body.password)
     if token is None:
         raise HTTPException(status_code=401, detail="Invalid password")
@@ -114,7 +114,7 @@ async def verify_password_endpoint(request: Request, body: VerifyPasswordRequest
 
 
 @public_router.get("/link_info/{link_suffix}/")
-async def get_link_info(link_suffix: str) -> Any:
+def get_link_info(link_suffix: str) -> Any:
     perms = get_link_permissions(link_suffix)
     return JSONResponse(
         content={"password_protected": perms.password_protected},
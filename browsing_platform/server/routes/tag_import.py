@@ -1,13 +1,17 @@
-from typing import Optional, Literal
+from typing import Callable, Optional, Literal, Union
 
-from fastapi import APIRouter, Depends, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, UploadFile, File
 from pydantic import BaseModel, field_validator
 
-from browsing_platform.server.services.import_utils import parse_import_file
-from browsing_platform.server.services.permissions import auth_user_access
+from browsing_platform.server.services.import_jobs import IMPORT_BACKGROUND_MIN_ROWS, start_import_job
+from browsing_platform.server.services.import_utils import (
+    IMPORT_QUERY_CHUNK, insert_ignore, parse_import_file, select_in, )
+from browsing_platform.server.services.permissions import auth_user_access, get_user_id
+from browsing_platform.server.services.search_cache import invalidate_search_cache
+from browsing_platform.server.services.tag_closure import lock_hierarchy, reaches, refresh_closure
 from browsing_platform.server.services.tag_management import (
-    get_tag_type_by_name, create_tag_type, upsert_tag,
-    add_hierarchy_ignore_duplicate, )
+    get_tag_type_by_name, create_tag_type, upsert_tag, )
+from utils import db
 
 router = APIRouter(
     prefix="/tag-management",
@@ -96,15 +100,16 @@ class ITagImportSummary(BaseModel):
 class ITagImportExecuteResponse(BaseModel):
     results: list[ITagImportRowResult]
     summary: ITagImportSummary
+    job_id: Optional[int] = None  # set when the import was started as a background job
 
 
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
 @router.post("/import/tags/preview/")
 @router.post("/import/tags/preview")
-async def preview_tag_import(file: UploadFile = File(...)) -> list[ITagImportRowParsed]:
+def preview_tag_import(file: UploadFile = File(...)) -> list[ITagImportRowParsed]:
     """Parse a CSV or XLSX file and return rows with inline validation errors. No DB changes."""
-    file_bytes = await file.read()
+    file_bytes = file.file.read()
     raw_rows = parse_import_file(file_bytes, file.filename or "", _IMPORT_COLUMNS, required_columns=["name"])
 
     result = []
@@ -139,89 +144,227 @@ async def preview_tag_import(file: UploadFile = File(...)) -> list[ITagImportRow
 
 @router.post("/import/tags/")
 @router.post("/import/tags")
-async def execute_tag_import(body: ITagImportExecuteRequest) -> ITagImportExecuteResponse:
+def execute_tag_import(body: ITagImportExecuteRequest, request: Request, response: Response) -> ITagImportExecuteResponse:
     """
-    Execute a tag import. Two-pass:
-    1. Resolve/create tag types, upsert tags → build name→id map
-    2. Resolve parent names, add hierarchy relationships
+    Execute a tag import (see run_tag_import). Imports of IMPORT_BACKGROUND_MIN_ROWS
+    rows or more run as a background job: the response is 202 with only `job_id`
+    set (see routes/import_jobs.py), or 429 while IMPORT_MAX_CONCURRENT_JOBS run.
+    """
+    if len(body.rows) >= IMPORT_BACKGROUND_MIN_ROWS:
+        try:
+            job_id = start_import_job(
+                "tags", get_user_id(request), len(body.rows),
+                lambda progress: run_tag_import(body, progress),
+            )
+        except RuntimeError as e:
+            raise HTTPException(status_code=429, detail=str(e))
+        response.status_code = 202
+        return ITagImportExecuteResponse(results=[], summary=ITagImportSummary(), job_id=job_id)
+    return run_tag_import(body)
+
+
+def run_tag_import(
+        body: ITagImportExecuteRequest,
+        progress: Optional[Callable[..., None]] = None,
+) -> ITagImportExecuteResponse:
+    """
+    Two-pass, in one transaction:
+    1. Resolve/create tag types, then per chunk of rows look up the existing tags
+       with one query and create the missing ones with one multi-row INSERT
+       → build name→id map
+    2. Resolve parent names in bulk, check for cycles against the hierarchy loaded
+       once into memory (locked, see services/tag_closure.py), add the new
+       relationships with multi-row INSERT IGNORE and refresh tag_closure
+    `progress(done=n)` is called after every chunk of pass 1.
     """
     results: list[ITagImportRowResult] = []
     summary = ITagImportSummary()
+    if progress:
+        progress(total=len(body.rows))
+
+    with db.transaction_batch():
+        type_ids = _resolve_tag_types(body)
+
+        # Pass 1: upsert all tags, build name→id lookup
+        tag_id_map: dict[str, int] = {}  # tag_name → tag_id (from this import batch)
+        known_tags: dict[tuple[str, Optional[int]], int] = {}  # (name key, tag_type_id) → tag_id
+
+        for start in range(0, len(body.rows), IMPORT_QUERY_CHUNK):
+            chunk = body.rows[start:start + IMPORT_QUERY_CHUNK]
+            _load_tags(known_tags, {_name_key(row.name) for row in chunk} - {k for k, _ in known_tags})
+
+            created = _create_missing_tags(known_tags, [
+                (row, type_ids[_name_key(row.tag_type)] if row.tag_type else None)
+                for row in chunk if not row.tag_type or type_ids.get(_name_key(row.tag_type)) is not None
+            ])
+
+            for i, row in enumerate(chunk, start=start):
+                row_result = ITagImportRowResult(row_index=i, tag_name=row.name)
+                results.append(row_result)
+                tag_type_id: Optional[int] = None
+                if row.tag_type:
+                    tag_type_id = type_ids.get(_name_key(row.tag_type))
+                    if tag_type_id is None:
+                        row_result.errors.append(f"Tag type '{row.tag_type}' not found")
+                        summary.errors += 1
+                        continue
+
+                key = (_name_key(row.name), tag_type_id)
+                if isinstance(created.get(key), str):
+                    row_result.errors.append(created[key])
+                    summary.errors += 1
+                    continue
+                row_result.tag_id = known_tags[key]
+                tag_id_map[row.name] = row_result.tag_id
+                # The first row that created a tag reports it; later rows naming it again find it existing
+                if created.pop(key, None) is not None:
+                    row_result.status = 'created'
+                    summary.created += 1
+                else:
+                    row_result.status = 'existing'
+                    summary.existing += 1
+            if progress:
+                progress(done=len(chunk))
+
+        # Pass 2: add hierarchy relationships
+        parent_ids = _resolve_parent_names({
+            parent_name for row in body.rows for parent_name in row.parents if parent_name not in tag_id_map
+        })
+        children = lock_hierarchy()
+        new_edges: list[tuple[int, int]] = []
+
+        for i, row in enumerate(body.rows):
+            row_result = results[i]
+            if row_result.status == 'error' or not row.parents:
+                continue
+
+            child_id = row_result.tag_id
+            if child_id is None:
+                continue
+
+            for parent_name in row.parents:
+                # Look up parent from this batch first, then from DB (any tag_type)
+                parent_id = tag_id_map.get(parent_name, parent_ids.get(parent_name))
+                if parent_id is None:
+                    row_result.relationships.append(
+                        ITagRelationshipResult(parent_name=parent_name, status='parent_not_found')
+                    )
+                    continue
 
-    # Pass 1: upsert all tags, build name→id lookup
-    tag_id_map: dict[str, int] = {}  # tag_name → tag_id (from this import batch)
+                if reaches(children, child_id, parent_id):
+                    status = 'cycle'
+                    summary.cycles_skipped += 1
+                elif child_id in children.get(parent_id, ()):
+                    status = 'exists'
+                else:
+                    status = 'added'
+                    summary.relationships_added += 1
+                    children.setdefault(parent_id, set()).add(child_id)
+                    new_edges.append((parent_id, child_id))
+                row_result.relationships.append(ITagRelationshipResult(parent_name=parent_name, status=status))
 
-    for i, row in enumerate(body.rows):
-        row_result = ITagImportRowResult(row_index=i, tag_name=row.name)
+        insert_ignore("tag_hierarchy", ["super_tag_id", "sub_tag_id"], new_edges)
+        refresh_closure(children, {child_id for _, child_id in new_edges})
 
-        # Resolve tag type
-        tag_type_id: Optional[int] = None
-        if row.tag_type:
-            tt = get_tag_type_by_name(row.tag_type)
-            if tt is None:
-                if body.create_missing_types:
-                    tt = create_tag_type(row.tag_type, None, None, None)
-                else:
-                    row_result.status = 'error'
-                    row_result.errors.append(f"Tag type '{row.tag_type}' not found")
-                    results.append(row_result)
-                    summary.errors += 1
-                    continue
-            tag_type_id = tt.id
+    if new_edges:
+        invalidate_search_cache()
+    return ITagImportExecuteResponse(results=results, summary=summary)
 
-        # Upsert tag
-        try:
-            tag, was_created = upsert_tag(row.name, row.description, tag_type_id, row.quick_access)
-            row_result.tag_id = tag.id
-            row_result.status = 'created' if was_created else 'existing'
-            tag_id_map[row.name] = tag.id
-            if was_created:
-                summary.created += 1
-            else:
-                summary.existing += 1
-        except Exception as e:
-            row_result.status = 'error'
-            row_result.errors.append(str(e))
-            summary.errors += 1
 
-        results.append(row_result)
+def _name_key(name: str) -> str:
+    """Python side of the LOWER(TRIM(name)) comparisons the tag lookups use."""
+    return name.strip().lower()
 
-    # Pass 2: add hierarchy relationships
-    for i, row in enumerate(body.rows):
-        row_result = results[i]
-        if row_result.status == 'error' or not row.parents:
-            continue
 
-        child_id = row_result.tag_id
-        if child_id is None:
+def _resolve_tag_types(body: ITagImportExecuteRequest) -> dict[str, Optional[int]]:
+    """name key → tag_type_id of every tag type the rows name (None: missing and not created)."""
+    names: dict[str, str] = {}  # name key → name as first written in the import
+    for row in body.rows:
+        if row.tag_type:
+            names.setdefault(_name_key(row.tag_type), row.tag_type)
+    type_ids: dict[str, Optional[int]] = {}
+    for r in select_in("SELECT id, name FROM tag_type WHERE LOWER(TRIM(name)) IN ({})", names):
+        type_ids.setdefault(_name_key(r["name"]), r["id"])
+    for key, name in names.items():
+        if key in type_ids:
             continue
+        tt = get_tag_type_by_name(name)
+        if tt is None and body.create_missing_types:
+            tt = create_tag_type(name, None, None, None)
+        type_ids[key] = tt.id if tt else None
+    return type_ids
 
-        for parent_name in row.parents:
-            # Look up parent from this batch first, then from DB
-            parent_id = tag_id_map.get(parent_name)
-            if parent_id is None:
-                # Try to find in DB (any tag_type)
-                db_parent = _find_tag_by_name_any_type(parent_name)
-                if db_parent is None:
-                    row_result.relationships.append(
-                        ITagRelationshipResult(parent_name=parent_name, status='parent_not_found')
-                    )
-                    continue
-                parent_id = db_parent
 
-            status = add_hierarchy_ignore_duplicate(super_tag_id=parent_id, sub_tag_id=child_id)
-            row_result.relationships.append(ITagRelationshipResult(parent_name=parent_name, status=status))
-            if status == 'added':
-                summary.relationships_added += 1
-            elif status == 'cycle':
-                summary.cycles_skipped += 1
+def _load_tags(known_tags: dict[tuple[str, Optional[int]], int], name_keys: set[str]) -> None:
+    """Adds the existing tags named by `name_keys` (any type) to `known_tags`."""
+    for r in select_in("SELECT id, name, tag_type_id FROM tag WHERE LOWER(TRIM(name)) IN ({})", name_keys):
+        known_tags.setdefault((_name_key(r["name"]), r["tag_type_id"]), r["id"])
 
-    return ITagImportExecuteResponse(results=results, summary=summary)
+
+def _create_missing_tags(
+        known_tags: dict[tuple[str, Optional[int]], int],
+        rows: list[tuple[ITagImportRowInput, Optional[int]]],
+) -> dict[tuple[str, Optional[int]], Union[bool, str]]:
+    """
+    Creates the tags of `rows` (row, tag_type_id) not in `known_tags` with one
+    multi-row INSERT and adds them to it. Returns key → True for every tag
+    created, or → the error message for tags that could not be created.
+    """
+    missing: dict[tuple[str, Optional[int]], ITagImportRowInput] = {}
+    for row, tag_type_id in rows:
+        key = (_name_key(row.name), tag_type_id)
+        if key not in known_tags:
+            missing.setdefault(key, row)
+    if not missing:
+        return {}
+
+    created: dict[tuple[str, Optional[int]], Union[bool, str]] = {}
+    values = [
+        (row.name.strip(), row.description, tag_type_id, row.quick_access, False, True)
+        for (_, tag_type_id), row in missing.items()
+    ]
+    try:
+        ids = db.batch_insert(
+            "tag", ["name", "description", "tag_type_id", "quick_access", "omit_from_tag_type_dropdown",
+                    "notes_recommended"], values
+        )
+        for key, new_id in zip(missing, ids):
+            known_tags[key] = new_id
+            created[key] = True
+        return created
+    except db.DbError:
+        # One bad row (too long, or a name the collation equates with an existing tag) fails the
+        # whole statement; fall back to one upsert per tag so only that row reports the error
+        pass
+    for key, row in missing.items():
+        try:
+            tag, was_created = upsert_tag(row.name, row.description, key[1], row.quick_access)
+        except Exception as e:
+            created[key] = str(e)
+            continue
+        known_tags[key] = tag.id
+        if was_created:
+            created[key] = True
+    return created
+
+
+def _resolve_parent_names(names: set[str]) -> dict[str, int]:
+    """parent name → tag_id (any tag_type) for the names found in the DB."""
+    by_key: dict[str, int] = {}
+    for r in select_in("SELECT id, name FROM tag WHERE LOWER(TRIM(name)) IN ({})", {_name_key(n) for n in names}):
+        by_key.setdefault(_name_key(r["name"]), r["id"])
+    parent_ids: dict[str, int] = {}
+    for name in names:
+        tag_id = by_key.get(_name_key(name))
+        if tag_id is None:
+            tag_id = _find_tag_by_name_any_type(name)
+        if tag_id is not None:
+            parent_ids[name] = tag_id
+    return parent_ids
 
 
 def _find_tag_by_name_any_type(name: str) -> Optional[int]:
     """Find a tag by name (case-insensitive, trimmed) across all types. Returns tag_id or None."""
-    from utils import db
     rows = db.execute_query(
         "SELECT id FROM tag WHERE LOWER(TRIM(name)) = LOWER(TRIM(%(name)s)) LIMIT 2",
         {"name": name},
@@ -9,7 +9,7 @@ from browsing_platform.server.services.tag_management import (
     list_tag_types, create_tag_type, update_tag_type, delete_tag_type,
     list_tags, get_tag as get_tag_service, list_quick_access_data, create_tag, update_tag, delete_tag,
     get_tag_usage_counts,
-    list_children, list_parents, add_hierarchy, remove_hierarchy, would_create_cycle, update_hierarchy_notes,
+    list_children, list_parents, add_hierarchy, remove_hierarchy, update_hierarchy_notes,
     get_tag_counts_by_type,
 )
 
@@ -69,33 +69,33 @@ class HierarchyDeleteBody(BaseModel):
 
 @router.get("/types/counts/")
 @router.get("/types/counts")
-async def get_tag_type_counts() -> dict[str, int]:
+def get_tag_type_counts() -> dict[str, int]:
     """Returns {type_id_str: count} plus key 'null' for untyped tags."""
     return get_tag_counts_by_type()
 
 
 @router.get("/types/")
 @router.get("/types")
-async def get_tag_types() -> list[ITagType]:
+def get_tag_types() -> list[ITagType]:
     return list_tag_types()
 
 
 @router.post("/types/")
 @router.post("/types")
-async def post_tag_type(body: TagTypeBody) -> ITagType:
+def post_tag_type(body: TagTypeBody) -> ITagType:
     return create_tag_type(body.name, body.description, body.notes, body.entity_affinity, body.quick_access)
 
 
 @router.put("/types/{type_id}/")
 @router.put("/types/{type_id}")
-async def put_tag_type(type_id: int, body: TagTypeBody) -> ITagType:
+def put_tag_type(type_id: int, body: TagTypeBody) -> ITagType:
     update_tag_type(type_id, body.name, body.description, body.notes, body.entity_affinity, body.quick_access)
     return ITagType(id=type_id, **body.model_dump())
 
 
 @router.delete("/types/{type_id}/")
 @router.delete("/types/{type_id}")
-async def del_tag_type(type_id: int) -> dict:
+def del_tag_type(type_id: int) -> dict:
     ok, msg = delete_tag_type(type_id)
     if not ok:
         raise HTTPException(status_code=409, detail=msg)
@@ -106,13 +106,13 @@ async def del_tag_type(type_id: int) -> dict:
 
 @router.get("/quick-access/")
 @router.get("/quick-access")
-async def get_quick_access_tags(entity: Optional[str] = None) -> IQuickAccessData:
+def get_quick_access_tags(entity: Optional[str] = None) -> IQuickAccessData:
     return list_quick_access_data(entity)
 
 
 @router.get("/tags/")
 @router.get("/tags")
-async def get_tags(
+def get_tags(
     tag_type_id: Optional[int] = None,
     q: Optional[str] = None,
     page: int = 1,
@@ -123,7 +123,7 @@ async def get_tags(
 
 @router.get("/tags/{tag_id}/")
 @router.get("/tags/{tag_id}")
-async def get_tag(tag_id: int) -> ITagDetail:
+def get_tag(tag_id: int) -> ITagDetail:
     tag = get_tag_service(tag_id)
     if not tag:
         raise HTTPException(status_code=404, detail="Tag not found")
@@ -132,20 +132,20 @@ async def get_tag(tag_id: int) -> ITagDetail:
 
 @router.post("/tags/")
 @router.post("/tags")
-async def post_tag(body: TagBody) -> ITagDetail:
+def post_tag(body: TagBody) -> ITagDetail:
     return create_tag(body.name, body.description, body.tag_type_id, body.quick_access, body.omit_from_tag_type_dropdown, body.notes_recommended)
 
 
 @router.put("/tags/{tag_id}/")
 @router.put("/tags/{tag_id}")
-async def put_tag(tag_id: int, body: TagBody) -> ITagDetail:
+def put_tag(tag_id: int, body: TagBody) -> ITagDetail:
     update_tag(tag_id, body.name, body.description, body.tag_type_id, body.quick_access, body.omit_from_tag_type_dropdown, body.notes_recommended)
     return ITagDetail(id=tag_id, **body.model_dump())
 
 
 @router.delete("/tags/{tag_id}/")
 @router.delete("/tags/{tag_id}")
-async def del_tag(tag_id: int) -> dict:
+def del_tag(tag_id: int) -> dict:
     ok, msg = delete_tag(tag_id)
     if not ok:
         raise HTTPException(status_code=409, detail=msg)
@@ -154,19 +154,19 @@ async def del_tag(tag_id: int) -> dict:
 
 @router.get("/tags/{tag_id}/usage/")
 @router.get("/tags/{tag_id}/usage")
-async def get_tag_usage(tag_id: int) -> ITagUsage:
+def get_tag_usage(tag_id: int) -> ITagUsage:
     return get_tag_usage_counts(tag_id)
 
 
 @router.get("/tags/{tag_id}/children/")
 @router.get("/tags/{tag_id}/children")
-async def get_tag_children(tag_id: int) -> list[ITagHierarchyEntry]:
+def get_tag_children(tag_id: int) -> list[ITagHierarchyEntry]:
     return list_children(tag_id)
 
 
 @router.get("/tags/{tag_id}/parents/")
 @router.get("/tags/{tag_id}/parents")
-async def get_tag_parents(tag_id: int) -> list[ITagHierarchyEntry]:
+def get_tag_parents(tag_id: int) -> list[ITagHierarchyEntry]:
     return list_parents(tag_id)
 
 
@@ -174,21 +174,22 @@ async def get_tag_parents(tag_id: int) -> list[ITagHierarchyEntry]:
 
 @router.post("/hierarchy/")
 @router.post("/hierarchy")
-async def post_hierarchy(body: HierarchyBody) -> ITagHierarchyEntry:
-    if would_create_cycle(body.super_tag_id, body.sub_tag_id):
-        raise HTTPException(status_code=409, detail="Would create a cycle in tag hierarchy")
-    return add_hierarchy(body.super_tag_id, body.sub_tag_id, body.notes)
+def post_hierarchy(body: HierarchyBody) -> ITagHierarchyEntry:
+    try:
+        return add_hierarchy(body.super_tag_id, body.sub_tag_id, body.notes)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
 
 
 @router.delete("/hierarchy/")
 @router.delete("/hierarchy")
-async def del_hierarchy(body: HierarchyDeleteBody) -> dict:
+def del_hierarchy(body: HierarchyDeleteBody) -> dict:
     remove_hierarchy(body.super_tag_id, body.sub_tag_id)
     return {"ok": True}
 
 
 @router.patch("/hierarchy/")
 @router.patch("/hierarchy")
-async def patch_hierarchy_notes(body: HierarchyBody) -> dict:
+def patch_hierarchy_notes(body: HierarchyBody) -> dict:
     update_hierarchy_notes(body.super_tag_id, body.sub_tag_id, body.notes)
     return {"ok": True}
@@ -14,7 +14,7 @@ router = APIRouter(
 
 
 @router.get("/", dependencies=[Depends(auth_user_access)])
-async def lookup_tags(req: Request) -> Any:
+def lookup_tags(req: Request) -> Any:
     search_query = req.query_params.get("q", "")
     tag_type_id_raw = req.query_params.get("tag_type_id", None)
     tag_type_id = int(tag_type_id_raw) if tag_type_id_raw else None
@@ -23,7 +23,7 @@ async def lookup_tags(req: Request) -> Any:
 
 
 @router.get("/by-entities/", dependencies=[Depends(auth_user_access)])
-async def get_tags_for_entities(req: Request) -> Any:
+def get_tags_for_entities(req: Request) -> Any:
     entity = req.query_params.get("entity", "")
     ids_raw = req.query_params.get("ids", "")
     ids = [int(x) for x in ids_raw.split(",") if x.strip().isdigit()]
@@ -45,7 +45,7 @@ class TotpSetupResponse(BaseModel):
 
 
 @router.post("/setup")
-async def setup_totp(data: PreAuthRequest) -> TotpSetupResponse:
+def setup_totp(data: PreAuthRequest) -> TotpSetupResponse:
     user_id = consume_pre_auth_token(data.pre_auth_token, "setup_totp")
     if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid or expired setup token")
@@ -72,7 +72,7 @@ async def setup_totp(data: PreAuthRequest) -> TotpSetupResponse:
 
 
 @router.post("/enable")
-async def enable_totp(data: EnableRequest) -> AuthTokenResponse:
+def enable_totp(data: EnableRequest) -> AuthTokenResponse:
     user_id = consume_pre_auth_token(data.pre_auth_token, "setup_totp_enable")
     if user_id is None:
         raise HTTPException(status_code=401, detail="Invalid or expired setup token")
@@ -110,7 +110,7 @@ async def enable_totp(data: EnableRequest) -> AuthTokenResponse:
 
 
 @router.get("/status")
-async def totp_status(request: Request, _=Depends(auth_user_access)) -> TotpStatusResponse:
+def totp_status(request: Request, _=Depends(auth_user_access)) -> TotpStatusResponse:
     user_id = get_user_id(request)
     if user_id is None:
         raise HTTPException(status_code=401)
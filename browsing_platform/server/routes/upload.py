@@ -1,12 +1,14 @@
 import base64
+import hashlib
 import logging
 from typing import Optional
 
 from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
 from browsing_platform.server.services import upload_service
-from browsing_platform.server.services.permissions import auth_admin_access
+from browsing_platform.server.services.permissions import auth_admin_access, parse_token_from_header
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +16,7 @@ router = APIRouter(prefix="/upload", tags=["upload"])
 
 MAX_UPLOAD_LENGTH = 10 * 1024 * 1024 * 1024  # 10 GB per file
 TUS_VERSION = "1.0.0"
-TUS_EXTENSIONS = "creation,termination"
+TUS_EXTENSIONS = "creation,termination,concatenation"
 
 
 def _tus_headers(extra: Optional[dict] = None) -> dict:
@@ -38,6 +40,23 @@ def _decode_tus_metadata(raw: str) -> dict:
     return result
 
 
+def _upload_id_from_url(url: str) -> str:
+    """file_id of an upload URL from an Upload-Concat: final header (absolute or path-only)."""
+    return url.rstrip("/").rsplit("/", 1)[-1]
+
+
+def _upload_owner(request: Request) -> Optional[str]:
+    """Digest of the session token, binding partial uploads to the session that created them
+    (None in dev-bypass mode, where requests carry no token)."""
+    token = parse_token_from_header(request.headers.get("Authorization"))
+    return hashlib.sha256(token.encode("utf-8")).hexdigest() if token else None
+
+
+def _upload_location(request: Request, file_id: str) -> str:
+    base = str(request.base_url).rstrip("/")
+    return f"{base}/api/upload/tus/{file_id}"
+
+
 # ---------------------------------------------------------------------------
 # Preflight — check which archive names already exist
 # ---------------------------------------------------------------------------
@@ -76,13 +95,44 @@ def tus_create(
     request: Request,
     upload_length: Optional[int] = Header(None, alias="Upload-Length"),
     upload_metadata: Optional[str] = Header(None, alias="Upload-Metadata"),
+    upload_concat: Optional[str] = Header(None, alias="Upload-Concat"),
     _=Depends(auth_admin_access),
 ):
+    # TUS concatenation: a client uploads several partial uploads in parallel, each at
+    # its own offsets, then creates the final upload listing them in order.
+    concat = (upload_concat or "").strip()
+    owner = _upload_owner(request)
+    part_urls: list[str] = []
+    part_ids: list[str] = []
+    if concat.startswith("final;"):
+        part_urls = concat[len("final;"):].split()
+        if not part_urls:
+            raise HTTPException(status_code=400, detail="Upload-Concat: final lists no partial uploads")
+        part_ids = [_upload_id_from_url(u) for u in part_urls]
+        # A retried final POST gets the upload the first one created (its parts may be consumed by now)
+        file_id = upload_service.find_final_upload(part_ids, owner)
+        if file_id is not None:
+            return Response(status_code=201, headers=_tus_headers({"Location": _upload_location(request, file_id)}))
+        try:
+            upload_length = upload_service.partial_uploads_length(part_ids, owner)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    elif concat not in ("", "partial"):
+        raise HTTPException(status_code=400, detail="Invalid Upload-Concat header")
+
     if upload_length is None:
         raise HTTPException(status_code=400, detail="Upload-Length header required")
     if upload_length > MAX_UPLOAD_LENGTH:
         raise HTTPException(status_code=413, detail="File too large")
 
+    if concat == "partial":
+        # Partial uploads carry no archive metadata; the final upload names the target
+        file_id = upload_service.create_partial_upload(upload_length, owner)
+        return Response(
+            status_code=201,
+            headers=_tus_headers({"Location": _upload_location(request, file_id), "Upload-Offset": "0"}),
+        )
+
     metadata = _decode_tus_metadata(upload_metadata or "")
     archive_name = metadata.get("archiveName", "")
     upload_mode = metadata.get("uploadMode", "")  # "tar" for tar uploads, "" for individual files
@@ -98,14 +148,20 @@ def tus_create(
     elif not upload_service.validate_file_path(relative_path):
         raise HTTPException(status_code=400, detail="Invalid file path")
 
-    file_id = upload_service.create_upload(archive_name, relative_path, upload_length, file_hash, upload_mode)
-    # Build absolute URL for Location header
-    base = str(request.base_url).rstrip("/")
-    location = f"{base}/api/upload/tus/{file_id}"
+    if part_urls:
+        # The parts are joined in the background; verify reports "assembling" until that is done
+        try:
+            file_id = upload_service.create_final_upload(
+                archive_name, relative_path, file_hash, upload_mode, part_ids, part_urls, owner,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return Response(status_code=201, headers=_tus_headers({"Location": _upload_location(request, file_id)}))
 
+    file_id = upload_service.create_upload(archive_name, relative_path, upload_length, file_hash, upload_mode)
     return Response(
         status_code=201,
-        headers=_tus_headers({"Location": location, "Upload-Offset": "0"}),
+        headers=_tus_headers({"Location": _upload_location(request, file_id), "Upload-Offset": "0"}),
     )
 
 
@@ -114,14 +170,16 @@ def tus_head(file_id: str, _=Depends(auth_admin_access)):
     state = upload_service.get_upload_state(file_id)
     if state is None:
         raise HTTPException(status_code=404, detail="Upload not found")
-    return Response(
-        status_code=200,
-        headers=_tus_headers({
-            "Upload-Offset": str(state["offset"]),
-            "Upload-Length": str(state["upload_length"]),
-            "Cache-Control": "no-store",
-        }),
-    )
+    headers = {
+        "Upload-Offset": str(state["offset"]),
+        "Upload-Length": str(state["upload_length"]),
+        "Cache-Control": "no-store",
+    }
+    if state.get("concat") == "partial":
+        headers["Upload-Concat"] = "partial"
+    elif state.get("concat") == "final":
+        headers["Upload-Concat"] = "final;" + " ".join(state["parts"])
+    return Response(status_code=200, headers=_tus_headers(headers))
 
 
 @router.patch("/tus/{file_id}")
@@ -140,9 +198,13 @@ async def tus_patch(
     data = await request.body()
 
     try:
-        new_offset = upload_service.patch_upload(file_id, upload_offset, data)
+        new_offset = await run_in_threadpool(
+            upload_service.patch_upload, file_id, upload_offset, data, _upload_owner(request)
+        )
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail="Upload not found")
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=409, detail=str(e))
 
@@ -45,7 +45,7 @@ class ChangePasswordVoluntary(BaseModel):
 
 
 @router.post("/change-password/preauth")
-async def change_password_preauth(
+def change_password_preauth(
     data: ChangePasswordPreAuth,
 ) -> Union[LoginStepResponse, AuthTokenResponse]:
     user_id = consume_pre_auth_token(data.pre_auth_token, "change_password")
@@ -87,7 +87,7 @@ async def change_password_preauth(
 
 
 @router.post("/change-password")
-async def change_password(
+def change_password(
     data: ChangePasswordVoluntary, request: Request, _=Depends(auth_user_access)
 ) -> AuthTokenResponse:
     user_id = get_user_id(request)
@@ -0,0 +1,113 @@
+"""
+Microbenchmark: serializing a large enriched account response.
+
+Builds a synthetic account with 10k posts (two media items each, every row
+carrying a realistic `data` blob) entirely in memory and times three ways of
+turning it into a response body:
+
+  fastapi   - what returning the model from a route costs: model_dump, response
+              model re-validation, jsonable_encoder and stdlib json.dumps
+  pydantic  - model_dump_json on entities whose `data` was parsed into dicts
+  raw       - ModelJSONResponse with `data` kept as raw JSON text (the path the
+              entity routes use now)
+
+No database rows are read, but the server modules still need the usual .env to
+import. Run from the project root:
+
+    uv run browsing_platform/server/scripts/bench_entity_serialization.py --posts 10000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
+from dotenv import load_dotenv
+load_dotenv()
+
+from fastapi.encoders import jsonable_encoder
+
+from browsing_platform.server.json_response import dump_model_json
+from browsing_platform.server.services.entities_hierarchy import nest_entities
+from extractors.entity_types import ExtractedEntitiesFlattened, ExtractedEntitiesNested, Account, Post, Media, \
+    keep_raw_json_data
+
+
+def _data_blob(i: int) -> str:
+    # Roughly the shape and size (~2 KB) of a stored Instagram post/media `data` column
+    return json.dumps({
+        "pk": str(3_000_000_000_000_000_000 + i),
+        "code": f"C{i:010d}",
+        "caption": {"text": "lorem ipsum dolor sit amet " * 8, "created_at": 1_700_000_000 + i},
+        "like_count": i * 7 % 10_000,
+        "comment_count": i * 3 % 500,
+        "image_versions2": {"candidates": [
+            {"width": w, "height": w, "url": f"https://scontent.cdninstagram.com/v/t51/{i}_{w}.jpg?stp=dst-jpg&_nc_ht=x"}
+            for w in (1080, 750, 640, 480, 320, 240, 150)
+        ]},
+        "user": {"pk": "1234567", "username": "synthetic_account", "is_verified": False},
+        "usertags": {"in": [{"user": {"pk": str(j), "username": f"user{j}"}, "position": [0.5, 0.5]} for j in range(3)]},
+    })
+
+
+def build_account(n_posts: int) -> ExtractedEntitiesNested:
+    base = datetime(2024, 1, 1)
+    account = Account(id=1, url_suffix="synthetic_account", platform="instagram", display_name="Synthetic",
+                      data=_data_blob(0))
+    posts, media = [], []
+    for i in range(n_posts):
+        posts.append(Post(id=i + 1, account_id=1, url_suffix=f"p/C{i:010d}", platform="instagram",
+                          publication_date=base + timedelta(hours=i), caption="lorem ipsum " * 10,
+                          data=_data_blob(i)))
+        for k in range(2):
+            media.append(Media(id=2 * i + k + 1, post_id=i + 1, url_suffix=f"v/t51/{i}_{k}.jpg",
+                               platform="instagram", media_type="image", local_url=f"local_archive_har/x/{i}_{k}.jpg",
+                               thumbnail_path=f"local_thumbnails/{i}_{k}.jpg", data=_data_blob(i)))
+    return nest_entities(ExtractedEntitiesFlattened(accounts=[account], posts=posts, media=media))
+
+
+def _fastapi_path(model: ExtractedEntitiesNested) -> bytes:
+    # fastapi.routing.serialize_response: dump, validate against the response model, encode, json.dumps
+    validated = ExtractedEntitiesNested.model_validate(model.model_dump())
+    content = jsonable_encoder(validated.model_dump(mode="json"))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _time(label: str, fn, repeat: int) -> bytes:
+    best = float("inf")
+    body = b""
+    for _ in range(repeat):
+        t = time.perf_counter()
+        body = fn()
+        best = min(best, time.perf_counter() - t)
+    print(f"{label:<10}{best * 1000:>10.0f} ms{len(body) / 1e6:>10.1f} MB")
+    return body
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Entity response serialization microbenchmark")
+    parser.add_argument("--posts", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    t = time.perf_counter()
+    parsed = build_account(args.posts)
+    build_parsed = time.perf_counter() - t
+    t = time.perf_counter()
+    with keep_raw_json_data():
+        raw = build_account(args.posts)
+    build_raw = time.perf_counter() - t
+    print(f"{args.posts} posts; building entities: parsed data {build_parsed * 1000:.0f} ms, "
+          f"raw data {build_raw * 1000:.0f} ms\n")
+
+    print(f"{'path':<10}{'best of ' + str(args.repeat):>13}{'body':>13}")
+    fastapi_body = _time("fastapi", lambda: _fastapi_path(parsed), args.repeat)
+    pydantic_body = _time("pydantic", lambda: parsed.model_dump_json().encode("utf-8"), args.repeat)
+    raw_body = _time("raw", lambda: dump_model_json(raw), args.repeat)
+    assert json.loads(fastapi_body) == json.loads(pydantic_body) == json.loads(raw_body), "serializers disagree"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Load test: concurrent search + browse traffic against a running server.
+
+Mixes POST /api/search/ (all search modes) with GETs of the account / post /
+media pages discovered from the search results, and reports p50/p95/p99
+latency per request class. Run it before and after server changes that touch
+request handling (threadpool size, caching, ...) and compare the p99 column.
+
+Run from the project root against a dev or staging server:
+
+    uv run browsing_platform/server/scripts/load_test.py --token <login token> \\
+        --base-url http://localhost:4444 --concurrency 32 --duration 60
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+SEARCH_MODES = ["accounts", "posts", "media", "archive_sessions", "all"]
+BROWSE_PAGES = {"account", "post", "media"}
+SEARCH_TERMS = ["", "a", "the", "news", "video"]
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class LoadTest:
+    def __init__(self, base_url: str, token: str, browse_ratio: float):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"Authorization": f"token:{token}"}
+        self.browse_ratio = browse_ratio
+        self.lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.browse_targets: list[tuple[str, int]] = []
+
+    def _record(self, kind: str, elapsed_ms: float, ok: bool, results: list | None = None):
+        with self.lock:
+            self.latencies[kind].append(elapsed_ms)
+            if not ok:
+                self.errors[kind] += 1
+            if results:
+                for r in results:
+                    if r.get("page") in BROWSE_PAGES and len(self.browse_targets) < 5000:
+                        self.browse_targets.append((r["page"], r["id"]))
+
+    def _search(self, session: requests.Session):
+        mode = random.choice(SEARCH_MODES)
+        body = {
+            "search_term": random.choice(SEARCH_TERMS),
+            "search_mode": mode,
+            "page_number": random.randint(1, 3),
+            "page_size": 20,
+        }
+        t = time.perf_counter()
+        try:
+            resp = session.post(f"{self.base_url}/api/search/", json=body, headers=self.headers, timeout=60)
+            ok = resp.status_code == 200
+            results = resp.json() if ok else None
+        except requests.RequestException:
+            ok, results = False, None
+        self._record(f"search:{mode}", (time.perf_counter() - t) * 1000, ok, results)
+
+    def _browse(self, session: requests.Session):
+        with self.lock:
+            target = random.choice(self.browse_targets) if self.browse_targets else None
+        if target is None:
+            return self._search(session)
+        page, item_id = target
+        t = time.perf_counter()
+        try:
+            resp = session.get(f"{self.base_url}/api/{page}/{item_id}", headers=self.headers, timeout=60)
+            ok = resp.status_code == 200
+        except requests.RequestException:
+            ok = False
+        self._record(f"browse:{page}", (time.perf_counter() - t) * 1000, ok)
+
+    def worker(self, deadline: float):
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            if random.random() < self.browse_ratio:
+                self._browse(session)
+            else:
+                self._search(session)
+
+    def report(self, wall_seconds: float):
+        total = sum(len(v) for v in self.latencies.values())
+        print(f"\n{total} requests in {wall_seconds:.1f}s ({total / wall_seconds:.1f} req/s)\n")
+        print(f"{'class':<26}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        all_values: list[float] = []
+        for kind in sorted(self.latencies):
+            values = sorted(self.latencies[kind])
+            all_values.extend(values)
+            print(f"{kind:<26}{len(values):>8}{self.errors[kind]:>8}"
+                  f"{_percentile(values, 50):>10.1f}{_percentile(values, 95):>10.1f}"
+                  f"{_percentile(values, 99):>10.1f}{values[-1]:>10.1f}")
+        all_values.sort()
+        if all_values:
+            print(f"{'ALL':<26}{len(all_values):>8}{sum(self.errors.values()):>8}"
+                  f"{_percentile(all_values, 50):>10.1f}{_percentile(all_values, 95):>10.1f}"
+                  f"{_percentile(all_values, 99):>10.1f}{all_values[-1]:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent search + browse load test")
+    parser.add_argument("--base-url", default="http://localhost:4444")
+    parser.add_argument("--token", required=True, help="login token (value after 'token:' in the Authorization header)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    parser.add_argument("--browse-ratio", type=float, default=0.7, help="share of requests that are entity page loads")
+    args = parser.parse_args()
+
+    test = LoadTest(args.base_url, args.token, args.browse_ratio)
+    # Warm-up: collect browse targets before the measured run
+    session = requests.Session()
+    for mode in SEARCH_MODES:
+        test._search(session)
+    if not test.browse_targets:
+        print("Warning: no browse targets found; running search-only traffic", file=sys.stderr)
+    test.latencies.clear()
+    test.errors.clear()
+
+    start = time.monotonic()
+    deadline = start + args.duration
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for _ in range(args.concurrency):
+            pool.submit(test.worker, deadline)
+    test.report(time.monotonic() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,13 @@ import asyncio
 import logging
 import os
 import re
+import threading
 import time
 from contextlib import asynccontextmanager
 from logging.handlers import RotatingFileHandler
+from urllib.parse import quote
 
+import anyio.to_thread
 import uvicorn
 from dotenv import load_dotenv
 from fastapi import FastAPI, Request, Response
@@ -14,17 +17,23 @@ from fastapi.responses import FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
+from starlette.concurrency import run_in_threadpool
 from starlette.middleware.base import BaseHTTPMiddleware
 
+from browsing_platform.server.compression import CompressionMiddleware
+from browsing_platform.server.config import SERVER_WORKERS
 from browsing_platform.server.rate_limiter import limiter
 from browsing_platform.server.routes import account, post, media, media_part, archiving_session, login, search, \
     permissions, tags, annotate, share, upload, incorporate, tag_management, tag_import, annotation_import, \
-    twofa, user as user_route, admin_users, community
+    import_jobs, twofa, user as user_route, admin_users, community
 from browsing_platform.server.routes.share import public_router as share_public_router
+from browsing_platform.server.services.event_logger import flush_event_log, event_log_stats
 from browsing_platform.server.services.file_tokens import decrypt_file_token, FileTokenError
+from browsing_platform.server.services.import_jobs import IMPORT_JOB_CONNECTIONS, IMPORT_MAX_CONCURRENT_JOBS
+from browsing_platform.server.services.search import SEARCH_FANOUT_WORKERS
 from browsing_platform.server.services.sharing_manager import get_link_permissions
-from browsing_platform.server.services.token_manager import check_token
-from utils.db import DbError
+from browsing_platform.server.services.token_manager import check_token, flush_last_use
+from utils.db import DbError, DB_POOL_SIZE
 
 load_dotenv()
 is_production = os.getenv("ENVIRONMENT") == "production"
@@ -100,16 +109,48 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Sync route handlers and run_in_threadpool() calls share anyio's default thread
+# limiter. Keep it below the DB pool size (leaving headroom for the incorporation
+# job thread, the search fan-out pool and the connections of running background
+# imports) so a burst of requests queues for a worker thread instead of failing
+# with PoolError in cnx_pool.get_connection().
+API_THREADPOOL_SIZE = int(os.getenv("API_THREADPOOL_SIZE", str(max(
+    1, DB_POOL_SIZE - 4 - SEARCH_FANOUT_WORKERS - IMPORT_JOB_CONNECTIONS * IMPORT_MAX_CONCURRENT_JOBS
+))))
+
+# Behind nginx (infra/nginx.conf), /archives and /thumbnails requests are only
+# authorized here; the file itself is handed off with X-Accel-Redirect to an
+# internal nginx location so multi-GB HARs and videos never stream through Python.
+STATIC_FILES_X_ACCEL = os.getenv("STATIC_FILES_X_ACCEL") == "1"
+X_ACCEL_PREFIX = os.getenv("STATIC_FILES_X_ACCEL_PREFIX", "/_protected")
+
+# Responses at least this large are compressed (zstd / gzip, per Accept-Encoding)
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
-    from browsing_platform.server.services import ws_manager
+    from browsing_platform.server.services import cache_invalidation, ws_manager
+    from browsing_platform.server.services.community import USE_TIE_GRAPH
+    from browsing_platform.server.services.import_jobs import cleanup_stale_import_jobs
     from browsing_platform.server.services.incorporation_service import cleanup_stale_jobs
     from browsing_platform.server.services.pre_auth_manager import cleanup_expired_pre_auth_tokens
+    from browsing_platform.server.services.tie_graph import tie_graph
+    from browsing_platform.server.services.upload_service import cleanup_expired_partial_uploads
     ws_manager.set_event_loop(asyncio.get_event_loop())
+    cache_invalidation.start_relay()
+    anyio.to_thread.current_default_thread_limiter().total_tokens = API_THREADPOOL_SIZE
     cleanup_stale_jobs()
+    cleanup_stale_import_jobs()
     cleanup_expired_pre_auth_tokens()
+    cleanup_expired_partial_uploads()
+    if USE_TIE_GRAPH:
+        # Build the community tie graph in the background so the first
+        # community request doesn't pay for the full load.
+        threading.Thread(target=tie_graph.warm, name="tie-graph-warm", daemon=True).start()
     yield
+    flush_last_use()
+    flush_event_log()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -157,6 +198,13 @@ app.mount(
 )
 
 
+def _embedded_token_grants_access(login_token: str, allow_share_link: bool) -> bool:
+    if check_token(login_token).valid:
+        return True
+    # prefix-scoped tokens are only issued for login tokens
+    return allow_share_link and get_link_permissions(login_token, skip_password_check=True).view
+
+
 class StaticFilesAuthMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         # BaseHTTPMiddleware cannot handle WebSocket upgrades — pass them straight through.
@@ -166,19 +214,29 @@ class StaticFilesAuthMiddleware(BaseHTTPMiddleware):
         if request.url.path.startswith("/archives") or request.url.path.startswith("/thumbnails"):
             # Prefer per-file token 'ft' which is bound to the file path and cannot be reused for other files.
             file_token = request.query_params.get("ft")
+            # Optional directory prefix ('fp') the token is scoped to instead of this exact file
+            path_prefix = request.query_params.get("fp")
             try:
                 # Use the request path (including leading slash) as the file_path binding.
-                payload = decrypt_file_token(file_token, request.url.path)
+                payload = decrypt_file_token(file_token, request.url.path, path_prefix)
             except FileTokenError as e:
                 logger.warning(f"File token validation failed for {request.url.path}: {e}")
                 return Response("Unauthorized", status_code=401)
             # access is allowed if the user supplied a valid login token or a share token
             # share tokens can be used to access static media even if the entities the media is attached to is beyond the share scope
             # this is fine because a user can not generate an encrypted payload containing their share token for arbitrary files without knowing the server secret
-            if not check_token(payload.login_token).valid and not get_link_permissions(payload.login_token, skip_password_check=True).view:
+            if not await run_in_threadpool(_embedded_token_grants_access, payload.login_token, path_prefix is None):
                 logger.warning(f"Invalid embedded login token for {request.url.path}")
                 return Response("Unauthorized", status_code=401)
-        response = await call_next(request)
+            if STATIC_FILES_X_ACCEL:
+                if ".." in request.url.path.split("/"):
+                    return Response("Not Found", status_code=404)
+                # nginx serves the bytes (sendfile, Range, caching headers) from its internal location
+                response = Response(headers={"X-Accel-Redirect": X_ACCEL_PREFIX + quote(request.url.path)})
+            else:
+                response = await call_next(request)
+        else:
+            response = await call_next(request)
 
         # Security headers
         response.headers["X-Robots-Tag"] = "noindex, nofollow"
@@ -208,6 +266,8 @@ class StaticFilesAuthMiddleware(BaseHTTPMiddleware):
 
 
 app.add_middleware(StaticFilesAuthMiddleware)
+# Added last so it is the outermost layer and compresses the final headers + body
+app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
 for r in [
     account.router,
     post.router,
@@ -226,6 +286,7 @@ for r in [
     tag_management.router,
     tag_import.router,
     annotation_import.router,
+    import_jobs.router,
     twofa.router,
     user_route.router,
     admin_users.router,
@@ -233,6 +294,22 @@ for r in [
 ]:
     app.include_router(r, prefix="/api")
 
+
+@app.get("/api/health")
+def health() -> dict:
+    """Liveness check for monitoring. Counters are this worker process's own.
+
+    event_log: error_log rows waiting for the background writer (queued) and rows
+    lost since startup because the queue was full (dropped) or the INSERT failed
+    (failed); a growing `dropped` means audit events are being lost.
+    """
+    stats = event_log_stats()
+    return {
+        "status": "ok",
+        "event_log": {key: stats[key] for key in ("queued", "dropped", "failed")},
+    }
+
+
 # # # SPA catch-all route (must be last)
 @app.api_route("/{full_path:path}", methods=["GET"])
 async def serve_spa(request: Request, full_path: str):
@@ -265,5 +342,7 @@ async def serve_spa(request: Request, full_path: str):
     return FileResponse(os.path.join(build_dir, "index.html"))
 
 if __name__ == "__main__":
-    reload = not is_production
-    uvicorn.run("browsing_platform.server.server:app", host="0.0.0.0", port=4444, reload=reload)
+    # Auto-reload and multiple workers are mutually exclusive in uvicorn
+    reload = not is_production and SERVER_WORKERS == 1
+    uvicorn.run("browsing_platform.server.server:app", host="0.0.0.0", port=4444, reload=reload,
+                workers=SERVER_WORKERS)
@@ -2,6 +2,7 @@ import json
 from typing import Any, Optional
 
 from browsing_platform.server.services.annotation import Annotation
+from browsing_platform.server.services.search_cache import invalidate_search_cache
 from extractors.entity_types import Account
 from utils import db
 
@@ -82,4 +83,5 @@ def annotate_account(account_id: int, annotation: Annotation) -> None:
                 """INSERT INTO account_tag (account_id, tag_id, notes) VALUES (%(account_id)s, %(tag_id)s, %(notes)s)""",
                 {"account_id": account_id, "tag_id": tag.id, "notes": tag.notes},
                 return_type="none"
-            )
\ No newline at end of file
+            )
+    invalidate_search_cache()
\ No newline at end of file
@@ -4,6 +4,7 @@ from typing import List, Optional
 from pydantic import BaseModel
 
 from browsing_platform.server.services.tag import ENTITY_TAG_TABLES
+from browsing_platform.server.services.search_cache import invalidate_search_cache
 from utils import db
 
 
@@ -47,6 +48,7 @@ def add_tags_batch(entity_type: str, entity_ids: list[int], tags: list[TagWithNo
                 {"eid": entity_id, "tid": tag.id, "notes": tag.notes},
                 return_type="none"
             )
+    invalidate_search_cache()
 
 
 def remove_tag_from_entity(entity_type: str, entity_id: int, tag_id: int) -> None:
@@ -58,3 +60,4 @@ def remove_tag_from_entity(entity_type: str, entity_id: int, tag_id: int) -> Non
         {"eid": entity_id, "tid": tag_id},
         return_type="none"
     )
+    invalidate_search_cache()
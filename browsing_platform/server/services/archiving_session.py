@@ -6,7 +6,7 @@ from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
 
 from pydantic import BaseModel, computed_field, field_validator
 
-from browsing_platform.server.services.file_tokens import generate_file_token
+from browsing_platform.server.services.file_tokens import file_token_params
 from db_loaders.db_intake import LOCAL_ARCHIVES_DIR_ALIAS, LOCAL_WACZ_ARCHIVES_DIR_ALIAS
 from extractors.entity_types import ExtractedEntitiesNested, reconstruct_url
 from utils import db
@@ -147,10 +147,10 @@ def sign_archiving_session(session: ArchiveSession, transform: ArchivingSessionT
             local_path = local_path.replace(LOCAL_WACZ_ARCHIVES_DIR_ALIAS, f"{transform.local_files_root}/archives", 1)
             parsed = urlparse(local_path)
             qs = dict(parse_qsl(parsed.query, keep_blank_values=True))
-            qs['ft'] = generate_file_token(
+            qs.update(file_token_params(
                 transform.access_token,
                 local_path.split(f"{transform.local_files_root}")[-1]
-            )
+            ))
             new_query = urlencode(qs, doseq=True)
             local_signed_url = str(urlunparse(parsed._replace(query=new_query)))
             session.attachments[attachment_type][i] = local_signed_url
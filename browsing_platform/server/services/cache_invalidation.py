@@ -0,0 +1,116 @@
+"""
+Invalidation of the per-process caches across API worker processes.
+
+Auth decisions (token_manager), share links (sharing_manager), search results
+(search_cache), the community tie graph and the perceptual-hash index are all
+cached inside each worker process, but a write is handled by one worker only.
+Code that changes what those caches hold calls ``invalidate(cache, **params)``
+after the write, instead of touching the cache directly: the registered handler runs in this
+process right away and, with ``SERVER_WORKERS > 1``, the invalidation is also
+written to the ``broadcast_event`` table (channel ``cache_invalidation``). Every
+worker polls that channel every BROADCAST_POLL_MS and runs the handler too, so
+a logged-out token or a deleted share link stops working everywhere within one
+poll interval instead of at the end of the cache TTL.
+
+Handlers are registered by the module owning the cache (``register``) and must
+be idempotent: the publishing worker reads its own message back. Secrets
+(tokens, share-link suffixes) are published as ``key_digest`` values, never in
+clear. If publishing fails, the other workers fall back to the cache TTLs.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+from browsing_platform.server.config import SERVER_WORKERS
+from browsing_platform.server.services.ws_manager import BROADCAST_POLL_SECONDS, EventCursor
+from utils import db
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "cache_invalidation"
+# Rows are only needed until every worker has polled them
+_RETENTION_SECONDS = 3600
+_PRUNE_INTERVAL_SECONDS = 300
+
+_handlers: dict[str, Callable[[dict], None]] = {}
+_relay_thread: Optional[threading.Thread] = None
+
+
+def key_digest(value: str) -> str:
+    """Stand-in for a secret cache key in published invalidations."""
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+
+def register(cache: str, handler: Callable[[dict], None]) -> None:
+    """Install the handler that applies invalidations of `cache` to this process."""
+    _handlers[cache] = handler
+
+
+def _apply(cache: str, params: dict) -> None:
+    handler = _handlers.get(cache)
+    if handler is None:
+        # The owning module was never imported in this process, so there is nothing to drop
+        return
+    try:
+        handler(params)
+    except Exception:
+        logger.exception(f"Applying {cache} cache invalidation failed")
+
+
+def invalidate(cache: str, **params) -> None:
+    """Invalidate `cache` in this process now and in every other worker at its next poll.
+    Call it after the write that made the entries stale: a read between the two would put
+    the old state back in the cache. Inside a db.transaction_batch it is deferred until
+    the batch commits."""
+    db.after_commit(lambda: _invalidate(cache, params))
+
+
+def _invalidate(cache: str, params: dict) -> None:
+    _apply(cache, params)
+    if SERVER_WORKERS <= 1:
+        return
+    try:
+        db.execute_query(
+            "INSERT INTO broadcast_event (channel, payload) VALUES (%(channel)s, %(payload)s)",
+            {"channel": CHANNEL, "payload": json.dumps({"cache": cache, "params": params})}, "none"
+        )
+    except Exception as e:
+        logger.warning(f"Could not publish {cache} cache invalidation to other workers: {e}")
+
+
+def start_relay() -> None:
+    """Start applying invalidations published by other workers (no-op with a single worker)."""
+    global _relay_thread
+    if SERVER_WORKERS <= 1 or _relay_thread is not None:
+        return
+    # Caches start empty, so older invalidations do not matter
+    row = db.execute_query(
+        "SELECT COALESCE(MAX(id), 0) AS last FROM broadcast_event WHERE channel = %(channel)s",
+        {"channel": CHANNEL}, "single_row"
+    )
+    cursor = EventCursor(CHANNEL, row["last"] if row else 0)
+    _relay_thread = threading.Thread(target=_relay_loop, args=(cursor,), name="cache-invalidation-relay", daemon=True)
+    _relay_thread.start()
+
+
+def _relay_loop(cursor: EventCursor) -> None:
+    pruned_at = 0.0
+    while True:
+        time.sleep(BROADCAST_POLL_SECONDS)
+        try:
+            for row in cursor.poll():
+                msg = json.loads(row["payload"])
+                _apply(msg["cache"], msg.get("params") or {})
+            if time.monotonic() - pruned_at >= _PRUNE_INTERVAL_SECONDS:
+                pruned_at = time.monotonic()
+                db.execute_query(
+                    """DELETE FROM broadcast_event
+                       WHERE channel = %(channel)s AND create_date < NOW() - INTERVAL %(s)s SECOND""",
+                    {"channel": CHANNEL, "s": _RETENTION_SECONDS}, "none"
+                )
+        except Exception as e:
+            logger.warning(f"Cache invalidation relay poll failed: {e}")
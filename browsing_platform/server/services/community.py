@@ -1,16 +1,24 @@
 import json
+import os
 from typing import Callable, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from browsing_platform.server.services.media import get_media_thumbnail_path
 from browsing_platform.server.services.search import SearchResultTransform, Thumbnail, sign_thumbnail_path
 from browsing_platform.server.services.tag import ITagWithType
 from browsing_platform.server.services.tag_management import IQuickAccessTypeDropdown, ITagHierarchyEntry
+from browsing_platform.server.services.tie_graph import tie_graph, SUGGESTED_RELATION_TYPE
+from db_loaders.entity_preview import get_entity_previews
 from utils import db
 
 TOP_N = 50
-SUGGESTED_RELATION_TYPE = 'suggested'
+# Score ties from the in-memory tie graph (tie_graph.py); set to 0 to fall back
+# to the SQL scoring query, e.g. on hosts without memory for the graph.
+USE_TIE_GRAPH = os.getenv("COMMUNITY_TIE_GRAPH", "1") == "1"
+MAX_EXPANSION_HOPS = 3
+MAX_EXPANSION_ITERATIONS = 100
+EXPANSION_TIME_BUDGET_SECONDS = 5.0
 DEFAULT_TIE_WEIGHTS: dict[str, float] = {
     'follow': 1.0,
     'suggested': 0.0,
@@ -34,6 +42,17 @@ class CommunityCandidatesRequest(BaseModel):
     weights: TieWeights = TieWeights()
 
 
+class CommunityExpansionRequest(BaseModel):
+    kernel_ids: list[int]
+    excluded_ids: list[int] = []
+    weights: TieWeights = TieWeights()
+    # Tag-bound mode: the tag's saved dismissals are excluded as well
+    tag_id: Optional[int] = None
+    max_hops: int = Field(default=3, ge=1, le=MAX_EXPANSION_HOPS)
+    restart_probability: float = Field(default=0.15, gt=0, lt=1)
+    max_iterations: int = Field(default=MAX_EXPANSION_ITERATIONS, ge=1, le=MAX_EXPANSION_ITERATIONS)
+
+
 class CandidateAccount(BaseModel):
     id: int
     url_suffix: Optional[str] = None
@@ -47,12 +66,21 @@ class CandidateAccount(BaseModel):
     follower_count: int = 0
     following_count: int = 0
     post_count: int = 0
+    # Multi-hop expansion only: shortest tie distance from the kernel
+    hops: Optional[int] = None
 
 
 class CommunityCandidatesResponse(BaseModel):
     candidates: list[CandidateAccount]
 
 
+class CommunityExpansionResponse(BaseModel):
+    candidates: list[CandidateAccount]
+    iterations: int
+    converged: bool
+    subgraph_size: int
+
+
 class TagKernelAccount(BaseModel):
     id: int
     url_suffix: Optional[str] = None
@@ -252,6 +280,12 @@ def _build_score_sql(k_in: str, cand_pred: Callable[[str], str], limited: bool)
         """
 
 
+def _tie_graph_score_rows(scores: list[tuple[int, float, int]]) -> list[dict]:
+    """Shape tie-graph scores like the rows of the SQL scoring query."""
+    return [{"candidate_id": cid, "score": score, "kernel_connections": connections}
+            for cid, score, connections in scores]
+
+
 def _parse_score_rows(score_rows) -> tuple[list[int], dict[int, float], dict[int, int]]:
     ids: list[int] = []
     score_map: dict[int, float] = {}
@@ -264,6 +298,25 @@ def _parse_score_rows(score_rows) -> tuple[list[int], dict[int, float], dict[int
     return ids, score_map, connections_map
 
 
+def _account_previews(
+        account_ids: list[int],
+        transform: Optional[SearchResultTransform],
+) -> tuple[dict[int, list[Thumbnail]], dict[int, int]]:
+    """Preview thumbnails and media count per account, from the stored search previews."""
+    thumb_map: dict[int, list[Thumbnail]] = {}
+    media_count_map: dict[int, int] = {}
+    should_sign = transform is not None and transform.access_token is not None
+    for aid, preview in get_entity_previews("account", account_ids).items():
+        media_count_map[aid] = preview["media_count"]
+        for media in preview["media"]:
+            src = get_media_thumbnail_path(media["thumbnail_path"], media["local_url"])
+            if src:
+                if should_sign:
+                    src = sign_thumbnail_path(src, transform)
+                thumb_map.setdefault(aid, []).append(Thumbnail(src=src, aspect_ratio=media["aspect_ratio"]))
+    return thumb_map, media_count_map
+
+
 def _hydrate_accounts(
         ids: list[int],
         score_map: dict[int, float],
@@ -282,65 +335,14 @@ def _hydrate_accounts(
     cand_in = ", ".join(f"%(c_{i})s" for i in range(len(ids)))
 
     account_rows = db.execute_query(  # nosec B608
-        f"SELECT id, url_suffix, display_name, bio, data, post_count FROM account WHERE id IN ({cand_in})",
+        f"""SELECT id, url_suffix, display_name, bio, data, post_count, followers_count, following_count
+            FROM account WHERE id IN ({cand_in})""",
         cand_args,
         return_type="rows",
     )
     account_map = {r["id"]: r for r in account_rows}
 
-    # Scraped relation counts (real follows only — 'suggested' relations excluded).
-    # Both directions in one batched pass: followers = account is the followed
-    # party, following = account is the follower.
-    relation_rows = db.execute_query(  # nosec B608
-        f"""SELECT account_id, direction, COUNT(*) AS cnt FROM (
-                SELECT followed_account_id AS account_id, 'followers' AS direction
-                FROM account_relation
-                WHERE followed_account_id IN ({cand_in})
-                  AND (relation_type IS NULL OR relation_type != %(suggested_type)s)
-                UNION ALL
-                SELECT follower_account_id AS account_id, 'following' AS direction
-                FROM account_relation
-                WHERE follower_account_id IN ({cand_in})
-                  AND (relation_type IS NULL OR relation_type != %(suggested_type)s)
-            ) r
-            GROUP BY account_id, direction""",
-        {**cand_args, "suggested_type": SUGGESTED_RELATION_TYPE},
-        return_type="rows",
-    )
-    follower_map: dict[int, int] = {}
-    following_map: dict[int, int] = {}
-    for r in relation_rows:
-        if r["direction"] == "followers":
-            follower_map[r["account_id"]] = r["cnt"]
-        else:
-            following_map[r["account_id"]] = r["cnt"]
-
-    thumb_rows = db.execute_query(  # nosec B608
-        f"""SELECT account_id, thumbnail_path, local_url, aspect_ratio, media_count
-            FROM (
-                SELECT account_id, thumbnail_path, local_url, aspect_ratio,
-                       COUNT(*) OVER (PARTITION BY account_id) AS media_count,
-                       ROW_NUMBER() OVER (PARTITION BY account_id ORDER BY publication_date DESC) AS rn
-                FROM media
-                WHERE account_id IN ({cand_in})
-                  AND local_url IS NOT NULL
-            ) ranked
-            WHERE rn <= 8""",
-        cand_args,
-        return_type="rows",
-    )
-
-    thumb_map: dict[int, list[Thumbnail]] = {}
-    media_count_map: dict[int, int] = {}
-    should_sign = transform is not None and transform.access_token is not None
-    for t in thumb_rows:
-        aid = t["account_id"]
-        media_count_map[aid] = t["media_count"]
-        src = get_media_thumbnail_path(t["thumbnail_path"], t["local_url"])
-        if src:
-            if should_sign:
-                src = sign_thumbnail_path(src, transform)
-            thumb_map.setdefault(aid, []).append(Thumbnail(src=src, aspect_ratio=t.get("aspect_ratio")))
+    thumb_map, media_count_map = _account_previews(ids, transform)
 
     candidates = []
     for cid in ids:
@@ -357,8 +359,8 @@ def _hydrate_accounts(
             kernel_connections=connections_map.get(cid, 0),
             thumbnails=thumb_map.get(cid, []),
             media_count=media_count_map.get(cid, 0),
-            follower_count=follower_map.get(cid, 0),
-            following_count=following_map.get(cid, 0),
+            follower_count=acct.get("followers_count") or 0,
+            following_count=acct.get("following_count") or 0,
             post_count=acct.get("post_count") or 0,
         ))
 
@@ -375,18 +377,23 @@ def compute_candidates(
     kernel_ids = req.kernel_ids
     all_excluded = list(set(kernel_ids) | set(req.excluded_ids))
 
-    k_args = {f"k_{i}": kid for i, kid in enumerate(kernel_ids)}
-    k_in = ", ".join(f"%(k_{i})s" for i in range(len(kernel_ids)))
-    ex_args = {f"ex_{i}": eid for i, eid in enumerate(all_excluded)}
-    ex_in = ", ".join(f"%(ex_{i})s" for i in range(len(all_excluded)))
+    if USE_TIE_GRAPH:
+        score_rows = _tie_graph_score_rows(tie_graph.score_kernel_ties(
+            kernel_ids, req.weights.model_dump(), excluded_ids=all_excluded, limit=TOP_N,
+        ))
+    else:
+        k_args = {f"k_{i}": kid for i, kid in enumerate(kernel_ids)}
+        k_in = ", ".join(f"%(k_{i})s" for i in range(len(kernel_ids)))
+        ex_args = {f"ex_{i}": eid for i, eid in enumerate(all_excluded)}
+        ex_in = ", ".join(f"%(ex_{i})s" for i in range(len(all_excluded)))
 
-    query_args = {**k_args, **ex_args, **_weight_args(req.weights), "top_n": TOP_N}
+        query_args = {**k_args, **ex_args, **_weight_args(req.weights), "top_n": TOP_N}
 
-    score_rows = db.execute_query(  # nosec B608 - k_in / ex_in contain only %(key)s placeholders
-        _build_score_sql(k_in, lambda col: f"{col} NOT IN ({ex_in})", limited=True),
-        query_args,
-        return_type="rows",
-    )
+        score_rows = db.execute_query(  # nosec B608 - k_in / ex_in contain only %(key)s placeholders
+            _build_score_sql(k_in, lambda col: f"{col} NOT IN ({ex_in})", limited=True),
+            query_args,
+            return_type="rows",
+        )
 
     if not score_rows:
         return CommunityCandidatesResponse(candidates=[])
@@ -405,24 +412,29 @@ def compute_kernel_scores(
 
     Reuses the optimized batched scoring of ``compute_candidates`` (the candidate
     side is restricted to the kernel rather than excluded from it), so every
-    member's score is produced by a single query rather than O(n) per-account
-    queries. Every kernel id is hydrated, including members with no internal ties
+    member's score is produced by one tie-graph pass (or one query) rather than
+    O(n) per-account queries. Every kernel id is hydrated, including members with no internal ties
     (score 0). ``req.excluded_ids`` is ignored in this mode.
     """
     if not req.kernel_ids:
         return CommunityCandidatesResponse(candidates=[])
 
     kernel_ids = req.kernel_ids
-    k_args = {f"k_{i}": kid for i, kid in enumerate(kernel_ids)}
-    k_in = ", ".join(f"%(k_{i})s" for i in range(len(kernel_ids)))
+    if USE_TIE_GRAPH:
+        score_rows = _tie_graph_score_rows(tie_graph.score_kernel_ties(
+            kernel_ids, req.weights.model_dump(), candidate_ids=kernel_ids,
+        ))
+    else:
+        k_args = {f"k_{i}": kid for i, kid in enumerate(kernel_ids)}
+        k_in = ", ".join(f"%(k_{i})s" for i in range(len(kernel_ids)))
 
-    query_args = {**k_args, **_weight_args(req.weights)}
+        query_args = {**k_args, **_weight_args(req.weights)}
 
-    score_rows = db.execute_query(  # nosec B608 - k_in contains only %(key)s placeholders
-        _build_score_sql(k_in, lambda col: f"{col} IN ({k_in})", limited=False),
-        query_args,
-        return_type="rows",
-    )
+        score_rows = db.execute_query(  # nosec B608 - k_in contains only %(key)s placeholders
+            _build_score_sql(k_in, lambda col: f"{col} IN ({k_in})", limited=False),
+            query_args,
+            return_type="rows",
+        )
 
     _, score_map, connections_map = _parse_score_rows(score_rows)
     return CommunityCandidatesResponse(
@@ -430,6 +442,46 @@ def compute_kernel_scores(
     )
 
 
+def compute_expansion(
+        req: CommunityExpansionRequest,
+        transform: Optional[SearchResultTransform] = None,
+) -> CommunityExpansionResponse:
+    """Rank accounts up to ``max_hops`` ties away from the kernel by personalized PageRank.
+
+    One-hop scoring (``compute_candidates``) only sees direct neighbours; this walks
+    the tie graph from the kernel (random walk with restart, weighted by
+    ``TieWeights``), so accounts that are reached through many strong paths rank
+    high even without a direct tie. Excluded accounts and, in tag-bound mode, the
+    tag's dismissals are removed from the walk. Always served from the tie graph,
+    whatever COMMUNITY_TIE_GRAPH says: there is no SQL equivalent.
+    """
+    blocked = set(req.excluded_ids)
+    if req.tag_id is not None:
+        blocked.update(d.id for d in get_tag_dismissals(req.tag_id))
+    ppr = tie_graph.personalized_pagerank(
+        req.kernel_ids,
+        req.weights.model_dump(),
+        blocked_ids=list(blocked - set(req.kernel_ids)),
+        max_hops=req.max_hops,
+        restart_probability=req.restart_probability,
+        max_iterations=req.max_iterations,
+        time_budget_seconds=EXPANSION_TIME_BUDGET_SECONDS,
+        limit=TOP_N,
+    )
+    score_map = dict(zip(ppr.ids, ppr.scores))
+    connections_map = dict(zip(ppr.ids, ppr.seed_connections))
+    candidates = _hydrate_accounts(ppr.ids, score_map, connections_map, transform)
+    hops_map = dict(zip(ppr.ids, ppr.hops))
+    for c in candidates:
+        c.hops = hops_map.get(c.id)
+    return CommunityExpansionResponse(
+        candidates=candidates,
+        iterations=ppr.iterations,
+        converged=ppr.converged,
+        subgraph_size=ppr.subgraph_size,
+    )
+
+
 # ── Tag-based kernel helpers ──────────────────────────────────────────────────
 
 _TAG_COLS = """
@@ -444,11 +496,10 @@ _TAG_COLS = """
 def get_community_tag_dropdown(tag_id: int) -> IQuickAccessTypeDropdown:
     """Return an IQuickAccessTypeDropdown for the tag and all its descendants."""
     tag_rows = db.execute_query(  # nosec B608
-        f"""WITH RECURSIVE tag_desc AS (
+        f"""WITH tag_desc AS (
                 SELECT id FROM tag WHERE id = %(tag_id)s
                 UNION ALL
-                SELECT th.sub_tag_id FROM tag_hierarchy th
-                JOIN tag_desc td ON th.super_tag_id = td.id
+                SELECT descendant_id FROM tag_closure WHERE ancestor_id = %(tag_id)s
             )
             SELECT {_TAG_COLS}
             FROM tag_desc td
@@ -566,32 +617,7 @@ def get_tag_kernel_accounts(
     )
     account_map = {r["id"]: r for r in account_rows}
 
-    thumb_rows = db.execute_query(  # nosec B608
-        f"""SELECT account_id, thumbnail_path, local_url, aspect_ratio, media_count
-            FROM (
-                SELECT account_id, thumbnail_path, local_url, aspect_ratio,
-                       COUNT(*) OVER (PARTITION BY account_id) AS media_count,
-                       ROW_NUMBER() OVER (PARTITION BY account_id ORDER BY publication_date DESC) AS rn
-                FROM media
-                WHERE account_id IN ({cand_in})
-                  AND local_url IS NOT NULL
-            ) ranked
-            WHERE rn <= 8""",
-        cand_args,
-        return_type="rows",
-    )
-
-    thumb_map: dict[int, list[Thumbnail]] = {}
-    media_count_map: dict[int, int] = {}
-    should_sign = transform is not None and transform.access_token is not None
-    for t in thumb_rows:
-        aid = t["account_id"]
-        media_count_map[aid] = t["media_count"]
-        src = get_media_thumbnail_path(t["thumbnail_path"], t["local_url"])
-        if src:
-            if should_sign:
-                src = sign_thumbnail_path(src, transform)
-            thumb_map.setdefault(aid, []).append(Thumbnail(src=src, aspect_ratio=t.get("aspect_ratio")))
+    thumb_map, media_count_map = _account_previews(account_ids, transform)
 
     accounts = []
     for aid in account_ids:
@@ -1,4 +1,5 @@
-from typing import Optional
+import functools
+from typing import Callable, Iterator, Optional
 from urllib.parse import urlparse, parse_qsl, urlencode, urlunparse
 
 from pydantic import BaseModel
@@ -7,16 +8,37 @@ from browsing_platform.server.services.account import get_account_by_id
 from browsing_platform.server.services.archiving_session import ArchiveSessionWithEntities, get_archiving_session_by_id, \
     ArchiveSession, censor_archiving_session, ArchivingSessionTransform, sign_archiving_session
 from browsing_platform.server.services.entities_hierarchy import nest_entities
-from browsing_platform.server.services.file_tokens import generate_file_token
+from browsing_platform.server.services.file_tokens import file_token_params
 from browsing_platform.server.services.media import get_media_by_posts, get_media_by_id
-from browsing_platform.server.services.post import get_post_by_id, get_posts_by_accounts
+from browsing_platform.server.services.post import get_post_by_id, get_posts_by_accounts, get_account_posts_page, \
+    count_account_posts
+from browsing_platform.server.services.search import encode_cursor, decode_cursor, keyset_where
 from browsing_platform.server.services.tag import get_tags_by_entity_ids, ITagWithType
 from db_loaders.db_intake import LOCAL_ARCHIVES_DIR_ALIAS
 from db_loaders.thumbnail_generator import LOCAL_THUMBNAILS_DIR_ALIAS
 from extractors.entity_types import ExtractedEntitiesNested, Media, ExtractedEntitiesFlattened, Account, Post, \
-    Comment, Like, TaggedAccount, AccountRelation
+    Comment, Like, TaggedAccount, AccountRelation, PostAndAssociatedEntities, keep_raw_json_data
 from utils import db
 
+# Accounts with tens of thousands of posts and viral posts with tens of thousands of
+# comments are returned a page at a time: the entity endpoint embeds the first page
+# plus the total, and the rest is read from the cursor-paginated sub-resource
+# endpoints (account posts, post comments / likes, account relations).
+ACCOUNT_POSTS_FIRST_PAGE = 200
+POST_COMMENTS_FIRST_PAGE = 200
+MAX_SUB_RESOURCE_PAGE = 1000
+
+
+class SubResourcePage(BaseModel):
+    total: int
+    # Pass back as `cursor` to get the next page; None on the last page
+    next_cursor: Optional[str] = None
+
+
+class EnrichedEntitiesNested(ExtractedEntitiesNested):
+    # Sub-resources that were cut to their first page, keyed "account_posts" / "post_comments"
+    pages: dict[str, SubResourcePage] = {}
+
 
 class AccountInteractions(BaseModel):
     comments: list[Comment] = []
@@ -28,16 +50,25 @@ class AccountInteractions(BaseModel):
 class AccountRelationsResponse(BaseModel):
     relations: list[AccountRelation]
     account_tags: dict[int, list[ITagWithType]] = {}
+    page: Optional[SubResourcePage] = None
 
 
 class CommentsResponse(BaseModel):
     comments: list[Comment]
     account_tags: dict[int, list[ITagWithType]] = {}
+    page: Optional[SubResourcePage] = None
 
 
 class LikesResponse(BaseModel):
     likes: list[Like]
     account_tags: dict[int, list[ITagWithType]] = {}
+    page: Optional[SubResourcePage] = None
+
+
+class AccountPostsResponse(BaseModel):
+    posts: list[PostAndAssociatedEntities]
+    account_tags: dict[int, list[ITagWithType]] = {}
+    page: SubResourcePage
 
 
 class AccountInteractionCounts(BaseModel):
@@ -180,6 +211,144 @@ def get_comments_by_post_ids(post_ids: list[int]) -> list[Comment]:
     return [Comment(**r) for r in rows]
 
 
+# ---------------------------------------------------------------------------
+# Keyset pagination of sub-resources
+#
+# Cursors use the same encoding as search cursors (search.encode_cursor), labelled
+# with the sub-resource name so a cursor from one list is rejected by another.
+# ---------------------------------------------------------------------------
+
+_ACCOUNT_POSTS_KEYSET = ("publication_date", "DESC")
+_POST_COMMENTS_KEYSET = ("c.publication_date", "ASC")
+_POST_LIKES_KEYSET = ("pl.id", "ASC")
+_ACCOUNT_RELATIONS_KEYSET = ("ar.id", "ASC")
+
+
+def clamp_page_size(limit: Optional[int], default: int) -> int:
+    return max(1, min(limit or default, MAX_SUB_RESOURCE_PAGE))
+
+
+def _after_cursor(label: str, keyset: tuple[str, str], id_column: str, cursor: Optional[str]) -> tuple[str, dict]:
+    """(keyset WHERE condition, args) for the rows after `cursor`; ("", {}) for the first page.
+    Raises ValueError for a malformed or foreign cursor."""
+    if not cursor:
+        return "", {}
+    value, row_id = decode_cursor(cursor, label, keyset)
+    args: dict = {}
+    return keyset_where(keyset, id_column, value, row_id, args), args
+
+
+def _cut_page(items: list, limit: int, label: str, keyset: tuple[str, str], sort_value: Callable) -> tuple[list, Optional[str]]:
+    """Pages are fetched with limit + 1 rows; the extra row only signals that another page exists."""
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor(label, keyset, sort_value(items[-1]), items[-1].id)
+
+
+def get_comments_page(post_id: int, cursor: Optional[str], limit: int) -> tuple[list[Comment], Optional[str]]:
+    after, args = _after_cursor("post_comments", _POST_COMMENTS_KEYSET, "c.id", cursor)
+    rows = db.execute_query(  # nosec B608 - `after` is built by keyset_where from a constant keyset
+        f"""SELECT c.*, a.url_suffix AS account_url_suffix, a.platform AS platform,
+                   a.id_on_platform AS account_id_on_platform,
+                   a.display_name AS account_display_name,
+                   p.url_suffix AS post_url_suffix, p.id_on_platform AS post_id_on_platform
+            FROM comment c
+            LEFT JOIN account a ON c.account_id = a.id
+            LEFT JOIN post p ON c.post_id = p.id
+            WHERE c.post_id = %(post_id)s {'AND ' + after if after else ''}
+            ORDER BY c.publication_date, c.id
+            LIMIT %(limit)s""",
+        {"post_id": post_id, "limit": limit + 1, **args},
+        return_type="rows"
+    )
+    return _cut_page([Comment(**r) for r in rows], limit, "post_comments", _POST_COMMENTS_KEYSET,
+                     lambda c: c.publication_date)
+
+
+def get_likes_page(post_id: int, cursor: Optional[str], limit: int) -> tuple[list[Like], Optional[str]]:
+    after, args = _after_cursor("post_likes", _POST_LIKES_KEYSET, "pl.id", cursor)
+    rows = db.execute_query(  # nosec B608 - `after` is built by keyset_where from a constant keyset
+        f"""SELECT pl.*, a.url_suffix AS account_url_suffix, a.platform AS platform,
+                   a.id_on_platform AS account_id_on_platform,
+                   a.display_name AS account_display_name,
+                   p.url_suffix AS post_url_suffix, p.id_on_platform AS post_id_on_platform
+            FROM post_like pl
+            LEFT JOIN account a ON pl.account_id = a.id
+            LEFT JOIN post p ON pl.post_id = p.id
+            WHERE pl.post_id = %(post_id)s {'AND ' + after if after else ''}
+            ORDER BY pl.id
+            LIMIT %(limit)s""",
+        {"post_id": post_id, "limit": limit + 1, **args},
+        return_type="rows"
+    )
+    return _cut_page([Like(**r) for r in rows], limit, "post_likes", _POST_LIKES_KEYSET, lambda l: l.id)
+
+
+def get_account_relations_page(account_id: int, cursor: Optional[str], limit: int) -> tuple[list[AccountRelation], Optional[str]]:
+    after, args = _after_cursor("account_relations", _ACCOUNT_RELATIONS_KEYSET, "ar.id", cursor)
+    # The two directions are separate index range scans; UNION ALL keeps each one indexed
+    rows = db.execute_query(  # nosec B608 - `after` is built by keyset_where from a constant keyset
+        f"""SELECT * FROM (
+                SELECT ar.*,
+                       fa.url_suffix AS follower_account_url_suffix, fa.platform AS platform,
+                       fa.id_on_platform AS follower_account_id_on_platform,
+                       fa.display_name AS follower_account_display_name,
+                       fd.url_suffix AS followed_account_url_suffix,
+                       fd.id_on_platform AS followed_account_id_on_platform,
+                       fd.display_name AS followed_account_display_name
+                FROM account_relation ar
+                LEFT JOIN account fa ON ar.follower_account_id = fa.id
+                LEFT JOIN account fd ON ar.followed_account_id = fd.id
+                WHERE ar.follower_account_id = %(id)s {'AND ' + after if after else ''}
+                UNION ALL
+                SELECT ar.*,
+                       fa.url_suffix, fa.platform, fa.id_on_platform, fa.display_name,
+                       fd.url_suffix, fd.id_on_platform, fd.display_name
+                FROM account_relation ar
+                LEFT JOIN account fa ON ar.follower_account_id = fa.id
+                LEFT JOIN account fd ON ar.followed_account_id = fd.id
+                WHERE ar.followed_account_id = %(id)s AND ar.follower_account_id != %(id)s
+                      {'AND ' + after if after else ''}
+            ) r
+            ORDER BY r.id
+            LIMIT %(limit)s""",
+        {"id": account_id, "limit": limit + 1, **args},
+        return_type="rows"
+    )
+    return _cut_page([AccountRelation(**r) for r in rows], limit, "account_relations",
+                     _ACCOUNT_RELATIONS_KEYSET, lambda r: r.id)
+
+
+def count_post_comments(post_id: int) -> int:
+    return get_post_auxiliary_counts(post_id).comments_count
+
+
+def count_post_likes(post_id: int) -> int:
+    return get_post_auxiliary_counts(post_id).likes_count
+
+
+def count_account_relations(account_id: int) -> int:
+    return get_account_auxiliary_counts(account_id).relations_count
+
+
+def account_tags_for(account_ids) -> dict[int, list[ITagWithType]]:
+    """Tags of the given accounts (e.g. the commenters on one page), ignoring None ids."""
+    return get_tags_by_entity_ids("account", sorted({a for a in account_ids if a is not None}))
+
+
+def iter_ndjson_pages(fetch_page: Callable[[Optional[str]], tuple[list[BaseModel], Optional[str]]],
+                      cursor: Optional[str] = None) -> Iterator[str]:
+    """Yield every item from `cursor` to the end of a paginated list as NDJSON lines,
+    one MAX_SUB_RESOURCE_PAGE page at a time, so a full export never sits in memory at once."""
+    while True:
+        items, cursor = fetch_page(cursor)
+        for item in items:
+            yield item.model_dump_json() + "\n"
+        if cursor is None:
+            return
+
+
 def get_tagged_accounts_by_post_ids(post_ids: list[int]) -> list[TaggedAccount]:
     if not post_ids:
         return []
@@ -296,35 +465,38 @@ def get_interactions_by_account_id(account_id: int) -> AccountInteractions:
 
 
 def get_account_auxiliary_counts(account_id: int) -> AccountAuxiliaryCounts:
-    relations_row = db.execute_query(
-        """SELECT COUNT(*) AS relations_count FROM account_relation
-           WHERE follower_account_id = %(id)s OR followed_account_id = %(id)s""",
-        {"id": account_id},
-        return_type="single_row"
-    )
-    interactions_row = db.execute_query(
-        """SELECT
-             (SELECT COUNT(*) FROM comment WHERE account_id = %(id)s) AS comments_count,
-             (SELECT COUNT(*) FROM post_like WHERE account_id = %(id)s) AS likes_count,
-             (SELECT COUNT(*) FROM tagged_account WHERE tagged_account_id = %(id)s) AS tagged_in_count""",
+    # Counters maintained by intake (db_loaders/engagement_counters.py)
+    row = db.execute_query(
+        """SELECT relations_count, comments_count, likes_count, tagged_in_count
+           FROM account WHERE id = %(id)s""",
         {"id": account_id},
         return_type="single_row"
     )
+    if row is None:
+        return AccountAuxiliaryCounts()
     return AccountAuxiliaryCounts(
-        relations_count=relations_row["relations_count"],
-        interaction_counts=AccountInteractionCounts(**interactions_row)
+        relations_count=row["relations_count"],
+        interaction_counts=AccountInteractionCounts(
+            comments_count=row["comments_count"],
+            likes_count=row["likes_count"],
+            tagged_in_count=row["tagged_in_count"],
+        )
     )
 
 
 def get_post_auxiliary_counts(post_id: int) -> PostAuxiliaryCounts:
+    # Counters maintained by intake (db_loaders/engagement_counters.py)
     row = db.execute_query(
-        """SELECT
-             (SELECT COUNT(*) FROM comment WHERE post_id = %(id)s) AS comments_count,
-             (SELECT COUNT(*) FROM post_like WHERE post_id = %(id)s) AS likes_count""",
+        "SELECT comments_count, likes_count FROM post WHERE id = %(id)s",
         {"id": post_id},
         return_type="single_row"
     )
-    return PostAuxiliaryCounts(**row)
+    return PostAuxiliaryCounts(**row) if row else PostAuxiliaryCounts()
+
+
+# Video preview files (hover-scrub sprite sheet + poster) live next to the thumbnails
+# and are rewritten/signed exactly like thumbnail_path.
+_PREVIEW_PATH_ATTRS = ("sprite_path", "poster_path")
 
 
 class FlattenedEntitiesTransform(BaseModel):
@@ -352,19 +524,30 @@ def apply_flattened_entities_transform(
                     m.thumbnail_path = m.thumbnail_path.replace(LOCAL_ARCHIVES_DIR_ALIAS, f"{transform.local_files_root}/archives", 1)
                 elif m.thumbnail_path.startswith(f"{LOCAL_THUMBNAILS_DIR_ALIAS}/"):
                     m.thumbnail_path = m.thumbnail_path.replace(LOCAL_THUMBNAILS_DIR_ALIAS, f"{transform.local_files_root}/thumbnails", 1)
+            for attr in _PREVIEW_PATH_ATTRS:
+                path = getattr(m, attr)
+                if path is not None and path.startswith(f"{LOCAL_THUMBNAILS_DIR_ALIAS}/"):
+                    setattr(m, attr, path.replace(LOCAL_THUMBNAILS_DIR_ALIAS, f"{transform.local_files_root}/thumbnails", 1))
     if transform.access_token is not None:
         for m in entities.media:
             if m.local_url is not None and m.local_url.strip() != "":
                 parsed = urlparse(m.local_url)
                 qs = dict(parse_qsl(parsed.query, keep_blank_values=True))
-                qs['ft'] = generate_file_token(transform.access_token, parsed.path)
+                qs.update(file_token_params(transform.access_token, parsed.path))
                 new_query = urlencode(qs, doseq=True)
                 m.local_url = str(urlunparse(parsed._replace(query=new_query)))
             if m.thumbnail_path is not None and m.thumbnail_path.strip() != "":
                 parsed_t = urlparse(m.thumbnail_path)
                 qs_t = dict(parse_qsl(parsed_t.query, keep_blank_values=True))
-                qs_t['ft'] = generate_file_token(transform.access_token, parsed_t.path)
+                qs_t.update(file_token_params(transform.access_token, parsed_t.path))
                 m.thumbnail_path = str(urlunparse(parsed_t._replace(query=urlencode(qs_t, doseq=True))))
+            for attr in _PREVIEW_PATH_ATTRS:
+                path = getattr(m, attr)
+                if path is not None and path.strip() != "":
+                    parsed_p = urlparse(path)
+                    qs_p = dict(parse_qsl(parsed_p.query, keep_blank_values=True))
+                    qs_p.update(file_token_params(transform.access_token, parsed_p.path))
+                    setattr(m, attr, str(urlunparse(parsed_p._replace(query=urlencode(qs_p, doseq=True)))))
     if transform.strip_raw_data:
         for a in entities.accounts:
             a.data = None
@@ -440,6 +623,16 @@ def transform_and_nest(
     return nested_entities
 
 
+def _raw_json_data(fn):
+    """Build the entities with `data` kept as raw JSON text; the routes splice it into
+    the response unparsed (see browsing_platform/server/json_response.py)."""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with keep_raw_json_data():
+            return fn(*args, **kwargs)
+    return wrapper
+
+
 def _include_data(config: Optional[EntitiesTransformConfig]) -> bool:
     return not (
         config is not None
@@ -448,6 +641,7 @@ def _include_data(config: Optional[EntitiesTransformConfig]) -> bool:
     )
 
 
+@_raw_json_data
 def get_enriched_media_by_id(
         media_id: int,
         config: Optional[EntitiesTransformConfig] = None
@@ -474,17 +668,57 @@ def get_enriched_media_by_id(
     return nested_entities
 
 
+class MediaPreview(BaseModel):
+    media_id: int
+    media_type: str
+    aspect_ratio: Optional[float] = None
+    thumbnail_path: Optional[str] = None
+    poster_path: Optional[str] = None
+    sprite_path: Optional[str] = None
+    sprite_frame_count: Optional[int] = None
+
+
+def get_media_preview_by_id(
+        media_id: int,
+        config: Optional[EntitiesTransformConfig] = None
+) -> Optional[MediaPreview]:
+    """Just the signed preview assets of one media item — no post/account/tag enrichment —
+    so a client can fetch a hover-scrub sprite with one small request."""
+    media = get_media_by_id(media_id, include_data=False)
+    if media is None:
+        return None
+    if config and config.flattened_entities_transform:
+        transformed = apply_flattened_entities_transform(
+            ExtractedEntitiesFlattened(media=[media]),
+            config.flattened_entities_transform
+        ).media
+        if not transformed:
+            return None
+        media = transformed[0]
+    return MediaPreview(
+        media_id=media.id,
+        media_type=media.media_type,
+        aspect_ratio=media.aspect_ratio,
+        thumbnail_path=media.thumbnail_path,
+        poster_path=media.poster_path,
+        sprite_path=media.sprite_path,
+        sprite_frame_count=media.sprite_frame_count,
+    )
+
+
+@_raw_json_data
 def get_enriched_post_by_id(
         post_id: int,
-        config: Optional[EntitiesTransformConfig] = None
-) -> Optional[ExtractedEntitiesNested]:
+        config: Optional[EntitiesTransformConfig] = None,
+        comments_limit: int = POST_COMMENTS_FIRST_PAGE
+) -> Optional[EnrichedEntitiesNested]:
     include_data = _include_data(config)
     post = get_post_by_id(post_id, include_data=include_data)
     if post is None:
         return None
     account = get_account_by_id(post.account_id, include_data=include_data)
     media = get_media_by_posts([post], include_data=include_data)
-    comments = get_comments_by_post_ids([post_id])
+    comments, comments_cursor = get_comments_page(post_id, None, comments_limit)
     tagged_accounts = get_tagged_accounts_by_post_ids([post_id])
 
     accounts = [account] if account else []
@@ -495,23 +729,29 @@ def get_enriched_post_by_id(
         comments=comments,
         tagged_accounts=tagged_accounts
     )
-    nested_entities = transform_and_nest(flattened_entities, config)
+    nested_entities = EnrichedEntitiesNested(**dict(transform_and_nest(flattened_entities, config)))
     nested_entities.account_tags = {
-        **get_account_tags_for_post_comments([post_id]),
+        **account_tags_for(c.account_id for c in comments),
         **get_account_tags_for_tagged_accounts([post_id]),
     }
+    nested_entities.pages["post_comments"] = SubResourcePage(
+        total=count_post_comments(post_id) if comments_cursor else len(comments),
+        next_cursor=comments_cursor,
+    )
     return nested_entities
 
 
+@_raw_json_data
 def get_enriched_account_by_id(
         account_id: int,
-        config: Optional[EntitiesTransformConfig] = None
-) -> Optional[ExtractedEntitiesNested]:
+        config: Optional[EntitiesTransformConfig] = None,
+        posts_limit: int = ACCOUNT_POSTS_FIRST_PAGE
+) -> Optional[EnrichedEntitiesNested]:
     include_data = _include_data(config)
     account = get_account_by_id(account_id, include_data=include_data)
     if account is None:
         return None
-    posts = get_posts_by_accounts([account], include_data=include_data)
+    posts, posts_cursor = _account_posts_page(account_id, None, posts_limit, include_data)
     media = get_media_by_posts(posts, include_data=include_data)
     post_ids = [p.id for p in posts if p.id is not None]
     tagged_accounts = get_tagged_accounts_by_post_ids(post_ids)
@@ -522,12 +762,56 @@ def get_enriched_account_by_id(
         media=media,
         tagged_accounts=tagged_accounts
     )
-    nested_entities = transform_and_nest(flattened_entities, config)
+    nested_entities = EnrichedEntitiesNested(**dict(transform_and_nest(flattened_entities, config)))
     if post_ids:
         nested_entities.account_tags = get_account_tags_for_tagged_accounts(post_ids)
+    nested_entities.pages["account_posts"] = SubResourcePage(
+        total=count_account_posts(account_id) if posts_cursor else len(posts),
+        next_cursor=posts_cursor,
+    )
     return nested_entities
 
 
+def _account_posts_page(account_id: int, cursor: Optional[str], limit: int,
+                        include_data: bool) -> tuple[list[Post], Optional[str]]:
+    after, args = _after_cursor("account_posts", _ACCOUNT_POSTS_KEYSET, "id", cursor)
+    posts = get_account_posts_page(account_id, limit + 1, after, args, include_data=include_data)
+    return _cut_page(posts, limit, "account_posts", _ACCOUNT_POSTS_KEYSET, lambda p: p.publication_date)
+
+
+@_raw_json_data
+def get_enriched_account_posts_page(
+        account_id: int,
+        cursor: Optional[str],
+        limit: int,
+        config: Optional[EntitiesTransformConfig] = None
+) -> Optional[AccountPostsResponse]:
+    """One page of an account's posts with their media, tags and tagged accounts,
+    transformed like the account page itself. Raises ValueError for a bad cursor."""
+    include_data = _include_data(config)
+    account = get_account_by_id(account_id, include_data=False)
+    if account is None:
+        return None
+    posts, next_cursor = _account_posts_page(account_id, cursor, limit, include_data)
+    media = get_media_by_posts(posts, include_data=include_data)
+    post_ids = [p.id for p in posts if p.id is not None]
+    flattened_entities = ExtractedEntitiesFlattened(
+        accounts=[account],
+        posts=posts,
+        media=media,
+        tagged_accounts=get_tagged_accounts_by_post_ids(post_ids)
+    )
+    nested_entities = transform_and_nest(flattened_entities, config)
+    # Posts end up at the top level when the transform filtered the account out
+    nested_posts = nested_entities.accounts[0].account_posts if nested_entities.accounts else nested_entities.posts
+    return AccountPostsResponse(
+        posts=nested_posts,
+        account_tags=get_account_tags_for_tagged_accounts(post_ids) if post_ids else {},
+        page=SubResourcePage(total=count_account_posts(account_id), next_cursor=next_cursor),
+    )
+
+
+@_raw_json_data
 def get_enriched_archiving_session_by_id(
         session_id: int,
         entities_transform: Optional[EntitiesTransformConfig] = None,
@@ -0,0 +1,94 @@
+"""
+ETags for the enriched entity endpoints (GET /account/{id}, /post/{id}, /media/{id}).
+
+Enrichment runs a dozen queries and serializes a large nested payload; a
+browser navigating back and forth between entity pages asks for the same
+payload again and again. The ETag is derived from a single cheap fingerprint
+query — the entity's own update_date plus COUNT/MAX(update_date) over every
+table the enriched response reads (child posts / media / comments, tag
+assignments, tagged accounts, the tag catalogue) — and the transform config of
+the request, which includes the login or share token the file URLs are signed
+with. A matching If-None-Match is answered with 304 before enrichment runs.
+
+update_date has one-second resolution; the row counts catch deletions, and two
+edits to the same entity within one second are the accepted blind spot.
+"""
+import hashlib
+import json
+from typing import Literal, Optional
+
+from pydantic import BaseModel
+
+from utils import db
+
+ETagEntity = Literal["account", "post", "media"]
+
+# Browsers must revalidate every time (the payload embeds per-user signed file URLs)
+ETAG_CACHE_CONTROL = "private, no-cache"
+
+
+def _agg(from_where: str) -> str:
+    """Row count and latest update_date of the rows aliased `x` in `from_where`."""
+    return f"(SELECT CONCAT_WS(':', COUNT(*), MAX(x.update_date)) FROM {from_where})"
+
+
+_TAG_CATALOGUE = f"""
+    {_agg("tag x")} AS tag_catalogue,
+    {_agg("tag_type x")} AS tag_types"""
+
+_FINGERPRINT_QUERIES: dict[str, str] = {
+    "account": f"""SELECT a.update_date AS entity,
+            {_agg("post x WHERE x.account_id = %(id)s")} AS posts,
+            {_agg("media x JOIN post p ON x.post_id = p.id WHERE p.account_id = %(id)s")} AS media,
+            {_agg("account_tag x WHERE x.account_id = %(id)s")} AS account_tags,
+            {_agg("post_tag x JOIN post p ON x.post_id = p.id WHERE p.account_id = %(id)s")} AS post_tags,
+            {_agg("media_tag x JOIN media m ON x.media_id = m.id JOIN post p ON m.post_id = p.id WHERE p.account_id = %(id)s")} AS media_tags,
+            {_agg("tagged_account x JOIN post p ON x.post_id = p.id WHERE p.account_id = %(id)s")} AS tagged_accounts,
+            {_agg("account_tag x JOIN tagged_account ta ON ta.tagged_account_id = x.account_id JOIN post p ON ta.post_id = p.id WHERE p.account_id = %(id)s")} AS tagged_account_tags,
+            {_TAG_CATALOGUE}
+        FROM account a WHERE a.id = %(id)s""",
+    "post": f"""SELECT po.update_date AS entity,
+            (SELECT a.update_date FROM account a WHERE a.id = po.account_id) AS author,
+            {_agg("media x WHERE x.post_id = %(id)s")} AS media,
+            {_agg("comment x WHERE x.post_id = %(id)s")} AS comments,
+            {_agg("post_tag x WHERE x.post_id = %(id)s")} AS post_tags,
+            {_agg("media_tag x JOIN media m ON x.media_id = m.id WHERE m.post_id = %(id)s")} AS media_tags,
+            {_agg("account_tag x WHERE x.account_id = po.account_id")} AS author_tags,
+            {_agg("tagged_account x WHERE x.post_id = %(id)s")} AS tagged_accounts,
+            {_agg("account_tag x JOIN tagged_account ta ON ta.tagged_account_id = x.account_id WHERE ta.post_id = %(id)s")} AS tagged_account_tags,
+            {_agg("account_tag x JOIN comment c ON c.account_id = x.account_id WHERE c.post_id = %(id)s")} AS commenter_tags,
+            {_TAG_CATALOGUE}
+        FROM post po WHERE po.id = %(id)s""",
+    "media": f"""SELECT m.update_date AS entity,
+            (SELECT po.update_date FROM post po WHERE po.id = m.post_id) AS post,
+            (SELECT a.update_date FROM post po JOIN account a ON a.id = po.account_id WHERE po.id = m.post_id) AS author,
+            {_agg("media_tag x WHERE x.media_id = %(id)s")} AS media_tags,
+            {_agg("post_tag x WHERE x.post_id = m.post_id")} AS post_tags,
+            {_agg("account_tag x JOIN post po ON po.account_id = x.account_id WHERE po.id = m.post_id")} AS author_tags,
+            {_agg("tagged_account x WHERE x.post_id = m.post_id")} AS tagged_accounts,
+            {_TAG_CATALOGUE}
+        FROM media m WHERE m.id = %(id)s""",
+}
+
+
+def compute_entity_etag(entity: ETagEntity, entity_id: int, config: Optional[BaseModel]) -> Optional[str]:
+    """Weak ETag for the enriched `entity` response under `config`; None if the entity does not exist."""
+    row = db.execute_query(_FINGERPRINT_QUERIES[entity], {"id": entity_id}, return_type="single_row")
+    if row is None:
+        return None
+    fingerprint = json.dumps(
+        [entity, entity_id, row, config.model_dump(mode="json") if config else None],
+        sort_keys=True, default=str, separators=(",", ":"),
+    )
+    # Weak: the compression middleware may re-encode the body
+    return 'W/"' + hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for this header)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
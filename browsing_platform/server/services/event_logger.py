@@ -1,14 +1,162 @@
+"""
+Audit / error events, written to the error_log table by a background thread.
+
+log_event() used to INSERT synchronously on the request path. It now only puts
+the row on a bounded in-memory queue; a daemon thread writes queued rows with
+one multi-row INSERT every EVENT_LOG_FLUSH_MS or as soon as EVENT_LOG_BATCH_SIZE
+rows are waiting. When the queue is full (the DB is down or far behind) new
+events are dropped and counted rather than blocking requests; the count is
+logged with the next successful write. The server lifespan calls
+flush_event_log() on shutdown so queued rows are not lost on a clean restart.
+"""
+import logging
+import os
+import queue
+import threading
+import time
 from typing import Literal, Optional
 
 from utils import db
 
+logger = logging.getLogger(__name__)
+
+EVENT_LOG_QUEUE_SIZE = int(os.getenv("EVENT_LOG_QUEUE_SIZE", "10000"))
+EVENT_LOG_FLUSH_MS = int(os.getenv("EVENT_LOG_FLUSH_MS", "500"))
+EVENT_LOG_BATCH_SIZE = int(os.getenv("EVENT_LOG_BATCH_SIZE", "200"))
+_SHUTDOWN_JOIN_SECONDS = 10
+
+_COLUMNS = ["event_type", "user_id", "details", "args"]
+
+t_event_type = Literal["server_call", "sql_error", "scraping_error", "scraping_progress", "unknown_error",
+                       "unauthorized_access", "login_attempt", "2fa_attempt", "password_change"]
+
+
+class _EventLogWriter:
+    def __init__(self):
+        self._queue: queue.Queue[tuple] = queue.Queue(maxsize=EVENT_LOG_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._dropped_reported = 0
+
+    def submit(self, row: tuple) -> None:
+        if self._stopping.is_set():
+            # After shutdown began nothing drains the queue; write through instead
+            self._write([row])
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+                self._thread.start()
+
+    def _take_batch(self) -> list[tuple]:
+        """Block until one row is queued (or the flush interval passes), then collect more
+        for up to one flush interval or until the batch is full."""
+        interval = EVENT_LOG_FLUSH_MS / 1000
+        try:
+            batch = [self._queue.get(timeout=interval)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + interval
+        while len(batch) < EVENT_LOG_BATCH_SIZE:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            batch = self._take_batch()
+            if batch:
+                self._write(batch)
+        self._drain()
+
+    def _drain(self) -> None:
+        while True:
+            batch = []
+            while len(batch) < EVENT_LOG_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not batch:
+                return
+            self._write(batch)
+
+    def _insert(self, rows: list[tuple]) -> None:
+        with db.transaction_batch():
+            db.batch_insert("error_log", _COLUMNS, rows)
+
+    def _write(self, batch: list[tuple]) -> None:
+        written = len(batch)
+        try:
+            self._insert(batch)
+        except Exception as e:
+            # One bad row fails the whole INSERT; retry row by row so only that row is lost
+            logger.error(f"Failed to write {len(batch)} event log row(s) as a batch: {e}")
+            written = 0
+            for row in batch:
+                try:
+                    self._insert([row])
+                    written += 1
+                except Exception as row_error:
+                    logger.error(f"Failed to write event log row {row[:2]}: {row_error}")
+            with self._lock:
+                self.failed += len(batch) - written
+        with self._lock:
+            self.written += written
+            newly_dropped = self.dropped - self._dropped_reported
+            self._dropped_reported = self.dropped
+        if newly_dropped:
+            logger.warning(f"Event log queue was full: dropped {newly_dropped} event(s)")
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=_SHUTDOWN_JOIN_SECONDS)
+        # Covers a writer thread that never started or did not finish in time
+        self._drain()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "failed": self.failed,
+                "queue_size": EVENT_LOG_QUEUE_SIZE,
+            }
+
+
+_writer = _EventLogWriter()
+
+
+def log_event(event_type: t_event_type, user_id: Optional[int], details: str, args: Optional[str]) -> None:
+    """Queue an error_log row; returns immediately (see module docstring)."""
+    _writer.submit((event_type, user_id, details, args))
+
+
+def flush_event_log() -> None:
+    """Stop the writer thread and write every queued event. Called at server shutdown."""
+    _writer.stop()
+
 
-def log_event(event_type: Literal["server_call", "sql_error", "scraping_error", "scraping_progress", "unknown_error",  "unauthorized_access", "login_attempt", "2fa_attempt", "password_change"],
-              user_id: Optional[int], details: str, args: Optional[str]):
-    return db.execute_query(
-        '''
-        INSERT INTO error_log (event_type, user_id, details, args) 
-        VALUES (%(event_type)s, %(user_id)s, %(details)s, %(args)s);
-        '''
-        , {"event_type": event_type, "user_id": user_id, "details": details, "args": args}, "id"
-    )
+def event_log_stats() -> dict:
+    return _writer.stats()
@@ -1,9 +1,11 @@
 from __future__ import annotations
 
 import base64
+import functools
 import json
 import logging
 import os
+from typing import Optional
 
 from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives import hashes
@@ -11,12 +13,27 @@ from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305
 from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 from pydantic import BaseModel
 
+from browsing_platform.server.services.token_manager import check_token
+from browsing_platform.server.services.ttl_cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
 FILE_TOKEN_SECRET_ENV = "FILE_TOKEN_SECRET"  # nosec B105 - this is the env var name, not a hardcoded credential
 # number of bytes of nonce for ChaCha20-Poly1305
 NONCE_SIZE = 12
 KEY_LEN = 32
+# HKDF output is deterministic per (secret, path); list pages sign the same
+# thumbnails over and over, and every file request re-derives its key.
+DERIVED_KEY_CACHE_SIZE = 8192
+
+# Optional directory-prefix tokens ("ft" + "fp" query params): one token covers
+# every file under /thumbnails/ or /archives/<archive>/, so a response signs
+# each prefix once and the token is reused across responses. Only issued for
+# login tokens — share-link viewers keep per-file tokens so they cannot reach
+# files outside what was rendered for them.
+FILE_TOKEN_PREFIX_SCOPE = os.getenv("FILE_TOKEN_PREFIX_SCOPE") == "1"
+PREFIX_TOKEN_CACHE_TTL_SECONDS = 600
+PREFIX_TOKEN_CACHE_MAX_ENTRIES = 4096
 
 
 class FileTokenError(Exception):
@@ -37,29 +54,50 @@ def _get_secret() -> bytes:
     return s.encode("utf-8")
 
 
-def _derive_key_for_path(file_path: str) -> bytes:
-    """Derive a 32-byte AEAD key for the given file path using HKDF-SHA256.
-    This binds tokens to the path. The file_path MUST be canonicalized the same way
-    by both generator and verifier (we use the raw request.path string).
-    """
-    secret = _get_secret()
+@functools.lru_cache(maxsize=DERIVED_KEY_CACHE_SIZE)
+def _derive_key(secret: bytes, info: bytes) -> bytes:
+    # the secret is part of the cache key so rotating FILE_TOKEN_SECRET takes effect immediately
     hkdf = HKDF(
         algorithm=hashes.SHA256(),
         length=KEY_LEN,
         salt=None,
-        info=(b"file-token" + file_path.encode("utf-8")),
+        info=info,
     )
     return hkdf.derive(secret)
 
 
+def _derive_key_for_path(file_path: str) -> bytes:
+    """Derive a 32-byte AEAD key for the given file path using HKDF-SHA256.
+    This binds tokens to the path. The file_path MUST be canonicalized the same way
+    by both generator and verifier (we use the raw request.path string).
+    """
+    return _derive_key(_get_secret(), b"file-token" + file_path.encode("utf-8"))
+
+
+def _derive_key_for_prefix(path_prefix: str) -> bytes:
+    """Like _derive_key_for_path, with a separate HKDF info label so a prefix token
+    can never be confused with a per-file token for a path equal to the prefix."""
+    return _derive_key(_get_secret(), b"file-token-prefix" + path_prefix.encode("utf-8"))
+
+
+def path_prefix_for(file_path: str) -> Optional[str]:
+    """Directory prefix a prefix-scoped token covers: /thumbnails/ or /archives/<archive>/.
+    None for any other path (no prefix token is issued or accepted for it)."""
+    parts = file_path.split("/")
+    if ".." in parts:
+        return None
+    if len(parts) == 3 and parts[0] == "" and parts[1] == "thumbnails" and parts[2]:
+        return "/thumbnails/"
+    if len(parts) >= 4 and parts[0] == "" and parts[1] == "archives" and parts[2] and parts[-1]:
+        return f"/archives/{parts[2]}/"
+    return None
+
+
 class FileTokenPayload(BaseModel):
     login_token: str
 
 
-def generate_file_token(login_token: str, file_path: str) -> str:
-    logger.debug("Generating file token for path: %s", file_path)  # nosemgrep: python.lang.security.audit.logging.logger-credential-leak.python-logger-credential-disclosure - file_path is the request URL path, not a secret
-    # Generate a url-safe per-file token that encrypts the login token.
-    key = _derive_key_for_path(file_path)
+def _encrypt_payload(login_token: str, key: bytes) -> str:
     aead = ChaCha20Poly1305(key)
     nonce = os.urandom(NONCE_SIZE)
     payload = FileTokenPayload(login_token=login_token).model_dump()
@@ -69,7 +107,50 @@ def generate_file_token(login_token: str, file_path: str) -> str:
     return base64.urlsafe_b64encode(blob).rstrip(b"=").decode("ascii")
 
 
-def decrypt_file_token(token: str, file_path: str) -> FileTokenPayload:
+def generate_file_token(login_token: str, file_path: str) -> str:
+    logger.debug("Generating file token for path: %s", file_path)  # nosemgrep: python.lang.security.audit.logging.logger-credential-leak.python-logger-credential-disclosure - file_path is the request URL path, not a secret
+    # Generate a url-safe per-file token that encrypts the login token.
+    return _encrypt_payload(login_token, _derive_key_for_path(file_path))
+
+
+_prefix_token_cache: TTLCache[tuple[str, str], str] = TTLCache(PREFIX_TOKEN_CACHE_MAX_ENTRIES, PREFIX_TOKEN_CACHE_TTL_SECONDS)
+# Whether a token may get prefix tokens (it is a valid login token), negative answers
+# included: a response signs many paths with the same token, and share-link tokens
+# would otherwise cost one token lookup per signed path. Only the shape of the issued
+# token depends on it; serving a file still checks the login token it carries.
+_prefix_eligible_cache: TTLCache[str, bool] = TTLCache(PREFIX_TOKEN_CACHE_MAX_ENTRIES, PREFIX_TOKEN_CACHE_TTL_SECONDS)
+
+
+def generate_prefix_file_token(login_token: str, path_prefix: str) -> str:
+    """Token valid for every file under path_prefix. Cached per (login token, prefix)."""
+    cached = _prefix_token_cache.get((login_token, path_prefix))
+    if cached is not None:
+        return cached
+    token = _encrypt_payload(login_token, _derive_key_for_prefix(path_prefix))
+    _prefix_token_cache.set((login_token, path_prefix), token)
+    return token
+
+
+def _prefix_eligible(login_token: str) -> bool:
+    eligible = _prefix_eligible_cache.get(login_token)
+    if eligible is None:
+        eligible = check_token(login_token).valid
+        _prefix_eligible_cache.set(login_token, eligible)
+    return eligible
+
+
+def file_token_params(login_token: str, file_path: str) -> dict[str, str]:
+    """Query parameters that authorize file_path: {"ft"} or, with prefix scope, {"ft", "fp"}."""
+    if FILE_TOKEN_PREFIX_SCOPE and _prefix_eligible(login_token):
+        path_prefix = path_prefix_for(file_path)
+        if path_prefix is not None:
+            return {"ft": generate_prefix_file_token(login_token, path_prefix), "fp": path_prefix}
+    return {"ft": generate_file_token(login_token, file_path)}
+
+
+def decrypt_file_token(token: str, file_path: str, path_prefix: Optional[str] = None) -> FileTokenPayload:
+    if path_prefix is not None and path_prefix != path_prefix_for(file_path):
+        raise FileTokenError("File path outside token prefix")
     try:
         # pad base64
         padding = "=" * ((4 - len(token) % 4) % 4)
@@ -83,7 +164,7 @@ def decrypt_file_token(token: str, file_path: str) -> FileTokenPayload:
 
     nonce = blob[:NONCE_SIZE]
     ciphertext = blob[NONCE_SIZE:]
-    key = _derive_key_for_path(file_path)
+    key = _derive_key_for_path(file_path) if path_prefix is None else _derive_key_for_prefix(path_prefix)
     aead = ChaCha20Poly1305(key)
     try:
         plaintext = aead.decrypt(nonce, ciphertext, associated_data=None)
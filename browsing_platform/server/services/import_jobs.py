@@ -0,0 +1,196 @@
+"""
+Background execution of large tag / annotation imports.
+
+An import of IMPORT_BACKGROUND_MIN_ROWS rows or more is not run inside the
+request: the endpoint inserts an `import_job` row, starts the import in a
+daemon thread and answers 202 with the job id right away. While it runs the
+import reports rows processed through ``import_ws.progress`` (stage
+``import-<job_id>``); when it ends the summary and per-row results are stored
+on the job row and a ``{"type": "done", "job_id", "status"}`` message is
+broadcast. Clients follow the job over the /import-jobs/ws WebSocket and fetch
+the results with GET /import-jobs/{job_id} (see routes/import_jobs.py), which
+works from any API worker since the results live in the database. Both only
+show a job to the user who started it and to admins.
+
+At most IMPORT_MAX_CONCURRENT_JOBS jobs run at once in each worker process;
+start_import_job() refuses more (the import endpoints answer 429). A running
+job holds two pooled connections, its lock's and its import transaction's,
+which server.py keeps out of the request thread budget.
+
+A running job holds the MySQL named lock ``import_job:<id>``. At startup
+cleanup_stale_import_jobs() marks 'running' rows whose lock nobody holds as
+failed: their thread died with the process that ran it.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Callable, Literal, Optional
+
+from pydantic import BaseModel
+
+from browsing_platform.server.services.ws_manager import BroadcastManager
+from utils import db
+
+logger = logging.getLogger(__name__)
+
+IMPORT_BACKGROUND_MIN_ROWS = int(os.getenv("IMPORT_BACKGROUND_MIN_ROWS", "2000"))
+IMPORT_MAX_CONCURRENT_JOBS = int(os.getenv("IMPORT_MAX_CONCURRENT_JOBS", "2"))
+# Pooled connections a running job holds: its named lock's and its import transaction's
+IMPORT_JOB_CONNECTIONS = 2
+
+_job_slots = threading.BoundedSemaphore(IMPORT_MAX_CONCURRENT_JOBS)
+
+# Progress and completion of every background import.
+# Import this in routes/import_jobs.py for the WebSocket endpoint.
+# Nothing clears this channel: finished jobs' progress stops being replayed
+# (forget_progress) and its broadcast_event rows expire after the retention window.
+_IMPORTS_RETENTION_SECONDS = 3600
+import_ws = BroadcastManager(channel="imports", retention_seconds=_IMPORTS_RETENTION_SECONDS)
+
+t_import_kind = Literal["tags", "annotations"]
+
+_STAGE_LABELS = {"tags": "Importing tags", "annotations": "Importing annotations"}
+_STAGE_PREFIX = "import-"
+
+
+def progress_stage(job_id: int) -> str:
+    return f"{_STAGE_PREFIX}{job_id}"
+
+
+def message_job_id(msg: dict) -> Optional[int]:
+    """The job an import_ws message belongs to: `job_id` of done messages, the stage of progress ones."""
+    if "job_id" in msg:
+        return msg["job_id"]
+    stage = msg.get("stage") or ""
+    if stage.startswith(_STAGE_PREFIX) and stage[len(_STAGE_PREFIX):].isdigit():
+        return int(stage[len(_STAGE_PREFIX):])
+    return None
+
+
+def _job_lock(job_id: int) -> db.AdvisoryLock:
+    return db.AdvisoryLock(f"import_job:{job_id}")
+
+
+def start_import_job(
+        kind: t_import_kind,
+        user_id: Optional[int],
+        total_rows: int,
+        run: Callable[[Callable[..., None]], BaseModel],
+) -> int:
+    """
+    Record a new import job and start `run(progress)` in a daemon thread.
+    `run` performs the import and returns the response model the import
+    endpoint would have returned; `progress` takes the keyword arguments of
+    BroadcastManager.progress (done / errors / total).
+
+    Raises RuntimeError if IMPORT_MAX_CONCURRENT_JOBS jobs are already running in this process.
+    """
+    if not _job_slots.acquire(blocking=False):
+        raise RuntimeError("Too many imports are running; try again once one has finished")
+    try:
+        job_id = db.execute_query(
+            "INSERT INTO import_job (kind, status, triggered_by_user_id, total_rows, started_at) "
+            "VALUES (%(kind)s, 'running', %(user_id)s, %(total)s, NOW())",
+            {"kind": kind, "user_id": user_id, "total": total_rows},
+            return_type="id"
+        )
+    except Exception:
+        _job_slots.release()
+        raise
+    lock = _job_lock(job_id)
+    try:
+        lock.try_acquire()
+    except Exception as e:
+        # The job still runs; only a worker starting meanwhile could wrongly mark it failed
+        logger.warning(f"Could not take the lock of import job {job_id}: {e}")
+    t = threading.Thread(target=_run_job, args=(job_id, kind, run, lock), name=f"import-job-{job_id}", daemon=True)
+    t.start()
+    return job_id
+
+
+def _run_job(job_id: int, kind: t_import_kind, run: Callable[[Callable[..., None]], BaseModel],
+             lock: db.AdvisoryLock) -> None:
+    try:
+        _run_and_record(job_id, kind, run)
+    finally:
+        lock.release()
+        _job_slots.release()
+
+
+def _run_and_record(job_id: int, kind: t_import_kind, run: Callable[[Callable[..., None]], BaseModel]) -> None:
+    stage = progress_stage(job_id)
+
+    def progress(**counters) -> None:
+        import_ws.progress(stage, label=_STAGE_LABELS[kind], **counters)
+
+    done_msg: dict = {"type": "done", "job_id": job_id, "status": "completed"}
+    try:
+        response = run(progress)
+        db.execute_query(
+            "UPDATE import_job SET status = 'completed', summary = %(summary)s, results = %(results)s, "
+            "completed_at = NOW() WHERE id = %(id)s",
+            {
+                "summary": response.summary.model_dump_json(),
+                "results": response.model_dump_json(include={"results"}),
+                "id": job_id,
+            },
+            return_type="none"
+        )
+    except Exception as e:
+        logger.exception(f"Import job {job_id} failed")
+        done_msg.update(status="failed", error=str(e))
+        try:
+            db.execute_query(
+                "UPDATE import_job SET status = 'failed', error = %(error)s, completed_at = NOW() WHERE id = %(id)s",
+                {"error": str(e), "id": job_id},
+                return_type="none"
+            )
+        except Exception:
+            logger.exception(f"Could not record the failure of import job {job_id}")
+    import_ws.finish_progress(stage)
+    import_ws.broadcast(done_msg)
+    # Subscribers joining later learn the outcome from the replayed done message
+    import_ws.forget_progress(stage)
+
+
+def cleanup_stale_import_jobs() -> None:
+    """Mark import jobs left in 'running' state by a stopped server as 'failed' (called at
+    server startup). Jobs whose lock is held are running in another worker process."""
+    rows = db.execute_query("SELECT id FROM import_job WHERE status = 'running'", {}, return_type="rows") or []
+    stale = [row["id"] for row in rows if not _job_lock(row["id"]).is_held_anywhere()]
+    for job_id in stale:
+        db.execute_query(
+            "UPDATE import_job SET status = 'failed', error = 'Server restarted while job was running', "
+            "completed_at = NOW() WHERE id = %(id)s AND status = 'running'",
+            {"id": job_id},
+            return_type="none"
+        )
+    if stale:
+        logger.info(f"Marked {len(stale)} interrupted import job(s) as failed")
+
+
+def import_job_owner(job_id: int) -> Optional[int]:
+    """triggered_by_user_id of the job (None if it has none or does not exist)."""
+    row = db.execute_query(
+        "SELECT triggered_by_user_id FROM import_job WHERE id = %(id)s",
+        {"id": job_id},
+        return_type="single_row"
+    )
+    return row["triggered_by_user_id"] if row else None
+
+
+def get_import_job(job_id: int) -> Optional[dict]:
+    """The job row, with `summary` and `results` decoded (None while the job runs)."""
+    row = db.execute_query(
+        "SELECT id, kind, status, triggered_by_user_id, total_rows, started_at, completed_at, summary, results, error "
+        "FROM import_job WHERE id = %(id)s",
+        {"id": job_id},
+        return_type="single_row"
+    )
+    if row is None:
+        return None
+    row["summary"] = json.loads(row["summary"]) if row["summary"] else None
+    row["results"] = json.loads(row["results"])["results"] if row["results"] else None
+    return row
@@ -1,9 +1,14 @@
 import csv
 import io
-from typing import Optional
+from typing import Iterator, Optional, Sequence
 
 from fastapi import HTTPException
 
+from utils import db
+
+# Values per IN (...) list / rows per multi-row INSERT when resolving and writing import rows
+IMPORT_QUERY_CHUNK = 1000
+
 
 def parse_import_file(file_bytes: bytes, filename: str, expected_columns: list[str],
                       required_columns: Optional[list[str]] = None) -> list[dict]:
@@ -81,3 +86,35 @@ def _parse_xlsx(file_bytes: bytes, expected_columns: list[str]) -> list[dict]:
         rows.append(normalized)
     wb.close()
     return rows
+
+
+def chunked(values: Sequence, size: int = IMPORT_QUERY_CHUNK) -> Iterator[Sequence]:
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def select_in(query: str, values, prefix: str = "v") -> list[dict]:
+    """
+    Runs `query` once per chunk of `values`, replacing its single `{}` with the
+    chunk's placeholders (e.g. "SELECT id FROM post WHERE id IN ({})"), and
+    returns all rows.
+    """
+    values = list(values)
+    rows: list[dict] = []
+    for chunk in chunked(values):
+        placeholders = ", ".join(f"%({prefix}_{i})s" for i in range(len(chunk)))
+        args = {f"{prefix}_{i}": v for i, v in enumerate(chunk)}
+        rows.extend(db.execute_query(query.format(placeholders), args, return_type="rows") or [])  # nosec B608
+    return rows
+
+
+def insert_ignore(table: str, columns: list[str], rows: list[tuple]) -> None:
+    """Multi-row INSERT IGNORE of `rows`, IMPORT_QUERY_CHUNK rows per statement."""
+    cols_sql = ", ".join(f"`{c}`" for c in columns)
+    row_ph = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    for chunk in chunked(rows):
+        db.execute_query(
+            f"INSERT IGNORE INTO `{table}` ({cols_sql}) VALUES {', '.join([row_ph] * len(chunk))}",  # nosec B608
+            [v for row in chunk for v in row],
+            return_type="none"
+        )
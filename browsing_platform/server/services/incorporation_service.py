@@ -2,6 +2,10 @@
 IncorporationManager — manages the lifecycle of a single incorporation job
 (concurrency gate, cancel flag, DB records).
 
+The gate is a MySQL named lock (db.AdvisoryLock), and the cancel flag and
+"is a job running" state live in the incorporation_job row, so start / stop /
+status behave the same whichever API worker process serves the request.
+
 WebSocket broadcasting is handled by the module-level ``incorporation_ws``
 BroadcastManager instance. Only messages that are explicitly intended for the
 client should be passed to it; backend logging stays in the standard logger.
@@ -11,28 +15,37 @@ import asyncio
 import logging
 import os
 import threading
+import time
 import traceback
 from datetime import datetime, timezone
 from typing import Optional
 
+from browsing_platform.server.services import cache_invalidation
+from browsing_platform.server.services.search_cache import invalidate_search_cache
 from browsing_platform.server.services.ws_manager import BroadcastManager
 from db_loaders.archives_db_loader import register_archives, parse_archives, extract_entities
-from db_loaders.thumbnail_generator import generate_missing_thumbnails
+from db_loaders.thumbnail_generator import generate_missing_thumbnails, generate_missing_sprites
 from utils import db
 
 logger = logging.getLogger(__name__)
 
 # One broadcast channel dedicated to incorporation progress.
 # Import this in routes/incorporate.py for the WebSocket endpoint.
-incorporation_ws = BroadcastManager()
+incorporation_ws = BroadcastManager(channel="incorporation")
+
+INCORPORATION_LOCK_NAME = "evidence_platform.incorporation_job"
+# How often the running job re-reads cancel_requested (POST /stop may hit another worker)
+CANCEL_POLL_SECONDS = 2.0
 
 
 class IncorporationManager:
     def __init__(self):
         self._lock = threading.Lock()
-        self._running = False
+        self._job_lock = db.AdvisoryLock(INCORPORATION_LOCK_NAME)
+        # Job started by this process, if any
         self._current_job_id: Optional[int] = None
         self._cancel_event = threading.Event()
+        self._cancel_checked_at = 0.0
 
     # ------------------------------------------------------------------
     # Public API
@@ -44,17 +57,23 @@ class IncorporationManager:
         Raises RuntimeError if a job is already running.
         """
         with self._lock:
-            if self._running:
+            if not self._job_lock.try_acquire():
                 raise RuntimeError("An incorporation job is already running")
-            job_id = db.execute_query(
-                "INSERT INTO incorporation_job (status, triggered_by_user_id, triggered_by_ip, started_at) "
-                "VALUES ('running', %(user_id)s, %(ip)s, NOW())",
-                {"user_id": triggered_by_user_id, "ip": triggered_by_ip},
-                return_type="id",
-            )
+            try:
+                # Holding the lock, any row still 'running' was left by a process that died
+                _fail_stale_job_rows()
+                job_id = db.execute_query(
+                    "INSERT INTO incorporation_job (status, triggered_by_user_id, triggered_by_ip, started_at) "
+                    "VALUES ('running', %(user_id)s, %(ip)s, NOW())",
+                    {"user_id": triggered_by_user_id, "ip": triggered_by_ip},
+                    return_type="id",
+                )
+            except Exception:
+                self._job_lock.release()
+                raise
             self._current_job_id = job_id
-            self._running = True
             self._cancel_event.clear()
+            self._cancel_checked_at = 0.0
             incorporation_ws.clear_buffer()
         return job_id
 
@@ -72,22 +91,49 @@ class IncorporationManager:
             return_type="none",
         )
         with self._lock:
-            self._running = False
             self._current_job_id = None
+        self._job_lock.release()
 
     def is_running(self) -> bool:
-        with self._lock:
-            return self._running
+        """True if a job is running in any worker process."""
+        return self._job_lock.is_held_anywhere()
 
     def current_job_id(self) -> Optional[int]:
-        with self._lock:
-            return self._current_job_id
+        """Id of the job running in any worker process. None unless some process holds the
+        job lock: a 'running' row without it was left behind by a process that died."""
+        if not self.is_running():
+            return None
+        row = db.execute_query(
+            "SELECT id FROM incorporation_job WHERE status = 'running' ORDER BY id DESC LIMIT 1",
+            {},
+            return_type="single_row",
+        )
+        return row["id"] if row else None
 
     def request_cancel(self):
         """Signal the running job to stop after the current archive completes."""
         self._cancel_event.set()
+        db.execute_query(
+            "UPDATE incorporation_job SET cancel_requested = 1 WHERE status = 'running'",
+            {},
+            return_type="none",
+        )
 
     def is_cancel_requested(self) -> bool:
+        if self._cancel_event.is_set():
+            return True
+        job_id = self._current_job_id
+        now = time.monotonic()
+        if job_id is None or now - self._cancel_checked_at < CANCEL_POLL_SECONDS:
+            return False
+        self._cancel_checked_at = now
+        row = db.execute_query(
+            "SELECT cancel_requested FROM incorporation_job WHERE id = %(id)s",
+            {"id": job_id},
+            return_type="single_row",
+        )
+        if row and row["cancel_requested"]:
+            self._cancel_event.set()
         return self._cancel_event.is_set()
 
 
@@ -105,6 +151,12 @@ def _run_incorporation(job_id: int):
         logger.info(text)
         incorporation_ws.broadcast({"type": msg_type, "text": text})
 
+    def stage_progress(stage: str, label: str):
+        """Per-item progress callback for one pipeline stage (coalesced by the BroadcastManager)."""
+        def progress(done: int = 0, errors: int = 0, total: Optional[int] = None):
+            incorporation_ws.progress(stage, done=done, errors=errors, total=total, label=label)
+        return progress
+
     cancel = manager.is_cancel_requested
     error_message = None
     status = "completed"
@@ -112,13 +164,17 @@ def _run_incorporation(job_id: int):
         emit("Starting incorporation pipeline…")
 
         emit("Part A — registering archives")
-        register_archives(limit=100 if os.getenv("BROWSING_PLATFORM_DEV") == "1" else None, cancel_check=cancel, emit=emit)
+        register_archives(limit=100 if os.getenv("BROWSING_PLATFORM_DEV") == "1" else None, cancel_check=cancel, emit=emit,
+                          progress=stage_progress("register", "Part A — registering archives"))
+        incorporation_ws.finish_progress("register")
 
         emit("Part B — parsing HAR files")
-        parse_archives(cancel_check=cancel, emit=emit)
+        parse_archives(cancel_check=cancel, emit=emit, progress=stage_progress("parse", "Part B — parsing archives"))
+        incorporation_ws.finish_progress("parse")
 
         emit("Part C — extracting entities")
-        extract_entities(cancel_check=cancel, emit=emit)
+        extract_entities(cancel_check=cancel, emit=emit, progress=stage_progress("extract", "Part C — extracting entities"))
+        incorporation_ws.finish_progress("extract")
 
         emit("Part D — generating thumbnails")
         # Use a manually managed loop instead of asyncio.run() to avoid blocking
@@ -128,7 +184,13 @@ def _run_incorporation(job_id: int):
         # zombie threads would hang the pipeline indefinitely.
         _loop = asyncio.new_event_loop()
         try:
-            _loop.run_until_complete(generate_missing_thumbnails(cancel_check=cancel, emit=emit))
+            _loop.run_until_complete(generate_missing_thumbnails(
+                cancel_check=cancel, emit=emit, progress=stage_progress("thumbnails", "Part D — thumbnails")))
+            incorporation_ws.finish_progress("thumbnails")
+            emit("Part D — generating video sprite sheets")
+            _loop.run_until_complete(generate_missing_sprites(
+                cancel_check=cancel, emit=emit, progress=stage_progress("sprites", "Part D — sprite sheets")))
+            incorporation_ws.finish_progress("sprites")
         finally:
             _loop.close()
 
@@ -149,15 +211,28 @@ def _run_incorporation(job_id: int):
         emit(f"ERROR: {e}")
         incorporation_ws.broadcast({"type": "done", "status": "failed", "error": error_message})
     finally:
+        # Also after a cancelled or failed run, which may have written entities in Parts C / D.
+        # In every worker process, not just the one that ran the job.
+        cache_invalidation.invalidate("media_hash_index")
+        cache_invalidation.invalidate("tie_graph")
+        invalidate_search_cache()
         manager.finish(job_id, status, error_message)
 
 
 def cleanup_stale_jobs():
-    """Mark any jobs left in 'running' state as 'failed' (called at server startup)."""
+    """Mark any jobs left in 'running' state as 'failed' (called at server startup).
+    Skipped while another worker process holds the job lock — its job is not stale."""
+    if manager.is_running():
+        logger.info("An incorporation job is running in another worker; not touching job records")
+        return
+    _fail_stale_job_rows()
+    logger.info("Stale incorporation jobs marked as failed")
+
+
+def _fail_stale_job_rows():
     db.execute_query(
         "UPDATE incorporation_job SET status = 'failed', error = 'Server restarted while job was running' "
         "WHERE status = 'running'",
         {},
         return_type="none",
     )
-    logger.info("Stale incorporation jobs marked as failed")
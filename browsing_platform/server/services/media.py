@@ -2,6 +2,7 @@ import json
 from typing import Any, Optional
 
 from browsing_platform.server.services.annotation import Annotation
+from browsing_platform.server.services.search_cache import invalidate_search_cache
 from extractors.entity_types import Post, Media
 from utils import db
 
@@ -32,8 +33,8 @@ def get_media_data_by_id(media_id: int) -> tuple[bool, Any]:
     return True, data
 
 
-_MEDIA_COLS = "id, id_on_platform, url_suffix, platform, post_id, local_url, media_type, data, annotation, thumbnail_path, aspect_ratio, thumbnail_status, create_date"
-_MEDIA_COLS_NO_DATA = "id, id_on_platform, url_suffix, platform, post_id, local_url, media_type, NULL AS data, annotation, thumbnail_path, aspect_ratio, thumbnail_status, create_date"
+_MEDIA_COLS = "id, id_on_platform, url_suffix, platform, post_id, local_url, media_type, data, annotation, thumbnail_path, aspect_ratio, thumbnail_status, sprite_path, poster_path, sprite_frame_count, create_date"
+_MEDIA_COLS_NO_DATA = "id, id_on_platform, url_suffix, platform, post_id, local_url, media_type, NULL AS data, annotation, thumbnail_path, aspect_ratio, thumbnail_status, sprite_path, poster_path, sprite_frame_count, create_date"
 
 
 def get_media_by_id(media_id: int, include_data: bool = True) -> Optional[Media]:
@@ -97,4 +98,5 @@ def annotate_media(media_id: int, annotation: Annotation) -> None:
                 """INSERT INTO media_tag (media_id, tag_id, notes) VALUES (%(media_id)s, %(tag_id)s, %(notes)s)""",
                 {"media_id": media_id, "tag_id": tag.id, "notes": tag.notes},
                 return_type="none"
-            )
\ No newline at end of file
+            )
+    invalidate_search_cache()
\ No newline at end of file
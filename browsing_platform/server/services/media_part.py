@@ -4,6 +4,7 @@ from typing import Optional
 from pydantic import field_validator
 
 from browsing_platform.server.services.annotation import Annotation
+from browsing_platform.server.services.search_cache import invalidate_search_cache
 from extractors.entity_types import Media, EntityBase
 from utils import db
 
@@ -77,6 +78,7 @@ def delete_media_part(media_part_id: int) -> None:
         {"id": media_part_id},
         "none"
     )
+    invalidate_search_cache()
 
 
 def get_media_part_by_media(media: list[Media]) -> list[MediaPart]:
@@ -105,4 +107,5 @@ def annotate_media_part(media_part_id: int, annotation: Annotation) -> None:
                 """INSERT INTO media_part_tag (media_part_id, tag_id, notes) VALUES (%(media_part_id)s, %(tag_id)s, %(notes)s)""",
                 {"media_part_id": media_part_id, "tag_id": tag.id, "notes": tag.notes},
                 return_type="none"
-            )
\ No newline at end of file
+            )
+    invalidate_search_cache()
\ No newline at end of file
@@ -0,0 +1,205 @@
+"""
+In-memory perceptual-hash index for near-duplicate media lookup.
+
+Part D stores a 64-bit dhash of every thumbnail in ``media.phash``. This module
+keeps all of them in two parallel NumPy arrays (media ids / hashes) and answers
+"which media are within Hamming distance d of this hash?" with a single
+vectorised XOR + popcount over the whole array — a few milliseconds for a
+million rows, with none of the worst-case blow-up a BK-tree has at the larger
+radii analysts actually use.
+
+The index is loaded lazily on the first query and refreshed incrementally:
+every ``REFRESH_INTERVAL_SECONDS`` only rows whose ``update_date`` moved since
+the previous refresh are re-read (indexed by V038), so new thumbnails — whether
+produced by the in-server incorporation job or by the CLI loader in another
+process — show up without a restart. ``mark_stale()`` forces the next query to
+refresh immediately (called when an incorporation job finishes).
+
+Deleted media leave no row for ``update_date`` to find, so the refresh cannot
+see them. ``existing_matches()`` checks hits against ``media`` (by primary key,
+only as far as the requested page) before they are paged, and drops the ids
+that are gone from the index.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+import numpy as np
+
+from browsing_platform.server.services import cache_invalidation
+from utils import db
+
+logger = logging.getLogger(__name__)
+
+REFRESH_INTERVAL_SECONDS = 30
+# update_date has one-second resolution; re-read a small overlap so rows written
+# in the same second as the previous refresh are never missed.
+_REFRESH_OVERLAP = timedelta(seconds=2)
+DEFAULT_MAX_DISTANCE = 10
+MAX_ALLOWED_DISTANCE = 20
+# Ids per existence check in existing_matches()
+_EXISTS_CHUNK = 500
+
+
+class MediaHashIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = np.empty(0, dtype=np.int64)
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._valid = np.empty(0, dtype=bool)
+        self._pos: dict[int, int] = {}
+        self._loaded = False
+        self._stale = True
+        self._last_refresh_monotonic = 0.0
+        self._watermark: Optional[datetime] = None
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _full_load(self) -> None:
+        t = time.perf_counter()
+        now_row = db.execute_query("SELECT NOW() AS now", {}, "single_row")
+        rows = db.execute_query(
+            "SELECT id, phash FROM media WHERE phash IS NOT NULL",
+            {}, "rows"
+        ) or []
+        self._ids = np.fromiter((r["id"] for r in rows), dtype=np.int64, count=len(rows))
+        self._hashes = np.fromiter((r["phash"] for r in rows), dtype=np.uint64, count=len(rows))
+        self._valid = np.ones(len(rows), dtype=bool)
+        self._pos = {int(media_id): i for i, media_id in enumerate(self._ids)}
+        self._watermark = now_row["now"]
+        self._loaded = True
+        logger.info(f"Media hash index loaded: {len(rows)} hashes in {time.perf_counter() - t:.2f}s")
+
+    def _incremental_refresh(self) -> None:
+        now_row = db.execute_query("SELECT NOW() AS now", {}, "single_row")
+        rows = db.execute_query(
+            "SELECT id, phash FROM media WHERE update_date >= %(since)s",
+            {"since": self._watermark - _REFRESH_OVERLAP}, "rows"
+        ) or []
+        new_ids: list[int] = []
+        new_hashes: list[int] = []
+        for r in rows:
+            pos = self._pos.get(r["id"])
+            if pos is not None:
+                if r["phash"] is None:
+                    self._valid[pos] = False
+                else:
+                    self._hashes[pos] = r["phash"]
+                    self._valid[pos] = True
+            elif r["phash"] is not None:
+                new_ids.append(r["id"])
+                new_hashes.append(r["phash"])
+        if new_ids:
+            base = len(self._ids)
+            self._ids = np.concatenate([self._ids, np.array(new_ids, dtype=np.int64)])
+            self._hashes = np.concatenate([self._hashes, np.array(new_hashes, dtype=np.uint64)])
+            self._valid = np.concatenate([self._valid, np.ones(len(new_ids), dtype=bool)])
+            for i, media_id in enumerate(new_ids):
+                self._pos[media_id] = base + i
+        self._watermark = now_row["now"]
+        if rows:
+            logger.debug(f"Media hash index refreshed: {len(rows)} touched rows, {len(new_ids)} new")
+
+    def _ensure_fresh(self) -> None:
+        with self._lock:
+            due = time.monotonic() - self._last_refresh_monotonic >= REFRESH_INTERVAL_SECONDS
+            if self._loaded and not self._stale and not due:
+                return
+            if not self._loaded:
+                self._full_load()
+            else:
+                self._incremental_refresh()
+            self._stale = False
+            self._last_refresh_monotonic = time.monotonic()
+
+    def mark_stale(self) -> None:
+        """Force a refresh on the next query (e.g. after an incorporation job)."""
+        self._stale = True
+
+    def discard(self, media_ids: list[int]) -> None:
+        """Stop returning media that no longer exist."""
+        with self._lock:
+            for media_id in media_ids:
+                pos = self._pos.get(media_id)
+                if pos is not None:
+                    self._valid[pos] = False
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def find_similar(
+            self,
+            phash: int,
+            max_distance: int = DEFAULT_MAX_DISTANCE,
+            exclude_media_id: Optional[int] = None,
+    ) -> list[tuple[int, int]]:
+        """Return [(media_id, hamming_distance)] within max_distance, closest first."""
+        self._ensure_fresh()
+        with self._lock:
+            ids, hashes, valid = self._ids, self._hashes, self._valid
+        if len(ids) == 0:
+            return []
+        distances = np.bitwise_count(np.bitwise_xor(hashes, np.uint64(phash)))
+        mask = (distances <= max_distance) & valid
+        if exclude_media_id is not None:
+            mask &= ids != exclude_media_id
+        hits = np.flatnonzero(mask)
+        # Stable sort by distance, then id, for deterministic paging
+        order = np.lexsort((ids[hits], distances[hits]))
+        hits = hits[order]
+        return [(int(ids[i]), int(distances[i])) for i in hits]
+
+
+# Module-level singleton
+media_hash_index = MediaHashIndex()
+cache_invalidation.register("media_hash_index", lambda _params: media_hash_index.mark_stale())
+
+
+def existing_matches(matches: list[tuple[int, int]], needed: int) -> list[tuple[int, int]]:
+    """The first `needed` of `matches` whose media still exist, in order. Deleted ones
+    found on the way are discarded from the index."""
+    kept: list[tuple[int, int]] = []
+    deleted: list[int] = []
+    for start in range(0, len(matches), _EXISTS_CHUNK):
+        if len(kept) >= needed:
+            break
+        chunk = matches[start:start + _EXISTS_CHUNK]
+        args = {f"mid_{i}": media_id for i, (media_id, _) in enumerate(chunk)}
+        rows = db.execute_query(  # nosec B608 - only %(key)s placeholders are formatted in
+            f"SELECT id FROM media WHERE id IN ({', '.join(f'%({k})s' for k in args)})",
+            args, "rows"
+        ) or []
+        existing = {row["id"] for row in rows}
+        for match in chunk:
+            if match[0] in existing:
+                kept.append(match)
+            else:
+                deleted.append(match[0])
+    if deleted:
+        media_hash_index.discard(deleted)
+        logger.info(f"Dropped {len(deleted)} deleted media from the hash index")
+    return kept[:needed]
+
+
+def get_media_phash(media_id: int) -> Optional[int]:
+    row = db.execute_query(
+        "SELECT phash FROM media WHERE id = %(id)s",
+        {"id": media_id},
+        return_type="single_row"
+    )
+    return row["phash"] if row else None
+
+
+def find_similar_media(media_id: int, max_distance: int = DEFAULT_MAX_DISTANCE) -> Optional[list[tuple[int, int]]]:
+    """Near-duplicates of one media item, or None if the item has no perceptual hash yet."""
+    phash = get_media_phash(media_id)
+    if phash is None:
+        return None
+    max_distance = max(0, min(max_distance, MAX_ALLOWED_DISTANCE))
+    return media_hash_index.find_similar(phash, max_distance, exclude_media_id=media_id)
@@ -4,6 +4,7 @@ import os
 from typing import Optional
 
 from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
 from starlette.requests import Request
 
 from browsing_platform.server.services.entities_hierarchy import T_Entities
@@ -31,7 +32,7 @@ async def get_auth_permissions(request: Request):
     token = parse_token_from_header(auth_header)
     if not token:
         return None
-    return check_token(token)
+    return await run_in_threadpool(check_token, token)
 
 
 async def _log_body_snippet(request: Request) -> str:
@@ -127,7 +128,7 @@ async def auth_entity_view_access(request: Request, entity: T_Entities, entity_i
     if not token_permissions or not token_permissions.valid:
         share_link = await get_share_permissions(request)
         password_token = await get_share_password_token(request)
-        entity_access = check_share_permissions(share_link, entity, entity_id, password_token)
+        entity_access = await run_in_threadpool(check_share_permissions, share_link, entity, entity_id, password_token)
         return await raise_share_access_error(request, entity_access)
     else:
         return await raise_auth_user_error(request, token_permissions)
@@ -166,14 +167,14 @@ async def log_server_call(request: Request):
     token = parse_token_from_header(auth_header)
     if token:
         try:
-            token_permissions = check_token(token)
+            token_permissions = await run_in_threadpool(check_token, token)
             user_id = token_permissions.user_id
         except Exception:  # nosec B110 - optional enrichment for logging; failure is non-fatal
             pass
-    body = await request.body()
+    body_snippet = await _log_body_snippet(request)
     log_event(
         "server_call", user_id,
         request.scope['root_path'] + request.scope['route'].path,
-        json.dumps({"body": body.decode("utf-8"), "path_params": request.path_params})
+        json.dumps({"body": body_snippet, "path_params": request.path_params})
     )
     return True
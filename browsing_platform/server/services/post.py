@@ -2,6 +2,7 @@ import json
 from typing import Any, Optional
 
 from browsing_platform.server.services.annotation import Annotation
+from browsing_platform.server.services.search_cache import invalidate_search_cache
 from extractors.entity_types import Account, Post
 from utils import db
 
@@ -81,6 +82,37 @@ def get_posts_by_accounts(accounts: list[Account], include_data: bool = True) ->
     )
     return [Post(**p) for p in posts]
 
+
+def get_account_posts_page(
+        account_id: int,
+        limit: int,
+        after_clause: str = "",
+        after_args: Optional[dict] = None,
+        include_data: bool = True,
+) -> list[Post]:
+    """Up to `limit` posts of one account, newest first. `after_clause` is a keyset
+    condition on post.publication_date / post.id (see search.keyset_where)."""
+    cols = _POST_COLS if include_data else _POST_COLS_NO_DATA
+    posts = db.execute_query(
+        f"""SELECT {cols} FROM post
+            WHERE account_id = %(account_id)s {'AND ' + after_clause if after_clause else ''}
+            ORDER BY publication_date DESC, id DESC
+            LIMIT %(limit)s""",  # nosec B608 - after_clause is built by keyset_where from whitelisted columns
+        {"account_id": account_id, "limit": limit, **(after_args or {})},
+        return_type="rows"
+    )
+    return [Post(**p) for p in posts]
+
+
+def count_account_posts(account_id: int) -> int:
+    row = db.execute_query(
+        "SELECT COUNT(*) AS cnt FROM post WHERE account_id = %(account_id)s",
+        {"account_id": account_id},
+        return_type="single_row"
+    )
+    return row["cnt"] if row else 0
+
+
 def annotate_post(post_id: int, annotation: Annotation) -> None:
     with db.transaction_batch():
         # Clear associated tags
@@ -95,4 +127,5 @@ def annotate_post(post_id: int, annotation: Annotation) -> None:
                 """INSERT INTO post_tag (post_id, tag_id, notes) VALUES (%(post_id)s, %(tag_id)s, %(notes)s)""",
                 {"post_id": post_id, "tag_id": tag.id, "notes": tag.notes},
                 return_type="none"
-            )
\ No newline at end of file
+            )
+    invalidate_search_cache()
\ No newline at end of file
@@ -1,21 +1,30 @@
+import base64
+import json
 import logging
+import os
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from datetime import datetime
 from typing import Literal, Optional, Any
 from urllib.parse import urlparse, urlencode, urlunparse, parse_qsl
 
 from pydantic import BaseModel, field_validator
 
-from browsing_platform.server.services.file_tokens import generate_file_token
+from browsing_platform.server.services.file_tokens import file_token_params
 from db_loaders.db_intake import LOCAL_ARCHIVES_DIR_ALIAS
+from db_loaders.entity_preview import get_entity_previews
 from db_loaders.thumbnail_generator import LOCAL_THUMBNAILS_DIR_ALIAS
 
 logger = logging.getLogger(__name__)
 
 from browsing_platform.server.services.media import get_media_thumbnail_path
+from browsing_platform.server.services.media_similarity import DEFAULT_MAX_DISTANCE, existing_matches, find_similar_media
+from browsing_platform.server.services.search_cache import cached_search
 from extractors.entity_types import reconstruct_url, parse_search_url
 from utils import db
 
-T_Search_Mode = Literal["media", "posts", "accounts", "archive_sessions", "all"]
+T_Search_Mode = Literal["media", "posts", "accounts", "archive_sessions", "similar_media", "all"]
 
 
 class ISearchQuery(BaseModel):
@@ -29,6 +38,12 @@ class ISearchQuery(BaseModel):
     tag_scopes: Optional[list[str]] = None
     sort_by: Optional[str] = None
     sort_order: Optional[Literal["asc", "desc"]] = None
+    # Keyset pagination: the `cursor` of the last result of the previous page.
+    # When set, page_number is ignored and the page starts right after that row.
+    cursor: Optional[str] = None
+    # search_mode="similar_media": reference media and Hamming-distance radius
+    similar_to_media_id: Optional[int] = None
+    max_hamming_distance: Optional[int] = None
 
 
 class SearchResultTransform(BaseModel):
@@ -48,6 +63,8 @@ class SearchResult(BaseModel):
     details: Optional[str]
     thumbnails: Optional[list[Thumbnail]] = None
     metadata: Optional[dict] = None
+    # Opaque keyset position of this row; None for relevance-ranked results (offset paging only)
+    cursor: Optional[str] = None
 
     @field_validator('thumbnails', mode='before')
     def parse_thumbnails(cls, v, _):
@@ -57,14 +74,15 @@ class SearchResult(BaseModel):
 
 
 def search_base(query: ISearchQuery, search_results_transform: SearchResultTransform) -> list[SearchResult]:
-    if query.search_mode == "archive_sessions":
-        return search_archive_sessions(query, search_results_transform)
-    elif query.search_mode == "accounts":
-        return search_accounts(query, search_results_transform)
-    elif query.search_mode == "posts":
-        return search_posts(query, search_results_transform)
-    elif query.search_mode == "media":
-        return search_media(query, search_results_transform)
+    if query.search_mode in _CACHED_SEARCHES:
+        # Cached unsigned (no access token), signed per request
+        search = _CACHED_SEARCHES[query.search_mode]
+        results = cached_search(query.model_dump(), lambda: search(query, SearchResultTransform()))
+        return apply_search_results_transform(results, search_results_transform)
+    elif query.search_mode == "similar_media":
+        return search_similar_media(query, search_results_transform)
+    elif query.search_mode == "all":
+        return apply_search_results_transform(search_all(query), search_results_transform)
     else:
         print(f"Search mode {query.search_mode} not implemented yet.")
         return []
@@ -88,18 +106,119 @@ SORTABLE_COLUMNS: dict[str, dict[str, str]] = {
 }
 
 
-def resolve_order_by(search_mode: str, sort_by: Optional[str], sort_order: Optional[str], fallback: str) -> str:
-    """Return an ORDER BY expression for an explicit user sort, or `fallback` when none/invalid.
-    The column expression is taken only from the SORTABLE_COLUMNS whitelist and the direction is
-    clamped to ASC/DESC, so the result is injection-safe (consistent with sanitize_column)."""
+# ---------------------------------------------------------------------------
+# Keyset (seek) pagination
+#
+# OFFSET makes MySQL read and discard every row before the page, and rows
+# inserted mid-browse shift later pages. With a cursor the page instead starts
+# with WHERE (sort_key, id) < (last_sort_key, last_id), which is an index range
+# scan: page 10,000 costs the same as page 1. Relevance-ranked (fulltext)
+# orderings have no stable key and keep offset paging.
+# ---------------------------------------------------------------------------
+
+def resolve_keyset_order(search_mode: str, sort_by: Optional[str], sort_order: Optional[str],
+                         default: Optional[tuple[str, str]]) -> Optional[tuple[str, str]]:
+    """(column, direction) of a keyset-capable ordering: an explicit user sort, else `default` (None when
+    the default ordering is by relevance). The column is taken only from the SORTABLE_COLUMNS whitelist and
+    the direction is clamped to ASC/DESC, so the ORDER BY built from it is injection-safe."""
     cols = SORTABLE_COLUMNS.get(search_mode, {})
     if sort_by and sort_by in cols:
-        direction = "ASC" if (sort_order or "").lower() == "asc" else "DESC"
-        return f"{cols[sort_by]} {direction}"
-    return fallback
+        return cols[sort_by], "ASC" if (sort_order or "").lower() == "asc" else "DESC"
+    return default
+
+
+def keyset_order_by(keyset: tuple[str, str], id_column: str) -> str:
+    column, direction = keyset
+    if column == id_column:
+        return f"{id_column} {direction}"
+    # id breaks ties so every row has a unique position
+    return f"{column} {direction}, {id_column} {direction}"
+
+
+def _encode_cursor_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_cursor_value(value: Any) -> Any:
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+def encode_cursor(search_mode: str, keyset: tuple[str, str], value: Any, row_id: int) -> str:
+    raw = json.dumps([search_mode, keyset[0], keyset[1], _encode_cursor_value(value), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str, search_mode: str, keyset: tuple[str, str]) -> tuple[Any, int]:
+    """Return (sort value, id) of a cursor; ValueError if it is malformed or from a different ordering."""
+    try:
+        padding = "=" * ((4 - len(cursor) % 4) % 4)
+        mode, column, direction, value, row_id = json.loads(base64.urlsafe_b64decode(cursor + padding))
+        value = _decode_cursor_value(value)
+    except Exception as e:
+        raise ValueError("Malformed search cursor") from e
+    if (mode, column, direction) != (search_mode, keyset[0], keyset[1]) or not isinstance(row_id, int):
+        raise ValueError("Search cursor does not match the query's search mode or sort order")
+    if value is not None and not isinstance(value, (str, int, float, datetime)):
+        raise ValueError("Malformed search cursor")
+    return value, row_id
+
+
+def keyset_where(keyset: tuple[str, str], id_column: str, value: Any, row_id: int, args: dict) -> str:
+    """WHERE clause selecting the rows strictly after (value, row_id) in keyset order.
+    MySQL sorts NULL first ascending and last descending; the NULL branches follow that."""
+    column, direction = keyset
+    cmp = "<" if direction == "DESC" else ">"
+    args["ks_id"] = row_id
+    if column == id_column:
+        return f"{id_column} {cmp} %(ks_id)s"
+    if value is None:
+        if direction == "DESC":
+            return f"({column} IS NULL AND {id_column} < %(ks_id)s)"
+        return f"(({column} IS NULL AND {id_column} > %(ks_id)s) OR {column} IS NOT NULL)"
+    args["ks_value"] = value
+    clause = f"({column} {cmp} %(ks_value)s OR ({column} = %(ks_value)s AND {id_column} {cmp} %(ks_id)s)"
+    if direction == "DESC":
+        clause += f" OR {column} IS NULL"
+    return clause + ")"
+
+
+def apply_cursor(query: ISearchQuery, search_mode: str, keyset: Optional[tuple[str, str]], id_column: str,
+                 where_clauses: list[str], query_args: dict) -> None:
+    """Replace OFFSET paging with a keyset condition when the query carries a cursor."""
+    if not query.cursor:
+        return
+    if keyset is None:
+        raise ValueError("Cursor pagination is not available for relevance-ranked searches")
+    value, row_id = decode_cursor(query.cursor, search_mode, keyset)
+    where_clauses.append(keyset_where(keyset, id_column, value, row_id, query_args))
+    query_args["offset"] = 0
+
+
+def attach_cursors(results: list[SearchResult], rows: list[dict], search_mode: str,
+                   keyset: Optional[tuple[str, str]]) -> None:
+    if keyset is None:
+        return
+    key = keyset[0].split(".")[-1]
+    for result, row in zip(results, rows):
+        result.cursor = encode_cursor(search_mode, keyset, row[key], row["id"])
+
+
+def _preview_thumbnails(preview: dict) -> Optional[list[Thumbnail]]:
+    """Thumbnails of an entity_preview entry (see db_loaders.entity_preview), None when it has none."""
+    thumbnails = []
+    for media in preview["media"]:
+        src = get_media_thumbnail_path(media["thumbnail_path"], media["local_url"])
+        if src:
+            thumbnails.append(Thumbnail(src=src, aspect_ratio=media["aspect_ratio"]))
+    return thumbnails or None
 
 
-def search_archive_sessions(query: ISearchQuery, search_results_transform: SearchResultTransform) -> list[SearchResult]:
+def search_archive_sessions(query: ISearchQuery, search_results_transform: SearchResultTransform,
+                            timeout_ms: int = 10_000) -> list[SearchResult]:
     query_args: dict["str", Any] = {
         "limit": query.page_size,
         "offset": (query.page_number - 1) * query.page_size,
@@ -119,42 +238,21 @@ def search_archive_sessions(query: ISearchQuery, search_results_transform: Searc
         general_filter, general_args = json_logic_format_to_where_clause(query.advanced_filters, "archive_session")
         where_clauses.append(general_filter)
         query_args.update(general_args)
-    rows = db.execute_query(
+    keyset = ("archiving_timestamp", "DESC")
+    apply_cursor(query, "archive_sessions", keyset, "id", where_clauses, query_args)
+    rows = db.execute_query(  # nosec B608 - where_clauses built from safe clauses only
         f"""SELECT id, archived_url_suffix, platform, notes, archiving_timestamp
            FROM archive_session
               {'WHERE ' + ' AND '.join(where_clauses) if len(where_clauses) else ''}
-           ORDER BY archiving_timestamp DESC
+           ORDER BY {keyset_order_by(keyset, "id")}
            LIMIT %(limit)s OFFSET %(offset)s""",
         query_args,
-        timeout_ms=10_000
+        timeout_ms=timeout_ms
     )
     if not rows:
         return []
-    session_ids = [row["id"] for row in rows]
-    thumb_args = {f"sid_{i}": sid for i, sid in enumerate(session_ids)}
-    thumb_in = ", ".join(f"%(sid_{i})s" for i in range(len(session_ids)))
-    thumb_rows = db.execute_query(  # nosec B608 - thumb_in contains only %(key)s placeholders
-        f"""SELECT archive_session_id, thumbnail_path, local_url, media_count, aspect_ratio
-            FROM (
-                SELECT ma.archive_session_id, m.thumbnail_path, m.local_url, m.aspect_ratio,
-                       COUNT(*) OVER (PARTITION BY ma.archive_session_id) AS media_count,
-                       ROW_NUMBER() OVER (PARTITION BY ma.archive_session_id ORDER BY m.id) AS rn
-                FROM media_archive ma
-                JOIN media m ON ma.canonical_id = m.id
-                WHERE ma.archive_session_id IN ({thumb_in})
-                  AND m.local_url IS NOT NULL
-            ) ranked
-            WHERE rn <= 4""",
-        thumb_args
-    )
-    session_thumbnails: dict[int, list[Thumbnail]] = {}
-    session_media_count: dict[int, int] = {}
-    for t in thumb_rows:
-        sid = t["archive_session_id"]
-        session_media_count[sid] = t["media_count"]
-        src = get_media_thumbnail_path(t["thumbnail_path"], t["local_url"])
-        if src:
-            session_thumbnails.setdefault(sid, []).append(Thumbnail(src=src, aspect_ratio=t.get("aspect_ratio")))
+    session_previews = get_entity_previews("archive_session", [row["id"] for row in rows])
+    session_thumbnails = {sid: _preview_thumbnails(p) for sid, p in session_previews.items()}
     results = [
         SearchResult(
             page="archive",
@@ -164,11 +262,12 @@ def search_archive_sessions(query: ISearchQuery, search_results_transform: Searc
             thumbnails=session_thumbnails.get(row["id"]),
             metadata={
                 "archiving_timestamp": row["archiving_timestamp"].isoformat() if row["archiving_timestamp"] else None,
-                "media_count": session_media_count.get(row["id"], 0),
+                "media_count": session_previews[row["id"]]["media_count"],
             }
         )
         for row in rows
     ]
+    attach_cursors(results, rows, "archive_sessions", keyset)
     results = apply_search_results_transform(results, search_results_transform)
     return results
 
@@ -243,10 +342,12 @@ def build_tag_filter_join(entity: str, tag_ids: list[int], tag_filter_mode: str,
     scopes = [s for s in allowed if s in requested] or [entity]
 
     args: dict = {}
-    # Recursive descendant CTE, carrying root_id so "all" mode can require coverage of every tag.
+    # Each input tag plus its descendants from tag_closure, carrying root_id so "all" mode can
+    # require coverage of every tag.
     seeds = "\n        UNION ALL ".join(
         f"SELECT %(tid_{i})s AS id, %(tid_{i})s AS root_id" for i in range(len(tag_ids))
     )
+    tid_in = ", ".join(f"%(tid_{i})s" for i in range(len(tag_ids)))
     for i, tid in enumerate(tag_ids):
         args[f"tid_{i}"] = tid
 
@@ -259,11 +360,11 @@ def build_tag_filter_join(entity: str, tag_ids: list[int], tag_filter_mode: str,
         having = ""
 
     sql = f"""JOIN (
-    WITH RECURSIVE tag_desc AS (
+    WITH tag_desc AS (
         {seeds}
         UNION ALL
-        SELECT th.sub_tag_id, td.root_id
-        FROM tag_hierarchy th JOIN tag_desc td ON th.super_tag_id = td.id
+        SELECT tc.descendant_id, tc.ancestor_id
+        FROM tag_closure tc WHERE tc.ancestor_id IN ({tid_in})
     )
     SELECT matched_id FROM (
         {branches}
@@ -279,7 +380,8 @@ def _escape_like(value: str) -> str:
     return value.replace('!', '!!').replace('%', '!%').replace('_', '!_')
 
 
-def search_accounts(query: ISearchQuery, search_results_transform: SearchResultTransform) -> list[SearchResult]:
+def search_accounts(query: ISearchQuery, search_results_transform: SearchResultTransform,
+                    timeout_ms: int = 10_000) -> list[SearchResult]:
     query_args: dict["str", Any] = {
         "limit": query.page_size,
         "offset": (query.page_number - 1) * query.page_size,
@@ -294,8 +396,8 @@ def search_accounts(query: ISearchQuery, search_results_transform: SearchResultT
             query_args["p_platform"]   = parsed_url.platform
             query_args["p_identifier"] = f"url_{parsed_url.suffix}"
             where_clauses.append(
-                "(url_suffix = %(p_suffix)s AND platform = %(p_platform)s) "
-                "OR JSON_CONTAINS(`identifiers`, JSON_QUOTE(%(p_identifier)s))"
+                "((url_suffix = %(p_suffix)s AND platform = %(p_platform)s) "
+                "OR JSON_CONTAINS(`identifiers`, JSON_QUOTE(%(p_identifier)s)))"
             )
         else:
             handle = extract_account_handle(query.search_term)
@@ -304,8 +406,8 @@ def search_accounts(query: ISearchQuery, search_results_transform: SearchResultT
                 query_args["search_term"]         = default_fulltext_query(handle)
                 query_args["account_search_term"] = f"url_{handle}/"
                 where_clauses.append(
-                    "JSON_CONTAINS(`identifiers`, JSON_QUOTE(%(account_search_term)s)) "
-                    "OR MATCH(`url_suffix`, `url_parts`, `bio`, `display_name`) AGAINST (%(search_term)s IN BOOLEAN MODE)"
+                    "(JSON_CONTAINS(`identifiers`, JSON_QUOTE(%(account_search_term)s)) "
+                    "OR MATCH(`url_suffix`, `url_parts`, `bio`, `display_name`) AGAINST (%(search_term)s IN BOOLEAN MODE))"
                 )
                 has_fulltext = True
             else:
@@ -323,11 +425,13 @@ def search_accounts(query: ISearchQuery, search_results_transform: SearchResultT
     if query.tag_ids:
         tag_filter_join, tag_filter_args = build_tag_filter_join("account", query.tag_ids, query.tag_filter_mode or "any", query.tag_scopes)
         query_args.update(tag_filter_args)
+    keyset = resolve_keyset_order("accounts", query.sort_by, query.sort_order,
+                                  None if has_fulltext else ("account.id", "DESC"))
     order_by = (
-        "MATCH(`url_suffix`, `url_parts`, `bio`, `display_name`) AGAINST (%(search_term)s IN BOOLEAN MODE) DESC"
-        if has_fulltext else "account.id DESC"
+        keyset_order_by(keyset, "account.id") if keyset
+        else "MATCH(`url_suffix`, `url_parts`, `bio`, `display_name`) AGAINST (%(search_term)s IN BOOLEAN MODE) DESC"
     )
-    order_by = resolve_order_by("accounts", query.sort_by, query.sort_order, order_by)
+    apply_cursor(query, "accounts", keyset, "account.id", where_clauses, query_args)
     rows = db.execute_query(  # nosec B608 - tag_filter_join built from safe templates only
         f"""SELECT account.id, account.url_suffix, account.platform, account.display_name, account.bio
            FROM account
@@ -336,47 +440,27 @@ def search_accounts(query: ISearchQuery, search_results_transform: SearchResultT
            ORDER BY {order_by}
            LIMIT %(limit)s OFFSET %(offset)s""",
         query_args,
-        timeout_ms=10_000
+        timeout_ms=timeout_ms
     )
     if not rows:
         return []
-    account_ids = [row["id"] for row in rows]
-    thumb_args = {f"aid_{i}": aid for i, aid in enumerate(account_ids)}
-    thumb_in = ", ".join(f"%(aid_{i})s" for i in range(len(account_ids)))
-    thumb_rows = db.execute_query(  # nosec B608 - thumb_in contains only %(key)s placeholders
-        f"""SELECT account_id, thumbnail_path, local_url, media_count, aspect_ratio
-            FROM (
-                SELECT account_id, thumbnail_path, local_url, aspect_ratio,
-                       COUNT(*) OVER (PARTITION BY account_id) AS media_count,
-                       ROW_NUMBER() OVER (PARTITION BY account_id ORDER BY publication_date DESC) AS rn
-                FROM media
-                WHERE account_id IN ({thumb_in})
-                  AND local_url IS NOT NULL
-            ) ranked
-            WHERE rn <= 8""",
-        thumb_args
-    )
-    account_thumbnails: dict[int, list[Thumbnail]] = {}
-    account_media_count: dict[int, int] = {}
-    for t in thumb_rows:
-        aid = t["account_id"]
-        account_media_count[aid] = t["media_count"]
-        src = get_media_thumbnail_path(t["thumbnail_path"], t["local_url"])
-        if src:
-            account_thumbnails.setdefault(aid, []).append(Thumbnail(src=src, aspect_ratio=t.get("aspect_ratio")))
+    account_previews = get_entity_previews("account", [row["id"] for row in rows])
+    account_thumbnails = {aid: _preview_thumbnails(p) for aid, p in account_previews.items()}
     results = [SearchResult(
         page="account",
         id=row["id"],
         title=reconstruct_url(row["url_suffix"], row["platform"]) or row["url_suffix"] or "",
         details=row["bio"] or "",
         thumbnails=account_thumbnails.get(row["id"]),
-        metadata={"media_count": account_media_count.get(row["id"], 0), "display_name": row["display_name"] or None, "url_suffix": row["url_suffix"] or None},
+        metadata={"media_count": account_previews[row["id"]]["media_count"], "display_name": row["display_name"] or None, "url_suffix": row["url_suffix"] or None},
     ) for row in rows]
+    attach_cursors(results, rows, "accounts", keyset)
     results = apply_search_results_transform(results, search_results_transform)
     return results
 
 
-def search_posts(query: ISearchQuery, search_results_transform: SearchResultTransform) -> list[SearchResult]:
+def search_posts(query: ISearchQuery, search_results_transform: SearchResultTransform,
+                 timeout_ms: int = 10_000) -> list[SearchResult]:
     query_args: dict["str", Any] = {
         "limit": query.page_size,
         "offset": (query.page_number - 1) * query.page_size,
@@ -402,12 +486,14 @@ def search_posts(query: ISearchQuery, search_results_transform: SearchResultTran
     if query.tag_ids:
         tag_filter_join, tag_filter_args = build_tag_filter_join("post", query.tag_ids, query.tag_filter_mode or "any", query.tag_scopes)
         query_args.update(tag_filter_args)
-    inner_where = ('WHERE ' + ' AND '.join(where_clauses)) if where_clauses else ''
+    keyset = resolve_keyset_order("posts", query.sort_by, query.sort_order,
+                                  None if has_fulltext else ("post.publication_date", "DESC"))
     order_by = (
-        "MATCH(`url_suffix`, `caption`) AGAINST (%(search_term)s IN BOOLEAN MODE) DESC"
-        if has_fulltext else "publication_date DESC"
+        keyset_order_by(keyset, "post.id") if keyset
+        else "MATCH(`url_suffix`, `caption`) AGAINST (%(search_term)s IN BOOLEAN MODE) DESC"
     )
-    order_by = resolve_order_by("posts", query.sort_by, query.sort_order, order_by)
+    apply_cursor(query, "posts", keyset, "post.id", where_clauses, query_args)
+    inner_where = ('WHERE ' + ' AND '.join(where_clauses)) if where_clauses else ''
     rows = db.execute_query(  # nosec B608 - inner_where, order_by, tag_filter_join built from safe clauses only
         f"""SELECT p.id, p.url_suffix, p.platform, p.id_on_platform, p.caption, p.publication_date,
                    a.display_name AS account_display_name, a.url_suffix AS account_url_suffix, a.platform AS account_platform
@@ -421,7 +507,7 @@ def search_posts(query: ISearchQuery, search_results_transform: SearchResultTran
            ) p
            LEFT JOIN account a ON p.account_id = a.id""",
         query_args,
-        timeout_ms=10_000
+        timeout_ms=timeout_ms
     )
     if not rows:
         return []
@@ -452,11 +538,13 @@ def search_posts(query: ISearchQuery, search_results_transform: SearchResultTran
         )
         for row in rows
     ]
+    attach_cursors(results, rows, "posts", keyset)
     results = apply_search_results_transform(results, search_results_transform)
     return results
 
 
-def search_media(query: ISearchQuery, search_results_transform: SearchResultTransform) -> list[SearchResult]:
+def search_media(query: ISearchQuery, search_results_transform: SearchResultTransform,
+                 timeout_ms: int = 10_000) -> list[SearchResult]:
     query_args: dict["str", Any] = {
         "limit": query.page_size,
         "offset": (query.page_number - 1) * query.page_size,
@@ -483,8 +571,10 @@ def search_media(query: ISearchQuery, search_results_transform: SearchResultTran
     if query.tag_ids:
         tag_filter_join, tag_filter_args = build_tag_filter_join("media", query.tag_ids, query.tag_filter_mode or "any", query.tag_scopes)
         query_args.update(tag_filter_args)
+    keyset = resolve_keyset_order("media", query.sort_by, query.sort_order, ("media.id", "DESC"))
+    order_by = keyset_order_by(keyset, "media.id")
+    apply_cursor(query, "media", keyset, "media.id", where_clauses, query_args)
     inner_where = ' AND '.join(where_clauses)
-    order_by = resolve_order_by("media", query.sort_by, query.sort_order, "media.id DESC")
     rows = db.execute_query(  # nosec B608 - inner_where, order_by and tag_filter_join built from safe clauses only
         f"""SELECT m.id, m.thumbnail_path, m.local_url, m.aspect_ratio, m.media_type, m.publication_date,
                    a.display_name AS account_display_name, a.url_suffix AS account_url_suffix, a.platform AS account_platform
@@ -498,31 +588,169 @@ def search_media(query: ISearchQuery, search_results_transform: SearchResultTran
            ) m
            LEFT JOIN account a ON m.account_id = a.id""",
         query_args,
-        timeout_ms=10_000
+        timeout_ms=timeout_ms
     )
-    results = [
-        SearchResult(
-            page="media",
-            id=row["id"],
-            title=reconstruct_url(row["account_url_suffix"], row["account_platform"]) or "",
-            details="",
-            thumbnails=[Thumbnail(src=src, aspect_ratio=row.get("aspect_ratio")) for src in [
-                get_media_thumbnail_path(row["thumbnail_path"], row["local_url"]),
-                row["local_url"],
-            ] if src],
-            metadata={
-                "publication_date": row["publication_date"].isoformat() if row["publication_date"] else None,
-                "account_display_name": row["account_display_name"],
-                "account_url": reconstruct_url(row["account_url_suffix"], row["account_platform"]),
-                "media_type": row["media_type"],
-            }
-        )
-        for row in rows
-    ]
+    results = [_media_row_to_search_result(row) for row in rows]
+    attach_cursors(results, rows, "media", keyset)
+    results = apply_search_results_transform(results, search_results_transform)
+    return results
+
+
+def _media_row_to_search_result(row: dict) -> SearchResult:
+    return SearchResult(
+        page="media",
+        id=row["id"],
+        title=reconstruct_url(row["account_url_suffix"], row["account_platform"]) or "",
+        details="",
+        thumbnails=[Thumbnail(src=src, aspect_ratio=row.get("aspect_ratio")) for src in [
+            get_media_thumbnail_path(row["thumbnail_path"], row["local_url"]),
+            row["local_url"],
+        ] if src],
+        metadata={
+            "publication_date": row["publication_date"].isoformat() if row["publication_date"] else None,
+            "account_display_name": row["account_display_name"],
+            "account_url": reconstruct_url(row["account_url_suffix"], row["account_platform"]),
+            "media_type": row["media_type"],
+        }
+    )
+
+
+def search_similar_media(query: ISearchQuery, search_results_transform: SearchResultTransform) -> list[SearchResult]:
+    """Near-duplicate lookup: media whose perceptual hash is within `max_hamming_distance` bits of
+    `similar_to_media_id`'s, closest first. Served from the in-memory hash index; the DB is only
+    hit to check that the hits up to the current page still exist and to hydrate that page."""
+    if query.similar_to_media_id is None:
+        return []
+    matches = find_similar_media(
+        query.similar_to_media_id,
+        query.max_hamming_distance if query.max_hamming_distance is not None else DEFAULT_MAX_DISTANCE,
+    )
+    if not matches:
+        return []
+    offset = (query.page_number - 1) * query.page_size
+    # Skip media deleted since the index was loaded, so they take no place in the ranking
+    page = existing_matches(matches, offset + query.page_size)[offset:]
+    if not page:
+        return []
+    distances = dict(page)
+    query_args = {f"mid_{i}": media_id for i, (media_id, _) in enumerate(page)}
+    media_in = ", ".join(f"%(mid_{i})s" for i in range(len(page)))
+    rows = db.execute_query(  # nosec B608 - media_in contains only %(key)s placeholders
+        f"""SELECT m.id, m.thumbnail_path, m.local_url, m.aspect_ratio, m.media_type, m.publication_date,
+                   a.display_name AS account_display_name, a.url_suffix AS account_url_suffix, a.platform AS account_platform
+            FROM media m
+            LEFT JOIN account a ON m.account_id = a.id
+            WHERE m.id IN ({media_in})""",
+        query_args
+    )
+    rows_by_id = {row["id"]: row for row in rows}
+    results = []
+    for media_id, distance in page:
+        row = rows_by_id.get(media_id)
+        if row is None:
+            continue
+        result = _media_row_to_search_result(row)
+        result.metadata["hamming_distance"] = distance
+        results.append(result)
     results = apply_search_results_transform(results, search_results_transform)
     return results
 
 
+_CACHED_SEARCHES = {
+    "archive_sessions": search_archive_sessions,
+    "accounts": search_accounts,
+    "posts": search_posts,
+    "media": search_media,
+}
+
+
+# ---------------------------------------------------------------------------
+# search_mode="all": fan-out over the four entity searches
+#
+# Each branch runs on its own pooled DB connection, so the request takes as
+# long as the slowest branch rather than the sum. A branch that has not
+# answered within its budget is left out of the response (partial results);
+# its query carries the same budget as MAX_EXECUTION_TIME, so MySQL stops it
+# shortly afterwards instead of it holding a fan-out worker for the default
+# 10s. The fan-out pool is separate from the API threadpool and counted
+# against the DB pool in server.py (API_THREADPOOL_SIZE).
+# ---------------------------------------------------------------------------
+
+SEARCH_FANOUT_WORKERS = int(os.getenv("SEARCH_FANOUT_WORKERS", "4"))
+# Per-branch budget in milliseconds, measured from the start of the fan-out.
+SEARCH_ALL_BRANCH_BUDGET_MS: dict[str, int] = {
+    "accounts": 3_000,
+    "posts": 3_000,
+    "media": 3_000,
+    "archive_sessions": 3_000,
+}
+# Order of the branches in the response when normalized scores tie.
+_ALL_SEARCH_BRANCHES = ["accounts", "posts", "media", "archive_sessions"]
+
+_fanout_pool = ThreadPoolExecutor(max_workers=SEARCH_FANOUT_WORKERS, thread_name_prefix="search-fanout")
+
+
+def _run_search_branch(query: ISearchQuery, search_mode: str, timeout_ms: int) -> list[SearchResult]:
+    branch_query = query.model_copy(update={"search_mode": search_mode})
+    search = _CACHED_SEARCHES[search_mode]
+    return cached_search(
+        branch_query.model_dump(),
+        lambda: search(branch_query, SearchResultTransform(), timeout_ms=timeout_ms)
+    )
+
+
+def merge_ranked_branches(branches: dict[str, list[SearchResult]]) -> list[SearchResult]:
+    """Merge per-entity result pages into one list.
+
+    Each branch is already ordered by its own relevance (or sort key), and the
+    raw MATCH scores of different FULLTEXT indexes are not comparable, so each
+    result is scored by its rank within its branch, normalized to (0, 1]:
+    the top of every branch scores 1.0 and the last of an n-result branch 1/n.
+    The score is exposed as metadata["score"].
+    """
+    scored: list[tuple[float, int, int, SearchResult]] = []
+    for branch_index, search_mode in enumerate(_ALL_SEARCH_BRANCHES):
+        results = branches.get(search_mode) or []
+        n = len(results)
+        for rank, result in enumerate(results):
+            scored.append((1 - rank / n, branch_index, rank, result))
+    scored.sort(key=lambda item: (-item[0], item[1], item[2]))
+    # Copy: branch results may be shared through the search cache. Branch cursors
+    # are dropped; they address a single entity search, not the merged list.
+    return [
+        result.model_copy(update={"metadata": {**(result.metadata or {}), "score": round(score, 4)}, "cursor": None})
+        for score, _, _, result in scored
+    ]
+
+
+def search_all(query: ISearchQuery) -> list[SearchResult]:
+    """Search accounts, posts, media and archive sessions concurrently and merge the pages.
+
+    Every branch returns up to page_size results for the same page_number, so a
+    page of "all" holds up to four times page_size results. Advanced filters are
+    written against one table's columns and are not applied; tag filters apply
+    to the branches that support them. Cursor paging is not available."""
+    if query.cursor:
+        raise ValueError("Cursor pagination is not available for search_mode 'all'")
+    query = query.model_copy(update={"advanced_filters": None})
+    start = time.monotonic()
+    futures = {
+        search_mode: _fanout_pool.submit(_run_search_branch, query, search_mode, SEARCH_ALL_BRANCH_BUDGET_MS[search_mode])
+        for search_mode in _ALL_SEARCH_BRANCHES
+    }
+    branches: dict[str, list[SearchResult]] = {}
+    for search_mode, future in futures.items():
+        remaining = SEARCH_ALL_BRANCH_BUDGET_MS[search_mode] / 1000 - (time.monotonic() - start)
+        try:
+            branches[search_mode] = future.result(timeout=max(0.0, remaining))
+        except (TimeoutError, FuturesTimeoutError):
+            future.cancel()
+            logger.warning(f"search 'all': {search_mode} branch exceeded its budget; returning partial results")
+        except Exception:
+            logger.exception(f"search 'all': {search_mode} branch failed; returning partial results")
+    return merge_ranked_branches(branches)
+
+
 def sign_thumbnail_path(path: str, transform: SearchResultTransform) -> str:
     if LOCAL_ARCHIVES_DIR_ALIAS in path:
         local_path = path.replace(LOCAL_ARCHIVES_DIR_ALIAS, f"{transform.local_files_root}/archives", 1)
@@ -532,18 +760,20 @@ def sign_thumbnail_path(path: str, transform: SearchResultTransform) -> str:
         local_path = path
     parsed = urlparse(local_path)
     qs = dict(parse_qsl(parsed.query, keep_blank_values=True))
-    qs['ft'] = generate_file_token(
+    qs.update(file_token_params(
         transform.access_token,
         local_path.split(f"{transform.local_files_root}")[-1]
-    )
+    ))
     return str(urlunparse(parsed._replace(query=urlencode(qs, doseq=True))))
 
 
 def sign_search_result_thumbnails(res: SearchResult, transform: SearchResultTransform) -> SearchResult:
     if not res.thumbnails:
         return res
-    res.thumbnails = [Thumbnail(src=sign_thumbnail_path(t.src, transform), aspect_ratio=t.aspect_ratio) for t in res.thumbnails]
-    return res
+    # copy rather than mutate: `res` may be shared through the search cache
+    return res.model_copy(update={
+        "thumbnails": [Thumbnail(src=sign_thumbnail_path(t.src, transform), aspect_ratio=t.aspect_ratio) for t in res.thumbnails]
+    })
 
 
 def apply_search_results_transform(
@@ -573,6 +803,11 @@ _ALLOWED_COLUMNS_RAW: dict[str, list[tuple[str, Literal["text", "number", "date"
         ("data", "text"),
         ("url_parts", "text"),
         ("post_count", "number"),
+        # indexed generated columns over `data` (migration V044)
+        ("data_is_verified", "number"),
+        ("data_is_private", "number"),
+        ("data_follower_count", "number"),
+        ("data_following_count", "number"),
     ],
     "archive_session": [
         ("id", "number"),
@@ -604,6 +839,11 @@ _ALLOWED_COLUMNS_RAW: dict[str, list[tuple[str, Literal["text", "number", "date"
         ("publication_date", "date"),
         ("caption", "text"),
         ("data", "text"),
+        # indexed generated columns over `data` (migration V044)
+        ("data_like_count", "number"),
+        ("data_comment_count", "number"),
+        ("data_play_count", "number"),
+        ("data_video_duration", "number"),
     ],
     "media": [
         ("id", "number"),
@@ -618,6 +858,10 @@ _ALLOWED_COLUMNS_RAW: dict[str, list[tuple[str, Literal["text", "number", "date"
         ("annotation", "text"),
         ("thumbnail_path", "text"),
         ("publication_date", "date"),
+        # indexed generated columns over `data` (migration V044)
+        ("data_video_duration", "number"),
+        ("data_original_width", "number"),
+        ("data_original_height", "number"),
     ],
 }
 
@@ -0,0 +1,84 @@
+"""
+Server-side cache of search results.
+
+Reviewers re-run the same handful of searches all day, and each one costs a
+FULLTEXT query plus window-function thumbnail subqueries. Results are cached
+here *unsigned* (thumbnail paths still carry the local_thumbnails/ and
+local_archive_har/ aliases); file tokens are added per request, so one entry
+serves every user.
+
+Keys are the normalized ISearchQuery plus a generation number.
+invalidate_search_cache() bumps the generation and drops every entry, in every
+API worker process (see cache_invalidation); it is called whenever something a
+search can see changes (an incorporation job finishing, tag imports,
+annotation and tag hierarchy edits). A search that was already running when
+the generation moved stores its result under the old generation, where nobody
+will look it up again. The TTL bounds staleness for writes made outside the
+API (CLI loader).
+"""
+
+import json
+import threading
+from typing import Callable
+
+from browsing_platform.server.services import cache_invalidation
+from browsing_platform.server.services.ttl_cache import TTLCache
+
+SEARCH_CACHE_MAX_ENTRIES = 1000
+SEARCH_CACHE_TTL_SECONDS = 300
+
+_cache: TTLCache[str, list] = TTLCache(SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL_SECONDS)
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def normalize_query_key(query: dict) -> str:
+    """Canonical JSON of a search query: whitespace-collapsed term, order-insensitive id/scope lists."""
+    q = dict(query)
+    if q.get("search_term"):
+        q["search_term"] = " ".join(q["search_term"].split())
+    if not q.get("search_term"):
+        q["search_term"] = None
+    for list_key in ("tag_ids", "tag_scopes"):
+        if q.get(list_key):
+            q[list_key] = sorted(set(q[list_key]))
+    return json.dumps(q, sort_keys=True, default=str, separators=(",", ":"))
+
+
+def cached_search(query: dict, compute: Callable[[], list]) -> list:
+    """Return the cached result list for `query`, computing and storing it on a miss.
+    Callers must not mutate the returned list or its items."""
+    generation = _generation
+    key = f"{generation}:{normalize_query_key(query)}"
+    results = _cache.get(key)
+    if results is None:
+        results = compute()
+        _cache.set(key, results)
+    return results
+
+
+def _drop_search_results(_params: dict) -> None:
+    global _generation
+    with _generation_lock:
+        _generation += 1
+    _cache.clear()
+
+
+cache_invalidation.register("search", _drop_search_results)
+
+
+def invalidate_search_cache() -> None:
+    cache_invalidation.invalidate("search")
+
+
+def search_cache_stats() -> dict:
+    lookups = _cache.hits + _cache.misses
+    return {
+        "hits": _cache.hits,
+        "misses": _cache.misses,
+        "hit_rate": round(_cache.hits / lookups, 4) if lookups else None,
+        "entries": len(_cache),
+        "max_entries": SEARCH_CACHE_MAX_ENTRIES,
+        "ttl_seconds": SEARCH_CACHE_TTL_SECONDS,
+        "generation": _generation,
+    }
@@ -8,13 +8,21 @@ from pydantic import BaseModel
 from browsing_platform.server.services.entities_hierarchy import T_Entities
 from browsing_platform.server.services.media import get_media_by_id
 from browsing_platform.server.services.media_part import get_media_part_by_id
+from browsing_platform.server.services import cache_invalidation
 from browsing_platform.server.services.post import get_post_by_id
+from browsing_platform.server.services.ttl_cache import TTLCache
 from utils import db
 
 _MIN_SHARE_PASSWORD_LEN = 6
 
 SHARE_LINK_LENGTH = 24
 
+# Share-link rows are looked up on every request of a share viewer, including
+# each static file hit. Cache them briefly; every setter below invalidates, in
+# every worker process (see cache_invalidation).
+SHARE_LINK_CACHE_TTL_SECONDS = 60
+SHARE_LINK_CACHE_MAX_ENTRIES = 5_000
+
 
 class EntityShare(BaseModel):
     entity: T_Entities
@@ -35,6 +43,21 @@ class EntityShareLink(EntityShare):
     password_protected: bool = False  # derived field, always safe to expose
 
 
+_share_link_cache: TTLCache[str, EntityShareLink] = TTLCache(SHARE_LINK_CACHE_MAX_ENTRIES, SHARE_LINK_CACHE_TTL_SECONDS)
+
+
+def _drop_cached_share_link(params: dict) -> None:
+    digest = params["suffix_digest"]
+    _share_link_cache.remove_where(lambda suffix, _: cache_invalidation.key_digest(suffix) == digest)
+
+
+cache_invalidation.register("share_link", _drop_cached_share_link)
+
+
+def invalidate_cached_share_link(link_suffix: str) -> None:
+    cache_invalidation.invalidate("share_link", suffix_digest=cache_invalidation.key_digest(link_suffix))
+
+
 def generate_suffix() -> str:
     """Generate a random token string of TOKEN_LENGTH characters."""
     return ''.join(choice(string.ascii_letters + string.digits) for _ in range(SHARE_LINK_LENGTH))
@@ -149,6 +172,8 @@ def set_link_password(link_suffix: str, password: Optional[str]):
             {"h": h, "alg": alg, "link_suffix": link_suffix},
             "none",
         )
+    # After the write: a get_link_permissions() in between would cache the old row again
+    invalidate_cached_share_link(link_suffix)
 
 
 def verify_share_link_password(link_suffix: str, password: str) -> Optional[str]:
@@ -193,6 +218,7 @@ def set_link_attachment_access(link_suffix: str, include_screen_recordings: bool
         },
         "none"
     )
+    invalidate_cached_share_link(link_suffix)
 
 
 def set_link_validity(link_suffix: str, valid: bool):
@@ -201,20 +227,24 @@ def set_link_validity(link_suffix: str, valid: bool):
         {"valid": valid, "link_suffix": link_suffix},
         "none"
     )
+    invalidate_cached_share_link(link_suffix)
 
 
 def get_link_permissions(link_suffix: str, password_token: Optional[str] = None, skip_password_check: bool = False) -> EntitySharePermissions:
     try:
         if not link_suffix:
             return EntitySharePermissions(view=False)
-        token_check = db.execute_query(
-            '''SELECT * FROM entity_share_link
-            WHERE link_suffix = %(token)s'''
-            , {"token": link_suffix}, "single_row"
-        )
-        if not token_check or not isinstance(token_check, dict):
-            return EntitySharePermissions(view=False)
-        share_link = EntityShareLink(**token_check)
+        share_link = _share_link_cache.get(link_suffix)
+        if share_link is None:
+            token_check = db.execute_query(
+                '''SELECT * FROM entity_share_link
+                WHERE link_suffix = %(token)s'''
+                , {"token": link_suffix}, "single_row"
+            )
+            if not token_check or not isinstance(token_check, dict):
+                return EntitySharePermissions(view=False)
+            share_link = EntityShareLink(**token_check)
+            _share_link_cache.set(link_suffix, share_link)
         if not share_link.valid:
             return EntitySharePermissions(view=False)
         if share_link.password_hash and not skip_password_check:
@@ -283,4 +313,5 @@ def invalidate_suffix(link_suffix: str):
         '''UPDATE entity_share_link SET valid = FALSE WHERE link_suffix = %(link_suffix)s'''
         , {"link_suffix": link_suffix}, "none"
     )
+    invalidate_cached_share_link(link_suffix)
     return True
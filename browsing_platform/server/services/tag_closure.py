@@ -0,0 +1,116 @@
+"""
+Materialized transitive closure of the tag hierarchy.
+
+`tag_closure` holds one row per (ancestor_id, descendant_id) pair connected by
+a path in tag_hierarchy, with `depth` the length of the shortest such path
+(1 for a direct parent). A tag is not its own ancestor — queries that want
+"the tag and everything below it" add the tag itself. Readers (the search tag
+filter, tag usage counts, the community tag dropdown) replace a
+WITH RECURSIVE walk over tag_hierarchy with an indexed lookup on this table.
+
+Every write to tag_hierarchy goes through the same pattern, in one transaction:
+
+    with db.transaction_batch():
+        children = lock_hierarchy()
+        ... INSERT / DELETE tag_hierarchy rows, mirror them in `children` ...
+        refresh_closure(children, [sub_tag_id, ...])
+
+lock_hierarchy() is a locking read of every edge, so concurrent hierarchy edits
+run one after the other and each recomputes from the committed state of the
+previous one. Cycle checks use the locked `children` (see reaches()) for the
+same reason: checked before the lock, two concurrent edits could each pass and
+together close a cycle. Adding or removing an edge parent→child changes the ancestors of
+child and of everything below it, and nothing else; refresh_closure() rewrites
+exactly the rows of those descendants.
+"""
+from typing import Iterable
+
+from browsing_platform.server.services.import_utils import chunked
+from utils import db
+
+_CLOSURE_COLUMNS = ["ancestor_id", "descendant_id", "depth"]
+
+
+def lock_hierarchy() -> dict[int, set[int]]:
+    """super_tag_id → sub_tag_ids of the whole hierarchy, read with FOR UPDATE.
+    Must be called inside db.transaction_batch()."""
+    children: dict[int, set[int]] = {}
+    rows = db.execute_query("SELECT super_tag_id, sub_tag_id FROM tag_hierarchy FOR UPDATE", {}, return_type="rows")
+    for r in rows:
+        children.setdefault(r["super_tag_id"], set()).add(r["sub_tag_id"])
+    return children
+
+
+def reaches(children: dict[int, set[int]], from_id: int, to_id: int) -> bool:
+    """True if to_id is from_id or one of its descendants (adding to_id→from_id would create a cycle)."""
+    stack = [from_id]
+    visited = {from_id}
+    while stack:
+        tag_id = stack.pop()
+        if tag_id == to_id:
+            return True
+        for sub_id in children.get(tag_id, ()):
+            if sub_id not in visited:
+                visited.add(sub_id)
+                stack.append(sub_id)
+    return False
+
+
+def _descendants(children: dict[int, set[int]], roots: Iterable[int]) -> set[int]:
+    """`roots` and every tag below them."""
+    found = set(roots)
+    stack = list(found)
+    while stack:
+        for sub_id in children.get(stack.pop(), ()):
+            if sub_id not in found:
+                found.add(sub_id)
+                stack.append(sub_id)
+    return found
+
+
+def _ancestor_depths(parents: dict[int, set[int]], tag_id: int) -> dict[int, int]:
+    """ancestor → shortest path length, breadth-first up the hierarchy."""
+    depths: dict[int, int] = {}
+    frontier = [tag_id]
+    depth = 0
+    while frontier:
+        depth += 1
+        next_frontier = []
+        for node in frontier:
+            for parent_id in parents.get(node, ()):
+                if parent_id not in depths and parent_id != tag_id:
+                    depths[parent_id] = depth
+                    next_frontier.append(parent_id)
+        frontier = next_frontier
+    return depths
+
+
+def refresh_closure(children: dict[int, set[int]], changed_sub_tag_ids: Iterable[int]) -> None:
+    """
+    Rewrite the closure rows of the tags whose ancestors may have changed: the
+    sub tags of the added / removed edges and everything below them. `children`
+    is the hierarchy after the change (see lock_hierarchy).
+    """
+    affected = _descendants(children, changed_sub_tag_ids)
+    if not affected:
+        return
+    parents: dict[int, set[int]] = {}
+    for super_id, sub_ids in children.items():
+        for sub_id in sub_ids:
+            parents.setdefault(sub_id, set()).add(super_id)
+
+    rows = [
+        (ancestor_id, tag_id, depth)
+        for tag_id in affected
+        for ancestor_id, depth in _ancestor_depths(parents, tag_id).items()
+    ]
+    for chunk in chunked(sorted(affected)):
+        placeholders = ", ".join(f"%(d_{i})s" for i in range(len(chunk)))
+        db.execute_query(
+            f"DELETE FROM tag_closure WHERE descendant_id IN ({placeholders})",  # nosec B608
+            {f"d_{i}": tag_id for i, tag_id in enumerate(chunk)},
+            return_type="none"
+        )
+    for chunk in chunked(rows):
+        db.batch_insert("tag_closure", _CLOSURE_COLUMNS, list(chunk))
+
@@ -4,6 +4,8 @@ from typing import Optional
 from pydantic import BaseModel
 
 from browsing_platform.server.services.tag import ITagWithType
+from browsing_platform.server.services.search_cache import invalidate_search_cache
+from browsing_platform.server.services.tag_closure import lock_hierarchy, reaches, refresh_closure
 from utils import db
 
 
@@ -293,19 +295,20 @@ def delete_tag(tag_id: int) -> tuple[bool, str]:
     if total > 0:
         return False, f"Cannot delete: tag is assigned to {total} entity(ies)"
     db.execute_query("DELETE FROM tag WHERE id = %(id)s", {"id": tag_id}, return_type="none")
+    invalidate_search_cache()
     return True, ""
 
 
 def get_tag_usage_counts(tag_id: int) -> ITagUsage:
     # Counts entities tagged with tag_id or any of its descendants (hierarchy-aware),
-    # matching the recursive expansion used by the search page's tag filter.
+    # matching the tag_closure expansion used by the search page's tag filter.
     # A single query computes all four counts in one CTE pass.
     row = db.execute_query(
         """
-        WITH RECURSIVE tag_desc AS (
+        WITH tag_desc AS (
             SELECT id FROM tag WHERE id = %(id)s
             UNION ALL
-            SELECT th.sub_tag_id FROM tag_hierarchy th JOIN tag_desc td ON th.super_tag_id = td.id
+            SELECT descendant_id FROM tag_closure WHERE ancestor_id = %(id)s
         ),
         all_tagged AS (
             SELECT 'account'    AS entity_type, account_id    AS entity_id FROM account_tag    WHERE tag_id IN (SELECT id FROM tag_desc)
@@ -364,39 +367,34 @@ def list_parents(tag_id: int) -> list[ITagHierarchyEntry]:
     return [ITagHierarchyEntry(**row) for row in rows]
 
 
-def would_create_cycle(super_tag_id: int, sub_tag_id: int) -> bool:
-    """Return True if adding super→sub would create a cycle (i.e. super is already a descendant of sub)."""
-    if super_tag_id == sub_tag_id:
-        return True
-    # Check if super_tag_id is reachable from sub_tag_id via existing hierarchy
-    row = db.execute_query(
-        """WITH RECURSIVE descendants AS (
-               SELECT sub_tag_id AS id FROM tag_hierarchy WHERE super_tag_id = %(sub_id)s
-               UNION ALL
-               SELECT th.sub_tag_id FROM tag_hierarchy th JOIN descendants d ON th.super_tag_id = d.id
-           )
-           SELECT COUNT(*) AS cnt FROM descendants WHERE id = %(super_id)s""",
-        {"sub_id": sub_tag_id, "super_id": super_tag_id},
-        return_type="single_row"
-    )
-    return bool(row and row["cnt"] > 0)
-
-
 def add_hierarchy(super_tag_id: int, sub_tag_id: int, notes: Optional[str]) -> ITagHierarchyEntry:
-    db.execute_query(
-        "INSERT INTO tag_hierarchy (super_tag_id, sub_tag_id, notes) VALUES (%(super_id)s, %(sub_id)s, %(notes)s)",
-        {"super_id": super_tag_id, "sub_id": sub_tag_id, "notes": notes},
-        return_type="none"
-    )
+    """Raises ValueError if adding super→sub would create a cycle (super is sub or one of its descendants)."""
+    with db.transaction_batch():
+        children = lock_hierarchy()
+        if reaches(children, sub_tag_id, super_tag_id):
+            raise ValueError("Would create a cycle in tag hierarchy")
+        db.execute_query(
+            "INSERT INTO tag_hierarchy (super_tag_id, sub_tag_id, notes) VALUES (%(super_id)s, %(sub_id)s, %(notes)s)",
+            {"super_id": super_tag_id, "sub_id": sub_tag_id, "notes": notes},
+            return_type="none"
+        )
+        children.setdefault(super_tag_id, set()).add(sub_tag_id)
+        refresh_closure(children, [sub_tag_id])
+    invalidate_search_cache()
     return ITagHierarchyEntry(super_tag_id=super_tag_id, sub_tag_id=sub_tag_id, notes=notes)
 
 
 def remove_hierarchy(super_tag_id: int, sub_tag_id: int) -> bool:
-    db.execute_query(
-        "DELETE FROM tag_hierarchy WHERE super_tag_id = %(super_id)s AND sub_tag_id = %(sub_id)s",
-        {"super_id": super_tag_id, "sub_id": sub_tag_id},
-        return_type="none"
-    )
+    with db.transaction_batch():
+        children = lock_hierarchy()
+        db.execute_query(
+            "DELETE FROM tag_hierarchy WHERE super_tag_id = %(super_id)s AND sub_tag_id = %(sub_id)s",
+            {"super_id": super_tag_id, "sub_id": sub_tag_id},
+            return_type="none"
+        )
+        children.get(super_tag_id, set()).discard(sub_tag_id)
+        refresh_closure(children, [sub_tag_id])
+    invalidate_search_cache()
     return True
 
 
@@ -467,20 +465,20 @@ def upsert_tag(name: str, description: Optional[str], tag_type_id: Optional[int]
 
 def add_hierarchy_ignore_duplicate(super_tag_id: int, sub_tag_id: int) -> str:
     """Returns 'added', 'exists', or 'cycle'."""
-    if would_create_cycle(super_tag_id, sub_tag_id):
-        return "cycle"
-    existing = db.execute_query(
-        "SELECT id FROM tag_hierarchy WHERE super_tag_id = %(super_id)s AND sub_tag_id = %(sub_id)s",
-        {"super_id": super_tag_id, "sub_id": sub_tag_id},
-        return_type="single_row"
-    )
-    if existing:
-        return "exists"
-    db.execute_query(
-        "INSERT INTO tag_hierarchy (super_tag_id, sub_tag_id) VALUES (%(super_id)s, %(sub_id)s)",
-        {"super_id": super_tag_id, "sub_id": sub_tag_id},
-        return_type="none"
-    )
+    with db.transaction_batch():
+        children = lock_hierarchy()
+        if reaches(children, sub_tag_id, super_tag_id):
+            return "cycle"
+        if sub_tag_id in children.get(super_tag_id, ()):
+            return "exists"
+        db.execute_query(
+            "INSERT INTO tag_hierarchy (super_tag_id, sub_tag_id) VALUES (%(super_id)s, %(sub_id)s)",
+            {"super_id": super_tag_id, "sub_id": sub_tag_id},
+            return_type="none"
+        )
+        children.setdefault(super_tag_id, set()).add(sub_tag_id)
+        refresh_closure(children, [sub_tag_id])
+    invalidate_search_cache()
     return "added"
 
 
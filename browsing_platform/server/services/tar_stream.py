@@ -0,0 +1,272 @@
+"""
+Streaming extraction of tar-mode TUS uploads.
+
+Instead of staging the whole `_upload.tar` and extracting it after the last
+chunk, each PATCH is fed to a TarStreamExtractor that parses tar headers as
+the bytes arrive and writes member data straight to its final place in the
+staging archive directory, hashing it on the way. When the last byte lands
+every member is on disk with its SHA-256 known, so verification only compares
+digests against `_manifest.json` and commit can move the directory right away.
+
+The parser is a small state machine whose state is a JSON-serializable dict
+stored in the upload's TUS state file after every chunk, so an upload can be
+resumed by any process. Completed members are appended to a `<file_id>.members`
+log (one JSON object per line) rather than kept in the state, which would
+otherwise be rewritten in full on every PATCH. The only thing that cannot be
+persisted is the SHA-256 of the member being written when a chunk ends; a
+process that resumes mid-member re-hashes the part of that one member already
+on disk.
+
+Supported entries are what the upload page produces and what tarfile would
+accept for a data-only archive: regular files, GNU long names (`L`) and pax
+extended headers (`x`, for `path` and `size`; global `g` headers are skipped).
+Anything else fails the upload the same way the old extract-then-verify path
+did (`not_a_regular_file`, `invalid_path`, `tar_error: ...`).
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import tarfile
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = tarfile.BLOCKSIZE
+_REGULAR_TYPES = (tarfile.REGTYPE, tarfile.AREGTYPE, tarfile.CONTTYPE)
+_MANIFEST_NAME = "_manifest.json"
+
+# Hash of the member currently being written, per upload: (name, bytes hashed, sha256)
+_open_member_hashes: dict[str, tuple[str, int, "hashlib._Hash"]] = {}
+_open_member_hashes_lock = threading.Lock()
+
+
+def initial_state() -> dict:
+    return {
+        "phase": "header",   # header | data | longname | pax | skip | end | failed
+        "buf": "",           # base64 of a partial header block or long-name / pax payload
+        "remaining": 0,      # bytes left in the current data / longname / pax / skip section
+        "padding": 0,        # zero padding after the current section
+        "member": None,      # {"name", "size", "written", "mtime"} while in the data phase
+        "next_name": None,   # from a preceding GNU long-name or pax header
+        "next_size": None,   # from a preceding pax header
+        "zero_blocks": 0,
+        "error": None,       # {"path", "status"} once the stream has failed
+    }
+
+
+def _padding(size: int) -> int:
+    return (BLOCK_SIZE - size % BLOCK_SIZE) % BLOCK_SIZE
+
+
+def _parse_pax(payload: bytes) -> dict[str, str]:
+    """Records of a pax extended header: '<len> <key>=<value>\\n' repeated."""
+    records = {}
+    pos = 0
+    while pos < len(payload):
+        space = payload.index(b" ", pos)
+        length = int(payload[pos:space])
+        key, _, value = payload[space + 1:pos + length - 1].partition(b"=")
+        records[key.decode("utf-8")] = value.decode("utf-8", "surrogateescape")
+        pos += length
+    return records
+
+
+def read_member_log(log_path: Path) -> dict[str, str]:
+    """name -> SHA-256 of every member written so far (a later duplicate wins, as in extraction)."""
+    hashes: dict[str, str] = {}
+    if log_path.exists():
+        for line in log_path.read_text(encoding="utf-8").splitlines():
+            if line:
+                entry = json.loads(line)
+                hashes[entry["name"]] = entry["sha256"]
+    return hashes
+
+
+def discard(upload_id: str) -> None:
+    with _open_member_hashes_lock:
+        _open_member_hashes.pop(upload_id, None)
+
+
+class TarStreamExtractor:
+    def __init__(
+        self,
+        upload_id: str,
+        state: dict,
+        resolve_path: Callable[[str], Path],
+        is_valid_path: Callable[[str], bool],
+        member_log: Path,
+    ):
+        self.upload_id = upload_id
+        self.state = state
+        self._resolve_path = resolve_path
+        self._is_valid_path = is_valid_path
+        self._member_log = member_log
+        self._buf = bytearray(base64.b64decode(state["buf"]))
+
+    def feed(self, data: bytes) -> None:
+        view = memoryview(data)
+        while view and self.state["phase"] not in ("end", "failed"):
+            phase = self.state["phase"]
+            if phase == "header":
+                view = self._fill(view, BLOCK_SIZE)
+                if len(self._buf) == BLOCK_SIZE:
+                    block = bytes(self._buf)
+                    self._buf.clear()
+                    self._on_header(block)
+            elif phase == "data":
+                view = self._write_data(view)
+            elif phase in ("longname", "pax"):
+                view = self._fill(view, self.state["remaining"])
+                if len(self._buf) == self.state["remaining"]:
+                    self._on_extended_header(phase, bytes(self._buf))
+                    self._buf.clear()
+            else:  # skip
+                take = min(self.state["remaining"], len(view))
+                view = view[take:]
+                self.state["remaining"] -= take
+                if self.state["remaining"] == 0:
+                    self.state["phase"] = "header"
+        self.state["buf"] = base64.b64encode(self._buf).decode("ascii")
+
+    @property
+    def complete(self) -> bool:
+        """True once the end-of-archive marker was read, or the stream stopped at an entry
+        boundary (tarfile also accepts archives without the trailing zero blocks)."""
+        return self.state["phase"] == "end" or (self.state["phase"] == "header" and not self._buf)
+
+    # ------------------------------------------------------------------
+
+    def _fill(self, view: memoryview, target: int) -> memoryview:
+        take = min(target - len(self._buf), len(view))
+        self._buf += view[:take]
+        return view[take:]
+
+    def _fail(self, path: str, status: str) -> None:
+        logger.warning(f"Tar upload {self.upload_id} rejected at {path!r}: {status}")
+        self.state["phase"] = "failed"
+        self.state["error"] = {"path": path, "status": status}
+        self.state["member"] = None
+        discard(self.upload_id)
+
+    def _skip_then_header(self, padding: int) -> None:
+        self.state["remaining"] = padding
+        self.state["phase"] = "skip" if padding else "header"
+
+    def _on_header(self, block: bytes) -> None:
+        if block == bytes(BLOCK_SIZE):
+            self.state["zero_blocks"] += 1
+            if self.state["zero_blocks"] == 2:
+                self.state["phase"] = "end"
+            return
+        self.state["zero_blocks"] = 0
+        try:
+            info = tarfile.TarInfo.frombuf(block, "utf-8", "surrogateescape")
+        except tarfile.HeaderError as exc:
+            self._fail("_upload.tar", f"tar_error: {exc}")
+            return
+
+        if info.type in (tarfile.GNUTYPE_LONGNAME, tarfile.XHDTYPE):
+            self.state["phase"] = "longname" if info.type == tarfile.GNUTYPE_LONGNAME else "pax"
+            self.state["remaining"] = info.size
+            self.state["padding"] = _padding(info.size)
+            if info.size == 0:
+                self._on_extended_header(self.state["phase"], b"")
+            return
+        if info.type == tarfile.XGLTYPE:
+            self._skip_then_header(info.size + _padding(info.size))
+            return
+
+        name = self.state["next_name"] or info.name
+        size = self.state["next_size"] if self.state["next_size"] is not None else info.size
+        self.state["next_name"] = None
+        self.state["next_size"] = None
+        if info.type not in _REGULAR_TYPES:
+            self._fail(name, "not_a_regular_file")
+            return
+        if name != _MANIFEST_NAME and not self._is_valid_path(name):
+            self._fail(name, "invalid_path")
+            return
+        try:
+            target = self._resolve_path(name)
+        except ValueError:
+            self._fail(name, "invalid_path")
+            return
+
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.open("wb").close()
+        self.state["member"] = {"name": name, "size": size, "written": 0, "mtime": info.mtime}
+        self.state["padding"] = _padding(size)
+        with _open_member_hashes_lock:
+            _open_member_hashes[self.upload_id] = (name, 0, hashlib.sha256())
+        if size == 0:
+            self._finish_member(target)
+        else:
+            self.state["phase"] = "data"
+            self.state["remaining"] = size
+
+    def _on_extended_header(self, phase: str, payload: bytes) -> None:
+        if phase == "longname":
+            self.state["next_name"] = payload.split(b"\0", 1)[0].decode("utf-8", "surrogateescape")
+        else:
+            try:
+                records = _parse_pax(payload)
+            except (ValueError, UnicodeDecodeError) as exc:
+                self._fail("_upload.tar", f"tar_error: invalid pax header ({exc})")
+                return
+            if "path" in records:
+                self.state["next_name"] = records["path"]
+            if "size" in records:
+                self.state["next_size"] = int(records["size"])
+        self._skip_then_header(self.state["padding"])
+
+    def _member_hash(self, target: Path) -> "hashlib._Hash":
+        """Running hash of the current member, rebuilt from disk if this process lost it."""
+        member = self.state["member"]
+        with _open_member_hashes_lock:
+            cached = _open_member_hashes.get(self.upload_id)
+        if cached is not None and cached[0] == member["name"] and cached[1] == member["written"]:
+            return cached[2]
+        sha256 = hashlib.sha256()
+        remaining = member["written"]
+        with open(target, "rb") as f:
+            while remaining:
+                chunk = f.read(min(remaining, 1 << 20))
+                if not chunk:
+                    break
+                sha256.update(chunk)
+                remaining -= len(chunk)
+        return sha256
+
+    def _write_data(self, view: memoryview) -> memoryview:
+        member = self.state["member"]
+        target = self._resolve_path(member["name"])
+        sha256 = self._member_hash(target)
+        take = min(self.state["remaining"], len(view))
+        piece = view[:take]
+        with open(target, "r+b") as f:
+            f.seek(member["written"])
+            f.write(piece)
+        sha256.update(piece)
+        member["written"] += take
+        self.state["remaining"] -= take
+        with _open_member_hashes_lock:
+            _open_member_hashes[self.upload_id] = (member["name"], member["written"], sha256)
+        if self.state["remaining"] == 0:
+            self._finish_member(target)
+        return view[take:]
+
+    def _finish_member(self, target: Path) -> None:
+        member = self.state["member"]
+        with _open_member_hashes_lock:
+            _, _, sha256 = _open_member_hashes.pop(self.upload_id)
+        # Drop bytes left behind by a PATCH that was written but never acknowledged
+        os.truncate(target, member["size"])
+        os.utime(target, (member["mtime"], member["mtime"]))
+        with open(self._member_log, "a", encoding="utf-8") as log:
+            log.write(json.dumps({"name": member["name"], "sha256": sha256.hexdigest()}) + "\n")
+        self.state["member"] = None
+        self._skip_then_header(self.state["padding"])
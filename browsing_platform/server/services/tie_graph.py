@@ -0,0 +1,444 @@
+"""
+In-memory weighted tie graph for community detection.
+
+Community scoring asks "how strongly is each account tied to this kernel?"
+where a tie is a follow / suggested relation, a like, a comment, or a tag
+between two accounts (see ``_build_score_sql`` in community.py for the SQL
+definition). Instead of re-running that 12-branch UNION per request, this
+module keeps every tie in a symmetric CSR adjacency structure:
+
+    node_ids  sorted account ids that have at least one tie      (int64, n)
+    indptr    row offsets into nbr_pos / masks                   (int64, n+1)
+    nbr_pos   neighbour positions in node_ids                    (int32, e)
+    masks     tie types present between the pair, one bit each   (uint8, e)
+
+Each unordered pair is stored once per direction. Per-pair strength under a
+``TieWeights`` is the MAX weight over the tie types present, looked up from a
+32-entry table indexed by the mask, which keeps the SQL semantics (a pair that
+both follows and likes counts once, at the larger weight). Scoring a kernel is
+then a gather over the kernel's rows plus a bincount.
+
+The graph is built on first use (or warmed at startup) by paging through the
+four tie tables by primary key, and refreshed incrementally every
+``REFRESH_INTERVAL_SECONDS``: only rows with an id above the last one seen are
+read and merged in. That misses rows changed in place or deleted, which is
+exactly what incorporation does when re-synthesis re-points comments, likes
+and relations to other accounts, so ``mark_stale()`` (called when an
+incorporation job finishes) makes the next query rebuild the graph in full.
+Other writes of that kind (CLI loader, manual SQL) are picked up by the full
+rebuild every ``FULL_REBUILD_INTERVAL_SECONDS``. While a refresh is running,
+queries keep using the previous snapshot.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from browsing_platform.server.services import cache_invalidation
+from utils import db
+
+logger = logging.getLogger(__name__)
+
+TIE_TYPES = ("follow", "suggested", "like", "comment", "tag")
+_TIE_BIT = {t: 1 << i for i, t in enumerate(TIE_TYPES)}
+SUGGESTED_RELATION_TYPE = "suggested"
+
+REFRESH_INTERVAL_SECONDS = 60
+FULL_REBUILD_INTERVAL_SECONDS = 6 * 3600
+LOAD_CHUNK_ROWS = 200_000
+
+# Per tie table: SELECT returning (id, a, b[, b2]) for rows with id > %(after)s.
+# Both sides must be non-null for a tie to exist, as in the SQL scoring query.
+_TIE_SOURCES: dict[str, str] = {
+    "account_relation": """
+        SELECT id, follower_account_id AS a, followed_account_id AS b,
+               (relation_type <=> %(suggested_type)s) AS is_suggested
+        FROM account_relation
+        WHERE id > %(after)s
+        ORDER BY id
+        LIMIT %(limit)s""",
+    "post_like": """
+        SELECT pl.id, pl.account_id AS a, p.account_id AS b
+        FROM post_like pl
+        JOIN post p ON pl.post_id = p.id
+        WHERE pl.id > %(after)s
+        ORDER BY pl.id
+        LIMIT %(limit)s""",
+    "comment": """
+        SELECT c.id, c.account_id AS a, p.account_id AS b
+        FROM comment c
+        JOIN post p ON c.post_id = p.id
+        WHERE c.id > %(after)s
+        ORDER BY c.id
+        LIMIT %(limit)s""",
+    "tagged_account": """
+        SELECT ta.id, ta.tagged_account_id AS a, p.account_id AS b, m.account_id AS b2
+        FROM tagged_account ta
+        LEFT JOIN post p ON ta.post_id = p.id
+        LEFT JOIN media m ON ta.media_id = m.id
+        WHERE ta.id > %(after)s
+        ORDER BY ta.id
+        LIMIT %(limit)s""",
+}
+
+
+def _pair_keys(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return (a.astype(np.int64) << 32) | b.astype(np.int64)
+
+
+def strength_lut(weights: dict[str, float]) -> np.ndarray:
+    """Pair strength for every tie-type mask: the max weight over the types present."""
+    lut = np.zeros(1 << len(TIE_TYPES), dtype=np.float64)
+    for mask in range(1, len(lut)):
+        lut[mask] = max(weights[t] for t in TIE_TYPES if mask & _TIE_BIT[t])
+    return lut
+
+
+@dataclass(frozen=True)
+class TieGraphSnapshot:
+    node_ids: np.ndarray
+    indptr: np.ndarray
+    nbr_pos: np.ndarray
+    masks: np.ndarray
+
+    @property
+    def node_count(self) -> int:
+        return len(self.node_ids)
+
+    def positions(self, account_ids) -> np.ndarray:
+        """Positions in node_ids of the given accounts; accounts without ties are dropped."""
+        ids = np.unique(np.asarray(list(account_ids), dtype=np.int64))
+        if len(ids) == 0 or self.node_count == 0:
+            return np.empty(0, dtype=np.int64)
+        pos = np.searchsorted(self.node_ids, ids)
+        pos = np.minimum(pos, self.node_count - 1)
+        return pos[self.node_ids[pos] == ids]
+
+    def edges_of(self, rows: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """(source row, edge index) of every edge leaving the given rows."""
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return np.repeat(rows, lengths), offsets + np.arange(total)
+
+
+@dataclass(frozen=True)
+class PersonalizedPageRank:
+    """Ranked accounts (parallel lists) plus how the power iteration ended."""
+    ids: list[int]
+    scores: list[float]
+    hops: list[int]
+    seed_connections: list[int]
+    iterations: int
+    converged: bool
+    subgraph_size: int
+
+    @staticmethod
+    def empty() -> "PersonalizedPageRank":
+        return PersonalizedPageRank(ids=[], scores=[], hops=[], seed_connections=[],
+                                    iterations=0, converged=True, subgraph_size=0)
+
+
+_EMPTY_SNAPSHOT = TieGraphSnapshot(
+    node_ids=np.empty(0, dtype=np.int64),
+    indptr=np.zeros(1, dtype=np.int64),
+    nbr_pos=np.empty(0, dtype=np.int32),
+    masks=np.empty(0, dtype=np.uint8),
+)
+
+
+class TieGraph:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Sorted directed pair keys (a << 32 | b) and their tie-type masks; the
+        # CSR snapshot is derived from these after every merge.
+        self._keys = np.empty(0, dtype=np.int64)
+        self._masks = np.empty(0, dtype=np.uint8)
+        self._watermarks: dict[str, int] = {table: 0 for table in _TIE_SOURCES}
+        self._snapshot = _EMPTY_SNAPSHOT
+        self._loaded = False
+        # Full rebuild requested by mark_stale()
+        self._stale = True
+        self._last_refresh_monotonic = 0.0
+        self._last_full_load_monotonic = 0.0
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _read_new_ties(watermarks: dict[str, int]) -> tuple[np.ndarray, np.ndarray, int]:
+        """Read tie rows above the per-table id watermarks, advancing them in place;
+        returns (directed pair keys, masks, rows read)."""
+        key_parts: list[np.ndarray] = []
+        mask_parts: list[np.ndarray] = []
+        rows_read = 0
+        for table, sql in _TIE_SOURCES.items():
+            while True:
+                rows = db.execute_query(
+                    sql,
+                    {"after": watermarks[table], "limit": LOAD_CHUNK_ROWS,
+                     "suggested_type": SUGGESTED_RELATION_TYPE},
+                    "rows"
+                ) or []
+                if not rows:
+                    break
+                rows_read += len(rows)
+                watermarks[table] = rows[-1]["id"]
+                if table == "account_relation":
+                    pairs = [(r["a"], r["b"], _TIE_BIT["suggested"] if r["is_suggested"] else _TIE_BIT["follow"])
+                             for r in rows]
+                elif table == "tagged_account":
+                    pairs = [(r["a"], r[col], _TIE_BIT["tag"]) for r in rows for col in ("b", "b2")]
+                else:
+                    bit = _TIE_BIT["like" if table == "post_like" else "comment"]
+                    pairs = [(r["a"], r["b"], bit) for r in rows]
+                pairs = [p for p in pairs if p[0] is not None and p[1] is not None and p[0] != p[1]]
+                if pairs:
+                    arr = np.array(pairs, dtype=np.int64)
+                    a, b, bits = arr[:, 0], arr[:, 1], arr[:, 2].astype(np.uint8)
+                    # Ties are symmetric: store both directions
+                    key_parts.append(np.concatenate([_pair_keys(a, b), _pair_keys(b, a)]))
+                    mask_parts.append(np.concatenate([bits, bits]))
+                if len(rows) < LOAD_CHUNK_ROWS:
+                    break
+        if not key_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8), rows_read
+        return np.concatenate(key_parts), np.concatenate(mask_parts), rows_read
+
+    @staticmethod
+    def _merge(keys: np.ndarray, masks: np.ndarray, new_keys: np.ndarray, new_masks: np.ndarray):
+        all_keys = np.concatenate([keys, new_keys])
+        all_masks = np.concatenate([masks, new_masks])
+        order = np.argsort(all_keys, kind="stable")
+        all_keys, all_masks = all_keys[order], all_masks[order]
+        starts = np.flatnonzero(np.r_[True, all_keys[1:] != all_keys[:-1]])
+        return all_keys[starts], np.bitwise_or.reduceat(all_masks, starts)
+
+    @staticmethod
+    def _build_snapshot(keys: np.ndarray, masks: np.ndarray) -> TieGraphSnapshot:
+        if len(keys) == 0:
+            return _EMPTY_SNAPSHOT
+        src = keys >> 32
+        dst = keys & 0xFFFFFFFF
+        node_ids = src[np.flatnonzero(np.r_[True, src[1:] != src[:-1]])]
+        indptr = np.append(np.searchsorted(src, node_ids), len(src)).astype(np.int64)
+        nbr_pos = np.searchsorted(node_ids, dst).astype(np.int32)
+        return TieGraphSnapshot(node_ids=node_ids, indptr=indptr, nbr_pos=nbr_pos, masks=masks)
+
+    def _refresh(self, full: bool) -> None:
+        t = time.perf_counter()
+        if full:
+            watermarks = {table: 0 for table in _TIE_SOURCES}
+            keys, masks = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.uint8)
+        else:
+            watermarks = dict(self._watermarks)
+            keys, masks = self._keys, self._masks
+        new_keys, new_masks, rows_read = self._read_new_ties(watermarks)
+        if full or len(new_keys):
+            self._keys, self._masks = self._merge(keys, masks, new_keys, new_masks)
+            self._snapshot = self._build_snapshot(self._keys, self._masks)
+        self._watermarks = watermarks
+        if full:
+            self._loaded = True
+            self._last_full_load_monotonic = time.monotonic()
+            logger.info(f"Tie graph loaded: {self._snapshot.node_count} accounts, "
+                        f"{len(self._keys) // 2} tied pairs in {time.perf_counter() - t:.2f}s")
+        elif rows_read:
+            logger.debug(f"Tie graph refreshed: {rows_read} new tie rows in {time.perf_counter() - t:.2f}s")
+
+    def _ensure_fresh(self) -> TieGraphSnapshot:
+        now = time.monotonic()
+        if self._loaded and not self._stale and now - self._last_refresh_monotonic < REFRESH_INTERVAL_SECONDS:
+            return self._snapshot
+        # Once loaded, never make a query wait for a refresh another thread is running
+        if not self._lock.acquire(blocking=not self._loaded):
+            return self._snapshot
+        try:
+            now = time.monotonic()
+            full_due = now - self._last_full_load_monotonic >= FULL_REBUILD_INTERVAL_SECONDS
+            refresh_due = now - self._last_refresh_monotonic >= REFRESH_INTERVAL_SECONDS
+            # Cleared before the rebuild, so a mark_stale() arriving during it is not lost
+            rebuild_requested, self._stale = self._stale, False
+            try:
+                if not self._loaded or full_due or rebuild_requested:
+                    self._refresh(full=True)
+                elif refresh_due:
+                    self._refresh(full=False)
+            except Exception:
+                self._stale = self._stale or rebuild_requested
+                raise
+            self._last_refresh_monotonic = time.monotonic()
+            return self._snapshot
+        finally:
+            self._lock.release()
+
+    def mark_stale(self) -> None:
+        """Rebuild the graph on the next query (e.g. after an incorporation job, which can
+        re-point existing tie rows to other accounts; an incremental refresh would miss that)."""
+        self._stale = True
+
+    def warm(self) -> None:
+        try:
+            self._ensure_fresh()
+        except Exception:
+            logger.exception("Tie graph warm-up failed; it will be loaded on first use")
+
+    def snapshot(self) -> TieGraphSnapshot:
+        return self._ensure_fresh()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def score_kernel_ties(
+            self,
+            kernel_ids: list[int],
+            weights: dict[str, float],
+            candidate_ids: Optional[list[int]] = None,
+            excluded_ids: Optional[list[int]] = None,
+            limit: Optional[int] = None,
+    ) -> list[tuple[int, float, int]]:
+        """[(candidate_id, score, kernel_connections)] by score descending, ties by id.
+
+        A candidate's score is the sum over kernel members of the pair strength;
+        kernel_connections counts the kernel members it has any tie with.
+        Candidates are restricted to ``candidate_ids`` when given, otherwise every
+        neighbour not in ``excluded_ids``. Only positive scores are returned.
+        """
+        g = self.snapshot()
+        rows = g.positions(kernel_ids)
+        _, edges = g.edges_of(rows)
+        if len(edges) == 0:
+            return []
+        nbr_ids = g.node_ids[g.nbr_pos[edges]]
+        strengths = strength_lut(weights)[g.masks[edges]]
+        if candidate_ids is not None:
+            keep = np.isin(nbr_ids, np.asarray(candidate_ids, dtype=np.int64))
+        else:
+            keep = ~np.isin(nbr_ids, np.asarray(excluded_ids or [], dtype=np.int64))
+        nbr_ids, strengths = nbr_ids[keep], strengths[keep]
+        if len(nbr_ids) == 0:
+            return []
+        cand, inverse = np.unique(nbr_ids, return_inverse=True)
+        scores = np.bincount(inverse, weights=strengths, minlength=len(cand))
+        # Each kernel row lists a neighbour at most once, so the edge count is the
+        # number of distinct kernel members tied to the candidate.
+        connections = np.bincount(inverse, minlength=len(cand))
+        positive = scores > 0
+        cand, scores, connections = cand[positive], scores[positive], connections[positive]
+        order = np.lexsort((cand, -scores))
+        if limit is not None:
+            order = order[:limit]
+        return [(int(cand[i]), float(scores[i]), int(connections[i])) for i in order]
+
+    def personalized_pagerank(
+            self,
+            seed_ids: list[int],
+            weights: dict[str, float],
+            blocked_ids: Optional[list[int]] = None,
+            max_hops: int = 3,
+            restart_probability: float = 0.15,
+            max_iterations: int = 100,
+            tolerance: float = 1e-4,
+            time_budget_seconds: float = 5.0,
+            limit: Optional[int] = None,
+    ) -> PersonalizedPageRank:
+        """Random walk with restart from the seed accounts over the weighted tie graph.
+
+        The walk runs on the subgraph within ``max_hops`` of the seeds, following
+        only ties with a positive strength under ``weights``; a step moves to a
+        neighbour with probability proportional to the pair strength, and at every
+        step the walker jumps back to a uniformly chosen seed with probability
+        ``restart_probability`` (or always, from a node with no usable ties).
+        Blocked accounts are removed from the graph, so the walk does not pass
+        through them. Power iteration stops at ``tolerance`` (L1 change), after
+        ``max_iterations``, or when ``time_budget_seconds`` runs out; seeds are
+        not returned. The L1 change shrinks by about (1 - restart_probability) per
+        iteration from at most 2, so the defaults converge after ~60 iterations at
+        the default restart probability of 0.15.
+        """
+        start = time.monotonic()
+        g = self.snapshot()
+        seeds = g.positions(seed_ids)
+        if len(seeds) == 0:
+            return PersonalizedPageRank.empty()
+        lut = np.maximum(strength_lut(weights), 0)
+
+        # Breadth-first expansion to the hop-limited neighbourhood
+        hops = np.full(g.node_count, -1, dtype=np.int16)
+        blocked = np.zeros(g.node_count, dtype=bool)
+        blocked[g.positions(blocked_ids or [])] = True
+        blocked[seeds] = False
+        hops[seeds] = 0
+        frontier = seeds
+        for hop in range(1, max_hops + 1):
+            _, edges = g.edges_of(frontier)
+            nbrs = np.unique(g.nbr_pos[edges][lut[g.masks[edges]] > 0])
+            frontier = nbrs[(hops[nbrs] < 0) & ~blocked[nbrs]]
+            if len(frontier) == 0:
+                break
+            hops[frontier] = hop
+        sub = np.flatnonzero(hops >= 0)
+
+        # Local weighted edge list of the induced subgraph
+        src_rows, edges = g.edges_of(sub)
+        dst_rows = g.nbr_pos[edges]
+        strengths = lut[g.masks[edges]]
+        keep = (strengths > 0) & (hops[dst_rows] >= 0)
+        local_src = np.searchsorted(sub, src_rows[keep])
+        local_dst = np.searchsorted(sub, dst_rows[keep])
+        strengths = strengths[keep]
+        m = len(sub)
+        out_strength = np.bincount(local_src, weights=strengths, minlength=m)
+        transition = strengths / out_strength[local_src]
+        dangling = out_strength == 0
+
+        restart = np.zeros(m)
+        restart[np.searchsorted(sub, seeds)] = 1 / len(seeds)
+        rank = restart.copy()
+        iterations = 0
+        converged = False
+        while iterations < max_iterations:
+            iterations += 1
+            flow = np.bincount(local_dst, weights=rank[local_src] * transition, minlength=m)
+            flow += rank[dangling].sum() * restart
+            new_rank = restart_probability * restart + (1 - restart_probability) * flow
+            delta = np.abs(new_rank - rank).sum()
+            rank = new_rank
+            if delta < tolerance:
+                converged = True
+                break
+            if time.monotonic() - start >= time_budget_seconds:
+                break
+
+        # Direct ties to the seeds (any tie type), for display next to the rank
+        _, seed_edges = g.edges_of(seeds)
+        seed_ties = np.bincount(g.nbr_pos[seed_edges], minlength=g.node_count)
+
+        candidates = np.flatnonzero((hops[sub] > 0) & (rank > 0))
+        order = candidates[np.lexsort((g.node_ids[sub[candidates]], -rank[candidates]))]
+        if limit is not None:
+            order = order[:limit]
+        rows = sub[order]
+        return PersonalizedPageRank(
+            ids=[int(i) for i in g.node_ids[rows]],
+            scores=[float(r) for r in rank[order]],
+            hops=[int(h) for h in hops[rows]],
+            seed_connections=[int(c) for c in seed_ties[rows]],
+            iterations=iterations,
+            converged=converged,
+            subgraph_size=m,
+        )
+
+
+# Module-level singleton
+tie_graph = TieGraph()
+cache_invalidation.register("tie_graph", lambda _params: tie_graph.mark_stale())
@@ -1,15 +1,33 @@
+import logging
 import string
+import threading
+import time
 from datetime import timedelta, datetime
 from secrets import choice
 from typing import Optional
 
 from pydantic import BaseModel
 
+from browsing_platform.server.services import cache_invalidation
+from browsing_platform.server.services.ttl_cache import TTLCache
 from utils import db
 
+logger = logging.getLogger(__name__)
+
 TOKEN_LENGTH = 30
 TOKEN_EXPIRY = timedelta(days=30)
 
+# Valid tokens are cached per process so authenticated requests (including every
+# /archives and /thumbnails hit) skip the token lookup. Logout and
+# remove_all_tokens_for_user() invalidate explicitly, in every worker process
+# (see cache_invalidation); the TTL is the fallback if that relay is down.
+TOKEN_CACHE_TTL_SECONDS = 60
+TOKEN_CACHE_MAX_ENTRIES = 10_000
+# last_use only drives the 30-day sliding expiry, so it is written behind:
+# tokens used since the last flush are touched in one UPDATE at most this often.
+LAST_USE_FLUSH_SECONDS = 30
+_LAST_USE_FLUSH_CHUNK = 500
+
 class Token(BaseModel):
     id: Optional[int]
     user_id: int
@@ -35,10 +53,48 @@ class AuthTokenResponse(BaseModel):
     permissions: bool
 
 
+_token_cache: TTLCache[str, TokenPermissions] = TTLCache(TOKEN_CACHE_MAX_ENTRIES, TOKEN_CACHE_TTL_SECONDS)
+_pending_last_use: set[str] = set()
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _touch_last_use(token: str) -> None:
+    global _last_flush
+    with _pending_lock:
+        _pending_last_use.add(token)
+        due = time.monotonic() - _last_flush >= LAST_USE_FLUSH_SECONDS
+    if due:
+        flush_last_use()
+
+
+def flush_last_use() -> None:
+    """Write queued last_use touches to the DB (one UPDATE per chunk of tokens)."""
+    global _last_flush
+    with _pending_lock:
+        tokens = list(_pending_last_use)
+        _pending_last_use.clear()
+        _last_flush = time.monotonic()
+    for i in range(0, len(tokens), _LAST_USE_FLUSH_CHUNK):
+        chunk = tokens[i:i + _LAST_USE_FLUSH_CHUNK]
+        placeholders = ", ".join(["%s"] * len(chunk))
+        try:
+            db.execute_query(
+                f"UPDATE token SET last_use = NOW() WHERE token IN ({placeholders})",
+                chunk, "none"
+            )
+        except Exception as e:
+            logger.warning(f"Failed to flush last_use for {len(chunk)} token(s): {e}")
+
+
 def check_token(token: Optional[str]) -> TokenPermissions:
     try:
         if not token:
             return TokenPermissions(valid=False, admin=False, user_id=None)
+        cached = _token_cache.get(token)
+        if cached is not None:
+            _touch_last_use(token)
+            return cached
         token_check = db.execute_query(
             '''SELECT token.*, u.admin, u.id as user_id FROM token JOIN user AS u ON token.user_id = u.id
             WHERE token = %(token)s'''
@@ -49,22 +105,43 @@ def check_token(token: Optional[str]) -> TokenPermissions:
         else:
             token = Token(**token_check)
             if token.last_use > datetime.now() - TOKEN_EXPIRY:
-                db.execute_query(
-                    "UPDATE token SET last_use = NOW() WHERE token = %(token)s",
-                    {"token": token.token}, "none"
-                )
-                return TokenPermissions(valid=True, admin=(token.admin ==1), user_id=token.user_id)
+                permissions = TokenPermissions(valid=True, admin=(token.admin ==1), user_id=token.user_id)
+                _token_cache.set(token.token, permissions)
+                _touch_last_use(token.token)
+                return permissions
             return TokenPermissions(valid=False, admin=False, user_id=None)
     except Exception:
         return TokenPermissions(valid=False, admin=False, user_id=None)
 
 
+def _drop_cached_tokens(params: dict) -> None:
+    if params.get("user_id") is not None:
+        _token_cache.remove_where(lambda _, perms: perms.user_id == params["user_id"])
+    else:
+        digest = params["token_digest"]
+        _token_cache.remove_where(lambda token, _: cache_invalidation.key_digest(token) == digest)
+
+
+cache_invalidation.register("token", _drop_cached_tokens)
+
+
+def invalidate_cached_token(token: str) -> None:
+    cache_invalidation.invalidate("token", token_digest=cache_invalidation.key_digest(token))
+
+
+def invalidate_cached_tokens_for_user(user_id: int) -> None:
+    """Drop cached permissions for every token of a user (after revocation or a role change)."""
+    cache_invalidation.invalidate("token", user_id=user_id)
+
+
 def remove_token(token: str):
     db.execute_query(
         '''DELETE FROM token
         WHERE token = %(token)s'''
         , {"token": token}, "none"
     )
+    # After the delete: a check_token() in between would cache the row again
+    invalidate_cached_token(token)
     return True
 
 
@@ -73,3 +150,4 @@ def remove_all_tokens_for_user(user_id: int) -> None:
         "DELETE FROM token WHERE user_id = %(uid)s",
         {"uid": user_id}, "none"
     )
+    invalidate_cached_tokens_for_user(user_id)
@@ -5,19 +5,62 @@ import os
 import re
 import shutil
 import socket
-import sys
 import tarfile as _tarfile
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional
 
+try:
+    import fcntl
+except ImportError:  # Windows (development server): a single process, see _upload_write_lock()
+    fcntl = None
+
+from browsing_platform.server.services import tar_stream
 from utils import db
+from utils.integrity.chunk_manifest import DEFAULT_CHUNK_SIZE, merkle_root_hex
 
 logger = logging.getLogger(__name__)
 
 _ARCHIVE_NAME_RE = re.compile(r'^[a-zA-Z0-9][a-zA-Z0-9_\-]*$')
 _TUS_STATE_DIR = ".tus_state"
+# Partial uploads (TUS concatenation) carry no archive metadata until the final
+# upload names them, so they live outside any archive directory. The leading dot
+# keeps the directory name out of the archive-name space.
+_PARTIALS_DIR = ".tus_partials"
+# A partial upload no final upload has claimed, and not written to for this long, is
+# abandoned (the client gave up on the concatenation) and deleted with its data.
+PARTIAL_UPLOAD_EXPIRY_HOURS = float(os.getenv("PARTIAL_UPLOAD_EXPIRY_HOURS", "24"))
+# create_partial_upload() looks for expired partial uploads at most this often per process
+_PARTIAL_SWEEP_INTERVAL_SECONDS = 3600
+_last_partial_sweep = 0.0
+_UPLOAD_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+_HASH_READ_SIZE = 1 << 20
+
+# Chunk digests of each individual-file upload in progress, in the
+# utils.integrity.chunk_manifest layout (DEFAULT_CHUNK_SIZE chunks). patch_upload()
+# appends the SHA-256 of every chunk a PATCH completes to the upload's chunk log
+# (<file_id>.chunks next to the state file, one hex digest per line), so the log
+# survives restarts and is shared by all worker processes. When the last byte
+# lands the Merkle root and chunk count are written to the state file.
+_CHUNK_LOG_LINE = 65  # 64 hex digits + "\n"
+
+# Running whole-file SHA-256 of uploads in progress. hashlib state cannot be
+# persisted, so this is only a cache: an entry is used when it has seen exactly
+# the bytes before the PATCH offset, and dropped otherwise (server restart,
+# PATCHes served by another worker process, a retried PATCH). An upload without a
+# complete running hash is verified by reading the file back, as before.
+_RUNNING_SHA256_MAX = 64
+_running_sha256: "OrderedDict[str, tuple[int, hashlib._Hash]]" = OrderedDict()
+_running_sha256_lock = threading.Lock()
+
+# Uploads being written by a request of this process (only used without fcntl)
+_busy_uploads: set[str] = set()
+_busy_uploads_lock = threading.Lock()
 
 
 def get_staging_dir() -> Path:
@@ -38,6 +81,9 @@ def validate_file_path(relative_path: str) -> bool:
     for part in p.parts:
         if part in ('..', '.', ''):
             return False
+    # Upload state (and the chunk / member logs beside it) must not be writable by an upload
+    if p.parts[0] == _TUS_STATE_DIR:
+        return False
     return True
 
 
@@ -67,10 +113,11 @@ def create_upload(archive_name: str, relative_path: str, upload_length: int, fil
     state_dir = staging / archive_name / _TUS_STATE_DIR
     state_dir.mkdir(parents=True, exist_ok=True)
 
-    file_path = _safe_staging_file_path(archive_name, relative_path)
-    file_path.parent.mkdir(parents=True, exist_ok=True)
-    # Create empty file (overwrite any leftover from a previous partial upload)
-    file_path.open("wb").close()
+    if upload_mode != "tar":
+        file_path = _safe_staging_file_path(archive_name, relative_path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        # Create empty file (overwrite any leftover from a previous partial upload)
+        file_path.open("wb").close()
 
     state = {
         "file_id": file_id,
@@ -81,14 +128,271 @@ def create_upload(archive_name: str, relative_path: str, upload_length: int, fil
         "offset": 0,
         "upload_mode": upload_mode,  # "tar" for tar uploads, "" for individual files
     }
+    if upload_mode == "tar":
+        # Members are extracted as the chunks arrive; no _upload.tar is written (see tar_stream)
+        state["tar_stream"] = tar_stream.initial_state()
+    else:
+        (state_dir / f"{file_id}.chunks").touch()
     (state_dir / f"{file_id}.json").write_text(json.dumps(state), encoding="utf-8")
     return file_id
 
 
+def _tar_extractor(file_id: str, state: dict, state_file: Path) -> tar_stream.TarStreamExtractor:
+    archive_name = state["archive_name"]
+    return tar_stream.TarStreamExtractor(
+        file_id,
+        state["tar_stream"],
+        resolve_path=lambda rel: _safe_staging_file_path(archive_name, rel),
+        is_valid_path=validate_file_path,
+        member_log=state_file.with_suffix(".members"),
+    )
+
+
+def create_partial_upload(upload_length: int, owner: Optional[str]) -> str:
+    """Create a partial upload (TUS concatenation): raw bytes to be joined by create_final_upload().
+
+    owner: digest of the session token creating it; only the same session can patch the
+           partial upload or concatenate it."""
+    global _last_partial_sweep
+    if time.monotonic() - _last_partial_sweep > _PARTIAL_SWEEP_INTERVAL_SECONDS:
+        _last_partial_sweep = time.monotonic()
+        cleanup_expired_partial_uploads()
+    partials = get_staging_dir() / _PARTIALS_DIR
+    partials.mkdir(parents=True, exist_ok=True)
+    file_id = uuid.uuid4().hex
+    (partials / f"{file_id}.part").open("wb").close()
+    state = {
+        "file_id": file_id,
+        "upload_length": upload_length,
+        "offset": 0,
+        "concat": "partial",
+        "owner": owner,
+    }
+    (partials / f"{file_id}.json").write_text(json.dumps(state), encoding="utf-8")
+    return file_id
+
+
+def _completed_partials(part_ids: list[str], owner: Optional[str]) -> list[tuple[Path, dict]]:
+    partials = get_staging_dir() / _PARTIALS_DIR
+    parts = []
+    for part_id in part_ids:
+        state_file = partials / f"{part_id}.json"
+        if not _UPLOAD_ID_RE.match(part_id) or not state_file.exists():
+            raise ValueError(f"Partial upload {part_id} not found")
+        state = json.loads(state_file.read_text(encoding="utf-8"))
+        if state.get("owner") != owner:
+            # Not distinguishable from a missing one: upload ids are not for other sessions to probe
+            raise ValueError(f"Partial upload {part_id} not found")
+        if state["offset"] != state["upload_length"]:
+            raise ValueError(f"Partial upload {part_id} is incomplete")
+        parts.append((state_file, state))
+    return parts
+
+
+def partial_uploads_length(part_ids: list[str], owner: Optional[str]) -> int:
+    """Total length of the given completed partial uploads. Raises ValueError if one is missing or incomplete."""
+    return sum(state["upload_length"] for _, state in _completed_partials(part_ids, owner))
+
+
+def _copy_into(src_path: Path, dst, dst_offset: int) -> None:
+    """Append src_path to the open file dst at dst_offset, inside the kernel where possible
+    (copy_file_range shares extents on reflink-capable filesystems such as XFS and btrfs)."""
+    size = src_path.stat().st_size
+    with open(src_path, "rb") as src:
+        copied = 0
+        try:
+            while copied < size:
+                n = os.copy_file_range(src.fileno(), dst.fileno(), size - copied,
+                                       offset_src=copied, offset_dst=dst_offset + copied)
+                if n == 0:
+                    break
+                copied += n
+        except (AttributeError, OSError):
+            # Not Linux, or a filesystem / kernel without cross-file copy_file_range support
+            pass
+        if copied < size:
+            src.seek(copied)
+            dst.seek(dst_offset + copied)
+            shutil.copyfileobj(src, dst, _HASH_READ_SIZE)
+
+
+def find_final_upload(part_ids: list[str], owner: Optional[str]) -> Optional[str]:
+    """file_id of the final upload already created from exactly these partial uploads by
+    this session, if any (a repeated final POST must not create a second one: its parts
+    may already be consumed)."""
+    staging = get_staging_dir()
+    if not staging.exists():
+        return None
+    for state_file in staging.glob(f"*/{_TUS_STATE_DIR}/*.json"):
+        try:
+            state = json.loads(state_file.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        if state.get("concat") == "final" and state.get("part_ids") == part_ids and state.get("owner") == owner:
+            return state_file.stem
+    return None
+
+
+def create_final_upload(archive_name: str, relative_path: str, file_hash: Optional[str], upload_mode: str,
+                        part_ids: list[str], part_urls: list[str], owner: Optional[str]) -> str:
+    """Create the final upload of a TUS concatenation of completed partial uploads and start
+    joining them in the background (see _assemble_final). Returns the file_id of the final
+    upload; if this session already created one from the same parts, that one.
+
+    The final state, with the part list, is written before any part is read, and the parts
+    are deleted only once the joined upload is recorded as complete, so an interrupted
+    assembly can always be started over."""
+    first_part = get_staging_dir() / _PARTIALS_DIR / f"{part_ids[0]}.json"
+    if not _UPLOAD_ID_RE.match(part_ids[0]) or not first_part.exists():
+        # Consumed by an assembly that already finished, or never there
+        file_id = find_final_upload(part_ids, owner)
+        if file_id is None:
+            raise ValueError(f"Partial upload {part_ids[0]} not found")
+        return file_id
+    # Serializes final POSTs naming the same parts, so a retry cannot create a second upload
+    with _upload_write_lock(first_part):
+        file_id = find_final_upload(part_ids, owner)
+        if file_id is not None:
+            return file_id
+        parts = _completed_partials(part_ids, owner)
+        total = sum(state["upload_length"] for _, state in parts)
+        file_id = create_upload(archive_name, relative_path, total, file_hash, upload_mode)
+        state_file = get_staging_dir() / archive_name / _TUS_STATE_DIR / f"{file_id}.json"
+        state = json.loads(state_file.read_text(encoding="utf-8"))
+        state["concat"] = "final"
+        state["parts"] = part_urls
+        state["part_ids"] = part_ids
+        state["owner"] = owner
+        state_file.write_text(json.dumps(state), encoding="utf-8")
+    _start_assembly(file_id, state_file)
+    return file_id
+
+
+def _start_assembly(file_id: str, state_file: Path) -> None:
+    threading.Thread(
+        target=_assemble_final, args=(file_id, state_file), name=f"tus-concat-{file_id}", daemon=True
+    ).start()
+
+
+def _assemble_final(file_id: str, state_file: Path) -> None:
+    """Join the partial uploads of a final upload, then delete them. Runs in a background
+    thread; a no-op if another thread or worker is already assembling the same upload.
+
+    Individual files are assembled with copy_file_range. Tar uploads are fed through the
+    streaming extractor part by part, so the tar itself is never written. A run that was
+    interrupted (server restart) is started over from the first part by verify_archive()."""
+    try:
+        with _upload_write_lock(state_file):
+            state = json.loads(state_file.read_text(encoding="utf-8"))
+            if state["offset"] != state["upload_length"]:
+                state.pop("assembly_error", None)
+                part_files = [get_staging_dir() / _PARTIALS_DIR / f"{part_id}.part" for part_id in state["part_ids"]]
+                if "tar_stream" in state:
+                    # Discard whatever an interrupted run extracted so far
+                    state["tar_stream"] = tar_stream.initial_state()
+                    state_file.with_suffix(".members").unlink(missing_ok=True)
+                    tar_stream.discard(file_id)
+                    extractor = _tar_extractor(file_id, state, state_file)
+                    for part_file in part_files:
+                        with open(part_file, "rb") as src:
+                            for chunk in iter(lambda: src.read(_HASH_READ_SIZE), b""):
+                                extractor.feed(chunk)
+                else:
+                    file_path = _safe_staging_file_path(state["archive_name"], state["relative_path"])
+                    offset = 0
+                    with open(file_path, "r+b") as dst:
+                        for part_file in part_files:
+                            _copy_into(part_file, dst, offset)
+                            offset += part_file.stat().st_size
+                state["offset"] = state["upload_length"]
+                state_file.write_text(json.dumps(state), encoding="utf-8")
+    except _UploadBusy:
+        return
+    except Exception as e:
+        logger.exception(f"Assembling concatenated upload {file_id} failed")
+        try:
+            state = json.loads(state_file.read_text(encoding="utf-8"))
+            state["assembly_error"] = str(e)
+            state_file.write_text(json.dumps(state), encoding="utf-8")
+        except Exception:
+            logger.warning(f"Could not record the assembly error of upload {file_id}")
+        return
+    # Only now that the joined upload is recorded as complete
+    _delete_partials(state["part_ids"])
+
+
+def _delete_partials(part_ids: list[str]) -> None:
+    partials = get_staging_dir() / _PARTIALS_DIR
+    for part_id in part_ids:
+        for suffix in (".part", ".json", ".lock"):
+            (partials / f"{part_id}{suffix}").unlink(missing_ok=True)
+
+
+def _claimed_partials() -> set[str]:
+    """Ids of the partial uploads named by a final upload; deleted with it, never expired."""
+    claimed: set[str] = set()
+    for state_file in get_staging_dir().glob(f"*/{_TUS_STATE_DIR}/*.json"):
+        try:
+            state = json.loads(state_file.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        if state.get("concat") == "final":
+            claimed.update(state.get("part_ids", []))
+    return claimed
+
+
+def cleanup_expired_partial_uploads() -> None:
+    """Delete partial uploads that no final upload claims and that have not been written to
+    for PARTIAL_UPLOAD_EXPIRY_HOURS (called at server startup and from create_partial_upload).
+    A partial upload a request is writing to right now is skipped."""
+    partials = get_staging_dir() / _PARTIALS_DIR
+    if not partials.exists():
+        return
+    cutoff = time.time() - PARTIAL_UPLOAD_EXPIRY_HOURS * 3600
+    expired = []
+    for state_file in partials.glob("*.json"):
+        try:
+            last_write = max(p.stat().st_mtime for p in (state_file, state_file.with_suffix(".part")) if p.exists())
+        except OSError:
+            continue
+        if last_write < cutoff:
+            expired.append(state_file)
+    if not expired:
+        return
+    claimed = _claimed_partials()
+    removed = 0
+    for state_file in expired:
+        part_id = state_file.stem
+        if part_id in claimed:
+            continue
+        try:
+            with _upload_write_lock(state_file):
+                # A final upload may have claimed it since the scan above
+                if part_id in _claimed_partials():
+                    continue
+                _delete_partials([part_id])
+                removed += 1
+        except _UploadBusy:
+            continue
+        except OSError:
+            logger.warning(f"Could not delete expired partial upload {part_id}")
+    if removed:
+        logger.info(f"Deleted {removed} expired partial upload(s)")
+
+
+def _upload_data_path(state_file: Path, state: dict) -> Path:
+    if state.get("concat") == "partial":
+        return state_file.with_suffix(".part")
+    return _safe_staging_file_path(state["archive_name"], state["relative_path"])
+
+
 def _find_state_file(file_id: str) -> Optional[Path]:
     staging = get_staging_dir()
     if not staging.exists():
         return None
+    partial = staging / _PARTIALS_DIR / f"{file_id}.json"
+    if partial.exists():
+        return partial
     for archive_dir in staging.iterdir():
         if not archive_dir.is_dir():
             continue
@@ -98,30 +402,166 @@ def _find_state_file(file_id: str) -> Optional[Path]:
     return None
 
 
+def _sha256_file(path: Path) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_READ_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def _update_running_sha256(file_id: str, offset: int, data: bytes) -> Optional[str]:
+    """Feed a chunk written at `offset` into the upload's running SHA-256 and return the
+    hex digest so far, or None (forgetting the entry) if the bytes before `offset` were
+    not all fed here exactly once."""
+    with _running_sha256_lock:
+        entry = _running_sha256.pop(file_id, None)
+    if offset == 0:
+        sha256 = hashlib.sha256()
+    elif entry is None or entry[0] != offset:
+        return None
+    else:
+        sha256 = entry[1]
+    sha256.update(data)
+    with _running_sha256_lock:
+        _running_sha256[file_id] = (offset + len(data), sha256)
+        while len(_running_sha256) > _RUNNING_SHA256_MAX:
+            _running_sha256.popitem(last=False)
+    return sha256.hexdigest()
+
+
+def _discard_running_sha256(file_id: str) -> None:
+    with _running_sha256_lock:
+        _running_sha256.pop(file_id, None)
+
+
+def _log_chunk_digests(log_path: Path, file_path: Path, offset: int, data: bytes, upload_length: int) -> None:
+    """Record the digests of the chunks completed by `data`, just written at `offset`
+    (the last, shorter chunk once the upload is complete).
+
+    The log is first cut back to the chunks that end at or before `offset`, which drops
+    digests of a PATCH that was written but never acknowledged and is now retried. The
+    head of a chunk that an earlier PATCH started is read back from the file."""
+    if not log_path.exists():
+        return  # upload created before chunk logging; verified by reading the file
+    first = offset // DEFAULT_CHUNK_SIZE
+    end = offset + len(data)
+    last = end // DEFAULT_CHUNK_SIZE if end < upload_length else -(-upload_length // DEFAULT_CHUNK_SIZE)
+    with open(log_path, "r+b") as log:
+        if log.seek(0, os.SEEK_END) < first * _CHUNK_LOG_LINE:
+            # Digests of earlier chunks are missing; stop logging rather than record a wrong root
+            log.close()
+            log_path.unlink()
+            return
+        log.truncate(first * _CHUNK_LOG_LINE)
+        if last == first:
+            return
+        head = b""
+        if offset > first * DEFAULT_CHUNK_SIZE:
+            with open(file_path, "rb") as f:
+                f.seek(first * DEFAULT_CHUNK_SIZE)
+                head = f.read(offset - first * DEFAULT_CHUNK_SIZE)
+        view = memoryview(data)
+        lines = []
+        for index in range(first, last):
+            chunk_start = index * DEFAULT_CHUNK_SIZE
+            chunk_end = min(chunk_start + DEFAULT_CHUNK_SIZE, upload_length)
+            sha256 = hashlib.sha256(head if index == first else b"")
+            sha256.update(view[max(chunk_start - offset, 0):chunk_end - offset])
+            lines.append(sha256.hexdigest() + "\n")
+        log.seek(first * _CHUNK_LOG_LINE)
+        log.write("".join(lines).encode("ascii"))
+
+
+def _read_chunk_log(log_path: Path) -> Optional[list[str]]:
+    if not log_path.exists():
+        return None
+    return log_path.read_text(encoding="ascii").split()
+
+
+class _UploadBusy(ValueError):
+    pass
+
+
+@contextmanager
+def _upload_write_lock(state_file: Path) -> Iterator[None]:
+    """Serialize the requests writing one upload, across threads and worker processes.
+    Raises _UploadBusy, a ValueError, if another request holds it (reported as 409, like
+    an offset mismatch: the client re-reads the offset and retries)."""
+    busy = _UploadBusy("Another request is writing to this upload")
+    if fcntl is None:
+        key = str(state_file)
+        with _busy_uploads_lock:
+            if key in _busy_uploads:
+                raise busy
+            _busy_uploads.add(key)
+        try:
+            yield
+        finally:
+            with _busy_uploads_lock:
+                _busy_uploads.discard(key)
+        return
+    with open(state_file.with_suffix(".lock"), "a") as lock_file:
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise busy
+        # Released when the file is closed
+        yield
+
+
 def get_upload_state(file_id: str) -> Optional[dict]:
     state_file = _find_state_file(file_id)
     return json.loads(state_file.read_text(encoding="utf-8")) if state_file else None
 
 
-def patch_upload(file_id: str, offset: int, data: bytes) -> int:
+def patch_upload(file_id: str, offset: int, data: bytes, owner: Optional[str]) -> int:
     """Append a chunk. Returns the new offset."""
     state_file = _find_state_file(file_id)
     if state_file is None:
         raise FileNotFoundError(f"Upload {file_id} not found")
 
-    state = json.loads(state_file.read_text(encoding="utf-8"))
-    if state["offset"] != offset:
-        raise ValueError(f"Offset mismatch: expected {state['offset']}, got {offset}")
-
-    file_path = _safe_staging_file_path(state["archive_name"], state["relative_path"])
-    with open(file_path, "r+b") as f:
-        f.seek(offset)
-        f.write(data)
-
-    new_offset = offset + len(data)
-    state["offset"] = new_offset
-    state_file.write_text(json.dumps(state), encoding="utf-8")
-    return new_offset
+    with _upload_write_lock(state_file):
+        # Read under the lock, so a concurrent PATCH at the same offset sees the new offset
+        state = json.loads(state_file.read_text(encoding="utf-8"))
+        if state.get("concat") == "final":
+            raise PermissionError("Final uploads of a concatenation cannot be patched")
+        if state.get("concat") == "partial" and state.get("owner") != owner:
+            raise PermissionError("Partial upload belongs to another session")
+        if state["offset"] != offset:
+            raise ValueError(f"Offset mismatch: expected {state['offset']}, got {offset}")
+
+        if "tar_stream" in state:
+            _tar_extractor(file_id, state, state_file).feed(data)
+            state["offset"] = offset + len(data)
+            state_file.write_text(json.dumps(state), encoding="utf-8")
+            return state["offset"]
+
+        file_path = _upload_data_path(state_file, state)
+        with open(file_path, "r+b") as f:
+            f.seek(offset)
+            f.write(data)
+
+        new_offset = offset + len(data)
+        state["offset"] = new_offset
+        if state.get("concat") == "partial":
+            # Partials are hashed, if at all, as part of the final upload
+            state_file.write_text(json.dumps(state), encoding="utf-8")
+            return new_offset
+        chunk_log = state_file.with_suffix(".chunks")
+        _log_chunk_digests(chunk_log, file_path, offset, data, state["upload_length"])
+        sha256 = _update_running_sha256(file_id, offset, data)
+        if new_offset == state["upload_length"]:
+            if sha256 is not None:
+                state["sha256"] = sha256
+            chunk_digests = _read_chunk_log(chunk_log)
+            if chunk_digests is not None:
+                state["chunk_size"] = DEFAULT_CHUNK_SIZE
+                state["chunk_count"] = len(chunk_digests)
+                state["merkle_root"] = merkle_root_hex(chunk_digests)
+            _discard_running_sha256(file_id)
+        state_file.write_text(json.dumps(state), encoding="utf-8")
+        return new_offset
 
 
 def delete_upload(file_id: str):
@@ -130,56 +570,21 @@ def delete_upload(file_id: str):
     if state_file is None:
         return
     state = json.loads(state_file.read_text(encoding="utf-8"))
-    file_path = _safe_staging_file_path(state["archive_name"], state["relative_path"])
+    file_path = _upload_data_path(state_file, state)
     if file_path.exists():
         file_path.unlink()
     state_file.unlink()
+    for suffix in (".members", ".chunks", ".lock"):
+        state_file.with_suffix(suffix).unlink(missing_ok=True)
+    if state.get("concat") == "final":
+        _delete_partials(state.get("part_ids", []))
+    _discard_running_sha256(file_id)
+    tar_stream.discard(file_id)
 
 
-def _extract_and_verify_tar(archive_name: str) -> dict:
-    """Extract _upload.tar in staging, verify contents against embedded _manifest.json."""
-    staging = get_staging_dir()
-    archive_dir = staging / archive_name
-    tar_path = archive_dir / "_upload.tar"
-
-    if not tar_path.exists():
-        state_dir = archive_dir / _TUS_STATE_DIR
-        state_count = len(list(state_dir.glob("*.json"))) if state_dir.exists() else 0
-        logger.error(
-            "_upload.tar missing for archive '%s'. archive_dir exists: %s, staging state files: %d",
-            archive_name, archive_dir.exists(), state_count,
-        )
-        return {"status": "fail", "results": [{"path": "_upload.tar", "status": "missing"}]}
-
-    try:
-        with _tarfile.open(tar_path, "r:") as tf:
-            members = tf.getmembers()
-            # Validate all paths before extracting anything
-            for member in members:
-                if member.name == "_manifest.json":
-                    continue  # internal manifest file — always permitted
-                if not member.isreg():
-                    return {
-                        "status": "fail",
-                        "results": [{"path": member.name, "status": "not_a_regular_file"}],
-                    }
-                if not validate_file_path(member.name):
-                    return {
-                        "status": "fail",
-                        "results": [{"path": member.name, "status": "invalid_path"}],
-                    }
-            # Extract safely
-            if sys.version_info >= (3, 12):
-                tf.extractall(archive_dir, filter="data")
-            else:
-                tf.extractall(archive_dir)  # nosec B202 - all members pre-validated: isreg() + validate_file_path()
-    except _tarfile.TarError as exc:
-        return {"status": "fail", "results": [{"path": "_upload.tar", "status": f"tar_error: {exc}"}]}
-
-    # Remove the tar file now that extraction is complete
-    tar_path.unlink()
-
-    # Read manifest
+def _verify_manifest(archive_name: str, member_hashes: dict[str, str]) -> dict:
+    """Compare the archive's _manifest.json against the SHA-256 of each extracted member."""
+    archive_dir = get_staging_dir() / archive_name
     manifest_path = archive_dir / "_manifest.json"
     if not manifest_path.exists():
         # Extraction succeeded but no hash manifest — treat as no_checksum_file
@@ -207,12 +612,7 @@ def _extract_and_verify_tar(archive_name: str) -> dict:
             all_pass = False
             continue
 
-        sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(65536), b""):
-                sha256.update(chunk)
-
-        actual = sha256.hexdigest()
+        actual = member_hashes.get(rel_path) or _sha256_file(file_path)
         ok = actual == expected_hash.lower()
         results.append({"path": rel_path, "status": "pass" if ok else "fail"})
         if not ok:
@@ -228,12 +628,82 @@ def _extract_and_verify_tar(archive_name: str) -> dict:
     return {"status": "pass" if all_pass else "fail", "results": results}
 
 
+def _verify_streamed_tar(file_id: str, state: dict, state_file: Path) -> dict:
+    """Verify a tar upload that was extracted while it arrived: no file is read."""
+    stream = state["tar_stream"]
+    if stream["error"]:
+        return {"status": "fail", "results": [stream["error"]]}
+    if state["offset"] != state["upload_length"]:
+        return {"status": "fail", "results": [{"path": "_upload.tar", "status": "incomplete"}]}
+    if not _tar_extractor(file_id, state, state_file).complete:
+        return {"status": "fail", "results": [{"path": "_upload.tar", "status": "tar_error: unexpected end of data"}]}
+    return _verify_manifest(state["archive_name"], tar_stream.read_member_log(state_file.with_suffix(".members")))
+
+
+def _extract_and_verify_tar(archive_name: str) -> dict:
+    """Extract _upload.tar in staging, verify contents against embedded _manifest.json.
+    Only used for tar uploads created before extraction happened during upload."""
+    staging = get_staging_dir()
+    archive_dir = staging / archive_name
+    tar_path = archive_dir / "_upload.tar"
+
+    if not tar_path.exists():
+        state_dir = archive_dir / _TUS_STATE_DIR
+        state_count = len(list(state_dir.glob("*.json"))) if state_dir.exists() else 0
+        logger.error(
+            "_upload.tar missing for archive '%s'. archive_dir exists: %s, staging state files: %d",
+            archive_name, archive_dir.exists(), state_count,
+        )
+        return {"status": "fail", "results": [{"path": "_upload.tar", "status": "missing"}]}
+
+    try:
+        with _tarfile.open(tar_path, "r:") as tf:
+            members = tf.getmembers()
+            # Validate all paths before extracting anything
+            for member in members:
+                if member.name == "_manifest.json":
+                    continue  # internal manifest file — always permitted
+                if not member.isreg():
+                    return {
+                        "status": "fail",
+                        "results": [{"path": member.name, "status": "not_a_regular_file"}],
+                    }
+                if not validate_file_path(member.name):
+                    return {
+                        "status": "fail",
+                        "results": [{"path": member.name, "status": "invalid_path"}],
+                    }
+            # Extract, hashing each member as it is written so nothing is read back afterwards
+            extracted_hashes: dict[str, str] = {}
+            for member in members:
+                if not member.isreg():
+                    continue  # only possible for _manifest.json, which was exempted above
+                target = _safe_staging_file_path(archive_name, member.name)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                sha256 = hashlib.sha256()
+                with tf.extractfile(member) as src, open(target, "wb") as dst:
+                    for chunk in iter(lambda: src.read(_HASH_READ_SIZE), b""):
+                        sha256.update(chunk)
+                        dst.write(chunk)
+                os.utime(target, (member.mtime, member.mtime))
+                extracted_hashes[member.name] = sha256.hexdigest()
+    except (_tarfile.TarError, ValueError) as exc:
+        return {"status": "fail", "results": [{"path": "_upload.tar", "status": f"tar_error: {exc}"}]}
+
+    # Remove the tar file now that extraction is complete
+    tar_path.unlink()
+
+    return _verify_manifest(archive_name, extracted_hashes)
+
+
 def verify_archive(archive_name: str) -> dict:
     """Verify every uploaded file in the archive against its client-declared SHA-256.
 
-    For tar uploads: extracts the tar, then verifies against the embedded _manifest.json.
+    For tar uploads: compares the member hashes computed while the tar was extracted
+    during upload (see tar_stream) against the embedded _manifest.json.
     For individual-file uploads: reads hashes from each TUS state JSON.
     Files uploaded without a declared hash are treated as passing (no-op check).
+    Returns status "assembling" while parallel parts are still being joined; the client polls.
     """
     staging = get_staging_dir()
     state_dir = staging / archive_name / _TUS_STATE_DIR
@@ -241,11 +711,31 @@ def verify_archive(archive_name: str) -> dict:
     if not state_dir.exists():
         return {"status": "no_uploads", "results": []}
 
+    # Final uploads of a concatenation whose parts are still being joined (see create_final_upload)
+    assembling = False
+    for state_file in state_dir.glob("*.json"):
+        try:
+            state = json.loads(state_file.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        if state.get("concat") != "final" or state["offset"] == state["upload_length"]:
+            continue
+        if state.get("assembly_error"):
+            return {"status": "fail",
+                    "results": [{"path": state["relative_path"], "status": f"concat_error: {state['assembly_error']}"}]}
+        # Restarts an assembly interrupted by a server restart; a no-op while one is running
+        _start_assembly(state_file.stem, state_file)
+        assembling = True
+    if assembling:
+        return {"status": "assembling", "results": []}
+
     # Detect tar upload: any TUS state file with upload_mode == "tar"
     for state_file in state_dir.glob("*.json"):
         try:
             state = json.loads(state_file.read_text(encoding="utf-8"))
             if state.get("upload_mode") == "tar":
+                if "tar_stream" in state:
+                    return _verify_streamed_tar(state_file.stem, state, state_file)
                 return _extract_and_verify_tar(archive_name)
         except Exception:
             logger.warning("Could not parse TUS state file %s during tar detection", state_file)
@@ -276,12 +766,8 @@ def verify_archive(archive_name: str) -> dict:
             all_pass = False
             continue
 
-        sha256 = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            for chunk in iter(lambda: f.read(65536), b""):
-                sha256.update(chunk)
-
-        actual = sha256.hexdigest()
+        # Hashed while the chunks arrived (see patch_upload); read back if the running hash was lost
+        actual = state.get("sha256") or _sha256_file(file_path)
         ok = actual == expected_hash.lower()
         results.append({"path": rel_path, "status": "pass" if ok else "fail"})
         if not ok:
@@ -305,11 +791,17 @@ def _collect_tus_records(archive_name: str) -> list[dict]:
         for state_file in state_dir.glob("*.json"):
             try:
                 state = json.loads(state_file.read_text(encoding="utf-8"))
-                records.append({
+                record = {
                     "relative_path": state["relative_path"],
                     "sha256": state.get("file_hash"),
                     "size_bytes": state.get("upload_length"),
-                })
+                }
+                if state.get("merkle_root"):
+                    # Chunk Merkle root in the utils.integrity.chunk_manifest layout
+                    record["chunk_size"] = state["chunk_size"]
+                    record["chunk_count"] = state["chunk_count"]
+                    record["merkle_root"] = state["merkle_root"]
+                records.append(record)
             except Exception:
                 logger.warning("Could not parse TUS state file %s", state_file)
     return sorted(records, key=lambda r: r["relative_path"])
@@ -416,6 +908,14 @@ def cleanup_staging_archive(archive_name: str):
     """Delete a staging archive (cancel / discard)."""
     staging = get_staging_dir()
     archive_dir = staging / archive_name
+    for state_file in (archive_dir / _TUS_STATE_DIR).glob("*.json"):
+        _discard_running_sha256(state_file.stem)
+        try:
+            state = json.loads(state_file.read_text(encoding="utf-8"))
+        except Exception:
+            continue
+        if state.get("concat") == "final":
+            _delete_partials(state.get("part_ids", []))
     if archive_dir.exists():
         shutil.rmtree(archive_dir)
         logger.info(f"Cleaned up staging for archive '{archive_name}'")
@@ -4,6 +4,7 @@ from typing import Optional
 from pydantic import BaseModel
 
 from browsing_platform.server.services.password_authenticator import set_user_password
+from browsing_platform.server.services.token_manager import invalidate_cached_tokens_for_user
 from utils import db
 
 
@@ -70,6 +71,8 @@ def update_user(item: User):
             '''DELETE FROM token WHERE user_id = %(id)s''',
             {"id": item.id}, "none"
         )
+    # admin / locked may have changed — cached permissions must not outlive that
+    invalidate_cached_tokens_for_user(item.id)
     return item.id
 
 
@@ -98,4 +101,5 @@ def delete_user(item_id: int):
         '''DELETE FROM token WHERE user_id = %(id)s''',
         {"id": item_id}, "none"
     )
+    invalidate_cached_tokens_for_user(item_id)
     return item_id
@@ -13,20 +13,159 @@ Usage
 
 All ``BroadcastManager`` instances automatically share the single event loop
 registered via ``set_event_loop()``.
+
+Progress and back-pressure
+--------------------------
+Per-item progress (one event per media item during thumbnail generation) goes
+through ``instance.progress(stage, done=1)`` rather than ``broadcast()``. The
+counters are aggregated per stage and at most one ``{"type": "progress"}``
+message per PROGRESS_FLUSH_MS is broadcast, carrying done / total / errors,
+the average rate and an ETA. Only the latest progress message of each stage is
+kept for replay, until clear_buffer() or forget_progress(stage). Subscriber queues are bounded (WS_SUBSCRIBER_QUEUE_MAX); a
+client that cannot keep up loses its oldest undelivered messages instead of
+growing the queue without limit.
+
+Multiple worker processes
+-------------------------
+With ``SERVER_WORKERS > 1`` a channel's messages are produced in one process
+while its WebSocket subscribers are spread over all of them. Managers created
+with a ``channel`` name then publish through the ``broadcast_event`` table
+instead of delivering directly; every process polls the table and relays new
+rows to its own subscribers (and replay buffer). With a single worker the
+table is not touched.
+
+Rows are inserted by several processes, so they do not become visible in id
+order: a row can commit after rows with higher ids were already relayed.
+EventCursor therefore keeps the ids it stepped over as gaps and queries them
+again for GAP_GRACE_SECONDS, relaying whatever shows up there late.
 """
 
 import asyncio
+import json
+import logging
+import os
 import threading
+import time
 from typing import Optional
 
+from browsing_platform.server.config import SERVER_WORKERS
+from utils import db
+
+logger = logging.getLogger(__name__)
+
 _loop: Optional[asyncio.AbstractEventLoop] = None
 _BUFFER_MAX_DEFAULT = 500
 
+BROADCAST_POLL_SECONDS = int(os.getenv("BROADCAST_POLL_MS", "500")) / 1000
+_RELAY_BATCH = 1000
+# How long ids skipped by a relay are re-queried; most belong to other channels or to
+# rolled-back inserts and never show up
+GAP_GRACE_SECONDS = 60
+# Published by clear_buffer(): resets every process's replay buffer, never delivered
+_CLEAR_MARKER = "__clear_buffer__"
+# Published by forget_progress(): drops one stage's replayed snapshot, never delivered
+_FORGET_MARKER = "__forget_progress__"
+# How often a relay with a retention window deletes its channel's older rows
+_PRUNE_INTERVAL_SECONDS = 300
+
+_shared_managers: list["BroadcastManager"] = []
+
+WS_SUBSCRIBER_QUEUE_MAX = int(os.getenv("WS_SUBSCRIBER_QUEUE_MAX", "1000"))
+PROGRESS_FLUSH_SECONDS = int(os.getenv("PROGRESS_FLUSH_MS", "500")) / 1000
+
+
+def _put_drop_oldest(q: asyncio.Queue, msg: dict) -> None:
+    """Enqueue on a bounded subscriber queue, discarding its oldest message when full.
+    Runs on the event loop thread."""
+    if q.full():
+        try:
+            q.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+    q.put_nowait(msg)
+
+
+class _StageProgress:
+    """Counters of one progress stage between flushes."""
+
+    def __init__(self, label: Optional[str]):
+        self.label = label
+        self.done = 0
+        self.errors = 0
+        self.total: Optional[int] = None
+        self.started_at = time.monotonic()
+        self.dirty = False
+
+    def message(self, stage: str, finished: bool) -> dict:
+        elapsed = time.monotonic() - self.started_at
+        rate = self.done / elapsed if elapsed > 0 else 0.0
+        eta = None
+        if self.total is not None and rate > 0 and not finished:
+            eta = round(max(self.total - self.done, 0) / rate, 1)
+        return {
+            "type": "progress",
+            "stage": stage,
+            "label": self.label or stage,
+            "done": self.done,
+            "total": self.total,
+            "errors": self.errors,
+            "rate": round(rate, 2),
+            "eta_seconds": eta,
+            "finished": finished,
+        }
+
+
+class EventCursor:
+    """Reads one channel of broadcast_event in id order without losing rows that commit
+    after rows with higher ids (see module docstring)."""
+
+    def __init__(self, channel: str, last_id: int = 0):
+        self.channel = channel
+        self.last_id = last_id
+        # (first id, last id, monotonic expiry) of ranges stepped over
+        self._gaps: list[tuple[int, int, float]] = []
+        # Ids inside the gaps that were already returned
+        self._late: set[int] = set()
+
+    def poll(self, limit: int = _RELAY_BATCH) -> list[dict]:
+        """Rows not returned before: new ones in id order, plus late commits inside known gaps."""
+        now = time.monotonic()
+        self._gaps = [gap for gap in self._gaps if gap[2] > now]
+        args: dict = {"channel": self.channel, "last": self.last_id, "n": limit}
+        ranges = ["id > %(last)s"]
+        for i, (low, high, _) in enumerate(self._gaps):
+            ranges.append(f"id BETWEEN %(low_{i})s AND %(high_{i})s")
+            args[f"low_{i}"] = low
+            args[f"high_{i}"] = high
+        rows = db.execute_query(  # nosec B608 - ranges contains only %(key)s placeholders
+            f"""SELECT id, payload FROM broadcast_event
+                WHERE channel = %(channel)s AND ({' OR '.join(ranges)})
+                ORDER BY id LIMIT %(n)s""",
+            args, "rows"
+        ) or []
+        fresh = []
+        for row in rows:
+            event_id = row["id"]
+            if event_id <= self.last_id:
+                if event_id in self._late:
+                    continue
+                self._late.add(event_id)
+            else:
+                if event_id > self.last_id + 1:
+                    self._gaps.append((self.last_id + 1, event_id - 1, now + GAP_GRACE_SECONDS))
+                self.last_id = event_id
+            fresh.append(row)
+        self._late = {i for i in self._late if any(low <= i <= high for low, high, _ in self._gaps)}
+        return fresh
+
 
 def set_event_loop(loop: asyncio.AbstractEventLoop) -> None:
-    """Register the running event loop. Call once from the server lifespan."""
+    """Register the running event loop. Call once from the server lifespan.
+    Also starts the DB relay of every shared channel."""
     global _loop
     _loop = loop
+    for manager in _shared_managers:
+        manager.start_relay()
 
 
 class BroadcastManager:
@@ -38,21 +177,39 @@ class BroadcastManager:
     - ``unsubscribe()`` — removes the queue and stops delivery.
     - ``broadcast()``   — pushes a message to all current subscribers; safe to
                           call from any thread (uses call_soon_threadsafe).
+    - ``progress()``    — adds to a stage's counters; coalesced into at most one
+                          progress message per PROGRESS_FLUSH_MS.
+    - ``finish_progress()`` — flushes a stage's final counters.
+    - ``forget_progress()`` — stops replaying a finished stage to new subscribers.
     - ``clear_buffer()``— wipe the replay buffer (e.g. at the start of a new job).
     """
 
-    def __init__(self, buffer_max: int = _BUFFER_MAX_DEFAULT):
+    def __init__(self, buffer_max: int = _BUFFER_MAX_DEFAULT, channel: Optional[str] = None,
+                 retention_seconds: Optional[int] = None):
+        """retention_seconds: with several workers, the channel's broadcast_event rows older
+        than this are deleted by the relay. Without it they are kept until clear_buffer()."""
         self._buffer_max = buffer_max
+        self._retention_seconds = retention_seconds
         self._lock = threading.Lock()
         self._subscribers: set[asyncio.Queue] = set()
         self._buffer: list[dict] = []
+        # Latest progress message per stage; replayed instead of every intermediate one
+        self._progress_snapshots: dict[str, dict] = {}
+        self._stages: dict[str, _StageProgress] = {}
+        self._progress_flushed_at = 0.0
+        # Only set when several worker processes share the channel (see module docstring)
+        self._channel = channel if SERVER_WORKERS > 1 else None
+        self._relay_thread: Optional[threading.Thread] = None
+        self._cursor: Optional[EventCursor] = None
+        if self._channel is not None:
+            _shared_managers.append(self)
 
     def subscribe(self) -> asyncio.Queue:
-        q: asyncio.Queue = asyncio.Queue()
+        q: asyncio.Queue = asyncio.Queue(maxsize=WS_SUBSCRIBER_QUEUE_MAX)
         with self._lock:
             self._subscribers.add(q)
-            for msg in self._buffer:
-                q.put_nowait(msg)
+            for msg in self._buffer + list(self._progress_snapshots.values()):
+                _put_drop_oldest(q, msg)
         return q
 
     def unsubscribe(self, q: asyncio.Queue) -> None:
@@ -60,16 +217,139 @@ class BroadcastManager:
             self._subscribers.discard(q)
 
     def broadcast(self, msg: dict) -> None:
+        if self._channel is not None:
+            self._publish(msg)
+            return
+        self._deliver(msg)
+
+    def _deliver(self, msg: dict) -> None:
         with self._lock:
-            self._buffer.append(msg)
-            if len(self._buffer) > self._buffer_max:
-                self._buffer = self._buffer[-self._buffer_max:]
+            if msg.get("type") == "progress":
+                self._progress_snapshots[msg["stage"]] = msg
+            else:
+                self._buffer.append(msg)
+                if len(self._buffer) > self._buffer_max:
+                    self._buffer = self._buffer[-self._buffer_max:]
             queues = list(self._subscribers)
         if _loop is None:
             return
         for q in queues:
-            _loop.call_soon_threadsafe(q.put_nowait, msg)
+            _loop.call_soon_threadsafe(_put_drop_oldest, q, msg)
+
+    # ------------------------------------------------------------------
+    # Coalesced progress
+    # ------------------------------------------------------------------
+
+    def progress(self, stage: str, done: int = 0, errors: int = 0, total: Optional[int] = None,
+                 label: Optional[str] = None) -> None:
+        """Add `done` / `errors` to the counters of `stage` (and set its total if given).
+        Broadcasts the dirty stages if PROGRESS_FLUSH_MS has passed since the last flush."""
+        now = time.monotonic()
+        with self._lock:
+            state = self._stages.get(stage)
+            if state is None:
+                state = self._stages[stage] = _StageProgress(label)
+            state.done += done
+            state.errors += errors
+            if total is not None:
+                state.total = total
+            state.dirty = True
+            if now - self._progress_flushed_at < PROGRESS_FLUSH_SECONDS:
+                return
+            self._progress_flushed_at = now
+            messages = [s.message(name, finished=False) for name, s in self._stages.items() if s.dirty]
+            for s in self._stages.values():
+                s.dirty = False
+        for msg in messages:
+            self.broadcast(msg)
+
+    def finish_progress(self, stage: str) -> None:
+        """Broadcast the final counters of `stage` and forget it."""
+        with self._lock:
+            state = self._stages.pop(stage, None)
+        if state is not None:
+            self.broadcast(state.message(stage, finished=True))
+
+    def forget_progress(self, stage: str) -> None:
+        """Stop replaying the last progress message of `stage` to new subscribers, in every
+        worker process. For stages named per job, once the job's outcome was broadcast."""
+        if self._channel is not None:
+            self._publish({_FORGET_MARKER: stage})
+            return
+        with self._lock:
+            self._progress_snapshots.pop(stage, None)
 
     def clear_buffer(self) -> None:
+        with self._lock:
+            self._stages = {}
+        if self._channel is not None:
+            marker_id = self._publish({_CLEAR_MARKER: True})
+            # Nothing before the marker can be replayed any more
+            db.execute_query(
+                "DELETE FROM broadcast_event WHERE channel = %(channel)s AND id < %(id)s",
+                {"channel": self._channel, "id": marker_id}, "none"
+            )
+            return
         with self._lock:
             self._buffer = []
+            self._progress_snapshots = {}
+
+    # ------------------------------------------------------------------
+    # Cross-process relay (SERVER_WORKERS > 1)
+    # ------------------------------------------------------------------
+
+    def _publish(self, msg: dict) -> int:
+        return db.execute_query(
+            "INSERT INTO broadcast_event (channel, payload) VALUES (%(channel)s, %(payload)s)",
+            {"channel": self._channel, "payload": json.dumps(msg, default=str)}, "id"
+        )
+
+    def _apply(self, rows: list[dict]) -> None:
+        for row in rows:
+            msg = json.loads(row["payload"])
+            if isinstance(msg, dict) and msg.get(_CLEAR_MARKER):
+                with self._lock:
+                    self._buffer = []
+                    self._progress_snapshots = {}
+                continue
+            if isinstance(msg, dict) and _FORGET_MARKER in msg:
+                with self._lock:
+                    self._progress_snapshots.pop(msg[_FORGET_MARKER], None)
+                continue
+            self._deliver(msg)
+
+    def start_relay(self) -> None:
+        if self._channel is None or self._relay_thread is not None:
+            return
+        # Seed the replay buffer with the channel's recent history
+        self._cursor = EventCursor(self._channel)
+        try:
+            rows = db.execute_query(
+                "SELECT id, payload FROM broadcast_event WHERE channel = %(channel)s ORDER BY id DESC LIMIT %(n)s",
+                {"channel": self._channel, "n": self._buffer_max}, "rows"
+            )
+            if rows:
+                self._cursor.last_id = rows[0]["id"]
+            self._apply(list(reversed(rows)))
+        except Exception as e:
+            logger.warning(f"Could not load broadcast history for channel {self._channel}: {e}")
+        self._relay_thread = threading.Thread(
+            target=self._relay_loop, name=f"broadcast-relay-{self._channel}", daemon=True
+        )
+        self._relay_thread.start()
+
+    def _relay_loop(self) -> None:
+        pruned_at = 0.0
+        while True:
+            time.sleep(BROADCAST_POLL_SECONDS)
+            try:
+                self._apply(self._cursor.poll())
+                if self._retention_seconds is not None and time.monotonic() - pruned_at >= _PRUNE_INTERVAL_SECONDS:
+                    pruned_at = time.monotonic()
+                    db.execute_query(
+                        """DELETE FROM broadcast_event
+                           WHERE channel = %(channel)s AND create_date < NOW() - INTERVAL %(s)s SECOND""",
+                        {"channel": self._channel, "s": self._retention_seconds}, "none"
+                    )
+            except Exception as e:
+                logger.warning(f"Broadcast relay poll failed for channel {self._channel}: {e}")
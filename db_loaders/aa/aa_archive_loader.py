@@ -44,6 +44,7 @@ import root_anchor
 from db_loaders.aa.aa_entity_extractor import _extract_url_suffix, extract_entities
 from db_loaders.aa.aa_html_parser import ParsedHTMLSummary, parse_html_summary
 from db_loaders.db_intake import incorporate_structures_into_db
+from db_loaders.entity_preview import refresh_previews_for_archive_sessions
 from utils import db
 
 logger = logging.getLogger(__name__)
@@ -345,6 +346,7 @@ def extract_aa_entities(limit: Optional[int] = None) -> None:
 
     extracted_count = 0
     error_count = 0
+    touched_session_ids: list[int] = []
 
     for stub in queue:
         entry = db.execute_query(
@@ -395,6 +397,7 @@ def extract_aa_entities(limit: Optional[int] = None) -> None:
                 f"{len(entities.posts)} posts, {len(entities.media)} media"
             )
 
+            touched_session_ids.append(session_id)
             incorporate_structures_into_db(entities, session_id, archive_location=None)
 
             # CDN-URL media cannot be thumbnailed locally — mark as not_needed.
@@ -438,6 +441,8 @@ def extract_aa_entities(limit: Optional[int] = None) -> None:
             traceback.print_exc()
             error_count += 1
 
+    refresh_previews_for_archive_sessions(touched_session_ids)
+
     elapsed = time.time() - start
     logger.info(f"Part C complete in {elapsed:.1f}s — {extracted_count} extracted, {error_count} errors")
 
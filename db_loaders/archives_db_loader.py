@@ -29,12 +29,16 @@ HOW IT WORKS:
        - Inserts/updates entities in database tables
        - Links entities to their source archive_session
        - Tracks extraction with algorithm version numbers
+       - Refreshes the stored search previews (entity_preview) of the extracted
+         sessions and of the accounts owning their media
 
     D) THUMBNAILS - Generate preview images for media
        - Creates thumbnails for images and video first frames
        - Only generates for media with missing thumbnail_path
        - Stores thumbnails in thumbnails/ directory
        - Uses MD5 hash-based filenames for deduplication
+       - Renders a hover-scrub sprite sheet and WebP poster per video (one ffmpeg
+         pass each); videos with sprite_status != 'pending' are skipped
 
 USAGE:
     Run with a stage argument:
@@ -63,6 +67,9 @@ USAGE:
     • clear_errors   - Clear extraction_error field to retry failed archives
                       Use this after fixing issues that caused failures
 
+    • repair_counters - Recount the engagement counters (comments / likes /
+                      tagged-in / followers / following) of every account and post
+
 REGENERATING THUMBNAILS:
     To regenerate ALL thumbnails (e.g., to change size or fix corrupted images):
 
@@ -134,7 +141,9 @@ from tzlocal import get_localzone_name
 import root_anchor
 from db_loaders.db_intake import LOCAL_ARCHIVES_DIR_ALIAS, LOCAL_WACZ_ARCHIVES_DIR_ALIAS
 from db_loaders.db_intake import incorporate_structures_into_db
-from db_loaders.thumbnail_generator import generate_missing_thumbnails
+from db_loaders.engagement_counters import repair_counters
+from db_loaders.entity_preview import refresh_previews_for_archive_sessions
+from db_loaders.thumbnail_generator import generate_missing_thumbnails, generate_missing_sprites
 from extractors.extract_photos import PhotoAcquisitionConfig
 from extractors.extract_videos import VideoAcquisitionConfig
 from extractors.session_attachments import get_session_attachments
@@ -150,7 +159,8 @@ _REGISTER_FETCH_BATCH = 5_000   # rows per page when loading existing registrati
 _REGISTER_INSERT_BATCH = 500    # archives per transaction when inserting new ones
 
 
-def register_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[[], bool]] = None, emit: Optional[Callable[[str], None]] = None):
+def register_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[[], bool]] = None, emit: Optional[Callable[[str], None]] = None,
+                      progress: Optional[Callable[..., None]] = None):
     """
     Part A of full - scans directory, puts in an archive_session record for each
     unregistered archive.
@@ -208,6 +218,8 @@ def register_archives(limit: Optional[int] = None, cancel_check: Optional[Callab
     if limit is not None:
         to_register = to_register[:limit]
     logger.info(f"Part A - {len(to_register)} new archives to register")
+    if progress:
+        progress(total=len(to_register))
 
     # --- Step 4: insert new archives in batches inside a single transaction ---
     registered_count = 0
@@ -239,11 +251,11 @@ def register_archives(limit: Optional[int] = None, cancel_check: Optional[Callab
                 )
                 if new_id:
                     logger.info(f"Registered new archive: {archive_dir.name} ({source_type})")
-                    if emit:
-                        emit(f"Part A — registered {archive_dir.name}")
                     registered_count += 1
                 else:
                     logger.debug(f"Archive already registered (race), skipped insert: {archive_dir.name}")
+                if progress:
+                    progress(done=1)
 
     elapsed = time.time() - start_time
     logger.info(f"Part A register_archives complete in {elapsed:.1f}s (registered {registered_count} new archives)")
@@ -301,7 +313,8 @@ def strip_media_contents(data: ExtractedHarData) -> None:
             p.fetched_assets = None
 
 
-def parse_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[[], bool]] = None, emit: Optional[Callable[[str], None]] = None):
+def parse_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[[], bool]] = None, emit: Optional[Callable[[str], None]] = None,
+                   progress: Optional[Callable[..., None]] = None):
     """
     Part B of full — queries archive_session where incorporation_status = 'pending'
     for both HAR (local_har) and WACZ (local_wacz) source types.
@@ -328,6 +341,8 @@ def parse_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[
     if limit is not None:
         queue = queue[:limit]
     logger.info(f"Part B - {len(queue)} archives to parse")
+    if progress:
+        progress(total=len(queue))
 
     for entry in queue:
         if cancel_check and cancel_check():
@@ -342,8 +357,6 @@ def parse_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[
 
             entry_id = entry['external_id'] or entry['id']
             logger.info(f"Parsing archive: {entry_id} ({source_type})")
-            if emit:
-                emit(f"Part B — parsing {entry_id}")
 
             archive_dir = root_anchor.ROOT_ARCHIVES / archive_name
 
@@ -506,8 +519,8 @@ def parse_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[
                     'none'
                 )
                 logger.info(f"Successfully parsed archive: {entry_id}")
-                if emit:
-                    emit(f"Part B — parsed {entry_id}")
+                if progress:
+                    progress(done=1)
                 parsed_count += 1
             except Exception as e:
                 traceback.print_exc()
@@ -524,13 +537,16 @@ def parse_archives(limit: Optional[int] = None, cancel_check: Optional[Callable[
             logger.error(f"Error processing archive {entry['external_id'] or entry['id']}: {e}")
             if emit:
                 emit(f"Part B — error parsing {entry['external_id'] or entry['id']}: {e}")
+            if progress:
+                progress(done=1, errors=1)
             error_count += 1
 
     elapsed = time.time() - start_time
     logger.info(f"Part B complete: {parsed_count} archives parsed, {error_count} errors in {elapsed:.1f}s")
 
 
-def extract_entities(limit: Optional[int] = None, cancel_check: Optional[Callable[[], bool]] = None, emit: Optional[Callable[[str], None]] = None):
+def extract_entities(limit: Optional[int] = None, cancel_check: Optional[Callable[[], bool]] = None, emit: Optional[Callable[[str], None]] = None,
+                     progress: Optional[Callable[..., None]] = None):
     """
     Part C of full - does db inserts for main entities... extraction error if a problem in archive_session
     """
@@ -559,9 +575,16 @@ def extract_entities(limit: Optional[int] = None, cancel_check: Optional[Callabl
     if limit is not None:
         queue = queue[:limit]
     logger.info(f"Part C - {len(queue)} archives to extract")
+    if progress:
+        progress(total=len(queue))
+
+    # Sessions whose entities were written (fully or partly); their search previews are
+    # refreshed when the stage ends, including when it is cancelled part way
+    touched_session_ids: list[int] = []
 
     for stub in queue:
         if cancel_check and cancel_check():
+            refresh_previews_for_archive_sessions(touched_session_ids)
             raise InterruptedError("Cancelled by user")
         # PK lookup — fast, and loads the large structures JSON only when needed
         entry = db.execute_query(
@@ -576,8 +599,6 @@ def extract_entities(limit: Optional[int] = None, cancel_check: Optional[Callabl
         entry_start = time.time()
         try:
             logger.info(f"Extracting entities for: {entry_id}")
-            if emit:
-                emit(f"Part C — extracting {entry_id}")
 
             # Resolve the archive directory path from the stored location
             source_type = entry.get('source_type', 'local_har')
@@ -618,6 +639,7 @@ def extract_entities(limit: Optional[int] = None, cancel_check: Optional[Callabl
             # Step C3: Insert/update entities in the database tables (account, post, media, etc.)
             # Also links entities to this archive_session
             step_start = time.time()
+            touched_session_ids.append(entry['id'])
             incorporate_structures_into_db(entities, entry['id'], archive_dir)
             c3_time = time.time() - step_start
             total_c3_time += c3_time
@@ -636,8 +658,8 @@ def extract_entities(limit: Optional[int] = None, cancel_check: Optional[Callabl
 
             entry_elapsed = time.time() - entry_start
             logger.info(f"Successfully extracted entities for: {entry_id} in {entry_elapsed:.1f}s")
-            if emit:
-                emit(f"Part C — extracted {entry_id}")
+            if progress:
+                progress(done=1)
             extracted_count += 1
 
         except Exception as e:
@@ -645,6 +667,8 @@ def extract_entities(limit: Optional[int] = None, cancel_check: Optional[Callabl
             logger.error(f"Error extracting entities for {entry_id}: {e}")
             if emit:
                 emit(f"Part C — error extracting {entry_id}: {e}")
+            if progress:
+                progress(done=1, errors=1)
             db.execute_query(
                 "UPDATE archive_session SET incorporation_status = 'extract_failed', extraction_error = %(extraction_error)s WHERE external_id = %(id)s",
                 {"id": entry_id, "extraction_error": str(e)},
@@ -653,6 +677,8 @@ def extract_entities(limit: Optional[int] = None, cancel_check: Optional[Callabl
             traceback.print_exc()
             error_count += 1
 
+    refresh_previews_for_archive_sessions(touched_session_ids)
+
     elapsed = time.time() - start_time
     logger.info(f"Part C complete: {extracted_count} archives processed, {error_count} errors in {elapsed:.1f}s")
     logger.info(
@@ -826,7 +852,8 @@ if __name__ == "__main__":
     import argparse
     from pathlib import Path
 
-    valid_stages = ["register", "parse", "extract", "full", "add_attachments", "clear_errors", "add_metadata"]
+    valid_stages = ["register", "parse", "extract", "full", "add_attachments", "clear_errors", "add_metadata",
+                    "repair_counters"]
 
     arg_parser = argparse.ArgumentParser(description="Archive Database Loader")
     arg_parser.add_argument("stage", nargs="?", choices=valid_stages,
@@ -885,6 +912,7 @@ if __name__ == "__main__":
         part_d_start = time.time()
         logger.info(f"Starting thumbnail generation{f' (limit: {args.limit})' if args.limit else ''}")
         asyncio.run(generate_missing_thumbnails(limit=args.limit))
+        asyncio.run(generate_missing_sprites(limit=args.limit))
         timings['D'] = time.time() - part_d_start
 
         # Summary
@@ -900,6 +928,8 @@ if __name__ == "__main__":
         add_missing_metadata()
     elif stage == "clear_errors":
         clear_extraction_errors()
+    elif stage == "repair_counters":
+        repair_counters()
     else:
         print(f"Unknown stage: {stage}")
         print(f"Valid stages: {', '.join(valid_stages)}")
@@ -5,6 +5,8 @@ from typing import Optional, TypeVar, Generic, Callable, Any
 
 from pydantic import BaseModel, ConfigDict
 
+from db_loaders.engagement_counters import recount_for_session
+from db_loaders.entity_preview import refresh_entity_previews
 from extractors.entity_types import EntityBase, ExtractedEntitiesFlattened, Account, Post, Media, Comment, Like, TaggedAccount, AccountRelation
 from extractors.reconcile_entities import reconcile_accounts, reconcile_posts, reconcile_media, reconcile_comments, reconcile_likes, reconcile_tagged_accounts, reconcile_account_relations, synthesize_from_archives, reconcile_primitives
 from root_anchor import ROOT_ARCHIVES
@@ -221,9 +223,10 @@ def batch_store_new_media(new_media: list, archive_location) -> list:
         if m.post_id is None:
             raise ValueError(f"Cannot store media {m.id_on_platform!r}: post not found "
                              f"(url={m.post_url_suffix!r}, id_on_platform={m.post_id_on_platform!r})")
-    columns = ['url_suffix', 'platform', 'id_on_platform', 'post_id', 'local_url', 'media_type', 'data', 'thumbnail_status']
+    columns = ['url_suffix', 'platform', 'id_on_platform', 'post_id', 'local_url', 'media_type', 'data',
+               'thumbnail_status', 'sprite_status']
     rows = [[m.url_suffix, m.platform, m.id_on_platform, m.post_id, m.local_url, m.media_type,
-             json.dumps(m.data) if m.data else None, initial_thumbnail_status(m)]
+             json.dumps(m.data) if m.data else None, initial_thumbnail_status(m), initial_sprite_status(m)]
             for m in new_media]
     return db.batch_insert('media', columns, rows)
 
@@ -465,6 +468,25 @@ def incorporate_structures_into_db(
             return_type="none"
         )
 
+        # Same for the engagement counters of the accounts and posts this session's
+        # comments, likes, tagged accounts and relations point at.
+        recount_for_session(archive_session_id)
+
+        # Accounts about to lose media to the sync below. The end-of-stage preview
+        # refresh only sees the current owners of this session's media, so the
+        # previous owners' search previews are refreshed here.
+        previous_owners = db.execute_query(
+            """SELECT DISTINCT m.account_id
+               FROM media_archive ma
+               JOIN media m ON ma.canonical_id = m.id
+               JOIN post p ON m.post_id = p.id
+               WHERE ma.archive_session_id = %(session_id)s
+                 AND m.account_id IS NOT NULL
+                 AND NOT (m.account_id <=> p.account_id)""",
+            {"session_id": archive_session_id},
+            return_type="rows"
+        ) or []
+
         # Sync media.publication_date and media.account_id from the associated post
         # for all media touched by this session.
         db.execute_query(
@@ -480,6 +502,8 @@ def incorporate_structures_into_db(
             {"session_id": archive_session_id},
             return_type="none"
         )
+        if previous_owners:
+            refresh_entity_previews("account", [row["account_id"] for row in previous_owners])
 
 
 def preserve_canonical_identifiers(synthesized: EntityBase, existing_canonical: EntityBase) -> None:
@@ -855,6 +879,14 @@ def initial_thumbnail_status(media: Media) -> str:
     return 'pending'
 
 
+def initial_sprite_status(media: Media) -> str:
+    """Determine the sprite_status to assign when first inserting a media record.
+    Only videos with a file in the local archives get a hover-scrub sprite sheet."""
+    if media.media_type != 'video' or not (media.local_url or '').startswith(f"{LOCAL_ARCHIVES_DIR_ALIAS}/"):
+        return 'not_needed'
+    return 'pending'
+
+
 def store_media(media: Media, existing_media: Optional[Media], archive_location: Path) -> int:
     if media.post_id is None:
         stored_post = get_canonical_post(
@@ -874,7 +906,8 @@ def store_media(media: Media, existing_media: Optional[Media], archive_location:
                    local_url        = %(local_url)s,
                    media_type       = %(media_type)s,
                    data             = %(data)s,
-                   thumbnail_status = IF(local_url <=> %(local_url)s, thumbnail_status, %(thumbnail_status)s)
+                   thumbnail_status = IF(local_url <=> %(local_url)s, thumbnail_status, %(thumbnail_status)s),
+                   sprite_status    = IF(local_url <=> %(local_url)s, sprite_status, %(sprite_status)s)
                WHERE id = %(id)s""",
             {
                 "id": media.id,
@@ -886,14 +919,15 @@ def store_media(media: Media, existing_media: Optional[Media], archive_location:
                 "media_type": media.media_type,
                 "data": json.dumps(media.data) if media.data else None,
                 "thumbnail_status": initial_thumbnail_status(media),
+                "sprite_status": initial_sprite_status(media),
             },
             return_type="none"
         )
         return media.id
     else:
         return db.execute_query(
-            """INSERT INTO media (url_suffix, platform, id_on_platform, post_id, local_url, media_type, data, thumbnail_status)
-               VALUES (%(url_suffix)s, %(platform)s, %(id_on_platform)s, %(post_id)s, %(local_url)s, %(media_type)s, %(data)s, %(thumbnail_status)s)""",
+            """INSERT INTO media (url_suffix, platform, id_on_platform, post_id, local_url, media_type, data, thumbnail_status, sprite_status)
+               VALUES (%(url_suffix)s, %(platform)s, %(id_on_platform)s, %(post_id)s, %(local_url)s, %(media_type)s, %(data)s, %(thumbnail_status)s, %(sprite_status)s)""",
             {
                 "url_suffix": media.url_suffix,
                 "platform": media.platform,
@@ -903,6 +937,7 @@ def store_media(media: Media, existing_media: Optional[Media], archive_location:
                 "media_type": media.media_type,
                 "data": json.dumps(media.data) if media.data else None,
                 "thumbnail_status": initial_thumbnail_status(media),
+                "sprite_status": initial_sprite_status(media),
             },
             return_type="id"
         )
@@ -0,0 +1,105 @@
+"""
+Denormalized engagement counters on account and post.
+
+Account and post pages used to count comments / likes / tagged-in / relations
+with a COUNT(*) per table on every view, and the community candidate list
+grouped account_relation for follower / following counts on every request.
+Those counts are now columns (migration V045), kept in sync the same way as
+account.post_count: at the end of each archive session,
+incorporate_structures_into_db recounts them for just the accounts and posts
+that the session's comments, likes, tagged accounts and relations point at
+(recount_for_session). Recounting a few rows over indexed foreign keys stays
+exact when re-synthesis moves a row to another post or account, which +1/-1
+deltas applied at insert time would not.
+
+repair_counters() recounts every account and post in id-ordered batches, for
+counters that drifted through writes that bypass intake (manual SQL, merges,
+deletions, or a row whose FK moved away from an account that this session
+no longer references):
+
+    uv run db_loaders/archives_db_loader.py repair_counters
+"""
+import logging
+import time
+
+from utils import db
+
+logger = logging.getLogger(__name__)
+
+# Same value as tie_graph.SUGGESTED_RELATION_TYPE; follower / following counts are real follows only
+SUGGESTED_RELATION_TYPE = "suggested"
+
+REPAIR_BATCH_SIZE = 1000
+
+ACCOUNT_COUNTERS: dict[str, str] = {
+    "comments_count": "SELECT COUNT(*) FROM comment x WHERE x.account_id = a.id",
+    "likes_count": "SELECT COUNT(*) FROM post_like x WHERE x.account_id = a.id",
+    "tagged_in_count": "SELECT COUNT(*) FROM tagged_account x WHERE x.tagged_account_id = a.id",
+    "followers_count": "SELECT COUNT(*) FROM account_relation x WHERE x.followed_account_id = a.id"
+                       " AND (x.relation_type IS NULL OR x.relation_type != %(suggested_type)s)",
+    "following_count": "SELECT COUNT(*) FROM account_relation x WHERE x.follower_account_id = a.id"
+                       " AND (x.relation_type IS NULL OR x.relation_type != %(suggested_type)s)",
+    # Every relation in either direction, suggested ones included (the account page's relations list)
+    "relations_count": "SELECT COUNT(*) FROM account_relation x"
+                       " WHERE x.follower_account_id = a.id OR x.followed_account_id = a.id",
+}
+
+POST_COUNTERS: dict[str, str] = {
+    "comments_count": "SELECT COUNT(*) FROM comment x WHERE x.post_id = a.id",
+    "likes_count": "SELECT COUNT(*) FROM post_like x WHERE x.post_id = a.id",
+}
+
+_COUNTERS = {"account": ACCOUNT_COUNTERS, "post": POST_COUNTERS}
+
+# Accounts / posts referenced by the engagement rows linked to one archive session
+_SESSION_ACCOUNTS = """
+    SELECT c.account_id AS id FROM comment_archive xa JOIN comment c ON xa.canonical_id = c.id
+        WHERE xa.archive_session_id = %(session_id)s
+    UNION SELECT l.account_id FROM post_like_archive xa JOIN post_like l ON xa.canonical_id = l.id
+        WHERE xa.archive_session_id = %(session_id)s
+    UNION SELECT t.tagged_account_id FROM tagged_account_archive xa JOIN tagged_account t ON xa.canonical_id = t.id
+        WHERE xa.archive_session_id = %(session_id)s
+    UNION SELECT r.follower_account_id FROM account_relation_archive xa JOIN account_relation r ON xa.canonical_id = r.id
+        WHERE xa.archive_session_id = %(session_id)s
+    UNION SELECT r.followed_account_id FROM account_relation_archive xa JOIN account_relation r ON xa.canonical_id = r.id
+        WHERE xa.archive_session_id = %(session_id)s"""
+
+_SESSION_POSTS = """
+    SELECT c.post_id AS id FROM comment_archive xa JOIN comment c ON xa.canonical_id = c.id
+        WHERE xa.archive_session_id = %(session_id)s
+    UNION SELECT l.post_id FROM post_like_archive xa JOIN post_like l ON xa.canonical_id = l.id
+        WHERE xa.archive_session_id = %(session_id)s"""
+
+
+def _set_clause(table: str) -> str:
+    return ", ".join(f"a.{column} = ({count})" for column, count in _COUNTERS[table].items())
+
+
+def recount_for_session(archive_session_id: int) -> None:
+    """Recount the counters of the accounts and posts this session's engagement rows point at."""
+    args = {"session_id": archive_session_id, "suggested_type": SUGGESTED_RELATION_TYPE}
+    for table, affected in (("account", _SESSION_ACCOUNTS), ("post", _SESSION_POSTS)):
+        db.execute_query(  # nosec B608 - built from the constant counter definitions above
+            f"""UPDATE {table} a
+                INNER JOIN ({affected}) affected ON a.id = affected.id
+                SET {_set_clause(table)}""",
+            args,
+            return_type="none"
+        )
+
+
+def repair_counters(batch_size: int = REPAIR_BATCH_SIZE) -> None:
+    """Recount every account and post, one committed batch of ids at a time."""
+    for table in ("account", "post"):
+        start = time.time()
+        row = db.execute_query(f"SELECT MAX(id) AS max_id FROM {table}", {}, return_type="single_row")  # nosec B608
+        max_id = (row or {}).get("max_id") or 0
+        logger.info(f"Recounting {table} counters (ids up to {max_id})")
+        for low in range(1, max_id + 1, batch_size):
+            db.execute_query(  # nosec B608 - built from the constant counter definitions above
+                f"""UPDATE {table} a SET {_set_clause(table)}
+                    WHERE a.id BETWEEN %(low)s AND %(high)s""",
+                {"low": low, "high": low + batch_size - 1, "suggested_type": SUGGESTED_RELATION_TYPE},
+                return_type="none"
+            )
+        logger.info(f"Recounted {table} counters in {time.time() - start:.1f}s")
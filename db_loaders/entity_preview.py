@@ -0,0 +1,234 @@
+"""
+Precomputed search-result previews (the entity_preview table).
+
+Archive session and account search results show a media count and a few
+thumbnails. Picking those with ROW_NUMBER() / COUNT(*) OVER on every search
+request ranks all of a busy account's media each time, so the loaders store
+the outcome instead:
+
+  - Part C (extract_entities, extract_aa_entities) refreshes the archive
+    sessions it extracted and the accounts owning their media; an account
+    whose media re-synthesis moved to another account is refreshed by
+    incorporate_structures_into_db, which sees the previous owner
+  - Part D (generate_missing_thumbnails) refreshes the entities whose preview
+    shows a media item that just got its thumbnail (and aspect ratio)
+
+Search then reads one entity_preview row per result; an entity with no row yet
+is computed on the fly with compute_entity_previews.
+
+The preview media are the ones the search queries used to pick: media with a
+local_url, the first PREVIEW_SIZE by id for an archive session and the newest
+PREVIEW_SIZE by publication_date for an account. media_count counts all of
+them. preview_media_ids and aspect_ratios are parallel JSON arrays; thumbnail
+paths are not stored, search reads them from media by primary key.
+"""
+import json
+import logging
+from typing import Iterable, Literal, Optional
+
+from utils import db
+
+logger = logging.getLogger(__name__)
+
+PreviewEntity = Literal["archive_session", "account"]
+
+PREVIEW_SIZE: dict[str, int] = {"archive_session": 4, "account": 8}
+
+# Entity ids per IN (...) list / rows per multi-row upsert
+_CHUNK = 500
+
+_RANKED_MEDIA: dict[str, str] = {
+    "archive_session": """
+        SELECT ma.archive_session_id AS entity_id, m.id, m.thumbnail_path, m.local_url, m.aspect_ratio,
+               COUNT(*) OVER (PARTITION BY ma.archive_session_id) AS media_count,
+               ROW_NUMBER() OVER (PARTITION BY ma.archive_session_id ORDER BY m.id) AS rn
+        FROM media_archive ma
+        JOIN media m ON ma.canonical_id = m.id
+        WHERE ma.archive_session_id IN ({ids})
+          AND m.local_url IS NOT NULL""",
+    "account": """
+        SELECT account_id AS entity_id, id, thumbnail_path, local_url, aspect_ratio,
+               COUNT(*) OVER (PARTITION BY account_id) AS media_count,
+               ROW_NUMBER() OVER (PARTITION BY account_id ORDER BY publication_date DESC) AS rn
+        FROM media
+        WHERE account_id IN ({ids})
+          AND local_url IS NOT NULL""",
+}
+
+
+def _chunks(values: list, size: int = _CHUNK) -> Iterable[list]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _in_args(values: list) -> tuple[str, dict]:
+    args = {f"v_{i}": v for i, v in enumerate(values)}
+    return ", ".join(f"%(v_{i})s" for i in range(len(values))), args
+
+
+def compute_entity_previews(entity_type: PreviewEntity, entity_ids: Iterable[int]) -> dict[int, dict]:
+    """
+    entity_id -> {"media_count", "media": [{"id", "thumbnail_path", "local_url", "aspect_ratio"}, ...]}
+    with the media in preview order. Every requested id is present (count 0 when it has no media).
+    """
+    ids = sorted(set(entity_ids))
+    previews: dict[int, dict] = {eid: {"media_count": 0, "media": []} for eid in ids}
+    for chunk in _chunks(ids):
+        placeholders, args = _in_args(chunk)
+        args["preview_size"] = PREVIEW_SIZE[entity_type]
+        rows = db.execute_query(  # nosec B608 - placeholders contains only %(key)s placeholders
+            f"""SELECT entity_id, id, thumbnail_path, local_url, aspect_ratio, media_count
+                FROM ({_RANKED_MEDIA[entity_type].format(ids=placeholders)}) ranked
+                WHERE rn <= %(preview_size)s
+                ORDER BY entity_id, rn""",
+            args,
+        ) or []
+        for row in rows:
+            preview = previews[row["entity_id"]]
+            preview["media_count"] = row["media_count"]
+            preview["media"].append({
+                "id": row["id"],
+                "thumbnail_path": row["thumbnail_path"],
+                "local_url": row["local_url"],
+                "aspect_ratio": float(row["aspect_ratio"]) if row["aspect_ratio"] is not None else None,
+            })
+    return previews
+
+
+def refresh_entity_previews(entity_type: PreviewEntity, entity_ids: Iterable[int]) -> int:
+    """Recompute and upsert the entity_preview rows of `entity_ids`. Returns the number of entities refreshed."""
+    previews = compute_entity_previews(entity_type, entity_ids)
+    items = list(previews.items())
+    for chunk in _chunks(items):
+        values = []
+        args: dict = {"entity_type": entity_type}
+        for i, (entity_id, preview) in enumerate(chunk):
+            values.append(f"(%(entity_type)s, %(id_{i})s, %(count_{i})s, %(ids_{i})s, %(ratios_{i})s)")
+            args[f"id_{i}"] = entity_id
+            args[f"count_{i}"] = preview["media_count"]
+            args[f"ids_{i}"] = json.dumps([m["id"] for m in preview["media"]])
+            args[f"ratios_{i}"] = json.dumps([m["aspect_ratio"] for m in preview["media"]])
+        db.execute_query(  # nosec B608 - values contains only %(key)s placeholders
+            f"""INSERT INTO entity_preview (entity_type, entity_id, media_count, preview_media_ids, aspect_ratios)
+                VALUES {', '.join(values)}
+                ON DUPLICATE KEY UPDATE media_count = VALUES(media_count),
+                                        preview_media_ids = VALUES(preview_media_ids),
+                                        aspect_ratios = VALUES(aspect_ratios)""",
+            args,
+            return_type="none",
+        )
+    return len(items)
+
+
+def get_entity_previews(entity_type: PreviewEntity, entity_ids: Iterable[int]) -> dict[int, dict]:
+    """
+    Same shape as compute_entity_previews, read from entity_preview (one primary key lookup per
+    entity plus one for the preview media). Entities without a row are computed on the fly.
+    """
+    ids = sorted(set(entity_ids))
+    stored: dict[int, dict] = {}
+    for chunk in _chunks(ids):
+        placeholders, args = _in_args(chunk)
+        args["entity_type"] = entity_type
+        rows = db.execute_query(  # nosec B608 - placeholders contains only %(key)s placeholders
+            f"""SELECT entity_id, media_count, preview_media_ids, aspect_ratios FROM entity_preview
+                WHERE entity_type = %(entity_type)s AND entity_id IN ({placeholders})""",
+            args,
+        ) or []
+        for row in rows:
+            stored[row["entity_id"]] = row
+
+    media_ids = sorted({mid for row in stored.values() for mid in _json_list(row["preview_media_ids"])})
+    media_rows: dict[int, dict] = {}
+    for chunk in _chunks(media_ids):
+        placeholders, args = _in_args(chunk)
+        rows = db.execute_query(  # nosec B608 - placeholders contains only %(key)s placeholders
+            f"SELECT id, thumbnail_path, local_url FROM media WHERE id IN ({placeholders})",
+            args,
+        ) or []
+        for row in rows:
+            media_rows[row["id"]] = row
+
+    previews: dict[int, dict] = {}
+    for entity_id, row in stored.items():
+        media = []
+        for mid, ratio in zip(_json_list(row["preview_media_ids"]), _json_list(row["aspect_ratios"])):
+            if mid in media_rows:
+                media.append({**media_rows[mid], "aspect_ratio": ratio})
+        previews[entity_id] = {"media_count": row["media_count"], "media": media}
+    missing = [eid for eid in ids if eid not in previews]
+    if missing:
+        previews.update(compute_entity_previews(entity_type, missing))
+    return previews
+
+
+def _distinct(query: str, values: list, column: str) -> set[int]:
+    found: set[int] = set()
+    for chunk in _chunks(values):
+        placeholders, args = _in_args(chunk)
+        rows = db.execute_query(query.format(ids=placeholders), args) or []  # nosec B608
+        found.update(row[column] for row in rows if row[column] is not None)
+    return found
+
+
+def refresh_previews_for_archive_sessions(archive_session_ids: Iterable[int]) -> None:
+    """End of Part C: the extracted sessions, and every account that owns media linked to them."""
+    session_ids = sorted(set(archive_session_ids))
+    if not session_ids:
+        return
+    try:
+        account_ids = _distinct(
+            """SELECT DISTINCT m.account_id
+               FROM media_archive ma
+               JOIN media m ON ma.canonical_id = m.id
+               WHERE ma.archive_session_id IN ({ids})""",
+            session_ids, "account_id",
+        )
+        refresh_entity_previews("archive_session", session_ids)
+        refresh_entity_previews("account", account_ids)
+        logger.info(f"Refreshed search previews for {len(session_ids)} archive session(s) "
+                    f"and {len(account_ids)} account(s)")
+    except Exception as e:
+        # Search still works without fresh rows; never fail the pipeline stage over it
+        logger.error(f"Failed to refresh search previews after entity extraction: {e}")
+
+
+def refresh_previews_for_media(media_ids: Iterable[int]) -> None:
+    """End of Part D: entities whose stored preview shows one of `media_ids`, or that have no preview yet."""
+    media_ids = sorted(set(media_ids))
+    if not media_ids:
+        return
+    try:
+        candidates: dict[str, set[int]] = {
+            "archive_session": _distinct(
+                "SELECT DISTINCT archive_session_id FROM media_archive WHERE canonical_id IN ({ids})",
+                media_ids, "archive_session_id",
+            ),
+            "account": _distinct(
+                "SELECT DISTINCT account_id FROM media WHERE id IN ({ids})",
+                media_ids, "account_id",
+            ),
+        }
+        changed = set(media_ids)
+        refreshed = 0
+        for entity_type, entity_ids in candidates.items():
+            stale = set(entity_ids)
+            for chunk in _chunks(sorted(entity_ids)):
+                placeholders, args = _in_args(chunk)
+                args["entity_type"] = entity_type
+                rows = db.execute_query(  # nosec B608 - placeholders contains only %(key)s placeholders
+                    f"""SELECT entity_id, preview_media_ids FROM entity_preview
+                        WHERE entity_type = %(entity_type)s AND entity_id IN ({placeholders})""",
+                    args,
+                ) or []
+                for row in rows:
+                    if changed.isdisjoint(_json_list(row["preview_media_ids"])):
+                        stale.discard(row["entity_id"])
+            refreshed += refresh_entity_previews(entity_type, stale) if stale else 0
+        logger.info(f"Refreshed search previews for {refreshed} entities after thumbnail generation")
+    except Exception as e:
+        logger.error(f"Failed to refresh search previews after thumbnail generation: {e}")
+
+
+def _json_list(value: Optional[str | bytes]) -> list:
+    return json.loads(value) if value else []
@@ -12,7 +12,13 @@ HOW IT WORKS:
        - Images: Opens with PIL and resizes
        - Videos: Extracts first frame using OpenCV, falls back to later frames if needed
     3. Saves thumbnail as JPEG in thumbnails/ directory
-    4. Updates the media record with the thumbnail path
+    4. Updates the media record with the thumbnail path and a 64-bit perceptual
+       difference hash (dhash) of the decoded thumbnail, used for near-duplicate lookup
+    5. For videos with sprite_status = 'pending', runs one ffmpeg pass that writes a
+       hover-scrub sprite sheet (SPRITE_FRAME_COUNT frames tiled in a row, JPEG) and a
+       WebP poster frame next to the thumbnails (generate_missing_sprites)
+    6. Refreshes the stored search previews (entity_preview) that show a media item
+       which just got its thumbnail, so they pick up its aspect ratio
 
 THUMBNAIL NAMING:
     Thumbnails are named using MD5 hash: {md5(id_on_platform + size)}.jpg
@@ -35,6 +41,21 @@ VIDEO FRAME EXTRACTION:
     - Tries frames 0, 1, 10, 30 if earlier frames fail
     - 10 second timeout per video to prevent hangs
 
+SPRITE SHEETS AND POSTERS:
+    - Uses ffprobe (header only) for the duration, then a single ffmpeg invocation whose
+      filter graph splits the decoded stream into the sprite and poster outputs
+    - Runs as a killable subprocess, so a timeout actually stops the decode
+    - Named after the video's local_url (md5), so only rows pointing at the same file share
+      a sprite and poster
+    - Failures set sprite_status = 'error'; to retry:
+      UPDATE media SET sprite_status = 'pending' WHERE sprite_status = 'error';
+
+PROGRESS:
+    The optional `progress` callback is called once per processed item as
+    progress(done=1, errors=0|1, total=None) (with total= once at the start); the
+    incorporation service coalesces these into throttled progress messages. Only
+    failures are reported through `emit`.
+
 USAGE:
     Usually called as Part D of the full pipeline:
         uv run db_loaders/archives_db_loader.py full
@@ -48,6 +69,7 @@ USAGE:
 DEPENDENCIES:
     - PIL/Pillow for image processing
     - OpenCV (cv2) for video frame extraction
+    - ffmpeg/ffprobe on PATH (with libwebp) for sprite sheets and posters
     - MySQL database with media table
 """
 
@@ -62,6 +84,7 @@ import cv2
 from PIL import Image
 
 from db_loaders.db_intake import LOCAL_ARCHIVES_DIR_ALIAS
+from db_loaders.entity_preview import refresh_previews_for_media
 from extractors.entity_types import Media
 from root_anchor import ROOT_DIR, ROOT_ARCHIVES
 from utils import db
@@ -170,6 +193,23 @@ def load_image_and_thumbnail(path: str, size: tuple) -> Image.Image:
     return img
 
 
+def dhash(img: Image.Image, hash_size: int = 8) -> int:
+    """64-bit difference hash of an image (for hash_size=8).
+
+    The image is reduced to (hash_size + 1) x hash_size grayscale and each bit records whether a
+    pixel is brighter than its right-hand neighbour. Near-duplicates (re-encodes, resizes, light
+    crops/filters) land within a few bits Hamming distance of each other.
+    """
+    small = img.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS)
+    pixels = small.tobytes()
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
 def save_image(img: Image.Image, out_path: Path) -> None:
     """Save a PIL image to disk. Runs in a thread."""
     os.makedirs(out_path.parent, exist_ok=True)
@@ -181,6 +221,7 @@ async def process_one_media(
     thumbnail_size: tuple,
     semaphore: asyncio.Semaphore,
     emit: Optional[Callable[[str], None]],
+    progress: Optional[Callable[..., None]] = None,
 ) -> bool:
     """Generate and persist a thumbnail for one media item. Returns True on success."""
     async with semaphore:
@@ -212,24 +253,37 @@ async def process_one_media(
                 "UPDATE media SET thumbnail_path = %(p)s, thumbnail_status = 'error' WHERE id = %(id)s",
                 {"p": f"error: {str(e)}", "id": media.id}, "none"
             )
+            if progress:
+                progress(done=1, errors=1)
             return False
 
         aspect_ratio = img.width / img.height if img.height > 0 else None
         relative_path = f"{LOCAL_THUMBNAILS_DIR_ALIAS}/{thumbnail_filename}"
+        # Hash the already-decoded thumbnail image — no second read of the source file.
+        phash = dhash(img)
         db.execute_query(
-            "UPDATE media SET thumbnail_path = %(p)s, thumbnail_status = 'generated', aspect_ratio = %(ar)s WHERE id = %(id)s",
-            {"p": relative_path, "ar": aspect_ratio, "id": media.id}, "none"
+            "UPDATE media SET thumbnail_path = %(p)s, thumbnail_status = 'generated', aspect_ratio = %(ar)s, phash = %(ph)s WHERE id = %(id)s",
+            {"p": relative_path, "ar": aspect_ratio, "ph": phash, "id": media.id}, "none"
         )
-        if emit:
-            emit(f"Part D — generated thumbnail for media {media.id}")
+        if progress:
+            progress(done=1)
         return True
 
 
-async def generate_missing_thumbnails(thumbnail_size=(128, 128), limit: int | None = None, cancel_check=None, emit: Optional[Callable[[str], None]] = None):
+async def generate_missing_thumbnails(thumbnail_size=(128, 128), limit: int | None = None, cancel_check=None,
+                                      emit: Optional[Callable[[str], None]] = None,
+                                      progress: Optional[Callable[..., None]] = None):
     semaphore = asyncio.Semaphore(MAX_CONCURRENT)
     generated_count = 0
+    generated_ids: list[int] = []
+    if progress:
+        pending = db.execute_query(
+            "SELECT COUNT(*) AS n FROM media WHERE thumbnail_status = 'pending'", {}, return_type="single_row"
+        )["n"]
+        progress(total=pending if limit is None else min(pending, limit))
     while True:
         if cancel_check and cancel_check():
+            refresh_previews_for_media(generated_ids)
             raise InterruptedError("Cancelled by user")
 
         fetch_count = BATCH_SIZE if limit is None else min(BATCH_SIZE, limit - generated_count)
@@ -244,9 +298,10 @@ async def generate_missing_thumbnails(thumbnail_size=(128, 128), limit: int | No
             break
 
         results = await asyncio.gather(*[
-            process_one_media(row, thumbnail_size, semaphore, emit) for row in rows
+            process_one_media(row, thumbnail_size, semaphore, emit, progress) for row in rows
         ])
         generated_count += sum(1 for r in results if r)
+        generated_ids.extend(row["id"] for row, ok in zip(rows, results) if ok)
 
         if len(rows) < fetch_count:
             # Received fewer rows than requested — no more pending items remain
@@ -254,7 +309,178 @@ async def generate_missing_thumbnails(thumbnail_size=(128, 128), limit: int | No
 
     if generated_count:
         logger.info(f"Part D - Generated {generated_count} thumbnails")
+    # Stored search previews carry the aspect ratios that were just computed
+    refresh_previews_for_media(generated_ids)
+
+
+# --------------------------------------------------------------------------- #
+# Hover-scrub sprite sheets and poster frames (videos only)
+# --------------------------------------------------------------------------- #
+
+SPRITE_FRAME_COUNT = 10
+SPRITE_FRAME_WIDTH = 160
+POSTER_MAX_WIDTH = 640
+SPRITE_TIMEOUT_SECONDS = 120
+
+
+async def _run_killable(args: list[str], timeout: float) -> bytes:
+    """Run a subprocess and return its stdout. Unlike asyncio.to_thread, the process is
+    killed on timeout, so a hanging decode never leaks an executor slot."""
+    proc = await asyncio.create_subprocess_exec(
+        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        raise Exception(f"{args[0]} timed out after {timeout}s")
+    if proc.returncode != 0:
+        raise Exception(f"{args[0]} exited with code {proc.returncode}: {stderr.decode('utf-8', errors='replace').strip()[-500:]}")
+    return stdout
+
+
+async def _probe_video_duration(path: str) -> float:
+    """Read the container duration (header only, no decoding)."""
+    out = await _run_killable(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration',
+         '-of', 'default=noprint_wrappers=1:nokey=1', path],
+        timeout=15,
+    )
+    try:
+        duration = float(out.decode('utf-8').strip())
+    except ValueError:
+        raise Exception(f"Could not determine video duration (ffprobe returned {out[:100]!r})")
+    if duration <= 0:
+        raise Exception(f"Video reports non-positive duration {duration}")
+    return duration
+
+
+async def render_sprite_and_poster(path: str, sprite_out: Path, poster_out: Path, frame_count: int) -> None:
+    """Decode the video once and write both the sprite sheet and the poster.
+
+    The decoded stream is split in the filter graph: one branch samples frame_count evenly
+    spaced frames and tiles them into a single row (JPEG), the other picks a representative
+    frame among the first 50 and encodes it as WebP. Only one ffmpeg process runs per video.
+    """
+    duration = await _probe_video_duration(path)
+    sample_rate = frame_count / duration
+    filter_graph = (
+        f"[0:v]split=2[s][p];"
+        f"[s]fps={sample_rate:.6f},scale={SPRITE_FRAME_WIDTH}:-2,tile={frame_count}x1[sprite];"
+        f"[p]thumbnail=50,scale='min({POSTER_MAX_WIDTH},iw)':-2[poster]"
+    )
+    os.makedirs(sprite_out.parent, exist_ok=True)
+    await _run_killable(
+        ['ffmpeg', '-v', 'error', '-y', '-i', path,
+         '-filter_complex', filter_graph,
+         '-map', '[sprite]', '-frames:v', '1', '-q:v', '5', str(sprite_out),
+         '-map', '[poster]', '-frames:v', '1', '-c:v', 'libwebp', '-quality', '80', str(poster_out)],
+        timeout=SPRITE_TIMEOUT_SECONDS,
+    )
+    if not sprite_out.exists() or not poster_out.exists():
+        raise Exception("ffmpeg finished without producing sprite/poster output")
+
+
+def preview_filenames(local_url: str, frame_count: int = SPRITE_FRAME_COUNT) -> tuple[str, str]:
+    """Return (sprite_filename, poster_filename), hash-named after the video file they are rendered from.
+    Keyed on local_url rather than id_on_platform, which can be NULL or shared by carousel items and
+    re-uploads; rows pointing at the same file still share one sprite and poster."""
+    sprite_hash = md5(f"{local_url}_sprite_{frame_count}x{SPRITE_FRAME_WIDTH}".encode('utf-8')).hexdigest()
+    poster_hash = md5(f"{local_url}_poster_{POSTER_MAX_WIDTH}".encode('utf-8')).hexdigest()
+    return f"{sprite_hash}.jpg", f"{poster_hash}.webp"
+
+
+async def process_one_video_preview(
+    media_row: dict,
+    semaphore: asyncio.Semaphore,
+    emit: Optional[Callable[[str], None]],
+    progress: Optional[Callable[..., None]] = None,
+) -> bool:
+    """Generate and persist the sprite sheet and poster for one video. Returns True on success."""
+    async with semaphore:
+        media = Media(**media_row)
+        local_path = ROOT_ARCHIVES / media.local_url.split(f'{LOCAL_ARCHIVES_DIR_ALIAS}/')[1]
+        sprite_filename, poster_filename = preview_filenames(media.local_url)
+        sprite_out = ROOT_THUMBNAILS / sprite_filename
+        poster_out = ROOT_THUMBNAILS / poster_filename
+        try:
+            if sprite_out.exists() and poster_out.exists():
+                # Same video file stored under another row (or a previous interrupted run)
+                logger.debug(f"Reusing existing sprite/poster for media ID {media.id}")
+            else:
+                logger.info(f"Generating sprite sheet for media ID {media.id} at {local_path}")
+                if not local_path.exists():
+                    raise Exception(f"Video file does not exist: {local_path}")
+                await render_sprite_and_poster(str(local_path), sprite_out, poster_out, SPRITE_FRAME_COUNT)
+        except Exception as e:
+            logger.error(f"Error generating sprite sheet for media ID {media.id} (path={local_path}): {e}")
+            if emit:
+                emit(f"Part D — error generating sprite sheet for media {media.id}: {e}")
+            db.execute_query(
+                "UPDATE media SET sprite_status = 'error' WHERE id = %(id)s",
+                {"id": media.id}, "none"
+            )
+            if progress:
+                progress(done=1, errors=1)
+            return False
+
+        db.execute_query(
+            """UPDATE media
+               SET sprite_path = %(sp)s, poster_path = %(pp)s, sprite_frame_count = %(n)s, sprite_status = 'generated'
+               WHERE id = %(id)s""",
+            {
+                "sp": f"{LOCAL_THUMBNAILS_DIR_ALIAS}/{sprite_filename}",
+                "pp": f"{LOCAL_THUMBNAILS_DIR_ALIAS}/{poster_filename}",
+                "n": SPRITE_FRAME_COUNT,
+                "id": media.id,
+            }, "none"
+        )
+        if progress:
+            progress(done=1)
+        return True
+
+
+async def generate_missing_sprites(limit: int | None = None, cancel_check=None,
+                                   emit: Optional[Callable[[str], None]] = None,
+                                   progress: Optional[Callable[..., None]] = None):
+    """Render sprite sheets and posters for videos whose sprite_status is still 'pending'.
+    Incremental: videos that already have sprites (or failed before) are never re-fetched."""
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+    generated_count = 0
+    if progress:
+        pending = db.execute_query(
+            "SELECT COUNT(*) AS n FROM media WHERE sprite_status = 'pending' AND media_type = 'video'",
+            {}, return_type="single_row"
+        )["n"]
+        progress(total=pending if limit is None else min(pending, limit))
+    while True:
+        if cancel_check and cancel_check():
+            raise InterruptedError("Cancelled by user")
+
+        fetch_count = BATCH_SIZE if limit is None else min(BATCH_SIZE, limit - generated_count)
+        if fetch_count <= 0:
+            break
+
+        rows = db.execute_query(
+            f"SELECT * FROM media WHERE sprite_status = 'pending' AND media_type = 'video' LIMIT {fetch_count}",
+            {}, return_type="rows"
+        ) or []
+        if not rows:
+            break
+
+        results = await asyncio.gather(*[
+            process_one_video_preview(row, semaphore, emit, progress) for row in rows
+        ])
+        generated_count += sum(1 for r in results if r)
+
+        if len(rows) < fetch_count:
+            break
+
+    if generated_count:
+        logger.info(f"Part D - Generated {generated_count} sprite sheets")
 
 
 if __name__ == "__main__":
-    asyncio.run(generate_missing_thumbnails())
\ No newline at end of file
+    asyncio.run(generate_missing_thumbnails())
+    asyncio.run(generate_missing_sprites())
\ No newline at end of file
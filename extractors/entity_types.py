@@ -1,11 +1,14 @@
 import json
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional, Any, Literal
 
 import re
 
-from pydantic import BaseModel, Field, field_validator, model_validator, computed_field
+from pydantic import BaseModel, Field, field_validator, model_validator, computed_field, field_serializer, \
+    SerializationInfo
 
 from browsing_platform.server.services.tag import ITagWithType
 
@@ -111,6 +114,46 @@ def collapse_null_like_suffix(v: Optional[str]) -> Optional[str]:
     return None if v == 'None' else (v or None)
 
 
+class RawJsonText(str):
+    """JSON text of a `data` column, kept verbatim instead of parsed.
+
+    The browsing API only relays `data` to the client; parsing multi-KB blobs
+    into dicts just to dump them again dominated serialization of large
+    accounts. Inside keep_raw_json_data() the entity validators wrap the column
+    text in this type, and the `data` serializer either splices it into the
+    output unchanged (see browsing_platform/server/json_response.py) or, for any
+    other JSON serialization, parses it back so the output is identical.
+    """
+
+
+RAW_JSON_PLACEHOLDERS = "raw_json_placeholders"
+
+_keep_raw_json_data: ContextVar[bool] = ContextVar("keep_raw_json_data", default=False)
+
+
+@contextmanager
+def keep_raw_json_data():
+    """Entities built inside this block keep `data` as RawJsonText."""
+    token = _keep_raw_json_data.set(True)
+    try:
+        yield
+    finally:
+        _keep_raw_json_data.reset(token)
+
+
+def parse_json_data(v: Any) -> Any:
+    if isinstance(v, RawJsonText):
+        return v
+    if isinstance(v, str):
+        if _keep_raw_json_data.get():
+            return RawJsonText(v)
+        try:
+            v = json.loads(v)
+        except json.JSONDecodeError:
+            v = None
+    return v
+
+
 class EntityBase(BaseModel):
     id: Optional[int] = None
     created_at: Optional[datetime] = None
@@ -118,6 +161,15 @@ class EntityBase(BaseModel):
     canonical_id: Optional[int] = None
     tags: Optional[list[ITagWithType]] = None
 
+    @field_serializer('data', mode='wrap', when_used='json', check_fields=False)
+    def serialize_data(self, v, handler, info: SerializationInfo):
+        if isinstance(v, RawJsonText):
+            placeholders = info.context.get(RAW_JSON_PLACEHOLDERS) if info.context else None
+            if placeholders is None:
+                return json.loads(v)
+            return placeholders.add(v)
+        return handler(v)
+
 
 class Account(EntityBase):
     id_on_platform: Optional[str] = None
@@ -149,12 +201,7 @@ class Account(EntityBase):
 
     @field_validator('data', mode='before')
     def parse_data(cls, v, _):
-        if isinstance(v, str):
-            try:
-                v = json.loads(v)
-            except json.JSONDecodeError:
-                v = None
-        return v
+        return parse_json_data(v)
 
     @field_validator('identifiers', mode='before')
     def parse_identifiers(cls, v, _):
@@ -227,12 +274,7 @@ class Post(EntityBase):
 
     @field_validator('data', mode='before')
     def parse_data(cls, v, _):
-        if isinstance(v, str):
-            try:
-                v = json.loads(v)
-            except json.JSONDecodeError:
-                v = None
-        return v
+        return parse_json_data(v)
 
 t_media_type = Literal['video', 'audio', 'image']
 
@@ -250,6 +292,9 @@ class Media(EntityBase):
     thumbnail_path: Optional[str] = None
     aspect_ratio: Optional[float] = None
     thumbnail_status: Literal['pending', 'generated', 'not_needed', 'error'] = "pending"
+    sprite_path: Optional[str] = None
+    poster_path: Optional[str] = None
+    sprite_frame_count: Optional[int] = None
 
     @computed_field
     @property
@@ -277,12 +322,7 @@ class Media(EntityBase):
 
     @field_validator('data', mode='before')
     def parse_data(cls, v, _):
-        if isinstance(v, str):
-            try:
-                v = json.loads(v)
-            except json.JSONDecodeError:
-                v = None
-        return v
+        return parse_json_data(v)
 
 
 class Comment(EntityBase):
@@ -336,12 +376,7 @@ class Comment(EntityBase):
 
     @field_validator('data', mode='before')
     def parse_data(cls, v, _):
-        if isinstance(v, str):
-            try:
-                v = json.loads(v)
-            except json.JSONDecodeError:
-                v = None
-        return v
+        return parse_json_data(v)
 
 
 class Like(EntityBase):
@@ -386,12 +421,7 @@ class Like(EntityBase):
 
     @field_validator('data', mode='before')
     def parse_data(cls, v, _):
-        if isinstance(v, str):
-            try:
-                v = json.loads(v)
-            except json.JSONDecodeError:
-                v = None
-        return v
+        return parse_json_data(v)
 
     @model_validator(mode='after')
     def synthesize_id_on_platform(self):
@@ -443,12 +473,7 @@ class AccountRelation(EntityBase):
 
     @field_validator('data', mode='before')
     def parse_data(cls, v, _):
-        if isinstance(v, str):
-            try:
-                v = json.loads(v)
-            except json.JSONDecodeError:
-                v = None
-        return v
+        return parse_json_data(v)
 
     @model_validator(mode='after')
     def synthesize_id_on_platform(self):
@@ -513,12 +538,7 @@ class TaggedAccount(EntityBase):
 
     @field_validator('data', mode='before')
     def parse_data(cls, v, _):
-        if isinstance(v, str):
-            try:
-                v = json.loads(v)
-            except json.JSONDecodeError:
-                v = None
-        return v
+        return parse_json_data(v)
 
     @model_validator(mode='after')
     def synthesize_id_on_platform(self):
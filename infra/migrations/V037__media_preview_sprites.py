@@ -0,0 +1,80 @@
+"""
+V037 — Add hover-scrub sprite sheet and poster columns to media
+
+Part D now renders, for every local video, a sprite sheet (N evenly spaced
+frames tiled into one JPEG) and a WebP poster frame in a single ffmpeg pass.
+Both files live in thumbnails/ next to the regular thumbnail and are referenced
+through the same local_thumbnails/ alias.
+
+New columns:
+  sprite_path         local_thumbnails/{hash}.jpg, NULL until generated
+  poster_path         local_thumbnails/{hash}.webp, NULL until generated
+  sprite_frame_count  number of tiles in the sprite (stored per row so the
+                      client never depends on the current generator constant)
+  sprite_status       pending / generated / not_needed / error — mirrors
+                      thumbnail_status so generation stays incremental
+
+Existing non-video rows and rows without a file under local_archive_har/
+(missing or CDN-only local_url) are backfilled to 'not_needed' so the pending
+index only ever holds real work.
+"""
+
+import time
+
+
+def run(cnx):
+    cur = cnx.cursor()
+    try:
+        cur.execute("""
+            SELECT COUNT(*) FROM information_schema.columns
+            WHERE table_schema = DATABASE()
+              AND table_name = 'media'
+              AND column_name = 'sprite_status'
+        """)
+        (count,) = cur.fetchone()
+        if count > 0:
+            print("    media.sprite_status: already exists, skipping ALTER")
+        else:
+            print("    add columns sprite_path, poster_path, sprite_frame_count, sprite_status ...", flush=True)
+            t = time.perf_counter()
+            cur.execute("""
+                ALTER TABLE media
+                ADD COLUMN sprite_path VARCHAR(200) NULL AFTER thumbnail_status,
+                ADD COLUMN poster_path VARCHAR(200) NULL AFTER sprite_path,
+                ADD COLUMN sprite_frame_count TINYINT UNSIGNED NULL AFTER poster_path,
+                ADD COLUMN sprite_status
+                    ENUM('pending', 'generated', 'not_needed', 'error')
+                    NOT NULL DEFAULT 'pending'
+                    AFTER sprite_frame_count
+            """)
+            print(f"    add columns done ({time.perf_counter() - t:.1f}s)")
+
+            print("    backfill: setting not_needed ...", flush=True)
+            t = time.perf_counter()
+            cur.execute("""
+                UPDATE media
+                SET sprite_status = 'not_needed'
+                WHERE media_type != 'video'
+                   OR local_url IS NULL
+                   OR local_url NOT LIKE 'local\\_archive\\_har/%'
+            """)
+            print(f"    backfill: not_needed — {cur.rowcount} rows ({time.perf_counter() - t:.1f}s)")
+
+        cur.execute("""
+            SELECT COUNT(*) FROM information_schema.statistics
+            WHERE table_schema = DATABASE()
+              AND table_name = 'media'
+              AND index_name = 'media_sprite_status_index'
+        """)
+        (count,) = cur.fetchone()
+        if count == 0:
+            print("    media_sprite_status_index: creating ...", flush=True)
+            t = time.perf_counter()
+            cur.execute("CREATE INDEX media_sprite_status_index ON media (sprite_status)")
+            print(f"    media_sprite_status_index: done ({time.perf_counter() - t:.1f}s)")
+        else:
+            print("    media_sprite_status_index: already exists, skipping")
+
+        cnx.commit()
+    finally:
+        cur.close()
@@ -0,0 +1,121 @@
+"""
+V038 — Add media.phash for near-duplicate media lookup
+
+Part D now stores a 64-bit difference hash (see dhash() in
+db_loaders/thumbnail_generator.py) of each thumbnail in media.phash. The server
+keeps all hashes in memory and answers Hamming-distance queries against them
+(browsing_platform/server/services/media_similarity.py).
+
+Steps:
+  1. Add phash BIGINT UNSIGNED NULL.
+  2. Index media.update_date so the in-memory index can be refreshed
+     incrementally (only rows touched since the last refresh are re-read).
+  3. Backfill phash from the existing thumbnail JPEGs, in id-ordered batches,
+     using a single CASE/WHEN UPDATE per batch (same approach as V030).
+"""
+
+import os
+import time
+
+from PIL import Image
+
+from db_loaders.thumbnail_generator import LOCAL_THUMBNAILS_DIR_ALIAS, ROOT_THUMBNAILS, dhash
+
+BATCH_SIZE = 200
+
+
+def run(cnx):
+    cur = cnx.cursor(dictionary=True)
+    try:
+        # ------------------------------------------------------------------ #
+        # Step 1: Add the column
+        # ------------------------------------------------------------------ #
+        cur.execute(
+            """SELECT COUNT(*) AS cnt
+               FROM information_schema.columns
+               WHERE table_schema = DATABASE()
+                 AND table_name = 'media'
+                 AND column_name = 'phash'"""
+        )
+        if cur.fetchone()['cnt'] > 0:
+            print("    V038: phash column already exists, skipping ALTER")
+        else:
+            cur.execute(
+                """ALTER TABLE media
+                   ADD COLUMN phash BIGINT UNSIGNED NULL AFTER aspect_ratio"""
+            )
+            cnx.commit()
+            print("    V038: phash column added")
+
+        # ------------------------------------------------------------------ #
+        # Step 2: Index for incremental refresh
+        # ------------------------------------------------------------------ #
+        cur.execute(
+            """SELECT COUNT(*) AS cnt
+               FROM information_schema.statistics
+               WHERE table_schema = DATABASE()
+                 AND table_name = 'media'
+                 AND index_name = 'media_update_date_index'"""
+        )
+        if cur.fetchone()['cnt'] > 0:
+            print("    V038: media_update_date_index already exists, skipping")
+        else:
+            print("    V038: media_update_date_index: creating ...", flush=True)
+            t = time.perf_counter()
+            cur.execute("CREATE INDEX media_update_date_index ON media (update_date)")
+            cnx.commit()
+            print(f"    V038: media_update_date_index: done ({time.perf_counter() - t:.1f}s)")
+
+        # ------------------------------------------------------------------ #
+        # Step 3: Backfill from existing thumbnails
+        # ------------------------------------------------------------------ #
+        total_updated = 0
+        last_id = 0
+        while True:
+            cur.execute(
+                """SELECT id, thumbnail_path FROM media
+                   WHERE id > %s
+                     AND thumbnail_status = 'generated'
+                     AND phash IS NULL
+                   ORDER BY id
+                   LIMIT %s""",
+                (last_id, BATCH_SIZE),
+            )
+            rows = cur.fetchall()
+            if not rows:
+                break
+
+            last_id = rows[-1]['id']
+
+            updates = {}
+            for row in rows:
+                if not row['thumbnail_path'] or not row['thumbnail_path'].startswith(LOCAL_THUMBNAILS_DIR_ALIAS + '/'):
+                    continue
+                filename = row['thumbnail_path'].replace(LOCAL_THUMBNAILS_DIR_ALIAS + '/', '', 1)
+                full_path = os.path.join(str(ROOT_THUMBNAILS), filename)
+                if not os.path.exists(full_path):
+                    continue
+                try:
+                    with Image.open(full_path) as img:
+                        updates[row['id']] = dhash(img)
+                except Exception:
+                    continue
+
+            if not updates:
+                continue
+
+            ids = list(updates.keys())
+            cases = ' '.join('WHEN %s THEN %s' for _ in ids)
+            in_clause = ','.join(['%s'] * len(ids))
+            values = [v for media_id in ids for v in (media_id, updates[media_id])]
+            cur.execute(
+                f"UPDATE media SET phash = CASE id {cases} END WHERE id IN ({in_clause})",
+                values + ids,
+            )
+            cnx.commit()
+            total_updated += len(ids)
+
+        print(f"    V038: backfilled phash for {total_updated} media row(s)")
+        print("    V038: done")
+    finally:
+        cur.close()
@@ -0,0 +1,31 @@
+"""
+V039 — Add the remaining log_event() types to error_log.event_type
+
+'password_change', 'scraping_error' and 'scraping_progress' are accepted by
+log_event() but were missing from the enum, so those rows failed to insert.
+Events are now written in multi-row batches, where one rejected row would fail
+the whole batch.
+"""
+
+
+def run(cnx):
+    cur = cnx.cursor()
+    try:
+        cur.execute(
+            """ALTER TABLE error_log
+               MODIFY event_type ENUM (
+                   'server_call',
+                   'sql_error',
+                   'scraping_error',
+                   'scraping_progress',
+                   'unknown_error',
+                   'unauthorized_access',
+                   'login_attempt',
+                   '2fa_attempt',
+                   'password_change'
+               ) NOT NULL"""
+        )
+        cnx.commit()
+        print("    V039: error_log.event_type enum extended with password_change / scraping_* types")
+    finally:
+        cur.close()
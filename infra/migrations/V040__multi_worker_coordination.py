@@ -0,0 +1,59 @@
+"""
+V040 — State the API workers share when the server runs with several processes
+
+Changes to `incorporation_job` table:
+  - cancel_requested  TINYINT(1) — set by POST /incorporate/stop, which may be
+    served by a different worker than the one running the job; the job polls it.
+
+New table `broadcast_event`:
+  WebSocket broadcast messages (incorporation progress, …) written by the
+  worker that produces them and polled by every worker, which relays them to
+  its own connected clients.
+"""
+
+
+def _column_exists(cur, table, column):
+    cur.execute(
+        "SELECT COUNT(*) FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+        (table, column),
+    )
+    return cur.fetchone()[0] > 0
+
+
+def _table_exists(cur, table):
+    cur.execute(
+        "SELECT COUNT(*) FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name = %s",
+        (table,),
+    )
+    return cur.fetchone()[0] > 0
+
+
+def run(cnx):
+    cur = cnx.cursor()
+    try:
+        if _column_exists(cur, "incorporation_job", "cancel_requested"):
+            print("    incorporation_job.cancel_requested: already exists, skipping")
+        else:
+            cur.execute(
+                "ALTER TABLE incorporation_job ADD COLUMN cancel_requested TINYINT(1) NOT NULL DEFAULT 0"
+            )
+            print("    incorporation_job.cancel_requested: added")
+
+        if _table_exists(cur, "broadcast_event"):
+            print("    broadcast_event: already exists, skipping")
+        else:
+            cur.execute("""
+                CREATE TABLE broadcast_event (
+                    id          BIGINT AUTO_INCREMENT PRIMARY KEY,
+                    create_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL,
+                    channel     VARCHAR(64) NOT NULL,
+                    payload     JSON NOT NULL,
+                    INDEX idx_broadcast_event_channel_id (channel, id)
+                ) ENGINE = InnoDB
+            """)
+            print("    broadcast_event: created")
+        cnx.commit()
+    finally:
+        cur.close()
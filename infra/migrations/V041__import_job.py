@@ -0,0 +1,44 @@
+"""
+V041 — Background tag / annotation imports
+
+New table `import_job`:
+  One row per import large enough to run in the background (see
+  services/import_jobs.py). Holds the job's status and, once it finished, the
+  summary and per-row results the import endpoint would have returned.
+"""
+
+
+def _table_exists(cur, table):
+    cur.execute(
+        "SELECT COUNT(*) FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name = %s",
+        (table,),
+    )
+    return cur.fetchone()[0] > 0
+
+
+def run(cnx):
+    cur = cnx.cursor()
+    try:
+        if _table_exists(cur, "import_job"):
+            print("    import_job: already exists, skipping")
+        else:
+            cur.execute("""
+                CREATE TABLE import_job (
+                    id                   INT AUTO_INCREMENT PRIMARY KEY,
+                    started_at           DATETIME NOT NULL,
+                    completed_at         DATETIME,
+                    kind                 ENUM('tags','annotations') NOT NULL,
+                    status               ENUM('running','completed','failed') NOT NULL DEFAULT 'running',
+                    triggered_by_user_id INT,
+                    total_rows           INT NOT NULL,
+                    summary              JSON,
+                    results              LONGTEXT,
+                    error                TEXT,
+                    INDEX idx_import_job_user (triggered_by_user_id, id)
+                ) ENGINE = InnoDB
+            """)
+            print("    import_job: created")
+        cnx.commit()
+    finally:
+        cur.close()
@@ -0,0 +1,66 @@
+"""
+V042 — Materialized closure of the tag hierarchy
+
+New table `tag_closure`:
+  One row per (ancestor_id, descendant_id) pair connected by a path in
+  tag_hierarchy, with `depth` the length of the shortest path. Kept in step
+  with tag_hierarchy by the server (services/tag_closure.py) and read by the
+  search tag filter, tag usage counts, cycle checks and the community tag
+  dropdown instead of a recursive CTE over tag_hierarchy.
+
+Populated here from the existing hierarchy.
+"""
+import time
+
+
+def _table_exists(cur, table):
+    cur.execute(
+        "SELECT COUNT(*) FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name = %s",
+        (table,),
+    )
+    return cur.fetchone()[0] > 0
+
+
+def run(cnx):
+    cur = cnx.cursor()
+    try:
+        if _table_exists(cur, "tag_closure"):
+            print("    tag_closure: already exists, skipping")
+            return
+        cur.execute("""
+            CREATE TABLE tag_closure (
+                ancestor_id   INT NOT NULL,
+                descendant_id INT NOT NULL,
+                depth         INT NOT NULL,
+                PRIMARY KEY (ancestor_id, descendant_id),
+                INDEX idx_tag_closure_descendant (descendant_id, ancestor_id),
+                CONSTRAINT tag_closure_ancestor_id_fk
+                    FOREIGN KEY (ancestor_id) REFERENCES tag (id) ON DELETE CASCADE,
+                CONSTRAINT tag_closure_descendant_id_fk
+                    FOREIGN KEY (descendant_id) REFERENCES tag (id) ON DELETE CASCADE
+            ) ENGINE = InnoDB
+        """)
+        print("    tag_closure: created")
+
+        t = time.perf_counter()
+        # The depth guard only matters if tag_hierarchy already contains a cycle
+        cur.execute("""
+            INSERT INTO tag_closure (ancestor_id, descendant_id, depth)
+            WITH RECURSIVE paths AS (
+                SELECT super_tag_id AS ancestor_id, sub_tag_id AS descendant_id, 1 AS depth
+                FROM tag_hierarchy
+                UNION ALL
+                SELECT p.ancestor_id, th.sub_tag_id, p.depth + 1
+                FROM paths p JOIN tag_hierarchy th ON th.super_tag_id = p.descendant_id
+                WHERE p.depth < 100
+            )
+            SELECT ancestor_id, descendant_id, MIN(depth)
+            FROM paths
+            WHERE ancestor_id <> descendant_id
+            GROUP BY ancestor_id, descendant_id
+        """)
+        print(f"    tag_closure: populated {cur.rowcount} row(s) ({time.perf_counter() - t:.1f}s)")
+        cnx.commit()
+    finally:
+        cur.close()
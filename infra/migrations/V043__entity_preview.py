@@ -0,0 +1,109 @@
+"""
+V043 — Precomputed search-result previews
+
+New table `entity_preview`:
+  One row per archive session / account with the media count and the preview
+  media (ids and aspect ratios, as parallel JSON arrays) its search result
+  card shows. Refreshed by the loaders at the end of Part C and Part D (see
+  db_loaders/entity_preview.py) and read by search_archive_sessions /
+  search_accounts instead of ranking media with window functions per request.
+
+Populated here for every existing session and account, picking media the
+same way (first 4 by id per session, newest 8 by publication_date per
+account, media with a local_url only).
+"""
+import json
+import time
+
+_CHUNK = 500
+
+_RANKED_MEDIA = {
+    "archive_session": """
+        SELECT ma.archive_session_id AS entity_id, m.id, m.aspect_ratio,
+               COUNT(*) OVER (PARTITION BY ma.archive_session_id) AS media_count,
+               ROW_NUMBER() OVER (PARTITION BY ma.archive_session_id ORDER BY m.id) AS rn
+        FROM media_archive ma
+        JOIN media m ON ma.canonical_id = m.id
+        WHERE ma.archive_session_id IN ({ids})
+          AND m.local_url IS NOT NULL""",
+    "account": """
+        SELECT account_id AS entity_id, id, aspect_ratio,
+               COUNT(*) OVER (PARTITION BY account_id) AS media_count,
+               ROW_NUMBER() OVER (PARTITION BY account_id ORDER BY publication_date DESC) AS rn
+        FROM media
+        WHERE account_id IN ({ids})
+          AND local_url IS NOT NULL""",
+}
+_PREVIEW_SIZE = {"archive_session": 4, "account": 8}
+
+
+def _table_exists(cur, table):
+    cur.execute(
+        "SELECT COUNT(*) FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name = %s",
+        (table,),
+    )
+    return cur.fetchone()[0] > 0
+
+
+def _populate(cnx, cur, entity_type):
+    t = time.perf_counter()
+    # Every entity gets a row; the ones with media are filled in below
+    cur.execute(
+        f"""INSERT INTO entity_preview (entity_type, entity_id, media_count, preview_media_ids, aspect_ratios)
+            SELECT %s, id, 0, JSON_ARRAY(), JSON_ARRAY() FROM {entity_type}""",
+        (entity_type,),
+    )
+    cur.execute(f"SELECT id FROM {entity_type} ORDER BY id")
+    ids = [row[0] for row in cur.fetchall()]
+    with_media = 0
+    for start in range(0, len(ids), _CHUNK):
+        chunk = ids[start:start + _CHUNK]
+        cur.execute(
+            f"""SELECT entity_id, id, aspect_ratio, media_count
+                FROM ({_RANKED_MEDIA[entity_type].format(ids=', '.join(['%s'] * len(chunk)))}) ranked
+                WHERE rn <= %s
+                ORDER BY entity_id, rn""",
+            (*chunk, _PREVIEW_SIZE[entity_type]),
+        )
+        previews = {}
+        for entity_id, media_id, aspect_ratio, media_count in cur.fetchall():
+            preview = previews.setdefault(entity_id, {"count": media_count, "ids": [], "ratios": []})
+            preview["ids"].append(media_id)
+            preview["ratios"].append(float(aspect_ratio) if aspect_ratio is not None else None)
+        if previews:
+            cur.executemany(
+                """UPDATE entity_preview SET media_count = %s, preview_media_ids = %s, aspect_ratios = %s
+                   WHERE entity_type = %s AND entity_id = %s""",
+                [(p["count"], json.dumps(p["ids"]), json.dumps(p["ratios"]), entity_type, entity_id)
+                 for entity_id, p in previews.items()],
+            )
+            with_media += len(previews)
+        cnx.commit()
+    print(f"    entity_preview: {len(ids)} {entity_type} row(s), {with_media} with media "
+          f"({time.perf_counter() - t:.1f}s)")
+
+
+def run(cnx):
+    cur = cnx.cursor()
+    try:
+        if _table_exists(cur, "entity_preview"):
+            print("    entity_preview: already exists, skipping")
+            return
+        cur.execute("""
+            CREATE TABLE entity_preview (
+                entity_type       ENUM('archive_session','account') NOT NULL,
+                entity_id         INT NOT NULL,
+                media_count       INT NOT NULL DEFAULT 0,
+                preview_media_ids JSON NOT NULL,
+                aspect_ratios     JSON NOT NULL,
+                update_date       TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                PRIMARY KEY (entity_type, entity_id)
+            ) ENGINE = InnoDB
+        """)
+        print("    entity_preview: created")
+        _populate(cnx, cur, "archive_session")
+        _populate(cnx, cur, "account")
+        cnx.commit()
+    finally:
+        cur.close()
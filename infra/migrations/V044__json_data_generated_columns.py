@@ -0,0 +1,127 @@
+"""
+V044 — Indexed generated columns for frequently filtered `data` fields
+
+The advanced search filter can only LIKE-match the raw `data` JSON of
+accounts, posts and media, which scans the whole table. The fields people
+actually filter on are promoted to VIRTUAL generated columns with a secondary
+index each, and listed in ALLOWED_COLUMNS (services/search.py) as numbers, so
+such filters become index range scans.
+
+Adding a VIRTUAL column does not rebuild the table; building each index reads
+every row once.
+
+Values that are missing, JSON null or not convertible become NULL
+(JSON_VALUE ... NULL ON EMPTY NULL ON ERROR), so no insert can fail on them.
+Booleans are stored as 1 / 0. Where the platform API exposes a count under two
+shapes (v1 `follower_count` vs. GraphQL `edge_followed_by.count`), the first
+one present wins.
+
+Columns:
+
+account
+  data_is_verified      is_verified
+  data_is_private       is_private
+  data_follower_count   follower_count | edge_followed_by.count
+  data_following_count  following_count | edge_follow.count
+
+post
+  data_like_count       like_count | edge_liked_by.count
+  data_comment_count    comment_count | edge_media_to_comment.count
+  data_play_count       play_count | ig_play_count | view_count
+  data_video_duration   video_duration (seconds)
+
+media
+  data_video_duration   video_duration (seconds)
+  data_original_width   original_width
+  data_original_height  original_height
+
+`taken_at` is not promoted: post.publication_date and media.publication_date
+already hold it and are indexed.
+"""
+
+import time
+
+
+def _value(path: str, returning: str) -> str:
+    return f"JSON_VALUE(data, '{path}' RETURNING {returning} NULL ON EMPTY NULL ON ERROR)"
+
+
+def _count(*paths: str) -> str:
+    return "COALESCE(" + ", ".join(_value(p, "UNSIGNED") for p in paths) + ")"
+
+
+def _flag(path: str) -> str:
+    return (f"IF(JSON_TYPE(JSON_EXTRACT(data, '{path}')) = 'BOOLEAN', "
+            f"JSON_UNQUOTE(JSON_EXTRACT(data, '{path}')) = 'true', NULL)")
+
+
+# (table, column, SQL type, generation expression)
+COLUMNS = [
+    ("account", "data_is_verified", "TINYINT", _flag("$.is_verified")),
+    ("account", "data_is_private", "TINYINT", _flag("$.is_private")),
+    ("account", "data_follower_count", "BIGINT UNSIGNED", _count("$.follower_count", "$.edge_followed_by.count")),
+    ("account", "data_following_count", "BIGINT UNSIGNED", _count("$.following_count", "$.edge_follow.count")),
+
+    ("post", "data_like_count", "BIGINT UNSIGNED", _count("$.like_count", "$.edge_liked_by.count")),
+    ("post", "data_comment_count", "BIGINT UNSIGNED", _count("$.comment_count", "$.edge_media_to_comment.count")),
+    ("post", "data_play_count", "BIGINT UNSIGNED", _count("$.play_count", "$.ig_play_count", "$.view_count")),
+    ("post", "data_video_duration", "DECIMAL(12,3)", _value("$.video_duration", "DECIMAL(12,3)")),
+
+    ("media", "data_video_duration", "DECIMAL(12,3)", _value("$.video_duration", "DECIMAL(12,3)")),
+    ("media", "data_original_width", "INT UNSIGNED", _value("$.original_width", "UNSIGNED")),
+    ("media", "data_original_height", "INT UNSIGNED", _value("$.original_height", "UNSIGNED")),
+]
+
+
+def _column_exists(cur, table: str, column: str) -> bool:
+    cur.execute(
+        """
+        SELECT COUNT(*) AS cnt
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE()
+          AND table_name   = %s
+          AND column_name  = %s
+        """,
+        (table, column),
+    )
+    return cur.fetchone()["cnt"] > 0
+
+
+def _index_exists(cur, table: str, index_name: str) -> bool:
+    cur.execute(
+        """
+        SELECT COUNT(*) AS cnt
+        FROM information_schema.statistics
+        WHERE table_schema = DATABASE()
+          AND table_name   = %s
+          AND index_name   = %s
+        """,
+        (table, index_name),
+    )
+    return cur.fetchone()["cnt"] > 0
+
+
+def run(cnx):
+    cur = cnx.cursor(dictionary=True)
+    try:
+        for table, column, sql_type, expression in COLUMNS:
+            if _column_exists(cur, table, column):
+                print(f"    {table}.{column}: already exists, skipping")
+            else:
+                cur.execute(
+                    f"ALTER TABLE {table} ADD COLUMN {column} {sql_type} "
+                    f"GENERATED ALWAYS AS ({expression}) VIRTUAL"
+                )
+                print(f"    {table}.{column}: added")
+
+            index_name = f"{table}_{column}_index"
+            if _index_exists(cur, table, index_name):
+                print(f"    {index_name}: already exists, skipping")
+            else:
+                print(f"    {index_name}: creating ...", flush=True)
+                t = time.perf_counter()
+                cur.execute(f"CREATE INDEX {index_name} ON {table} ({column})")
+                print(f"    {index_name}: created ({time.perf_counter() - t:.1f}s)")
+        cnx.commit()
+    finally:
+        cur.close()
@@ -0,0 +1,111 @@
+"""
+V045 — Denormalized engagement counters on account and post
+
+New columns (INT NOT NULL DEFAULT 0):
+
+account
+  comments_count   comments written by the account
+  likes_count      likes given by the account
+  tagged_in_count  tagged_account rows tagging the account
+  followers_count  account_relation rows where it is followed (suggested excluded)
+  following_count  account_relation rows where it is the follower (suggested excluded)
+  relations_count  account_relation rows in either direction, suggested included
+
+post
+  comments_count
+  likes_count
+
+They replace the per-view COUNT(*) subqueries of the account / post pages and
+the follower / following grouping of the community candidate list. Intake
+keeps them in sync (db_loaders/engagement_counters.py); the loader's
+`repair_counters` stage recounts everything.
+
+Each table gets all of its columns in one ALTER, then every counter is
+backfilled with one grouped UPDATE. Only columns added by this run are
+backfilled; if a run stopped in between, run `repair_counters`.
+"""
+
+import time
+
+COLUMNS = {
+    "account": ["comments_count", "likes_count", "tagged_in_count",
+                "followers_count", "following_count", "relations_count"],
+    "post": ["comments_count", "likes_count"],
+}
+
+_REAL_FOLLOW = "(relation_type IS NULL OR relation_type != 'suggested')"
+
+# (table, column, grouped count: id -> cnt)
+BACKFILL = [
+    ("account", "comments_count",
+     "SELECT account_id AS id, COUNT(*) AS cnt FROM comment WHERE account_id IS NOT NULL GROUP BY account_id"),
+    ("account", "likes_count",
+     "SELECT account_id AS id, COUNT(*) AS cnt FROM post_like WHERE account_id IS NOT NULL GROUP BY account_id"),
+    ("account", "tagged_in_count",
+     "SELECT tagged_account_id AS id, COUNT(*) AS cnt FROM tagged_account "
+     "WHERE tagged_account_id IS NOT NULL GROUP BY tagged_account_id"),
+    ("account", "followers_count",
+     f"SELECT followed_account_id AS id, COUNT(*) AS cnt FROM account_relation "
+     f"WHERE {_REAL_FOLLOW} GROUP BY followed_account_id"),
+    ("account", "following_count",
+     f"SELECT follower_account_id AS id, COUNT(*) AS cnt FROM account_relation "
+     f"WHERE {_REAL_FOLLOW} GROUP BY follower_account_id"),
+    # UNION (not UNION ALL) so a self-relation is counted once, like the OR in the old query
+    ("account", "relations_count",
+     "SELECT id, COUNT(*) AS cnt FROM ("
+     "  SELECT follower_account_id AS id, id AS relation_id FROM account_relation"
+     "  UNION SELECT followed_account_id, id FROM account_relation"
+     ") r GROUP BY id"),
+    ("post", "comments_count",
+     "SELECT post_id AS id, COUNT(*) AS cnt FROM comment WHERE post_id IS NOT NULL GROUP BY post_id"),
+    ("post", "likes_count",
+     "SELECT post_id AS id, COUNT(*) AS cnt FROM post_like WHERE post_id IS NOT NULL GROUP BY post_id"),
+]
+
+
+def _column_exists(cur, table: str, column: str) -> bool:
+    cur.execute(
+        """
+        SELECT COUNT(*) AS cnt
+        FROM information_schema.columns
+        WHERE table_schema = DATABASE()
+          AND table_name   = %s
+          AND column_name  = %s
+        """,
+        (table, column),
+    )
+    return cur.fetchone()["cnt"] > 0
+
+
+def run(cnx):
+    cur = cnx.cursor(dictionary=True)
+    try:
+        added: set[tuple[str, str]] = set()
+        for table, columns in COLUMNS.items():
+            missing = [c for c in columns if not _column_exists(cur, table, c)]
+            if not missing:
+                print(f"    {table}: counter columns already exist, skipping")
+                continue
+            print(f"    {table}: adding {', '.join(missing)} ...", flush=True)
+            t = time.perf_counter()
+            cur.execute(f"ALTER TABLE {table} "
+                        + ", ".join(f"ADD COLUMN {c} INT NOT NULL DEFAULT 0" for c in missing))
+            added.update((table, c) for c in missing)
+            print(f"    {table}: added ({time.perf_counter() - t:.1f}s)")
+
+        for table, column, grouped in BACKFILL:
+            if (table, column) not in added:
+                continue
+            print(f"    backfill {table}.{column} ...", flush=True)
+            t = time.perf_counter()
+            cur.execute(
+                f"""UPDATE {table} a
+                    INNER JOIN ({grouped}) g ON a.id = g.id
+                    SET a.{column} = g.cnt"""
+            )
+            updated = cur.rowcount
+            cnx.commit()
+            print(f"    backfill {table}.{column}: {updated} rows ({time.perf_counter() - t:.1f}s)")
+        cnx.commit()
+    finally:
+        cur.close()
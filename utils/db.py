@@ -3,7 +3,7 @@ import logging
 import os
 import threading
 from contextlib import contextmanager
-from typing import Literal
+from typing import Callable, Literal
 
 import mysql
 import mysql.connector
@@ -15,11 +15,12 @@ PASSWORD = os.getenv("DB_PASS")
 DB_NAME = os.getenv("DB_NAME")
 DB_PORT = os.getenv("DB_PORT")
 DB_HOST = os.getenv("DB_HOST")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
 
 logger = logging.getLogger(__name__)
 
 cnx_pool = mysql.connector.pooling.MySQLConnectionPool(
-    pool_name="connections", pool_size=20,
+    pool_name="connections", pool_size=DB_POOL_SIZE,
     pool_reset_session=True,
     host=DB_HOST,
     port=DB_PORT,
@@ -54,6 +55,7 @@ def transaction_batch():
     This can provide 5-10x speedup for bulk insert operations.
     Nested calls reuse the same connection (inner batch is a no-op boundary).
     Thread-safe: each thread maintains its own connection via threading.local().
+    Callbacks registered with after_commit() run once the batch has committed.
     """
     if getattr(_local, "connection", None) is not None:
         # Already in a batch on this thread — nested call, just yield through.
@@ -63,6 +65,7 @@ def transaction_batch():
     cnx = cnx_pool.get_connection()
     cnx.autocommit = False
     _local.connection = cnx
+    _local.after_commit = []
     try:
         yield
         cnx.commit()
@@ -70,8 +73,23 @@ def transaction_batch():
         cnx.rollback()
         raise
     finally:
+        callbacks = _local.after_commit
         _local.connection = None
+        _local.after_commit = []
         cnx.close()
+    # Only reached when the batch committed
+    for callback in callbacks:
+        callback()
+
+
+def after_commit(callback: Callable[[], None]) -> None:
+    """Run `callback` when the transaction_batch open on this thread commits (never if it
+    rolls back), or right away outside a batch. For work that must not see, or let
+    others see, the state from before the write, such as dropping cached reads of it."""
+    if getattr(_local, "connection", None) is None:
+        callback()
+    else:
+        _local.after_commit.append(callback)
 
 
 def batch_insert(table: str, columns: list, rows: list) -> list:
@@ -165,3 +183,54 @@ def select_result(cursor):
         return None
     results = {columns[i]: data[i] for i in range(len(columns))}
     return results
+
+
+class AdvisoryLock:
+    """
+    MySQL named lock (GET_LOCK) held on a dedicated pooled connection.
+
+    Used as a cross-process gate for work that must run at most once across all
+    API workers. The lock lives exactly as long as the connection: release()
+    frees it, and MySQL frees it by itself if the holding process dies.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._cnx = None
+        self._mutex = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._mutex:
+            if self._cnx is not None:
+                return False
+            cnx = cnx_pool.get_connection()
+            try:
+                acquired = _execute_query_on_connection(
+                    cnx, "SELECT GET_LOCK(%(name)s, 0) AS acquired", {"name": self.name}, "single_row"
+                )["acquired"] == 1
+            except Exception:
+                cnx.close()
+                raise
+            if not acquired:
+                cnx.close()
+                return False
+            self._cnx = cnx
+            return True
+
+    def release(self) -> None:
+        with self._mutex:
+            cnx, self._cnx = self._cnx, None
+        if cnx is None:
+            return
+        try:
+            _execute_query_on_connection(cnx, "SELECT RELEASE_LOCK(%(name)s)", {"name": self.name}, "none")
+        except DbError as e:
+            # Returning the connection to the pool resets the session, which frees the lock anyway
+            logger.warning("RELEASE_LOCK(%s) failed: %s", self.name, e)
+        finally:
+            cnx.close()
+
+    def is_held_anywhere(self) -> bool:
+        """True if any session (in any process) currently holds the lock."""
+        row = execute_query("SELECT IS_USED_LOCK(%(name)s) AS holder", {"name": self.name}, "single_row")
+        return row is not None and row["holder"] is not None
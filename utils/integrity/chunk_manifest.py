@@ -33,43 +33,78 @@ def _merkle_root(chunk_digests: list[bytes]) -> bytes:
     return layer[0]
 
 
+def merkle_root_hex(chunk_hex_digests: list[str]) -> str:
+    """Merkle root of chunk digests given as hex strings, as in a manifest's "chunks"."""
+    return _merkle_root([bytes.fromhex(d) for d in chunk_hex_digests]).hex()
+
+
+class IncrementalManifest:
+    """Builds the same manifest as build_manifest() from data fed in order, in pieces
+    of any size (e.g. upload chunks as they arrive), so the file never has to be
+    read back. Holds at most one partial chunk in memory."""
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.size = 0
+        self.chunk_digests: list[bytes] = []
+        self._whole = hashlib.sha256()
+        self._tail = bytearray()
+
+    def update(self, data: bytes) -> None:
+        self._whole.update(data)
+        self.size += len(data)
+        view = memoryview(data)
+        if self._tail:
+            take = min(self.chunk_size - len(self._tail), len(view))
+            self._tail += view[:take]
+            view = view[take:]
+            if len(self._tail) < self.chunk_size:
+                return
+            self.chunk_digests.append(hashlib.sha256(self._tail).digest())
+            self._tail = bytearray()
+        full = len(view) - len(view) % self.chunk_size
+        for start in range(0, full, self.chunk_size):
+            self.chunk_digests.append(hashlib.sha256(view[start:start + self.chunk_size]).digest())
+        self._tail += view[full:]
+
+    def whole_file_sha256(self) -> str:
+        return self._whole.hexdigest()
+
+    def manifest(self, filename: str, par2: Optional[dict] = None) -> dict:
+        chunk_digests = list(self.chunk_digests)
+        if self._tail:
+            chunk_digests.append(hashlib.sha256(self._tail).digest())
+        manifest: dict = {
+            "version": MANIFEST_VERSION,
+            "filename": filename,
+            "size": self.size,
+            "algorithm": ALGORITHM,
+            "chunk_size": self.chunk_size,
+            "chunk_count": len(chunk_digests),
+            "whole_file_sha256": self.whole_file_sha256(),
+            "merkle_root": _merkle_root(chunk_digests).hex(),
+            "chunks": [d.hex() for d in chunk_digests],
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        }
+        if par2 is not None:
+            manifest["par2"] = par2
+        return manifest
+
+
 def build_manifest(
     path: Path,
     chunk_size: int = DEFAULT_CHUNK_SIZE,
     par2: Optional[dict] = None,
 ) -> dict:
     path = Path(path)
-    chunk_hex: list[str] = []
-    chunk_digests: list[bytes] = []
-    whole = hashlib.sha256()
-    size = 0
-
+    builder = IncrementalManifest(chunk_size)
     with open(path, "rb") as f:
         while True:
             buf = f.read(chunk_size)
             if not buf:
                 break
-            size += len(buf)
-            digest = hashlib.sha256(buf).digest()
-            chunk_digests.append(digest)
-            chunk_hex.append(digest.hex())
-            whole.update(buf)
-
-    manifest: dict = {
-        "version": MANIFEST_VERSION,
-        "filename": path.name,
-        "size": size,
-        "algorithm": ALGORITHM,
-        "chunk_size": chunk_size,
-        "chunk_count": len(chunk_hex),
-        "whole_file_sha256": whole.hexdigest(),
-        "merkle_root": _merkle_root(chunk_digests).hex(),
-        "chunks": chunk_hex,
-        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-    }
-    if par2 is not None:
-        manifest["par2"] = par2
-    return manifest
+            builder.update(buf)
+    return builder.manifest(path.name, par2=par2)
 
 
 def serialize_manifest(manifest: dict) -> bytes: